@@ -0,0 +1,71 @@
+"""
+Compares serial and concurrent scoring against a local fake model endpoint.
+
+Run with: python -m backend.benchmarks.bench_async_scoring
+"""
+import os
+
+os.environ.setdefault("GOOGLE_AI_API_KEY", "fake-key")
+os.environ.setdefault("GOOGLE_AI_MODEL", "fake-model")
+
+from backend.benchmarks.fake_model_server import FakeModelServer  # noqa: E402
+from backend.models.segment import Segment  # noqa: E402
+from backend.core.rate_limiter import RateLimiter  # noqa: E402
+from backend.services.highlight_detection import HighlightDetectionService  # noqa: E402
+
+from google import genai  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import asyncio  # noqa: E402
+import time  # noqa: E402
+
+CHUNK_COUNT = 40
+LATENCY_SECONDS = 0.25
+MAX_CONCURRENCY = 10
+THROTTLED_RPM = 600
+
+
+def make_transcripts() -> list:
+    return [Segment(0, 60000, "草" * index) for index in range(CHUNK_COUNT)]
+
+
+def make_service(server: FakeModelServer, rate_limiter: RateLimiter) -> HighlightDetectionService:
+    return HighlightDetectionService(rate_limiter=rate_limiter, client=genai.Client(
+        api_key="fake-key", http_options=types.HttpOptions(base_url=server.base_url)))
+
+
+def drained_limiter(requests_per_minute: int) -> RateLimiter:
+    # Spend the initial burst so the run shows the steady-state rate
+    limiter = RateLimiter(requests_per_minute, 10**9)
+    for _ in range(requests_per_minute):
+        limiter.reserve()
+    return limiter
+
+
+def timed(label: str, server: FakeModelServer, run) -> list:
+    server.request_count = 0
+    start_time = time.perf_counter()
+    scored = run()
+    elapsed = time.perf_counter() - start_time
+    print(f"{label:<34} {elapsed:7.2f}s  requests={server.request_count}")
+    return [t.highlight_score for t in scored]
+
+
+if __name__ == "__main__":
+    unlimited = RateLimiter(10**6, 10**9)
+
+    with FakeModelServer(latency_seconds=LATENCY_SECONDS) as server:
+        print(f"{CHUNK_COUNT} chunks, {LATENCY_SECONDS}s injected latency")
+        print(f"sum(latency) = {CHUNK_COUNT * LATENCY_SECONDS:.2f}s, "
+              f"N/RPM at {THROTTLED_RPM} RPM = {CHUNK_COUNT * 60 / THROTTLED_RPM:.2f}s\n")
+
+        serial = timed("serial", server, lambda: make_service(
+            server, unlimited).score_transcripts(make_transcripts()))
+        concurrent = timed(f"async, concurrency={MAX_CONCURRENCY}", server, lambda: asyncio.run(
+            make_service(server, unlimited).score_transcripts_async(
+                make_transcripts(), max_concurrency=MAX_CONCURRENCY)))
+        throttled = timed(f"async, {THROTTLED_RPM} RPM limit", server, lambda: asyncio.run(
+            make_service(server, drained_limiter(THROTTLED_RPM)).score_transcripts_async(
+                make_transcripts(), max_concurrency=MAX_CONCURRENCY)))
+
+    assert serial == concurrent == throttled
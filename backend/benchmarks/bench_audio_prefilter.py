@@ -0,0 +1,62 @@
+"""
+Times the audio prefilter on a synthetic 1 hour stream, mostly steady music
+and near silence with a few lively minutes, and counts the AI requests it saves.
+
+Run with: python -m backend.benchmarks.bench_audio_prefilter
+"""
+from backend.core.constants import SCORING_BATCH_SIZE
+from backend.models.segment import Segment
+from backend.services.audio_extraction import AudioExtractionService
+
+import math
+import numpy as np
+import os
+import tempfile
+import time
+import wave
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 60
+CHUNK_COUNT = 60
+# Minutes with laughter-like bursts, every other minute is music or silence
+LIVELY_CHUNKS = {5, 6, 21, 37, 38, 39, 52}
+
+
+def make_stream_wav(path: str) -> None:
+    rng = np.random.default_rng(0)
+    times = np.arange(SAMPLE_RATE * CHUNK_SECONDS) / SAMPLE_RATE
+    # Written a minute at a time to keep the generator small
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        for index in range(CHUNK_COUNT):
+            if index in LIVELY_CHUNKS:
+                samples = rng.normal(0, 0.3, len(times)) * ((times % 0.3) < 0.12) + \
+                    0.05 * np.sin(2 * np.pi * 220 * times)
+            elif index % 2:
+                samples = 0.1 * np.sin(2 * np.pi * 440 * times)
+            else:
+                samples = rng.normal(0, 0.002, len(times))
+            file.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        audio_path = os.path.join(directory, "stream.wav")
+        make_stream_wav(audio_path)
+        transcripts = [Segment(index * CHUNK_SECONDS * 1000, (index + 1) * CHUNK_SECONDS * 1000, f"chunk {index}")
+                       for index in range(CHUNK_COUNT)]
+
+        start_time = time.perf_counter()
+        candidates = AudioExtractionService(audio_path).select_candidates(transcripts)
+        elapsed = time.perf_counter() - start_time
+
+    kept = {transcripts.index(candidate) for candidate in candidates}
+    print(f"{CHUNK_COUNT * CHUNK_SECONDS / 3600:.1f} hours of audio analyzed in {elapsed:.2f}s")
+    print(f"chunks scored: {len(candidates)} of {CHUNK_COUNT}, "
+          f"AI requests: {math.ceil(len(candidates) / SCORING_BATCH_SIZE)} "
+          f"instead of {math.ceil(CHUNK_COUNT / SCORING_BATCH_SIZE)}")
+    print(f"lively chunks kept: {len(LIVELY_CHUNKS & kept)} of {len(LIVELY_CHUNKS)}")
+
+    assert LIVELY_CHUNKS <= kept
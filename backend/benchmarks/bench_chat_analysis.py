@@ -0,0 +1,70 @@
+"""
+Times the chat pre-ranking of a synthetic live chat replay and reports the
+peak RSS, which stays flat as the replay is read one line at a time.
+
+Run with: python -m backend.benchmarks.bench_chat_analysis [message count]
+"""
+from backend.models.segment import Segment
+from backend.services.chat_analysis import ChatAnalysisService
+from backend.services.prerank import select_candidates
+
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+DEFAULT_MESSAGE_COUNT = 500000
+STREAM_HOURS = 4
+CHUNK_SECONDS = 60
+MESSAGES = ["こんにちは", "草草草", "wwwww", "かわいい", "888888", "lol", "えっ", "おつかれさま"]
+
+
+def make_replay(path: str, message_count: int) -> None:
+    # Written line by line so the generator itself stays small, padded like real renderers
+    stream_ms = STREAM_HOURS * 3600 * 1000
+    with open(path, "w", encoding="utf-8") as file:
+        for index in range(message_count):
+            if index % 500 == 0:
+                item = {"liveChatPaidMessageRenderer": {
+                    "message": {"runs": [{"text": "スパチャ"}]},
+                    "purchaseAmountText": {"simpleText": "¥1,000"}}}
+            else:
+                item = {"liveChatTextMessageRenderer": {
+                    "message": {"runs": [{"text": MESSAGES[index % len(MESSAGES)]}]},
+                    "authorName": {"simpleText": f"viewer {index % 997}"},
+                    "authorPhoto": {"thumbnails": [{"url": "https://yt4.ggpht.com/" + "x" * 120}]},
+                    "timestampUsec": str(1700000000000000 + index)}}
+            line = {"replayChatItemAction": {
+                "actions": [{"addChatItemAction": {"item": item, "clientId": f"client-{index}"}}],
+                "videoOffsetTimeMsec": str(index * stream_ms // message_count)}}
+            file.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MESSAGE_COUNT
+    transcripts = [Segment(start * 1000, (start + CHUNK_SECONDS) * 1000, "")
+                   for start in range(0, STREAM_HOURS * 3600, CHUNK_SECONDS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        chat_path = os.path.join(directory, "stream.live_chat.json")
+        make_replay(chat_path, message_count)
+        # ru_maxrss is in kilobytes on Linux
+        baseline_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{message_count} messages, {os.path.getsize(chat_path) / 1e6:.1f} MB replay, "
+              f"{len(transcripts)} chunks\n")
+
+        service = ChatAnalysisService(chat_path)
+        start_time = time.perf_counter()
+        features = service.extract_features()
+        parse_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        candidates = select_candidates(transcripts, [service.score_windows(features, transcripts)])
+        select_seconds = time.perf_counter() - start_time
+
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"parse       {parse_seconds:7.2f}s  {os.path.getsize(chat_path) / 1e6 / parse_seconds:6.1f} MB/s")
+        print(f"rank+select {select_seconds:7.3f}s  kept {len(candidates)} of {len(transcripts)} chunks")
+        print(f"peak RSS    {peak_rss_mb:7.1f} MB ({peak_rss_mb - baseline_rss_mb:+.1f} MB while ranking)")
@@ -0,0 +1,130 @@
+"""
+Measures the per-request setup overhead of the GCS and Gemini clients,
+building them for every request as before versus taking them from the
+shared ClientPool, and the cost of a TLS handshake on every request versus
+a pooled connection, against a local HTTPS server. Over the internet every
+handshake also costs network round trips, which are not part of these numbers.
+
+Needs the openssl command to create a throwaway key and certificate.
+
+Run with: python -m backend.benchmarks.bench_client_setup [request count]
+"""
+from backend.core.clients import ClientPool
+
+from google import genai
+from google.cloud import storage
+from google.oauth2 import service_account
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from threading import Thread
+
+import json
+import os
+import requests
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_REQUEST_COUNT = 50
+
+
+def make_credentials(directory: str) -> tuple:
+    """
+    :return: (service account file, certificate file, key file)
+    """
+    key_path = os.path.join(directory, "key.pem")
+    cert_path = os.path.join(directory, "cert.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key_path, "-out", cert_path],
+                   check=True, capture_output=True)
+    with open(key_path) as file:
+        private_key = file.read()
+
+    credentials_path = os.path.join(directory, "service-account.json")
+    with open(credentials_path, "w") as file:
+        json.dump({"type": "service_account", "project_id": "bench", "private_key_id": "bench",
+                   "private_key": private_key, "client_email": "bench@bench.iam.gserviceaccount.com",
+                   "client_id": "1", "token_uri": "https://oauth2.googleapis.com/token"}, file)
+    return credentials_path, cert_path, key_path
+
+
+def start_https_server(cert_path: str, key_path: str) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes, which Nagle would delay
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(label: str, request_count: int, run) -> float:
+    start_time = time.perf_counter()
+    for _ in range(request_count):
+        run()
+    per_request_ms = (time.perf_counter() - start_time) / request_count * 1000
+    print(f"{label:<40} {per_request_ms:8.2f} ms per request")
+    return per_request_ms
+
+
+if __name__ == "__main__":
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUEST_COUNT
+
+    with tempfile.TemporaryDirectory() as directory:
+        credentials_path, cert_path, key_path = make_credentials(directory)
+        server = start_https_server(cert_path, key_path)
+        url = f"https://127.0.0.1:{server.server_address[1]}/"
+        print(f"{request_count} requests\n")
+
+        def build_clients():
+            # What every request did before: parse the key, build both clients
+            credentials = service_account.Credentials.from_service_account_file(credentials_path)
+            storage.Client(credentials=credentials, project=credentials.project_id)
+            genai.Client(api_key="bench-key")
+
+        client_pool = ClientPool(credentials_path=credentials_path, api_key="bench-key")
+        client_pool.start()
+
+        def shared_clients():
+            client_pool.storage_client
+            client_pool.genai_client()
+
+        before = timed("clients built per request", request_count, build_clients)
+        after = timed("shared clients", request_count, shared_clients)
+        print(f"{'':<40} {before - after:8.2f} ms saved per request\n")
+
+        def new_connection():
+            with requests.Session() as session:
+                session.get(url, verify=cert_path).raise_for_status()
+
+        pooled_session = requests.Session()
+        pooled_session.mount("https://", HTTPAdapter(pool_maxsize=client_pool.pool_size))
+
+        def pooled_connection():
+            pooled_session.get(url, verify=cert_path).raise_for_status()
+
+        before = timed("TLS handshake per request", request_count, new_connection)
+        after = timed("pooled connection", request_count, pooled_connection)
+        print(f"{'':<40} {before - after:8.2f} ms saved per request")
+
+        pooled_session.close()
+        client_pool.close()
+        server.shutdown()
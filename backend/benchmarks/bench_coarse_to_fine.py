@@ -0,0 +1,131 @@
+"""
+Counts the AI requests of flat and coarse-to-fine scoring on a synthetic
+6 hour stream with a dozen highlights, against a local fake model, and
+reports how many of the highlights each mode finds.
+
+The fake model scores a text by its liveliest moment, so a long window
+holding a highlight scores about as high as the highlight itself.
+
+Run with: python -m backend.benchmarks.bench_coarse_to_fine
+"""
+import os
+
+os.environ.setdefault("GOOGLE_AI_API_KEY", "fake-key")
+os.environ.setdefault("GOOGLE_AI_MODEL", "fake-model")
+
+from backend.benchmarks.fake_model_server import FakeModelServer  # noqa: E402
+from backend.core.constants import SCORING_BATCH_SIZE  # noqa: E402
+from backend.core.rate_limiter import RateLimiter  # noqa: E402
+from backend.services.coarse_to_fine import CoarseToFineSelector  # noqa: E402
+from backend.services.highlight_detection import HighlightDetectionService  # noqa: E402
+from backend.services.transcript_parser import TranscriptParser  # noqa: E402
+
+from google import genai  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import numpy as np  # noqa: E402
+import tempfile  # noqa: E402
+
+STREAM_SECONDS = 6 * 3600
+LINE_SECONDS = 2
+HIGHLIGHT_COUNT = 12
+# Share of lively lines in a highlight and elsewhere
+HIGHLIGHT_DENSITY = 0.8
+BACKGROUND_DENSITY = 0.05
+LIVELY_WORD = "草"
+# (window seconds, windows per prompt) of every coarse-to-fine run
+COARSE_SETTINGS = ((600, 6), (300, 12), (180, 20))
+
+
+class LivelinessModelServer(FakeModelServer):
+    """
+    Scores a text by the density of lively lines in its liveliest stretch,
+    and counts the characters of the prompts it receives.
+    """
+
+    window_lines = 15
+
+    def __init__(self):
+        super().__init__()
+        self.prompt_characters = 0
+
+    @classmethod
+    def score(cls, text: str) -> float:
+        lively = np.array([word.startswith(LIVELY_WORD) for word in text.split()], dtype=float)
+        if len(lively) < cls.window_lines:
+            return float(round(10 * lively.mean())) if len(lively) else 0.0
+        densities = np.convolve(lively, np.ones(cls.window_lines), mode="valid") / cls.window_lines
+        return float(round(10 * densities.max()))
+
+    def respond(self, prompt: str) -> str:
+        self.prompt_characters += len(prompt)
+        return super().respond(prompt)
+
+
+def make_transcript_json(path: str, rng: np.random.Generator) -> list:
+    """
+    :return: The (start, end) seconds of every highlight
+    """
+    line_count = STREAM_SECONDS // LINE_SECONDS
+    starts = np.sort(rng.choice(np.arange(300, STREAM_SECONDS - 300, 600), HIGHLIGHT_COUNT, replace=False))
+    highlights = [(int(start), int(start + rng.integers(60, 180))) for start in starts]
+
+    density = np.full(line_count, BACKGROUND_DENSITY)
+    for start, end in highlights:
+        density[start // LINE_SECONDS:end // LINE_SECONDS] = HIGHLIGHT_DENSITY
+    lively = rng.random(line_count) < density
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump([{"text": f"{LIVELY_WORD if is_lively else '話'}{index}",
+                    "start": index * LINE_SECONDS, "duration": LINE_SECONDS}
+                   for index, is_lively in enumerate(lively.tolist())], file, ensure_ascii=False)
+    return highlights
+
+
+def recall(found: list, highlights: list) -> float:
+    hits = sum(any(clip.start_ms < end * 1000 and start * 1000 < clip.end_ms for clip in found)
+               for start, end in highlights)
+    return hits / len(highlights)
+
+
+async def score_flat(service: HighlightDetectionService, chunks: list) -> list:
+    return await service.execute_async(chunks)
+
+
+async def score_coarse_to_fine(service: HighlightDetectionService, chunks: list,
+                               window_size: int, batch_size: int) -> list:
+    candidates = await CoarseToFineSelector(
+        service, window_size=window_size, batch_size=batch_size).select_async(chunks)
+    return await service.execute_async(candidates)
+
+
+def run(label: str, server: LivelinessModelServer, highlights: list, score) -> int:
+    server.request_count = 0
+    server.prompt_characters = 0
+    service = HighlightDetectionService(rate_limiter=RateLimiter(10**6, 10**9), client=genai.Client(
+        api_key="fake-key", http_options=types.HttpOptions(base_url=server.base_url)))
+    found = asyncio.run(score(service))
+    print(f"{label:<30} requests={server.request_count:4}  prompt chars={server.prompt_characters:8}  "
+          f"clips={len(found):3}  recall={recall(found, highlights):.2f}")
+    return server.request_count
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory, LivelinessModelServer() as server:
+        transcript_path = os.path.join(directory, "transcript.json")
+        highlights = make_transcript_json(transcript_path, rng)
+        parser = TranscriptParser()
+        print(f"{STREAM_SECONDS / 3600:.0f} hour stream, {HIGHLIGHT_COUNT} highlights, "
+              f"{SCORING_BATCH_SIZE} chunks per prompt\n")
+
+        flat_requests = run("flat", server, highlights,
+                            lambda service: score_flat(service, parser.parse(transcript_path)))
+        for window_size, batch_size in COARSE_SETTINGS:
+            requests = run(f"coarse {window_size}s x {batch_size} per prompt", server, highlights,
+                           lambda service: score_coarse_to_fine(
+                               service, parser.parse(transcript_path), window_size, batch_size))
+            print(f"{'':<30} {flat_requests / requests:.1f}x fewer requests than flat")
@@ -0,0 +1,74 @@
+"""
+Compares upload_from_filename with chunked resumable uploads and parallel
+composite uploads against a local fake GCS server throttled per connection,
+with and without injected chunk failures.
+
+Run with: python -m backend.benchmarks.bench_gcs_upload [size in MiB]
+"""
+from backend.benchmarks.fake_gcs_server import FakeGcsServer
+from backend.services.resumable_upload import ResumableUploader
+
+from google.api_core.client_options import ClientOptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+import os
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZE_MB = 64
+# Per connection, so parallel parts add up
+BYTES_PER_SECOND = 32 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_PARTS = 8
+FAILING_CHUNK_REQUESTS = {2, 5, 8}
+
+
+def make_bucket(server: FakeGcsServer) -> storage.Bucket:
+    client = storage.Client(project="bench", credentials=AnonymousCredentials(),
+                            client_options=ClientOptions(api_endpoint=server.base_url))
+    return client.bucket(server.bucket_name)
+
+
+def timed(label: str, server: FakeGcsServer, size: int, run) -> None:
+    server.objects.clear()
+    server.chunk_request_count = 0
+    start_time = time.perf_counter()
+    retry_count = run()
+    elapsed = time.perf_counter() - start_time
+    assert len(server.objects["clip.mp4"]) == size
+    print(f"{label:<36} {elapsed:7.2f}s  {size / elapsed / 2**20:7.1f} MiB/s  "
+          f"requests={server.chunk_request_count}  retries={retry_count}")
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SIZE_MB) * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeGcsServer(bytes_per_second=BYTES_PER_SECOND) as server:
+        file_path = os.path.join(directory, "clip.mp4")
+        with open(file_path, "wb") as file:
+            file.write(os.urandom(size))
+        print(f"{size // 2**20} MiB file, {BYTES_PER_SECOND // 2**20} MiB/s per connection\n")
+
+        bucket = make_bucket(server)
+        single = ResumableUploader(bucket, chunk_size=CHUNK_SIZE, composite_threshold=size + 1)
+        composite = ResumableUploader(bucket, chunk_size=CHUNK_SIZE, composite_threshold=0,
+                                      max_parts=MAX_PARTS, backoff_seconds=0.05)
+
+        def upload_from_filename():
+            blob = bucket.blob("clip.mp4")
+            blob.chunk_size = CHUNK_SIZE
+            blob.upload_from_filename(file_path, checksum=None)
+            return 0
+
+        timed("upload_from_filename", server, size, upload_from_filename)
+        timed("resumable, 1 part", server, size,
+              lambda: single.upload(file_path, "clip.mp4").retry_count)
+        timed(f"composite, {MAX_PARTS} parts", server, size,
+              lambda: composite.upload(file_path, "clip.mp4").retry_count)
+
+        server.fail_chunk_requests = FAILING_CHUNK_REQUESTS
+        timed(f"composite, {len(FAILING_CHUNK_REQUESTS)} failing chunks", server, size,
+              lambda: composite.upload(file_path, "clip.mp4").retry_count)
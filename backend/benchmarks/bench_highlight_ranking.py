@@ -0,0 +1,68 @@
+"""
+Times re-ranking the scored chunks of a synthetic 10 hour stream with
+several ranking parameter sets, at 60, 10 and 1 second chunks, next to the
+threshold and aggregation it extends.
+
+Run with: python -m backend.benchmarks.bench_highlight_ranking
+"""
+from backend.models.segment import Segment
+from backend.services.highlight_detection import HighlightDetectionService
+from backend.services.highlight_ranking import HighlightRanker
+
+from unittest.mock import MagicMock
+
+import dataclasses
+import numpy as np
+import time
+
+STREAM_SECONDS = 10 * 3600
+CHUNK_SECONDS = (60, 10, 1)
+REPEATS = 5
+PARAMETER_SETS = {
+    "defaults": {},
+    "smoothed": {"smoothing_chunks": 3, "min_peak_score": -1.0},
+    "short clips": {"min_clip_seconds": 10, "max_clip_seconds": 60, "top_k": 50},
+    "strict peaks": {"min_peak_score": 1.5, "top_k": 5},
+}
+
+
+def make_chunks(chunk_seconds: int, rng: np.random.Generator) -> tuple:
+    chunk_count = STREAM_SECONDS // chunk_seconds
+    chunk_ms = chunk_seconds * 1000
+    # Mostly dull chunks with a few bursts of excitement
+    scores = np.clip(rng.normal(4, 2, chunk_count), 0, 10).round()
+    transcripts = [Segment(index * chunk_ms, (index + 1) * chunk_ms, f"chunk {index}",
+                           highlight_score=float(score), reason="")
+                   for index, score in enumerate(scores.tolist())]
+    signals = {"audio": rng.normal(size=chunk_count) + (scores > 7),
+               "chat": rng.gamma(2.0, size=chunk_count)}
+    return transcripts, signals
+
+
+def timed(run) -> tuple:
+    best_seconds = float("inf")
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        result = run()
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+    return result, best_seconds
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    service = HighlightDetectionService(client=MagicMock())
+
+    for chunk_seconds in CHUNK_SECONDS:
+        transcripts, signals = make_chunks(chunk_seconds, rng)
+        print(f"{len(transcripts)} chunks of {chunk_seconds}s")
+
+        highlights, seconds = timed(lambda: service.aggregate_highlights(service.detect_highlights(
+            [dataclasses.replace(transcript) for transcript in transcripts])))
+        print(f"  {'threshold':<16} {seconds * 1000:8.1f} ms  clips={len(highlights)}")
+
+        for label, parameters in PARAMETER_SETS.items():
+            ranker = HighlightRanker(**parameters)
+            clips, seconds = timed(lambda: service.rank_highlights(transcripts, signals, ranker))
+            total_seconds = sum(clip.duration_ms for clip in clips) / 1000
+            print(f"  {label:<16} {seconds * 1000:8.1f} ms  clips={len(clips)}  total={total_seconds:.0f}s")
+        print()
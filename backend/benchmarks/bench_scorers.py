@@ -0,0 +1,133 @@
+"""
+Compares the throughput and the agreement of the scoring backends on a
+synthetic 3 hour stream with lively sections, against a local fake model
+with injected latency.
+
+The fake model stands in for Gemini and for a local OpenAI compatible
+server alike: it scores a chunk by its share of lively lines, including
+the lively lines without any keyword, which the heuristic cannot see.
+Agreement with Gemini is reported as the rank correlation of the chunk
+scores and the overlap of the chunks above THRESHOLD_SCORE.
+
+Run with: python -m backend.benchmarks.bench_scorers
+"""
+import os
+
+os.environ.setdefault("GOOGLE_AI_API_KEY", "fake-key")
+os.environ.setdefault("GOOGLE_AI_MODEL", "fake-model")
+
+from backend.benchmarks.fake_model_server import FakeModelServer  # noqa: E402
+from backend.core.constants import SCORING_BATCH_SIZE, THRESHOLD_SCORE  # noqa: E402
+from backend.core.rate_limiter import RateLimiter  # noqa: E402
+from backend.services.highlight_detection import HighlightDetectionService  # noqa: E402
+from backend.services.scorers import GeminiScorer, HeuristicScorer, OpenAICompatibleScorer  # noqa: E402
+from backend.services.transcript_parser import TranscriptParser  # noqa: E402
+
+from google import genai  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import numpy as np  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+STREAM_SECONDS = 3 * 3600
+SECTION_SECONDS = 300
+LINE_SECONDS = 2
+LATENCY_SECONDS = 0.2
+# Share of lively lines in a lively section and elsewhere
+LIVELY_SECTION_SHARE = 0.3
+LIVELY_DENSITY = 0.7
+BACKGROUND_DENSITY = 0.05
+CALM_LINES = ("今日は雑談します", "次のステージ行きます", "コメントありがとう", "ちょっと休憩", "このアイテム使う")
+LIVELY_LINES = ("やばいやばい", "草www", "えぐすぎる！", "まじで勝った！", "最高！", "なんでそうなるの？！")
+# Lively to the model, invisible to the keywords of the heuristic
+UNMARKED_LIVELY_LINES = ("うおおおお", "今の見た", "ちょっと待って待って", "ありえないって")
+
+
+class LivelinessModelServer(FakeModelServer):
+    """
+    Scores a chunk by its share of lively lines.
+    """
+
+    @staticmethod
+    def score(text: str) -> float:
+        lines = text.split()
+        if not lines:
+            return 0.0
+        lively = sum(line in LIVELY_LINES or line in UNMARKED_LIVELY_LINES for line in lines)
+        return float(round(10 * min(1.0, 1.5 * lively / len(lines))))
+
+
+def make_transcript_json(path: str, rng: np.random.Generator) -> None:
+    line_count = STREAM_SECONDS // LINE_SECONDS
+    section_lines = SECTION_SECONDS // LINE_SECONDS
+    lively_sections = rng.random(line_count // section_lines + 1) < LIVELY_SECTION_SHARE
+    density = np.where(np.repeat(lively_sections, section_lines)[:line_count], LIVELY_DENSITY, BACKGROUND_DENSITY)
+    lively = rng.random(line_count) < density
+    unmarked = rng.random(line_count) < 0.3
+
+    lines = []
+    for index in range(line_count):
+        if not lively[index]:
+            text = rng.choice(CALM_LINES)
+        else:
+            text = rng.choice(UNMARKED_LIVELY_LINES if unmarked[index] else LIVELY_LINES)
+        lines.append({"text": str(text), "start": index * LINE_SECONDS, "duration": LINE_SECONDS})
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(lines, file, ensure_ascii=False)
+
+
+def rank(values: np.ndarray) -> np.ndarray:
+    """
+    Ranks of the values, tied values sharing their average rank.
+    """
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return ((ends - counts + ends - 1) / 2)[inverse]
+
+
+def score(service: HighlightDetectionService, chunks: list) -> tuple:
+    """
+    :return: (score of every chunk, seconds taken)
+    """
+    for chunk in chunks:
+        chunk.highlight_score = chunk.reason = None
+    started = time.perf_counter()
+    asyncio.run(service.score_transcripts_async(chunks, batch_size=SCORING_BATCH_SIZE))
+    elapsed = time.perf_counter() - started
+    return np.array([chunk.highlight_score or 0 for chunk in chunks], dtype=float), elapsed
+
+
+def report(label: str, scores: np.ndarray, elapsed: float, reference: np.ndarray, requests: int) -> None:
+    correlation = np.corrcoef(rank(scores), rank(reference))[0, 1]
+    highlights, reference_highlights = scores > THRESHOLD_SCORE, reference > THRESHOLD_SCORE
+    overlap = (highlights & reference_highlights).sum() / max(1, (highlights | reference_highlights).sum())
+    print(f"{label:<20} requests={requests:4}  time={elapsed:7.3f}s  chunks/s={len(scores) / elapsed:9.0f}  "
+          f"highlights={highlights.sum():3}  rank corr={correlation:.2f}  highlight overlap={overlap:.2f}")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory, LivelinessModelServer(LATENCY_SECONDS) as server:
+        transcript_path = os.path.join(directory, "transcript.json")
+        make_transcript_json(transcript_path, rng)
+        chunks = TranscriptParser().parse(transcript_path)
+        print(f"{STREAM_SECONDS / 3600:.0f} hour stream, {len(chunks)} chunks, "
+              f"{LATENCY_SECONDS}s fake model latency, {SCORING_BATCH_SIZE} chunks per prompt\n")
+
+        scorers = {
+            "gemini (fake)": GeminiScorer(genai.Client(
+                api_key="fake-key", http_options=types.HttpOptions(base_url=server.base_url))),
+            "openai compatible": OpenAICompatibleScorer(base_url=f"{server.base_url}/v1"),
+            "heuristic": HeuristicScorer(),
+        }
+        reference = None
+        for label, scorer in scorers.items():
+            server.request_count = 0
+            service = HighlightDetectionService(rate_limiter=RateLimiter(10**6, 10**9), scorer=scorer)
+            scores, elapsed = score(service, chunks)
+            reference = scores if reference is None else reference
+            report(label, scores, elapsed, reference, server.request_count)
@@ -0,0 +1,106 @@
+"""
+Counts the input tokens of scoring a synthetic 3 hour stream, alternating
+quiet music sections full of [音楽] captions and dense talk full of filler,
+against a local fake model.
+
+The prompts as they were sent before compaction, 60 second chunks with the
+instructions repeated in every prompt, are compared with token budgeted
+chunks and compacted prompts, with the instructions in every prompt and
+as a system instruction. Tokens are counted with the token counter of the
+pipeline, tiktoken when its encoding can be loaded.
+
+Run with: python -m backend.benchmarks.bench_token_budget
+"""
+import os
+
+os.environ.setdefault("GOOGLE_AI_API_KEY", "fake-key")
+os.environ.setdefault("GOOGLE_AI_MODEL", "fake-model")
+
+from backend.benchmarks.fake_model_server import FakeModelServer  # noqa: E402
+from backend.core.constants import HIGHLIGHT_DETECTION_BATCH_INSTRUCTION, HIGHLIGHT_DETECTION_BATCH_PROMPT, INDEX, SCORING_BATCH_SIZE, TEXT  # noqa: E402
+from backend.core.rate_limiter import RateLimiter  # noqa: E402
+from backend.core.tokens import get_token_counter  # noqa: E402
+from backend.services.highlight_detection import HighlightDetectionService  # noqa: E402
+from backend.services.scorers import GeminiScorer  # noqa: E402
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy  # noqa: E402
+
+from google import genai  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import numpy as np  # noqa: E402
+import tempfile  # noqa: E402
+
+STREAM_SECONDS = 3 * 3600
+SECTION_SECONDS = 600
+FILLERS = ("えー", "あのー", "えっと", "うーん")
+WORDS = ("今日", "配信", "ゲーム", "コメント", "ありがとう", "みんな", "やばい", "次", "ボス", "勝った")
+
+
+def make_transcript_json(path: str, rng: np.random.Generator) -> None:
+    lines = []
+    start = 0.0
+    while start < STREAM_SECONDS:
+        dense = (start // SECTION_SECONDS) % 2 == 1
+        if dense:
+            # Fast talk, often opened by a run of filler
+            words = rng.choice(WORDS, rng.integers(4, 10)).tolist()
+            fillers = rng.choice(FILLERS, rng.integers(0, 4)).tolist() if rng.random() < 0.4 else []
+            text, duration = "".join(fillers) + "".join(words), 1.5
+        else:
+            # Music with the odd comment
+            text = " ".join(["[音楽]"] * int(rng.integers(1, 4))) if rng.random() < 0.8 else "いいね"
+            duration = 4.0
+        lines.append({"text": text, "start": round(start, 3), "duration": duration})
+        start += duration
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(lines, file, ensure_ascii=False)
+
+
+def report(label: str, request_tokens: list, chunk_count: int) -> None:
+    tokens = np.asarray(request_tokens)
+    print(f"{label:<44} chunks={chunk_count:4}  requests={len(tokens):4}  input tokens={tokens.sum():7}  "
+          f"per request: mean={tokens.mean():6.0f} max={tokens.max():6} std={tokens.std():6.0f}")
+
+
+def uncompacted_request_tokens(chunks: list) -> list:
+    """
+    Input tokens of the batched prompts as they were sent before compaction,
+    with the instructions in every prompt.
+    """
+    counter = get_token_counter()
+    return [counter.count(HIGHLIGHT_DETECTION_BATCH_INSTRUCTION + HIGHLIGHT_DETECTION_BATCH_PROMPT % json.dumps(
+        [{INDEX: index, TEXT: chunk.text} for index, chunk in enumerate(chunks[batch_start:batch_start + SCORING_BATCH_SIZE])],
+        ensure_ascii=False)) for batch_start in range(0, len(chunks), SCORING_BATCH_SIZE)]
+
+
+def scored_request_tokens(server: FakeModelServer, chunks: list, system_instruction: bool) -> list:
+    counter = get_token_counter()
+    server.requests = []
+    service = HighlightDetectionService(rate_limiter=RateLimiter(10**6, 10**9), scorer=GeminiScorer(
+        genai.Client(api_key="fake-key", http_options=types.HttpOptions(base_url=server.base_url)),
+        system_instruction=system_instruction))
+    asyncio.run(service.score_transcripts_async(chunks, batch_size=SCORING_BATCH_SIZE))
+    return [counter.count(instruction) + counter.count(prompt) for instruction, prompt in server.requests]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    counter = get_token_counter()
+
+    with tempfile.TemporaryDirectory() as directory, FakeModelServer() as server:
+        transcript_path = os.path.join(directory, "transcript.json")
+        make_transcript_json(transcript_path, rng)
+        print(f"{STREAM_SECONDS / 3600:.0f} hour stream, counting "
+              f"{'characters' if counter.encoding is None else counter.encoding.name} as tokens\n")
+
+        time_chunks = TranscriptParser().parse(transcript_path)
+        token_chunks = TranscriptParser(policy=WindowPolicy.TOKENS).parse(transcript_path)
+        report("60s chunks, uncompacted", uncompacted_request_tokens(time_chunks), len(time_chunks))
+        report("60s chunks, compacted", scored_request_tokens(
+            server, time_chunks, system_instruction=False), len(time_chunks))
+        report("token chunks, compacted", scored_request_tokens(
+            server, token_chunks, system_instruction=False), len(token_chunks))
+        report("token chunks, compacted, system instruction", scored_request_tokens(
+            server, token_chunks, system_instruction=True), len(token_chunks))
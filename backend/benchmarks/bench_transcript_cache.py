@@ -0,0 +1,77 @@
+"""
+Times repeated parses of a synthetic 100k line transcript at several chunk
+sizes, streaming the JSON file every time versus reading the memory-mapped
+binary copy kept by TranscriptCache.
+
+Run with: python -m backend.benchmarks.bench_transcript_cache
+"""
+from backend.benchmarks.bench_transcript_parser import LINE_COUNT, make_transcript_json
+from backend.core.constants import DURATION, START, TEXT
+from backend.core.timestamps import seconds_to_ms
+from backend.models.segment import Segment
+from backend.services.transcript_cache import TranscriptCache, iter_json_array
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy
+
+from typing import Iterable, Iterator
+
+import itertools
+import os
+import tempfile
+import time
+
+CHUNK_SIZES_SECONDS = (30, 60, 120, 300)
+
+
+def json_segments(lines: Iterable[dict], close_gaps: bool = True) -> Iterator[Segment]:
+    """
+    The lines of a transcript JSON as segments, the way the parser read them
+    before the binary cache, see BinaryTranscript.segments.
+
+    :param close_gaps: Extend every line to the start of the next one,
+                       instead of ending it after its own duration
+    """
+    lines, next_lines = itertools.tee(lines)
+    next(next_lines, None)
+    for line in lines:
+        next_line = next(next_lines, None)
+        end_sec = line[START] + line[DURATION]
+        if next_line is not None:
+            end_sec = next_line[START] if close_gaps else min(end_sec, next_line[START])
+        text = line[TEXT].strip()
+        if text:
+            yield Segment(seconds_to_ms(line[START]), seconds_to_ms(end_sec), text)
+
+
+def json_parse(parser: TranscriptParser, transcript_path: str) -> list:
+    # The parser as it was before the binary cache
+    return parser.regroup(json_segments(iter_json_array(transcript_path),
+                                        close_gaps=parser.policy != WindowPolicy.BOUNDARY))
+
+
+def timed(run) -> tuple:
+    start_time = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        transcript_path = os.path.join(directory, "transcript.json")
+        make_transcript_json(transcript_path)
+        cache = TranscriptCache()
+
+        _, conversion_seconds = timed(lambda: cache.open(transcript_path).close())
+        print(f"{LINE_COUNT} transcript lines, "
+              f"{os.path.getsize(transcript_path) / 1e6:.1f} MB of JSON, "
+              f"{os.path.getsize(cache.binary_path(transcript_path)) / 1e6:.1f} MB binary, "
+              f"converted in {conversion_seconds:.3f}s\n")
+
+        print(f"{'policy':<10} {'chunk':>6} {'json':>8} {'binary':>8}")
+        for policy in WindowPolicy:
+            for chunk_size in CHUNK_SIZES_SECONDS:
+                parser = TranscriptParser(policy=policy, chunk_size=chunk_size)
+                expected, json_seconds = timed(lambda: json_parse(parser, transcript_path))
+                chunks, binary_seconds = timed(lambda: parser.parse(transcript_path))
+                assert chunks == expected
+                print(f"{policy.value:<10} {chunk_size:>5}s {json_seconds:7.3f}s {binary_seconds:7.3f}s"
+                      f"  {json_seconds / binary_seconds:5.1f}x")
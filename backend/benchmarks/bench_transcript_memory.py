@@ -0,0 +1,67 @@
+"""
+Measures the peak RSS of parsing a very large synthetic transcript, loading
+the whole file with json.load versus streaming it with TranscriptParser.iter_parse.
+
+Every mode runs in its own process, so the peaks do not mask each other.
+
+Run with: python -m backend.benchmarks.bench_transcript_memory [line count]
+"""
+from backend.benchmarks.bench_transcript_cache import json_segments
+from backend.services.transcript_parser import TranscriptParser
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_LINE_COUNT = 1000000
+LINE_SECONDS = 0.36
+MODES = ("load", "stream")
+
+
+def make_transcript_json(path: str, line_count: int) -> None:
+    # Written line by line so the generator itself stays small
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[\n")
+        for index in range(line_count):
+            separator = ",\n" if index < line_count - 1 else "\n"
+            file.write(json.dumps({"text": f"配信のセリフ {index}", "start": round(index * LINE_SECONDS, 3),
+                                   "duration": LINE_SECONDS}, ensure_ascii=False) + separator)
+        file.write("]\n")
+
+
+def run_mode(mode: str, path: str) -> None:
+    parser = TranscriptParser()
+    start_time = time.perf_counter()
+
+    if mode == "load":
+        # The whole file, every line and every chunk are held at once
+        with open(path, "r", encoding="utf-8") as file:
+            chunk_count = len(parser.regroup(list(json_segments(json.load(file)))))
+    else:
+        chunk_count = sum(1 for _ in parser.iter_parse(path))
+
+    elapsed = time.perf_counter() - start_time
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<8} {elapsed:7.2f}s  chunks={chunk_count}  peak RSS={peak_rss_mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] in MODES:
+        run_mode(sys.argv[1], sys.argv[2])
+        sys.exit()
+
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LINE_COUNT
+    with tempfile.TemporaryDirectory() as directory:
+        transcript_path = os.path.join(directory, "transcript.json")
+        make_transcript_json(transcript_path, line_count)
+        print(f"{line_count} transcript lines, "
+              f"{os.path.getsize(transcript_path) / 1e6:.1f} MB of JSON\n")
+
+        for mode in MODES:
+            subprocess.run([sys.executable, "-m", "backend.benchmarks.bench_transcript_memory",
+                            mode, transcript_path], check=True)
@@ -0,0 +1,116 @@
+"""
+Times transcript parsing on a synthetic 10 hour, 100k line transcript JSON,
+comparing the original string-based implementation with every window policy.
+
+Run with: python -m backend.benchmarks.bench_transcript_parser
+"""
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy
+from backend.services.highlight_detection import HighlightDetectionService
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import json
+import os
+import tempfile
+import time
+
+LINE_COUNT = 100000
+# 100k lines over 10 hours; the original implementation fails past 24 hours
+LINE_SECONDS = 0.36
+CHUNK_SIZE_SECONDS = 60
+
+
+def make_transcript_json(path: str) -> None:
+    lines = [{"text": f"line {index}{'。' if index % 7 == 0 else ''}",
+              "start": round(index * LINE_SECONDS, 3),
+              # Every 50th line is followed by a pause
+              "duration": LINE_SECONDS / 2 if index % 50 == 0 else LINE_SECONDS}
+             for index in range(LINE_COUNT)]
+    with open(path, "w") as file:
+        json.dump(lines, file)
+
+
+def legacy_parse(transcripts_path: str) -> list:
+    """
+    The parser as it was before the Segment model: HH:MM:SS.mmm strings,
+    strptime on every line, string concatenation and dict equality checks.
+    """
+    def format_seconds(seconds: float) -> str:
+        total_seconds = timedelta(seconds=seconds).total_seconds()
+        hours = int(total_seconds // 3600)
+        minutes = int((total_seconds % 3600) // 60)
+        secs = total_seconds % 60
+        return f"{hours:02}:{minutes:02}:{secs:06.3f}"
+
+    with open(transcripts_path, "r") as file:
+        transcripts_raw = json.load(file)
+
+    transcripts = []
+    for i, chunk in enumerate(transcripts_raw):
+        start_sec = chunk["start"]
+        end_sec = transcripts_raw[i + 1]["start"] if i < len(transcripts_raw) - 1 \
+            else chunk["duration"] + start_sec
+        clean_text = chunk["text"].strip()
+        if clean_text:
+            transcripts.append({"start": format_seconds(start_sec),
+                                "end": format_seconds(end_sec), "text": clean_text})
+
+    aggregated = []
+    aggregated_text = ""
+    previous_start_time = None
+    for transcript in transcripts:
+        current_start_time = datetime.strptime(transcript["start"], "%H:%M:%S.%f")
+        current_end_time = datetime.strptime(transcript["end"], "%H:%M:%S.%f")
+        aggregated_text = aggregated_text + " " + transcript["text"]
+        if previous_start_time is None:
+            previous_start_time = current_start_time
+        if current_end_time - previous_start_time > timedelta(seconds=CHUNK_SIZE_SECONDS) \
+                or transcript == transcripts[-1]:
+            aggregated.append({"start": datetime.strftime(previous_start_time, "%H:%M:%S.%f")[:-3],
+                               "end": transcript["end"], "text": str.strip(aggregated_text)})
+            aggregated_text = ""
+            previous_start_time = None
+
+    return aggregated
+
+
+def timed(label: str, run):
+    start_time = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start_time
+    print(f"{label:<28} {elapsed:7.3f}s  chunks={len(result)}")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        transcript_path = os.path.join(directory, "transcript.json")
+        make_transcript_json(transcript_path)
+        print(f"{LINE_COUNT} transcript lines, "
+              f"{LINE_COUNT * LINE_SECONDS / 3600:.1f} hours\n")
+
+        legacy, legacy_seconds = timed("original implementation",
+                                       lambda: legacy_parse(transcript_path))
+        results = {}
+        for policy in WindowPolicy:
+            parser = TranscriptParser(policy=policy, chunk_size=CHUNK_SIZE_SECONDS)
+            results[policy], seconds = timed(
+                f"{policy.value} policy", lambda: parser.parse(transcript_path))
+            if policy == WindowPolicy.FIXED:
+                print(f"{'':<28} {legacy_seconds / seconds:6.1f}x faster than the original")
+
+    # The fixed policy produces the same chunks as the original implementation
+    assert [(chunk.text, str(chunk)) for chunk in results[WindowPolicy.FIXED]] == [
+        (chunk["text"], f"{chunk['start']} - {chunk['end']}") for chunk in legacy]
+
+    chunks = results[WindowPolicy.FIXED]
+    for chunk in chunks:
+        chunk.highlight_score = 9
+        chunk.reason = ""
+    service = HighlightDetectionService(client=MagicMock())
+    highlights, _ = timed("aggregate highlights", lambda: service.aggregate_highlights(
+        service.detect_highlights(chunks)))
+
+    # Every chunk touches the next one, so they all merge
+    assert len(highlights) == 1
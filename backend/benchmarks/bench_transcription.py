@@ -0,0 +1,54 @@
+"""
+Reports the throughput of local Whisper transcription, in audio seconds
+per wall second, for every worker count up to the number of CPUs.
+
+Needs openai-whisper and torch. Without an audio file, 10 minutes of
+synthetic bursts and pauses are transcribed; the text is meaningless but
+the model does the same work.
+
+Run with: python -m backend.benchmarks.bench_transcription [audio path] [model size]
+"""
+from backend.services.transcription import TranscriptionService
+
+import numpy as np
+import os
+import sys
+import tempfile
+import wave
+
+SAMPLE_RATE = 16000
+SYNTHETIC_SECONDS = 600
+CHUNK_SECONDS = 60
+
+
+def make_speech_like_wav(path: str) -> None:
+    rng = np.random.default_rng(0)
+    times = np.arange(SAMPLE_RATE * SYNTHETIC_SECONDS) / SAMPLE_RATE
+    # Syllable-rate bursts of voiced noise with a pause every 7 seconds
+    samples = 0.2 * np.sin(2 * np.pi * 180 * times) * (1 + rng.normal(0, 0.3, len(times)))
+    samples *= ((times % 0.2) < 0.12) & ((times % 7) < 6)
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        file.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+if __name__ == "__main__":
+    model_size = sys.argv[2] if len(sys.argv) > 2 else "tiny"
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        audio_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(directory, "speech.wav")
+        if len(sys.argv) <= 1:
+            make_speech_like_wav(audio_path)
+
+        print(f"model={model_size}, {CHUNK_SECONDS}s chunks\n")
+        print(f"{'workers':>7} {'audio':>8} {'wall':>8} {'throughput':>12}")
+        for worker_count in worker_counts:
+            service = TranscriptionService(model_size=model_size, max_workers=worker_count,
+                                           chunk_seconds=CHUNK_SECONDS)
+            service.transcribe(audio_path, os.path.join(directory, "transcript.json"))
+            report = service.report
+            print(f"{worker_count:>7} {report.audio_seconds:7.0f}s {report.elapsed_seconds:7.1f}s "
+                  f"{report.throughput:9.1f} x")
@@ -0,0 +1,57 @@
+"""
+Compares the serial, pooled and single-pass clip modes on a synthetic video.
+
+Run with: python -m backend.benchmarks.bench_video_clipping
+Requires the ffmpeg binary on the PATH.
+"""
+from backend.models.segment import Segment
+from backend.services.video_clipping import ClipMode, VideoClippingService
+
+import ffmpeg
+import os
+import tempfile
+import time
+
+VIDEO_DURATION_SECONDS = 600
+HIGHLIGHT_COUNT = 20
+HIGHLIGHT_DURATION_SECONDS = 10
+
+
+def make_test_video(video_path: str) -> None:
+    video = ffmpeg.input(
+        f"testsrc=duration={VIDEO_DURATION_SECONDS}:size=1280x720:rate=30", f="lavfi")
+    audio = ffmpeg.input(
+        f"sine=frequency=440:duration={VIDEO_DURATION_SECONDS}", f="lavfi")
+    (
+        ffmpeg
+        .output(video, audio, video_path, vcodec="libx264", preset="ultrafast", g=60, acodec="aac")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def make_highlights() -> list:
+    spacing_ms = VIDEO_DURATION_SECONDS * 1000 // HIGHLIGHT_COUNT
+    return [Segment(index * spacing_ms, index * spacing_ms + HIGHLIGHT_DURATION_SECONDS * 1000, "")
+            for index in range(HIGHLIGHT_COUNT)]
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "testsrc.mp4")
+        make_test_video(video_path)
+        print(f"{VIDEO_DURATION_SECONDS}s synthetic video "
+              f"({os.path.getsize(video_path) / 1e6:.1f} MB), {HIGHLIGHT_COUNT} highlights\n")
+
+        for mode in ClipMode:
+            service = VideoClippingService(video_path)
+            start_time = time.perf_counter()
+            clipped_videos = service.clip(make_highlights(), mode=mode)
+            elapsed = time.perf_counter() - start_time
+
+            clipped_bytes = sum(os.path.getsize(path)
+                                for path in clipped_videos)
+            print(f"{mode.value:<12} {elapsed:6.2f}s  "
+                  f"clips={len(clipped_videos)}  output={clipped_bytes / 1e6:.1f} MB")
+            for path in clipped_videos:
+                os.remove(path)
@@ -0,0 +1,176 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, unquote, urlparse
+
+import json
+import re
+import time
+import uuid
+
+
+class FakeGcsServer:
+    """
+    A local stand-in for the parts of the GCS JSON API used for uploads:
+    resumable upload sessions, compose, object metadata and delete.
+
+    Faults are injected on chunk requests: the request numbers in
+    fail_chunk_requests answer 503 after persisting only half of the chunk,
+    like a connection dropped mid-request. The request numbers in
+    stall_chunk_requests persist nothing and never answer, like a stalled
+    connection. bytes_per_second throttles every request, as GCS throughput
+    is limited per connection.
+    """
+
+    def __init__(self, bucket_name: str = "fake-bucket", bytes_per_second: float | None = None,
+                 fail_chunk_requests: set | None = None, stall_chunk_requests: set | None = None,
+                 stall_seconds: float = 5.0):
+        self.bucket_name = bucket_name
+        self.bytes_per_second = bytes_per_second
+        self.fail_chunk_requests = fail_chunk_requests or set()
+        self.stall_chunk_requests = stall_chunk_requests or set()
+        self.stall_seconds = stall_seconds
+        self.objects: dict[str, bytes] = {}
+        self.chunk_request_count = 0
+        self.compose_count = 0
+        self._sessions: dict[str, dict] = {}
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeGcsServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _object_resource(self, name: str) -> dict:
+        return {"kind": "storage#object", "bucket": self.bucket_name, "name": name,
+                "size": str(len(self.objects[name])), "generation": "1", "metageneration": "1"}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = self._read_body()
+                query = parse_qs(url.query)
+
+                if url.path.startswith(f"/upload/storage/v1/b/{server.bucket_name}/o"):
+                    name = query.get("name", [None])[0] or json.loads(body or b"{}").get("name")
+                    upload_id = uuid.uuid4().hex
+                    with server._lock:
+                        server._sessions[upload_id] = {"name": name, "data": bytearray()}
+                    location = f"{server.base_url}/upload/storage/v1/b/{server.bucket_name}/o" \
+                               f"?uploadType=resumable&upload_id={upload_id}"
+                    self._respond(200, {}, {"Location": location})
+                    return
+
+                match = re.fullmatch(rf"/storage/v1/b/{server.bucket_name}/o/(.+)/compose", url.path)
+                if match:
+                    name = unquote(match.group(1))
+                    sources = [source["name"] for source in json.loads(body)["sourceObjects"]]
+                    with server._lock:
+                        if any(source not in server.objects for source in sources):
+                            self._respond(404, {"error": {"code": 404, "message": "Not Found"}})
+                            return
+                        server.objects[name] = b"".join(server.objects[source] for source in sources)
+                        server.compose_count += 1
+                        resource = server._object_resource(name)
+                    self._respond(200, resource)
+                    return
+
+                self._respond(404, {"error": {"code": 404, "message": "Not Found"}})
+
+            def do_PUT(self):
+                query = parse_qs(urlparse(self.path).query)
+                body = self._read_body()
+                session = server._sessions.get(query.get("upload_id", [""])[0])
+                if session is None:
+                    self._respond(404, {"error": {"code": 404, "message": "No such upload"}})
+                    return
+
+                content_range = self.headers.get("Content-Range", "")
+                status_query = re.fullmatch(r"bytes \*/(\d+|\*)", content_range)
+                if status_query is None:
+                    start, end, total = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range).groups()
+                    with server._lock:
+                        server.chunk_request_count += 1
+                        failing = server.chunk_request_count in server.fail_chunk_requests
+                        stalling = server.chunk_request_count in server.stall_chunk_requests
+                    if stalling:
+                        # Holds the connection without answering, then drops it
+                        time.sleep(server.stall_seconds)
+                        self.close_connection = True
+                        return
+                    if server.bytes_per_second:
+                        time.sleep(len(body) / server.bytes_per_second)
+                    if int(start) == len(session["data"]):
+                        session["data"] += body[:len(body) // 2] if failing else body
+                    if failing:
+                        self._respond(503, {"error": {"code": 503, "message": "Backend Error"}})
+                        return
+                    total = None if total == "*" else int(total)
+                else:
+                    total = None if status_query.group(1) == "*" else int(status_query.group(1))
+
+                if total is not None and len(session["data"]) >= total:
+                    with server._lock:
+                        server.objects[session["name"]] = bytes(session["data"])
+                        resource = server._object_resource(session["name"])
+                    self._respond(200, resource)
+                    return
+
+                headers = {"Range": f"bytes=0-{len(session['data']) - 1}"} if session["data"] else {}
+                self._respond(308, None, headers)
+
+            def do_GET(self):
+                name = self._object_name()
+                if name not in server.objects:
+                    self._respond(404, {"error": {"code": 404, "message": "Not Found"}})
+                    return
+                self._respond(200, server._object_resource(name))
+
+            def do_DELETE(self):
+                name = self._object_name()
+                with server._lock:
+                    found = server.objects.pop(name, None) is not None
+                if not found:
+                    self._respond(404, {"error": {"code": 404, "message": "Not Found"}})
+                    return
+                self._respond(204, None)
+
+            def _object_name(self) -> str:
+                prefix = f"/storage/v1/b/{server.bucket_name}/o/"
+                path = urlparse(self.path).path
+                return unquote(path[len(prefix):]) if path.startswith(prefix) else ""
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _respond(self, status: int, payload: dict | None, headers: dict | None = None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                for header, value in (headers or {}).items():
+                    self.send_header(header, value)
+                if payload is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
@@ -0,0 +1,97 @@
+from backend.core.constants import HIGHLIGHT_SCORE, INDEX, REASON, TEXT
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import json
+import time
+
+
+class FakeModelServer:
+    """
+    A local stand-in for the Gemini REST endpoint with injected latency, which
+    also answers the /chat/completions endpoint of the OpenAI API.
+
+    Scores are derived from the chunk text, so batched and per-chunk prompts
+    return the same score for the same chunk.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.request_count = 0
+        # (system instruction, prompt) of every request
+        self.requests = []
+        self._server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def score(text: str) -> float:
+        return float(len(text) % 11)
+
+    def __enter__(self) -> "FakeModelServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, prompt: str) -> str:
+        payload = prompt.split('"""')[1]
+        if INDEX not in prompt:
+            return json.dumps({HIGHLIGHT_SCORE: self.score(payload), REASON: "fake"})
+
+        return json.dumps([{INDEX: chunk[INDEX], HIGHLIGHT_SCORE: self.score(chunk[TEXT]), REASON: "fake"}
+                           for chunk in json.loads(payload)])
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(
+                    int(self.headers["Content-Length"])))
+                openai_compatible = self.path.endswith("/chat/completions")
+                if openai_compatible:
+                    messages = {message["role"]: message["content"] for message in body["messages"]}
+                    prompt, instruction = messages["user"], messages.get("system", "")
+                else:
+                    prompt = "".join(part.get("text", "")
+                                     for content in body["contents"] for part in content["parts"])
+                    instruction = "".join(part.get("text", "")
+                                          for part in body.get("systemInstruction", {}).get("parts", []))
+                server.request_count += 1
+                server.requests.append((instruction, prompt))
+                time.sleep(server.latency_seconds)
+
+                if openai_compatible:
+                    response = json.dumps({
+                        "choices": [{
+                            "message": {"role": "assistant", "content": server.respond(prompt)},
+                            "finish_reason": "stop",
+                        }]
+                    }).encode()
+                else:
+                    response = json.dumps({
+                        "candidates": [{
+                            "content": {"role": "model", "parts": [{"text": server.respond(prompt)}]},
+                            "finishReason": "STOP",
+                        }]
+                    }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
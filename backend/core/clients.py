@@ -0,0 +1,201 @@
+from backend.core.constants import HTTP_KEEPALIVE_SECONDS, HTTP_POOL_SIZE
+from backend.core.settings import GOOGLE_AI_API_KEY, GOOGLE_APPLICATION_CREDENTIALS
+
+from google import genai
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage
+from google.genai import types
+from google.oauth2 import service_account
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Awaitable, Callable, TypeVar
+
+import asyncio
+import certifi
+import httpx
+import os
+import ssl
+import threading
+
+T = TypeVar("T")
+
+
+class _ThreadClients:
+    """
+    The Gemini client and event loop of one thread, see ClientPool.
+    """
+
+    def __init__(self):
+        self.genai_client = None
+        self.runner = None
+
+
+class ClientPool:
+    """
+    The GCS and Gemini clients of the application, shared by every job and
+    worker thread instead of being built per request.
+
+    Credentials are loaded once, and connections are pooled, so TLS
+    handshakes are only paid when a pooled connection is first opened.
+
+    The GCS client and its HTTP session are thread-safe and shared as is.
+    An async HTTP client is bound to the event loop it first runs on, so
+    every thread gets its own Gemini client and a persistent event loop to
+    run it on, see run_async. Both live until the pool is closed, like the
+    scorer of every scoring backend, see scorer.
+    """
+
+    def __init__(self, credentials_path: str | None = GOOGLE_APPLICATION_CREDENTIALS,
+                 api_key: str | None = GOOGLE_AI_API_KEY, pool_size: int = HTTP_POOL_SIZE):
+        self.credentials_path = credentials_path
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self._storage_client = None
+        self._ssl_context = None
+        self._local = threading.local()
+        # Of every thread, to be closed with the pool
+        self._thread_clients: list[_ThreadClients] = []
+        self._scorers = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Loads the credentials and builds the shared clients. Called once at
+        startup, later calls do nothing.
+        """
+        with self._lock:
+            if self._ssl_context is None:
+                # Reading the CA bundle is the slowest part of building a Gemini client
+                self._ssl_context = ssl.create_default_context(
+                    cafile=os.environ.get("SSL_CERT_FILE", certifi.where()),
+                    capath=os.environ.get("SSL_CERT_DIR"))
+            if self._storage_client is None and self.credentials_path:
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_path)
+                session = AuthorizedSession(credentials)
+                adapter = HTTPAdapter(pool_connections=self.pool_size,
+                                      pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._storage_client = storage.Client(
+                    credentials=credentials, project=credentials.project_id, _http=session)
+
+    @property
+    def storage_client(self) -> storage.Client:
+        """
+        :raises RuntimeError: When no service account file is configured
+        """
+        self.start()
+        if self._storage_client is None:
+            raise RuntimeError("GOOGLE_APPLICATION_CREDENTIALS is not set")
+        return self._storage_client
+
+    @property
+    def http_session(self) -> AuthorizedSession:
+        """
+        The pooled, authorized session of the GCS client, for requests the
+        client library does not make itself such as resumable upload chunks.
+        """
+        return self.storage_client._http
+
+    def genai_client(self) -> genai.Client:
+        """
+        Returns the Gemini client of the calling thread.
+        """
+        thread_clients = self._get_thread_clients()
+        client = thread_clients.genai_client
+        if client is None:
+            self.start()
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size,
+                                  keepalive_expiry=HTTP_KEEPALIVE_SECONDS)
+            client_args = {"verify": self._ssl_context, "limits": limits}
+            client = genai.Client(api_key=self.api_key, http_options=types.HttpOptions(
+                client_args=client_args, async_client_args=client_args))
+            thread_clients.genai_client = client
+        return client
+
+    def run_async(self, coroutine: Awaitable[T]) -> T:
+        """
+        Like asyncio.run, but every call from the same thread runs on the same
+        event loop, so the async connections of genai_client are reused.
+        """
+        thread_clients = self._get_thread_clients()
+        if thread_clients.runner is None:
+            thread_clients.runner = asyncio.Runner()
+        return thread_clients.runner.run(coroutine)
+
+    def scorer(self, backend: object, create: Callable[[], T]) -> T:
+        """
+        Returns the scorer of the scoring backend shared by every job, built
+        by create on first use, so its connections are pooled across jobs.
+        """
+        with self._lock:
+            if backend not in self._scorers:
+                self._scorers[backend] = create()
+            return self._scorers[backend]
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections of the shared clients and scorers, and
+        the Gemini clients and event loops of every thread. Called at
+        shutdown, threads using the pool afterwards get new ones.
+        """
+        with self._lock:
+            if self._storage_client is not None:
+                # Also closes the pooled session it was given
+                self._storage_client.close()
+            self._storage_client = None
+            scorers = list(self._scorers.values())
+            self._scorers = {}
+            all_thread_clients = self._thread_clients
+            self._thread_clients = []
+            self._local = threading.local()
+
+        # The loops of the threads cannot run on a thread already running a loop, such as at app shutdown
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Scorers first, their async connections are closed on the loops of the threads
+            for scorer in scorers:
+                executor.submit(scorer.close).result()
+            executor.submit(self._close_thread_clients, all_thread_clients).result()
+
+    def _get_thread_clients(self) -> _ThreadClients:
+        thread_clients = getattr(self._local, "clients", None)
+        if thread_clients is None:
+            thread_clients = _ThreadClients()
+            with self._lock:
+                self._local.clients = thread_clients
+                self._thread_clients.append(thread_clients)
+        return thread_clients
+
+    def _close_thread_clients(self, all_thread_clients: list) -> None:
+        for thread_clients in all_thread_clients:
+            # google-genai has no close method, its httpx clients are closed directly
+            api_client = thread_clients.genai_client._api_client if thread_clients.genai_client else None
+            if api_client is not None:
+                api_client._httpx_client.close()
+            if thread_clients.runner is None:
+                continue
+            try:
+                if api_client is not None:
+                    # Async connections are closed on the loop they were opened on
+                    thread_clients.runner.run(api_client._async_httpx_client.aclose())
+                thread_clients.runner.close()
+            except RuntimeError as e:
+                # The loop is still running a job on its thread
+                print(f"Event loop of a thread not closed: {e}")
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    """
+    Returns the process-wide client pool.
+    """
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = ClientPool()
+    return _client_pool
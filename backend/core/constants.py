@@ -2,16 +2,108 @@ import re
 
 # Transcript chunk size in seconds
 TRANSCRIPT_CHUNK_SIZE = 60
+# Seconds shared by consecutive chunks with the sliding window policy
+TRANSCRIPT_WINDOW_OVERLAP = 15
+# With the boundary policy, chunks end at a pause of at least this many seconds
+# or at the end of a sentence, once they are TRANSCRIPT_MIN_CHUNK_SIZE long
+TRANSCRIPT_SILENCE_GAP_SECONDS = 2
+TRANSCRIPT_MIN_CHUNK_SIZE = 20
+# TOKENS chunks also end once they hold this many tokens, so dense talk is cut shorter
+TRANSCRIPT_CHUNK_TOKEN_BUDGET = 600
+SENTENCE_ENDINGS = ("。", "！", "？", "!", "?", ".", "♪")
+# Characters read at a time when streaming a transcript JSON file
+TRANSCRIPT_READ_BLOCK_SIZE = 64 * 1024
+
+# Audio prefilter
+# Audio is decoded to mono float PCM at this rate for the features below
+AUDIO_SAMPLE_RATE = 16000
+# Length of one analysis frame; loudness, spectral flux and onsets are computed per frame
+AUDIO_FRAME_SECONDS = 0.05
+# Frames decoded from the ffmpeg pipe at a time
+AUDIO_READ_FRAMES = 4096
+# A flux peak is an onset when it exceeds the median flux by this many mean absolute deviations
+AUDIO_ONSET_THRESHOLD = 3.0
+# Weights of the standardized loudness, spectral flux and onset density in a chunk's audio score
+AUDIO_LOUDNESS_WEIGHT = 1.0
+AUDIO_FLUX_WEIGHT = 1.0
+AUDIO_ONSET_WEIGHT = 1.0
+
+# Pre-ranking, chunks are ranked by their audio and live chat before AI scoring
+# Share of the chunks kept for AI scoring
+PRERANK_KEEP_RATIO = 0.2
+# Chunks kept on each side of every kept chunk, so highlights are not cut short
+PRERANK_NEIGHBOURS = 1
+# Transcripts with fewer chunks are scored in full
+PRERANK_MIN_CHUNKS = 30
+# Longest wait for the audio or the chat once the transcript is parsed, chunks are ranked without the late ones
+PRERANK_SIGNAL_TIMEOUT_SECONDS = 60
+
+# Live chat pre-ranking
+# Weights of the standardized message rate, superchat value and laughter rate in a chunk's chat score
+CHAT_RATE_WEIGHT = 1.0
+CHAT_SUPERCHAT_WEIGHT = 0.5
+CHAT_LAUGHTER_WEIGHT = 1.0
+# Laughter in a chat message: 草, 笑, www, lol and laughing emoji, each match counts once
+CHAT_LAUGHTER_REGEX = re.compile(
+    r"草+|笑+|[wｗ]{2,}|\blol\b|\blmao\b|kusa|[😂🤣]+",
+    re.IGNORECASE)
+# Rough value in yen of one unit of the usual superchat currencies, only relative sizes matter
+CHAT_CURRENCY_TO_JPY = {
+    "¥": 1, "￥": 1, "JP¥": 1, "$": 150, "US$": 150, "CA$": 110, "A$": 100, "NZ$": 90,
+    "HK$": 19, "NT$": 4.7, "MX$": 8, "R$": 28, "€": 160, "£": 190, "₩": 0.11, "₱": 2.6,
+    "₹": 1.8, "SGD": 110, "MYR": 32, "THB": 4.2, "IDR": 0.0095, "RUB": 1.6,
+}
+# Value of a superchat in any other currency
+CHAT_UNKNOWN_SUPERCHAT_JPY = 500
+
+# Transcription
+# Whisper models expect 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+# Audio is split into chunks of about this many seconds, transcribed in parallel
+TRANSCRIPTION_CHUNK_SECONDS = 300
+# Every chunk ends at the quietest frame of its last seconds, so words are not cut
+TRANSCRIPTION_SPLIT_SEARCH_SECONDS = 30
 
 # Transcript scores
 MAX_SCORE = 10
 MIN_SCORE = 0
 THRESHOLD_SCORE = 7
+# Highlights closer than this are merged into one
+HIGHLIGHT_ADJACENCY_TOLERANCE_MS = 500
+
+# Highlight ranking
+# Weight of every signal in the fused score of a chunk: the AI score counts in points above
+# THRESHOLD_SCORE, the audio and chat scores in standard deviations
+HIGHLIGHT_FUSION_WEIGHTS = {"llm": 1.0, "audio": 0.5, "chat": 0.5}
+# Fused scores are averaged over this many chunks before peak picking, 1 keeps them as is
+HIGHLIGHT_SMOOTHING_CHUNKS = 1
+# Peaks and the chunks around them must have a fused score above this
+HIGHLIGHT_MIN_PEAK_SCORE = 0.0
+# Clips are widened or cut around their peak to this length range
+HIGHLIGHT_MIN_CLIP_SECONDS = 20
+HIGHLIGHT_MAX_CLIP_SECONDS = 180
+# At most this many clips, lasting this long in total, best peaks first
+HIGHLIGHT_TOP_K = 20
+HIGHLIGHT_MAX_TOTAL_SECONDS = 1200
 
 # AI request
 AI_REQUEST_PER_MINUTE_LIMIT = 15
-AI_REQUEST_BUFFER_SECONDS = 10
-SLEEP_TIME_BEFORE_RETRY_SECONDS = 1
+AI_TOKENS_PER_MINUTE_LIMIT = 250000
+# Upper bound of AI requests in flight at once for the async scoring path
+MAX_CONCURRENT_AI_REQUESTS = 5
+# Number of transcript chunks packed into one batched scoring prompt
+SCORING_BATCH_SIZE = 10
+# Batches are cut before their chunks exceed this many tokens, a longer chunk is sent alone
+SCORING_TOKEN_BUDGET = 6000
+
+# Coarse-to-fine scoring
+# Chunks are first regrouped into windows this long, an hour of transcript per scoring prompt
+COARSE_WINDOW_SIZE = 300
+COARSE_SCORING_BATCH_SIZE = 12
+# SCORING_TOKEN_BUDGET scaled from 10 minutes to the hour of transcript of a coarse prompt
+COARSE_SCORING_TOKEN_BUDGET = 36000
+# Only the chunks of the windows scoring above this are scored on their own
+COARSE_THRESHOLD_SCORE = 5
 
 # Highlight
 START = "start"
@@ -20,20 +112,47 @@ TEXT = "text"
 HIGHLIGHT_SCORE = "highlight_score"
 REASON = "reason"
 DURATION = "duration"
+INDEX = "index"
 
 # These paths are used to store downloaded videos and audios.
 DOWNLOADED_VIDEO_DIR = "./backend/download/downloaded_videos"
 DOWNLOADED_AUDIO_DIR = "./backend/download/downloaded_audios"
 DOWNLOADED_TRANSCRIPT_DIR = "./backend/download/downloaded_transcripts"
+DOWNLOADED_CHAT_DIR = "./backend/download/downloaded_chats"
 DOWNLOADED_VIDEO_PATH = f"{DOWNLOADED_VIDEO_DIR}/%(title)s.%(ext)s"
 DOWNLOADED_AUDIO_PATH = f"{DOWNLOADED_AUDIO_DIR}/%(title)s.%(ext)s"
 DOWNLOADED_TRANSCRIPT_PATH = f"{DOWNLOADED_TRANSCRIPT_DIR}/%(title)s.%(ext)s"
+# yt-dlp appends .live_chat.json
+DOWNLOADED_CHAT_PATH = f"{DOWNLOADED_CHAT_DIR}/%(id)s"
+DOWNLOADED_SEGMENT_PATH = f"{DOWNLOADED_VIDEO_DIR}/%(id)s_%(section_start)s-%(section_end)s.%(ext)s"
+
+# Media store, downloads of every video are kept in MEDIA_STORE_DIR/<video id>
+MEDIA_STORE_DIR = "./backend/download/media_store"
+MEDIA_STORE_MANIFEST = "manifest.json"
+# Downloads are written under MEDIA_STORE_DIR/<video id>/<staging dir>/<name> until they are stored
+MEDIA_STORE_STAGING_DIR = ".staging"
+# Evicted video directories are moved under MEDIA_STORE_DIR/<trash dir> and deleted outside the store's lock
+MEDIA_STORE_TRASH_DIR = ".trash"
+
+# Video metadata cache
+VIDEO_METADATA_CACHE_DIR = "./backend/download/video_metadata"
+# Stream URLs in the metadata expire after about 6 hours, so it is refetched well before
+VIDEO_METADATA_TTL_SECONDS = 3600
+# Info dicts of yt-dlp can take megabytes, so only the most recent are kept in memory
+VIDEO_METADATA_MAX_ENTRIES = 64
+
+# Score cache
+SCORE_CACHE_PATH = "./backend/download/score_cache.sqlite3"
+SCORE_CACHE_MAX_ENTRIES = 100000
+SCORE_CACHE_TTL_SECONDS = 30 * 24 * 3600
 
 # Constants for video and audio formats
 VIDEO_FORMAT = 'bestvideo+bestaudio/best/mp4'
 AUDIO_FORMAT = 'mp3/bestaudio'
 LANGUAGE = ['ja', 'en']  # Default language for transcription
 TRANSCRIPT_EXT = "json"
+# Columnar copy of a transcript, written next to the JSON file on first read
+BINARY_TRANSCRIPT_EXT = "bin"
 
 VIDEO_OPTION = {
     'format': VIDEO_FORMAT,
@@ -45,33 +164,129 @@ AUDIO_OPTION = {
     'outtmpl': DOWNLOADED_AUDIO_PATH,
 }
 
+# The live chat replay is a subtitle track of the video
+LIVE_CHAT = "live_chat"
+CHAT_OPTION = {
+    'skip_download': True,
+    'writesubtitles': True,
+    'subtitleslangs': [LIVE_CHAT],
+    'outtmpl': DOWNLOADED_CHAT_PATH,
+}
+
+SEGMENT_OPTION = {
+    'format': VIDEO_FORMAT,
+    'outtmpl': DOWNLOADED_SEGMENT_PATH,
+}
+
+# Range downloads
+# Seconds added around each range, since stream copy cuts at the previous keyframe
+SEGMENT_KEYFRAME_PAD_SECONDS = 2
+MAX_SEGMENT_DOWNLOAD_WORKERS = 3
+
+# Video clipping
+MAX_CLIP_WORKERS = 4
+
+# Maximum number of items waiting between two pipeline stages
+PIPELINE_QUEUE_SIZE = 4
+
 # Youtube
 YOUTUBE_REGEX = re.compile(
     r"^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[\w-]{11}(&.*)?$"
 )
+YOUTUBE_VIDEO_ID_REGEX = re.compile(r"(?:[?&]v=|youtu\.be/)([\w-]{11})")
 
 # AI
 AI_RESPONSE_PRECEDING_STRING_FORMAT = r"^```(?:json)?\s*"
 AI_RESPONSE_SUCCEDING_STRING_FORMAT = r"\s*```$"
-HIGHLIGHT_DETECTION_PROMPT = f"""
-You are a livestream highlight detector.
-
+AI_RESPONSE_PARSE_FAILED_REASON = "Failed to parse AI response"
+HIGHLIGHT_DEFINITION = """
 Highlight definition:
 - Emotional reactions (laughing, excitement, sarcasm, angry outbursts)
 - Audience interactions (reading comments)
 - Funny or surprising statements (cute moments)
 - Interesting discussions (personal stories, insights, or opinions)
-
+"""
+HIGHLIGHT_DETECTION_INSTRUCTION = f"""
+You are a livestream highlight detector.
+{HIGHLIGHT_DEFINITION}
+Return a JSON object for the transcript chunk you are given, with:
+- highlight_score ({MIN_SCORE}-{MAX_SCORE}, {MIN_SCORE} = not highlight, {MAX_SCORE} = very strong)
+- reason (short explanation)
+"""
+HIGHLIGHT_DETECTION_PROMPT = """
 Transcript chunk:
 \"\"\"%s\"\"\"
-
-Return a JSON object with:
+"""
+HIGHLIGHT_DETECTION_BATCH_INSTRUCTION = f"""
+You are a livestream highlight detector.
+{HIGHLIGHT_DEFINITION}
+You are given transcript chunks as a JSON array of objects with "{INDEX}" and "{TEXT}".
+Score every chunk independently and return a JSON array with one object per chunk:
+- {INDEX} (the index of the chunk given above)
 - highlight_score ({MIN_SCORE}-{MAX_SCORE}, {MIN_SCORE} = not highlight, {MAX_SCORE} = very strong)
 - reason (short explanation)
 """
+HIGHLIGHT_DETECTION_BATCH_PROMPT = """
+Transcript chunks:
+\"\"\"%s\"\"\"
+"""
+
+# Scoring backends
+# Seconds an OpenAI-compatible server may take to answer one prompt
+OPENAI_COMPATIBLE_TIMEOUT_SECONDS = 120
+# Points per minute of transcript of every keyword found by the heuristic scorer
+HEURISTIC_KEYWORD_WEIGHTS = {
+    "www": 2.0, "草": 2.0, "笑": 1.5, "やば": 2.0, "えぐ": 2.0, "すご": 1.0, "まじ": 1.0, "最高": 1.5,
+    "神": 1.0, "かわいい": 1.0, "うそ": 1.0, "なんで": 1.0, "きた": 1.0, "!": 0.5, "！": 0.5, "?!": 1.0, "？！": 1.0,
+}
+# Points per minute at which the heuristic score reaches 63% of MAX_SCORE
+HEURISTIC_SCORE_SCALE = 10.0
+
+# Prompt compaction
+# tiktoken encoding that counts prompt tokens, characters are counted when it cannot be loaded
+TOKEN_ENCODING = "cl100k_base"
+# Repeats of a caption annotation such as [音楽] or [拍手], sent once
+TRANSCRIPT_ANNOTATION_REPEAT_REGEX = re.compile(r"([\[［][^\[\]［］]{1,12}[\]］])(?:\s*\1)+")
+# Runs of filler words, sent as their first filler
+TRANSCRIPT_FILLER = r"(?:えー+|えっと|あのー*|んー+|うーん|\bum+\b|\buh+\b)"
+TRANSCRIPT_FILLER_RUN_REGEX = re.compile(
+    rf"({TRANSCRIPT_FILLER})(?:[\s、,。.]*{TRANSCRIPT_FILLER})+", re.IGNORECASE)
 
 
 # Google cloud storage
 MAX_UPLOAD_WORKERS = 5
 URL_EXPIRATION_SECONDS = 3600
+# Resumable uploads send the file in chunks of this size, a multiple of 256 KiB as GCS requires
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# A failed chunk is retried this many times, waiting UPLOAD_BACKOFF_SECONDS doubled after every try
+UPLOAD_MAX_RETRIES = 5
+UPLOAD_BACKOFF_SECONDS = 0.5
+# A chunk request that cannot connect, or gets no answer for this long, is retried
+UPLOAD_CONNECT_TIMEOUT_SECONDS = 10
+UPLOAD_READ_TIMEOUT_SECONDS = 120
+# Larger files are uploaded as up to UPLOAD_MAX_PARTS parts in parallel, then composed
+UPLOAD_COMPOSITE_THRESHOLD = 64 * 1024 * 1024
+UPLOAD_MAX_PARTS = 8
 SIGNED_CREDENTIAL_VERSION = "v4"
+
+# Shared API clients
+# Connections kept open per host, enough for the upload workers and composite parts of concurrent jobs
+HTTP_POOL_SIZE = 32
+# Idle connections are closed after this many seconds
+HTTP_KEEPALIVE_SECONDS = 60
+
+# Job registry
+# Finished jobs are served from the cache of GCS object names for this long
+JOB_RESULT_TTL_SECONDS = 24 * 3600
+# Finished results kept in memory at most, the oldest are dropped first
+JOB_RESULT_MAX_ENTRIES = 1000
+# Finished jobs can be polled for this long
+JOB_RETENTION_SECONDS = 3600
+# Seconds clients are told to wait before retrying when the job queue is full
+JOB_QUEUE_FULL_RETRY_AFTER_SECONDS = 30
+
+# Progress events
+# Download and scoring events of one job are sent at most once per interval
+PROGRESS_EVENT_INTERVAL_SECONDS = 0.5
+# Comment line sent to idle event streams so proxies keep the connection open
+PROGRESS_EVENT_KEEPALIVE_SECONDS = 15
@@ -0,0 +1,180 @@
+from backend.core.constants import PROGRESS_EVENT_INTERVAL_SECONDS
+from backend.models.job import JobStage
+from backend.models.progress_event import ProgressEvent, ProgressEventType
+
+from typing import Callable
+
+import asyncio
+import threading
+import time
+
+# Events that may arrive many times per second, only the latest one matters
+THROTTLED_EVENT_TYPES = {ProgressEventType.DOWNLOAD, ProgressEventType.SCORING}
+# Events kept once per clip when replaying to late subscribers
+PER_CLIP_EVENT_TYPES = {ProgressEventType.CLIP, ProgressEventType.UPLOAD}
+
+
+class EventSubscription:
+    """
+    Async iterator over the events of one bus, for one client.
+
+    The bus publishes from worker threads, events are handed to the
+    subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop):
+        self._bus = bus
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def put(self, event: ProgressEvent | None) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def get(self) -> ProgressEvent | None:
+        """
+        :return: The next event, or None once the bus is closed
+        """
+        return await self._queue.get()
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class EventBus:
+    """
+    Progress events of one job, fanned out to listeners and subscribers.
+
+    Download and scoring events are throttled: within min_interval_seconds
+    only the latest one is kept and it is sent with the next event that goes
+    out. Publishing a throttled event is a clock read and a dict update, so
+    services can publish from their hot loops.
+
+    Subscribers that join late first receive the latest event of every type
+    and every clip event, so they never miss the current state.
+    """
+
+    def __init__(self, min_interval_seconds: float = PROGRESS_EVENT_INTERVAL_SECONDS,
+                 clock=time.monotonic):
+        self.min_interval_seconds = min_interval_seconds
+        self.closed = False
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[ProgressEvent], None]] = []
+        self._subscriptions: list[EventSubscription] = []
+        self._sent_at: dict[ProgressEventType, float] = {}
+        self._pending: dict[ProgressEventType, dict] = {}
+        self._snapshot: dict = {}
+
+    def publish(self, event_type: ProgressEventType, stage: JobStage, **fields) -> None:
+        """
+        Publishes an event, see ProgressEvent for the fields.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            now = self._clock()
+            if event_type in THROTTLED_EVENT_TYPES and \
+                    now - self._sent_at.get(event_type, float("-inf")) < self.min_interval_seconds:
+                self._pending[event_type] = dict(stage=stage, **fields)
+                return
+
+            # A newer event of the same type replaces the waiting one
+            self._pending.pop(event_type, None)
+            # The event is only built once it is known to be sent
+            events = self._take_pending()
+            events.append(ProgressEvent(type=event_type, stage=stage, **fields))
+            self._sent_at[event_type] = now
+            self._send(events)
+
+    def flush(self) -> None:
+        """
+        Sends the throttled events that are still waiting.
+        """
+        with self._lock:
+            self._send(self._take_pending())
+
+    def close(self) -> None:
+        """
+        Sends the waiting events and ends every subscription.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self._send(self._take_pending())
+            self.closed = True
+            for subscription in self._subscriptions:
+                subscription.put(None)
+            self._subscriptions.clear()
+
+    def add_listener(self, listener: Callable[[ProgressEvent], None], replay: bool = False) -> None:
+        """
+        Calls listener synchronously, on the publishing thread, for every sent event.
+
+        :param replay: Whether listener first receives the events a late
+                       subscriber would, see subscribe
+        """
+        with self._lock:
+            if replay:
+                for event in self._snapshot.values():
+                    listener(event)
+            self._listeners.append(listener)
+
+    def relay_to(self, bus: "EventBus") -> None:
+        """
+        Publishes every event of this bus, past and future, on bus too.
+        """
+        self.add_listener(lambda event: bus.publish(
+            event.type, event.stage, **event.model_dump(exclude={"type", "stage"}, exclude_none=True)),
+            replay=True)
+
+    def subscribe(self) -> EventSubscription:
+        """
+        Subscribes the running event loop to the bus.
+        """
+        subscription = EventSubscription(self, asyncio.get_running_loop())
+        with self._lock:
+            for event in self._snapshot.values():
+                subscription.put(event)
+            if self.closed:
+                subscription.put(None)
+            else:
+                self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _take_pending(self) -> list:
+        events = [ProgressEvent(type=event_type, **fields)
+                  for event_type, fields in self._pending.items()]
+        self._pending.clear()
+        for event in events:
+            self._sent_at[event.type] = self._clock()
+        return events
+
+    def _send(self, events: list) -> None:
+        for event in events:
+            key = (event.type, event.completed) if event.type in PER_CLIP_EVENT_TYPES else event.type
+            # Re-inserting moves the key to the end, keeping the snapshot in order
+            self._snapshot.pop(key, None)
+            self._snapshot[key] = event
+
+            for listener in self._listeners:
+                listener(event)
+            for subscription in list(self._subscriptions):
+                try:
+                    subscription.put(event)
+                except RuntimeError:
+                    # The subscriber's event loop is closed
+                    self._subscriptions.remove(subscription)
@@ -0,0 +1,6 @@
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the job queue is full."""
+
+
+class JobNotFoundError(Exception):
+    """Raised when a job ID is unknown or the job has expired."""
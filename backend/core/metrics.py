@@ -0,0 +1,264 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+
+import bisect
+import threading
+import time
+
+# Upper bounds, in seconds, of the default histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# Stages of the pipeline, used as the stage label and as keys of StageTimings
+VIDEO_DOWNLOAD = "video_download"
+TRANSCRIPT_DOWNLOAD = "transcript_download"
+TRANSCRIPTION = "transcription"
+PARSE = "parse"
+AUDIO_ANALYSIS = "audio_analysis"
+CHAT_ANALYSIS = "chat_analysis"
+COARSE_SCORE = "coarse_score"
+SCORE = "score"
+CLIP = "clip"
+UPLOAD = "upload"
+TOTAL = "total"
+
+
+class Metric(ABC):
+    """
+    Base class of the Prometheus metrics below. Every metric keeps one value
+    per combination of label values.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}",
+                 f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> list:
+        """
+        :return: The sample lines of every label combination, called with the lock held
+        """
+
+    def _label_values(self, labels: dict) -> tuple:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _format_labels(self, label_values: tuple, extra: dict | None = None) -> str:
+        pairs = list(zip(self.labels, label_values)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                   for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        super().__init__(name, description, labels)
+        self._values = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> list:
+        return [f"{self.name}{self._format_labels(key)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: count in every bucket, plus the +Inf bucket, and the sum
+        self._counts = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self._sums = defaultdict(float)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[key][bucket] += 1
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return sum(self._counts.get(self._label_values(labels), ()))
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            return self._sums.get(self._label_values(labels), 0.0)
+
+    @contextmanager
+    def time(self, **labels):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def _render_samples(self) -> list:
+        lines = []
+        for key, counts in sorted(self._counts.items()):
+            # Prometheus buckets are cumulative
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{self._format_labels(key, {'le': upper_bound})} {cumulative}")
+            lines.append(
+                f"{self.name}_sum{self._format_labels(key)} {self._sums[key]}")
+            lines.append(
+                f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "highlight_stage_duration_seconds",
+    "Wall time of one run of a pipeline stage, per clip for clip and upload, "
+    "and of the whole pipeline for total",
+    labels=("stage",)))
+STAGE_BYTES = REGISTRY.register(Counter(
+    "highlight_stage_bytes_total",
+    "Bytes downloaded or uploaded by a pipeline stage",
+    labels=("stage",)))
+STAGE_ITEMS = REGISTRY.register(Counter(
+    "highlight_stage_items_total",
+    "Transcript chunks parsed and scored, and clips cut and uploaded",
+    labels=("stage",)))
+PRERANK_CHUNKS = REGISTRY.register(Counter(
+    "highlight_prerank_chunks_total",
+    "Transcript chunks kept for AI scoring or skipped by the audio and chat pre-ranking",
+    labels=("result",)))
+COARSE_WINDOWS = REGISTRY.register(Counter(
+    "highlight_coarse_windows_total",
+    "Coarse windows whose chunks were scored or skipped by coarse-to-fine scoring",
+    labels=("result",)))
+
+AI_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "highlight_ai_request_duration_seconds",
+    "Latency of one AI scoring request, excluding rate limit waits"))
+AI_RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "highlight_ai_rate_limit_wait_seconds",
+    "Time one AI scoring request waited for the rate limiter",
+    buckets=(0, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)))
+AI_RETRIES = REGISTRY.register(Counter(
+    "highlight_ai_retries_total",
+    "AI requests re-sent after a malformed or incomplete batched response",
+    labels=("reason",)))
+SCORE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "highlight_score_cache_lookups_total",
+    "Score cache lookups by result",
+    labels=("result",)))
+
+UPLOAD_RETRIES = REGISTRY.register(Counter(
+    "highlight_upload_retries_total",
+    "Upload chunks re-sent after a transient GCS error"))
+
+MEDIA_STORE_LOOKUPS = REGISTRY.register(Counter(
+    "highlight_media_store_lookups_total",
+    "Media store lookups by result, a hit skips the download",
+    labels=("result",)))
+MEDIA_STORE_BYTES = REGISTRY.register(Gauge(
+    "highlight_media_store_bytes",
+    "Bytes of media kept in the media store"))
+MEDIA_STORE_EVICTIONS = REGISTRY.register(Counter(
+    "highlight_media_store_evictions_total",
+    "Videos deleted from the media store to stay under its quota"))
+
+JOBS = REGISTRY.register(Counter(
+    "highlight_jobs_total",
+    "Finished highlight jobs by result",
+    labels=("result",)))
+JOBS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "highlight_jobs_in_progress",
+    "Highlight jobs currently running"))
+
+
+class StageTimings:
+    """
+    Per-job breakdown of the time spent in every stage.
+
+    Stages overlap and clip and upload run on several workers, so a stage's
+    time is the sum over all its runs and can exceed the job's wall time.
+    Every measurement is also recorded in STAGE_DURATION.
+    """
+
+    def __init__(self):
+        self._seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def add(self, stage: str, seconds: float) -> None:
+        STAGE_DURATION.observe(seconds, stage=stage)
+        with self._lock:
+            self._seconds[stage] += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {stage: round(seconds, 3) for stage, seconds in self._seconds.items()}
@@ -0,0 +1,101 @@
+from backend.core.constants import AI_REQUEST_PER_MINUTE_LIMIT, AI_TOKENS_PER_MINUTE_LIMIT
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """A bucket that refills continuously up to its capacity."""
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = now
+
+    def take(self, amount: float, now: float) -> float:
+        """
+        Takes amount from the bucket, going into debt if it is not available.
+
+        :return: Seconds to wait until the debt is paid back
+        """
+        elapsed = max(0.0, now - self.updated_at)
+        self.level = min(self.capacity, self.level +
+                         elapsed * self.refill_per_second)
+        self.updated_at = now
+        self.level -= amount
+
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.refill_per_second
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for both requests per minute and tokens per minute.
+
+    Callers reserve capacity under a lock and then sleep outside of it, so one
+    instance can be shared by threads and by several event loops at once.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._request_bucket = TokenBucket(
+            requests_per_minute, requests_per_minute / 60, now)
+        self._token_bucket = TokenBucket(
+            tokens_per_minute, tokens_per_minute / 60, now)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserves one request and the given amount of tokens.
+
+        :param tokens: Estimated tokens used by the request
+        :return: Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = self._clock()
+            request_wait = self._request_bucket.take(1, now)
+            token_wait = self._token_bucket.take(tokens, now)
+        return max(request_wait, token_wait)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until the request may be sent.
+
+        :return: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Waits without blocking the event loop until the request may be sent.
+
+        :return: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_ai_rate_limiter = None
+_ai_rate_limiter_lock = threading.Lock()
+
+
+def get_ai_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide limiter shared by every AI request, so concurrent
+    jobs split the quota instead of each assuming they own all of it.
+    """
+    global _ai_rate_limiter
+    with _ai_rate_limiter_lock:
+        if _ai_rate_limiter is None:
+            _ai_rate_limiter = RateLimiter(
+                AI_REQUEST_PER_MINUTE_LIMIT, AI_TOKENS_PER_MINUTE_LIMIT)
+    return _ai_rate_limiter
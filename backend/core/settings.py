@@ -2,5 +2,33 @@ import os
 
 GOOGLE_AI_API_KEY = os.getenv('GOOGLE_AI_API_KEY')
 GOOGLE_AI_MODEL = os.getenv('GOOGLE_AI_MODEL')
+# Send the scoring instructions as a system instruction, for models that support one
+AI_SYSTEM_INSTRUCTION_ENABLED = os.getenv('AI_SYSTEM_INSTRUCTION_ENABLED', 'true').lower() == 'true'
+
+# OpenAI-compatible scoring backend, such as a local llama.cpp or vLLM server
+OPENAI_COMPATIBLE_BASE_URL = os.getenv('OPENAI_COMPATIBLE_BASE_URL', 'http://localhost:8080/v1')
+OPENAI_COMPATIBLE_MODEL = os.getenv('OPENAI_COMPATIBLE_MODEL', 'local')
+OPENAI_COMPATIBLE_API_KEY = os.getenv('OPENAI_COMPATIBLE_API_KEY')
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
 GOOGLE_BUCKET_NAME = os.getenv('GOOGLE_BUCKET_NAME')
+
+# Jobs
+MAX_CONCURRENT_JOBS = int(os.getenv('MAX_CONCURRENT_JOBS', '2'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '10'))
+
+# Pre-ranking by audio and live chat
+AUDIO_PREFILTER_ENABLED = os.getenv('AUDIO_PREFILTER_ENABLED', 'true').lower() == 'true'
+CHAT_PREFILTER_ENABLED = os.getenv('CHAT_PREFILTER_ENABLED', 'true').lower() == 'true'
+
+# Coarse-to-fine scoring, long windows are scored before the chunks inside the lively ones
+COARSE_TO_FINE_ENABLED = os.getenv('COARSE_TO_FINE_ENABLED', 'false').lower() == 'true'
+
+# Highlights picked by HighlightRanker from the AI, audio and chat scores, instead of the AI score threshold
+HIGHLIGHT_RANKING_ENABLED = os.getenv('HIGHLIGHT_RANKING_ENABLED', 'false').lower() == 'true'
+
+# Transcription fallback, used when a video has no captions
+WHISPER_MODEL_SIZE = os.getenv('WHISPER_MODEL_SIZE', 'small')
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', str(max(1, (os.cpu_count() or 1) // 2))))
+
+# Media store, least recently used videos are deleted beyond this many bytes
+MEDIA_STORE_QUOTA_BYTES = int(os.getenv('MEDIA_STORE_QUOTA_BYTES', str(50 * 1024 ** 3)))
@@ -0,0 +1,20 @@
+def seconds_to_ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Converts a HH:MM:SS.mmm timestamp to milliseconds.
+    """
+    hours, minutes, seconds = timestamp.split(":")
+    return (int(hours) * 3600 + int(minutes) * 60) * 1000 + seconds_to_ms(float(seconds))
+
+
+def format_timestamp(milliseconds: int) -> str:
+    """
+    Converts milliseconds to a HH:MM:SS.mmm timestamp.
+    """
+    seconds, millis = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}.{millis:03}"
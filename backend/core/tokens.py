@@ -0,0 +1,74 @@
+from backend.core.constants import TOKEN_ENCODING, TRANSCRIPT_ANNOTATION_REPEAT_REGEX, TRANSCRIPT_FILLER_RUN_REGEX
+
+from typing import List
+
+import re
+import threading
+import tiktoken
+
+_WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+class TokenCounter:
+    """
+    Counts the tokens of prompt texts with a tiktoken encoding.
+
+    The encoding only approximates the tokenizer of the AI model, which is
+    enough to keep requests under a token budget. Without an encoding, or
+    when it cannot be loaded, every character counts as one token, which
+    over-estimates English but is close for Japanese.
+    """
+
+    def __init__(self, encoding_name: str | None = TOKEN_ENCODING):
+        self.encoding = None
+        if encoding_name is None:
+            return
+        try:
+            self.encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            # The encoding is downloaded on first use, which fails offline
+            print(f"Token encoding {encoding_name} unavailable, counting characters: {e}")
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return len(text)
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        if self.encoding is None:
+            return [len(text) for text in texts]
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+
+def compact_text(text: str) -> str:
+    """
+    Shortens transcript text without changing what it says: repeated caption
+    annotations such as [音楽] and runs of filler words are kept once, and
+    whitespace runs become a single space.
+    """
+    text = TRANSCRIPT_ANNOTATION_REPEAT_REGEX.sub(r"\1", text)
+    text = TRANSCRIPT_FILLER_RUN_REGEX.sub(r"\1", text)
+    return _WHITESPACE_REGEX.sub(" ", text).strip()
+
+
+_token_counter = None
+_token_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """
+    Returns the process-wide token counter, loading its encoding on first use.
+    """
+    global _token_counter
+    with _token_counter_lock:
+        if _token_counter is None:
+            _token_counter = TokenCounter()
+    return _token_counter
+
+
+# Example usage
+if __name__ == "__main__":
+    text = "[音楽] [音楽] [音楽] えーあのー、えっと今日は    雑談配信です [拍手][拍手]"
+    counter = get_token_counter()
+    print(f"{counter.count(text)} tokens: {text}")
+    print(f"{counter.count(compact_text(text))} tokens: {compact_text(text)}")
@@ -1,15 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from backend.core.clients import get_client_pool
+from backend.core.metrics import REGISTRY
 from backend.routers.router import router
 from fastapi.middleware.cors import CORSMiddleware
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Credentials are loaded and clients built once, before the first request
+    client_pool = get_client_pool()
+    client_pool.start()
+    yield
+    client_pool.close()
+
+
 app = FastAPI(
     title="Highlight generator backend",
     description="An app that generates highlight clips from just a YouTube URL",
+    lifespan=lifespan,
 )
 
 app.include_router(router, prefix="/api/v1")
 
+
+@app.get("/metrics",
+         response_class=PlainTextResponse,
+         description="Pipeline metrics in the Prometheus text format.")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 origins = [
     "http://localhost:5173",
 ]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 
-from backend.core.constants import HIGHLIGHT_SCORE, REASON
+from backend.core.constants import HIGHLIGHT_SCORE, INDEX, REASON
 
 
 class AIResponse(BaseModel):
@@ -8,3 +8,8 @@ class AIResponse(BaseModel):
         ..., description="Score indicating the strength of the highlight (0-10)", alias=HIGHLIGHT_SCORE)
     reason: str = Field(...,
                         description="Short explanation of why this is a highlight", alias=REASON)
+
+
+class AIBatchResponse(AIResponse):
+    index: int = Field(...,
+                       description="Index of the scored chunk inside the batched prompt", alias=INDEX)
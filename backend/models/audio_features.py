@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class AudioFeatures:
+    """
+    Per-frame audio features of a whole video, frame i covering
+    [i * frame_ms, (i + 1) * frame_ms).
+    """
+
+    frame_ms: float
+    # Mean square of the samples, the loudness in dBFS is 10 * log10(energy)
+    energy: np.ndarray
+    # Positive spectral flux, how much the spectrum grew since the previous frame
+    flux: np.ndarray
+    # True on frames where a sound starts
+    onsets: np.ndarray
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.energy)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.frame_count * self.frame_ms
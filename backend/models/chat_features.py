@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class ChatFeatures:
+    """
+    Per-message features of a live chat replay, in video time order.
+    """
+
+    # Milliseconds into the video at which every message was sent
+    offsets_ms: np.ndarray
+    # Value of every superchat or super sticker in yen, 0 for other messages
+    superchat_values: np.ndarray
+    # Laughter tokens in every message, such as 草 or www
+    laughter_counts: np.ndarray
+
+    @property
+    def message_count(self) -> int:
+        return len(self.offsets_ms)
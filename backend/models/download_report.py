@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+
+
+class DownloadReport(BaseModel):
+    bytes_downloaded: int = Field(0,
+                                  description="Bytes fetched from YouTube")
+    peak_disk_bytes: int = Field(0,
+                                 description="Largest amount of disk used by the download at any time")
+    file_count: int = Field(0, description="Number of files downloaded")
+    elapsed_seconds: float = Field(0.0,
+                                   description="Wall time spent downloading")
@@ -1,5 +1,26 @@
 from pydantic import BaseModel, Field
+from enum import Enum
+
+
+class DownloadMode(str, Enum):
+    # Download the whole video, then clip the highlights out of it
+    FULL = "full"
+    # Detect highlights first, then download only their time ranges
+    RANGES = "ranges"
+
+
+class ScoringBackend(str, Enum):
+    # Gemini through the google-genai client
+    GEMINI = "gemini"
+    # Any server with an OpenAI-compatible chat completions endpoint, such as llama.cpp or vLLM
+    OPENAI_COMPATIBLE = "openai_compatible"
+    # Keyword heuristic on the CPU, no model
+    HEURISTIC = "heuristic"
 
 
 class GenereateHighlightRequest(BaseModel):
     url: str = Field(..., description="A YouTube URL of a Vtuber livestream")
+    download_mode: DownloadMode = Field(DownloadMode.FULL,
+                                        description="Whether to download the whole video or only the highlight ranges")
+    scoring_backend: ScoringBackend = Field(ScoringBackend.GEMINI,
+                                            description="What scores the transcript chunks")
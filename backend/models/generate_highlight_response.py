@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List
 
 
 class GenerateHighlightResponse(BaseModel):
     download_links: List[str | None] = Field(...,
                                              description="A list of downloadable links")
+    timings: Dict[str, float] = Field(default_factory=dict,
+                                      description="Seconds spent in every pipeline stage run for this request")
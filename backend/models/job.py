@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+from enum import Enum
+
+
+class JobStage(str, Enum):
+    QUEUED = "queued"
+    DOWNLOADING = "downloading"
+    PARSING = "parsing"
+    SCORING = "scoring"
+    CLIPPING = "clipping"
+    UPLOADING = "uploading"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobCreatedResponse(BaseModel):
+    job_id: str = Field(..., description="ID to poll the job status with")
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str = Field(..., description="ID of the job")
+    url: str = Field(..., description="The YouTube URL being processed")
+    stage: JobStage = Field(..., description="Current stage of the pipeline")
+    progress: float = Field(...,
+                            description="Overall progress of the job, from 0 to 1")
+    download_links: List[str | None] = Field(default_factory=list,
+                                             description="A list of downloadable links, set once the job is done")
+    error: str | None = Field(None,
+                              description="Error message, set if the job failed")
+    timings: Dict[str, float] = Field(default_factory=dict,
+                                      description="Seconds spent in every pipeline stage, set once the job is done")
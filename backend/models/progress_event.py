@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from enum import Enum
+
+from backend.models.job import JobStage
+
+
+class ProgressEventType(str, Enum):
+    STAGE = "stage"
+    DOWNLOAD = "download"
+    SCORING = "scoring"
+    CLIP = "clip"
+    UPLOAD = "upload"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ProgressEvent(BaseModel):
+    type: ProgressEventType = Field(..., description="What happened")
+    stage: JobStage = Field(..., description="Stage of the pipeline the event belongs to")
+    progress: float | None = Field(None,
+                                   description="Overall progress of the job, from 0 to 1, if the event changes it")
+    completed: int | None = Field(None,
+                                  description="Bytes downloaded, chunks scored, clips cut or clips uploaded so far")
+    total: int | None = Field(None,
+                              description="Total for completed, if known")
+    download_link: str | None = Field(None,
+                                      description="Downloadable link of an uploaded clip")
+    error: str | None = Field(None,
+                              description="Error message of a failed job")
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+
+from backend.core.timestamps import format_timestamp, parse_timestamp
+
+
+@dataclass(slots=True)
+class Segment:
+    """
+    A time range of the video with its transcript text, used from parsing
+    through clipping. Times are integer milliseconds so interval math is exact;
+    they are only formatted as HH:MM:SS.mmm strings at the edges.
+    """
+
+    start_ms: int
+    end_ms: int
+    text: str
+    # Set once the segment is scored
+    highlight_score: float | None = None
+    reason: str | None = None
+
+    @classmethod
+    def from_timestamps(cls, start: str, end: str, text: str = "") -> "Segment":
+        """
+        Builds a segment from HH:MM:SS.mmm timestamps.
+        """
+        return cls(parse_timestamp(start), parse_timestamp(end), text)
+
+    @property
+    def start_seconds(self) -> float:
+        return self.start_ms / 1000
+
+    @property
+    def end_seconds(self) -> float:
+        return self.end_ms / 1000
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+    @property
+    def is_scored(self) -> bool:
+        return self.highlight_score is not None
+
+    def __str__(self) -> str:
+        return f"{format_timestamp(self.start_ms)} - {format_timestamp(self.end_ms)}"
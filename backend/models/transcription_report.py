@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+
+
+class TranscriptionReport(BaseModel):
+    audio_seconds: float = Field(0.0, description="Length of the transcribed audio")
+    elapsed_seconds: float = Field(0.0,
+                                   description="Wall time spent transcribing, model loading included")
+    worker_count: int = Field(0, description="Number of worker processes")
+    chunk_count: int = Field(0, description="Number of audio chunks transcribed")
+
+    @property
+    def throughput(self) -> float:
+        """
+        Audio seconds transcribed per wall second.
+        """
+        return self.audio_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.0
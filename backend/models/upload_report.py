@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+
+
+class UploadReport(BaseModel):
+    bytes_uploaded: int = Field(0, description="Size of the uploaded file")
+    elapsed_seconds: float = Field(0.0, description="Wall time spent uploading")
+    part_count: int = Field(1,
+                            description="Parts uploaded in parallel and composed, 1 for a single upload")
+    retry_count: int = Field(0, description="Chunks re-sent after a transient error")
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes uploaded per wall second.
+        """
+        return self.bytes_uploaded / self.elapsed_seconds if self.elapsed_seconds else 0.0
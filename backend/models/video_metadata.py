@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class VideoMetadata(BaseModel):
+    video_id: str = Field(..., description="YouTube video ID")
+    title: str = Field(..., description="Title of the video")
+    duration: float | None = Field(None,
+                                   description="Length of the video in seconds, unknown for live streams")
+    formats: List[dict] = Field(default_factory=list,
+                                description="Formats offered by YouTube, as reported by yt-dlp")
+    chapters: List[dict] = Field(default_factory=list,
+                                 description="Chapters with their start_time, end_time and title")
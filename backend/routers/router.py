@@ -1,11 +1,20 @@
 from fastapi import APIRouter
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
+from backend.core.constants import JOB_QUEUE_FULL_RETRY_AFTER_SECONDS, PROGRESS_EVENT_KEEPALIVE_SECONDS
+from backend.core.event_bus import EventSubscription
+from backend.core.exceptions import JobNotFoundError, JobQueueFullError
 from backend.models.generate_highlight_request import GenereateHighlightRequest
 from backend.models.generate_highlight_response import GenerateHighlightResponse
+from backend.models.job import JobCreatedResponse, JobStatusResponse
 from backend.services.generate_highlight_coordinator import GenerateHighlightCoordinator
+from backend.services.job_manager import get_job_manager
 from backend.services.url_validator import UrlValidator
 
+import asyncio
+
 router = APIRouter()
 
 
@@ -18,8 +27,69 @@ async def generate_highlight(highlight_request: GenereateHighlightRequest):
 
     try:
         highlight_coordinator = GenerateHighlightCoordinator()
-        highlight_response: GenerateHighlightResponse = highlight_coordinator.run(
-            highlight_request.url)
+        # The pipeline is blocking, keep it off the event loop
+        highlight_response: GenerateHighlightResponse = await run_in_threadpool(
+            highlight_coordinator.run, highlight_request.url,
+            download_mode=highlight_request.download_mode,
+            scoring_backend=highlight_request.scoring_backend)
         return highlight_response
     except Exception as e:
         raise HTTPException(500, str(e.with_traceback))
+
+
+@router.post("/jobs",
+             status_code=202,
+             response_model=JobCreatedResponse,
+             description="Queues a highlight job for a youtube url and returns its ID immediately.")
+async def create_job(highlight_request: GenereateHighlightRequest):
+    if not UrlValidator.is_validate_url(highlight_request.url):
+        raise HTTPException(400, "Invalid url")
+
+    try:
+        job = get_job_manager().submit(highlight_request)
+    except JobQueueFullError as e:
+        raise HTTPException(429, str(e), headers={
+                            "Retry-After": str(JOB_QUEUE_FULL_RETRY_AFTER_SECONDS)})
+
+    return JobCreatedResponse(job_id=job.job_id)
+
+
+@router.get("/jobs/{job_id}",
+            response_model=JobStatusResponse,
+            description="Returns the stage, progress and, once done, the downloadable links of a job.")
+async def get_job(job_id: str):
+    try:
+        job = get_job_manager().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(404, str(e))
+
+    return job.to_response()
+
+
+@router.get("/jobs/{job_id}/events",
+            response_class=StreamingResponse,
+            description="Streams the progress events of a job as server-sent events until it finishes.")
+async def stream_job_events(job_id: str):
+    try:
+        job = get_job_manager().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(404, str(e))
+
+    subscription = job.events.subscribe()
+    return StreamingResponse(_server_sent_events(subscription), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+async def _server_sent_events(subscription: EventSubscription):
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), PROGRESS_EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield f"event: {event.type.value}\ndata: {event.model_dump_json(exclude_none=True)}\n\n"
+    finally:
+        subscription.close()
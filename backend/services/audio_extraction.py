@@ -0,0 +1,172 @@
+from backend.core.constants import AUDIO_FLUX_WEIGHT, AUDIO_FRAME_SECONDS, AUDIO_LOUDNESS_WEIGHT, AUDIO_ONSET_THRESHOLD, AUDIO_ONSET_WEIGHT, AUDIO_READ_FRAMES, PRERANK_KEEP_RATIO, PRERANK_NEIGHBOURS, AUDIO_SAMPLE_RATE
+from backend.models.audio_features import AudioFeatures
+from backend.models.segment import Segment
+from backend.services.prerank import select_candidates, standardize
+
+from typing import List
+
+import ffmpeg
+import numpy as np
+
+# Floor of the loudness, so digital silence does not become -inf
+_SILENCE_ENERGY = 1e-10
+
+
+class AudioExtractionService:
+    """
+    Ranks transcript chunks by how lively their audio is, so that only the
+    most promising ones are sent to the AI model.
+
+    Dead air, steady background music and long silences have low loudness,
+    little spectral change and few onsets, while laughter, shouting and
+    lively talk are loud and bursty.
+    """
+
+    def __init__(self, audio_path: str, sample_rate: int = AUDIO_SAMPLE_RATE,
+                 frame_seconds: float = AUDIO_FRAME_SECONDS):
+        """
+        :param audio_path: Any file ffmpeg can decode an audio stream from
+        """
+        self.audio_path = audio_path
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, round(sample_rate * frame_seconds))
+        self._window = np.hanning(self.frame_length).astype(np.float32)
+
+    def select_candidates(self, transcripts: List[Segment], keep_ratio: float = PRERANK_KEEP_RATIO,
+                          neighbours: int = PRERANK_NEIGHBOURS) -> List[Segment]:
+        """
+        Keeps the chunks with the best audio scores and their neighbours,
+        see prerank.select_candidates.
+        """
+        if not transcripts:
+            return []
+        return select_candidates(transcripts, [self.score_chunks(transcripts)], keep_ratio, neighbours)
+
+    def score_chunks(self, transcripts: List[Segment]) -> np.ndarray:
+        """
+        Decodes the audio and scores every chunk, see score_windows.
+        """
+        return self.score_windows(self.extract_features(), transcripts)
+
+    def extract_features(self) -> AudioFeatures:
+        """
+        Decodes the audio with ffmpeg and computes the features of every frame.
+
+        PCM is read from the ffmpeg pipe AUDIO_READ_FRAMES frames at a time,
+        so only the per-frame features of a long stream are kept in memory.
+        """
+        process = (
+            ffmpeg
+            .input(self.audio_path)
+            .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=self.sample_rate)
+            .global_args("-nostats", "-loglevel", "error")
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        block_bytes = self.frame_length * 4 * AUDIO_READ_FRAMES
+        energy_blocks, flux_blocks = [], []
+        previous_spectrum = None
+        remainder = b""
+
+        while block := process.stdout.read(block_bytes):
+            block = remainder + block
+            frame_count = len(block) // (self.frame_length * 4)
+            remainder = block[frame_count * self.frame_length * 4:]
+            if not frame_count:
+                continue
+
+            frames = np.frombuffer(block, np.float32, frame_count * self.frame_length) \
+                .reshape(frame_count, self.frame_length)
+            energy, flux, previous_spectrum = self._frame_features(
+                frames, previous_spectrum)
+            energy_blocks.append(energy)
+            flux_blocks.append(flux)
+
+        _, error = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg failed to decode '{self.audio_path}': {error.decode(errors='replace').strip()}")
+
+        energy = np.concatenate(energy_blocks) if energy_blocks else np.zeros(0, np.float32)
+        flux = np.concatenate(flux_blocks) if flux_blocks else np.zeros(0, np.float32)
+
+        return AudioFeatures(frame_ms=self.frame_length * 1000 / self.sample_rate,
+                             energy=energy, flux=flux, onsets=detect_onsets(flux))
+
+    def _frame_features(self, frames: np.ndarray, previous_spectrum: np.ndarray | None) -> tuple:
+        """
+        :return: (energy, positive spectral flux, spectrum of the last frame)
+        """
+        energy = np.mean(np.square(frames), axis=1)
+
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1)).astype(np.float32)
+        if previous_spectrum is None:
+            # The first frame has nothing to grow from
+            previous_spectrum = spectrum[0]
+        growth = np.diff(spectrum, axis=0, prepend=previous_spectrum[np.newaxis])
+        flux = np.maximum(growth, 0).sum(axis=1) / spectrum.shape[1]
+
+        return energy.astype(np.float32), flux.astype(np.float32), spectrum[-1]
+
+    def score_windows(self, features: AudioFeatures, transcripts: List[Segment]) -> np.ndarray:
+        """
+        Scores the audio of every chunk: the weighted sum of its RMS loudness
+        in dBFS, mean spectral flux and onset density, each standardized over
+        all chunks.
+
+        Chunks past the end of the audio get the lowest score.
+        """
+        starts_ms = np.fromiter((transcript.start_ms for transcript in transcripts),
+                                np.float64, len(transcripts))
+        ends_ms = np.fromiter((transcript.end_ms for transcript in transcripts),
+                              np.float64, len(transcripts))
+        first_frames = np.clip(np.floor(starts_ms / features.frame_ms), 0,
+                               features.frame_count).astype(np.int64)
+        last_frames = np.clip(np.ceil(ends_ms / features.frame_ms), first_frames,
+                              features.frame_count).astype(np.int64)
+        frame_counts = last_frames - first_frames
+        has_audio = frame_counts > 0
+
+        def window_means(values: np.ndarray) -> np.ndarray:
+            # Sums over any range of frames from one cumulative sum
+            cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+            sums = cumulative[last_frames] - cumulative[first_frames]
+            return sums / np.maximum(frame_counts, 1)
+
+        # Averaged as energy, so short loud bursts are not drowned by the pauses between them
+        loudness_db = 10 * np.log10(np.maximum(window_means(features.energy), _SILENCE_ENERGY))
+        onset_density = window_means(features.onsets) * (1000 / features.frame_ms)
+        scores = AUDIO_LOUDNESS_WEIGHT * standardize(loudness_db, has_audio) + \
+            AUDIO_FLUX_WEIGHT * standardize(window_means(features.flux), has_audio) + \
+            AUDIO_ONSET_WEIGHT * standardize(onset_density, has_audio)
+
+        return np.where(has_audio, scores, -np.inf)
+
+
+def detect_onsets(flux: np.ndarray, threshold: float = AUDIO_ONSET_THRESHOLD) -> np.ndarray:
+    """
+    Marks the local maxima of the spectral flux that stand out from its
+    median by threshold mean absolute deviations.
+    """
+    if len(flux) < 3:
+        return np.zeros(len(flux), dtype=bool)
+
+    median = np.median(flux)
+    deviation = np.mean(np.abs(flux - median))
+    peaks = np.zeros(len(flux), dtype=bool)
+    peaks[1:-1] = (flux[1:-1] > flux[:-2]) & (flux[1:-1] >= flux[2:])
+
+    return peaks & (flux > median + threshold * deviation)
+
+
+# Example usage
+if __name__ == "__main__":
+    audio_path = "./backend/download/downloaded_audios/sample_audio.mp3"
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}")
+                   for index in range(60)]
+
+    audio_extraction_service = AudioExtractionService(audio_path)
+    candidates = audio_extraction_service.select_candidates(transcripts)
+
+    print(f"Kept {len(candidates)} of {len(transcripts)} chunks for AI scoring:")
+    for candidate in candidates:
+        print(candidate)
@@ -0,0 +1,168 @@
+from backend.core.constants import CHAT_CURRENCY_TO_JPY, CHAT_LAUGHTER_REGEX, CHAT_LAUGHTER_WEIGHT, CHAT_RATE_WEIGHT, CHAT_SUPERCHAT_WEIGHT, CHAT_UNKNOWN_SUPERCHAT_JPY, PRERANK_KEEP_RATIO, PRERANK_NEIGHBOURS
+from backend.models.chat_features import ChatFeatures
+from backend.models.segment import Segment
+from backend.services.prerank import select_candidates, standardize
+
+from array import array
+from typing import List
+
+import json
+import numpy as np
+import re
+
+# Chat items that are messages, the others are ticker, banner or moderation items
+_TEXT_MESSAGE = "liveChatTextMessageRenderer"
+_PAID_RENDERERS = ("liveChatPaidMessageRenderer", "liveChatPaidStickerRenderer")
+# Currency then amount, such as "¥1,000", "CA$5.00" or "SGD 10.00"
+_AMOUNT_REGEX = re.compile(r"^\s*([^\d\s.,]*)\s*([\d.,]+)")
+
+
+class ChatAnalysisService:
+    """
+    Ranks transcript chunks by how the live chat reacted to them, so that
+    only the most promising ones are sent to the AI model.
+
+    Highlights of a stream line up with chat spikes: bursts of messages,
+    laughter such as 草 and www, and superchats.
+    """
+
+    def __init__(self, chat_path: str):
+        """
+        :param chat_path: A live chat replay as written by yt-dlp, one JSON
+                          object per line
+        """
+        self.chat_path = chat_path
+
+    def select_candidates(self, transcripts: List[Segment], keep_ratio: float = PRERANK_KEEP_RATIO,
+                          neighbours: int = PRERANK_NEIGHBOURS) -> List[Segment]:
+        """
+        Keeps the chunks with the best chat scores and their neighbours,
+        see prerank.select_candidates.
+        """
+        if not transcripts:
+            return []
+        return select_candidates(transcripts, [self.score_chunks(transcripts)], keep_ratio, neighbours)
+
+    def score_chunks(self, transcripts: List[Segment]) -> np.ndarray:
+        """
+        Parses the replay and scores every chunk, see score_windows.
+        """
+        return self.score_windows(self.extract_features(), transcripts)
+
+    def extract_features(self) -> ChatFeatures:
+        """
+        Reads the replay one line at a time, so a replay of hundreds of MB
+        never is in memory at once, only three numbers per message.
+        """
+        offsets_ms, superchat_values, laughter_counts = array("q"), array("d"), array("l")
+
+        with open(self.chat_path, "r", encoding="utf-8") as file:
+            for line in file:
+                # Most lines of a busy replay are messages, skip the rest before decoding them
+                if "addChatItemAction" not in line:
+                    continue
+                action = json.loads(line).get("replayChatItemAction", {})
+                offset_ms = int(action.get("videoOffsetTimeMsec", 0))
+
+                for item_action in action.get("actions", []):
+                    item = item_action.get("addChatItemAction", {}).get("item", {})
+                    message = _message_features(item)
+                    if message is not None:
+                        offsets_ms.append(offset_ms)
+                        superchat_values.append(message[0])
+                        laughter_counts.append(message[1])
+
+        offsets = np.frombuffer(offsets_ms, np.int64) if offsets_ms else np.zeros(0, np.int64)
+        # Replays are almost always in order already, the stable sort is then a single pass
+        order = np.argsort(offsets, kind="stable")
+        return ChatFeatures(
+            offsets_ms=offsets[order],
+            superchat_values=np.asarray(superchat_values, np.float64)[order],
+            laughter_counts=np.asarray(laughter_counts, np.int64)[order],
+        )
+
+    def score_windows(self, features: ChatFeatures, transcripts: List[Segment]) -> np.ndarray:
+        """
+        Scores the chat of every chunk: the weighted sum of its message rate,
+        its superchat value and its laughter rate, each standardized over all
+        chunks. Superchat values are log-scaled, so one large superchat does
+        not outweigh everything else.
+        """
+        starts_ms = np.fromiter((transcript.start_ms for transcript in transcripts),
+                                np.int64, len(transcripts))
+        ends_ms = np.fromiter((transcript.end_ms for transcript in transcripts),
+                              np.int64, len(transcripts))
+        first_messages = np.searchsorted(features.offsets_ms, starts_ms, side="left")
+        last_messages = np.searchsorted(features.offsets_ms, ends_ms, side="left")
+        minutes = np.maximum(ends_ms - starts_ms, 1) / 60000
+
+        def window_sums(values: np.ndarray) -> np.ndarray:
+            # Sums over any range of messages from one cumulative sum
+            cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+            return cumulative[last_messages] - cumulative[first_messages]
+
+        message_rate = (last_messages - first_messages) / minutes
+        superchat_value = np.log1p(window_sums(features.superchat_values))
+        laughter_rate = window_sums(features.laughter_counts) / minutes
+
+        return CHAT_RATE_WEIGHT * standardize(message_rate) + \
+            CHAT_SUPERCHAT_WEIGHT * standardize(superchat_value) + \
+            CHAT_LAUGHTER_WEIGHT * standardize(laughter_rate)
+
+
+def _message_features(item: dict) -> tuple | None:
+    """
+    :return: (superchat value in yen, laughter tokens) of a chat item,
+             None when the item is not a message
+    """
+    for renderer_name in (_TEXT_MESSAGE, *_PAID_RENDERERS):
+        renderer = item.get(renderer_name)
+        if renderer is None:
+            continue
+        text = "".join(_run_text(run) for run in renderer.get("message", {}).get("runs", []))
+        laughter_count = len(CHAT_LAUGHTER_REGEX.findall(text))
+        if renderer_name == _TEXT_MESSAGE:
+            return 0.0, laughter_count
+        return parse_superchat_value(renderer.get("purchaseAmountText", {}).get("simpleText", "")), \
+            laughter_count
+    return None
+
+
+def _run_text(run: dict) -> str:
+    if "text" in run:
+        return run["text"]
+    emoji = run.get("emoji", {})
+    shortcuts = emoji.get("shortcuts") or [""]
+    # Standard emoji carry the character itself as their ID, channel emoji are named by a shortcut such as :_kusa:
+    return shortcuts[0] if emoji.get("isCustomEmoji") else emoji.get("emojiId", "")
+
+
+def parse_superchat_value(amount_text: str) -> float:
+    """
+    Converts a superchat amount such as "¥1,000" or "$5.00" to yen.
+    """
+    match = _AMOUNT_REGEX.match(amount_text)
+    if match is None:
+        return float(CHAT_UNKNOWN_SUPERCHAT_JPY)
+    currency, amount = match.groups()
+    rate = CHAT_CURRENCY_TO_JPY.get(currency)
+    if rate is None:
+        return float(CHAT_UNKNOWN_SUPERCHAT_JPY)
+    # Both 1,000.50 and 1.000,50 are written, the last separator followed by 2 digits is the decimal point
+    decimals = re.search(r"[.,](\d{2})$", amount)
+    whole = re.sub(r"[.,]", "", amount[:decimals.start()] if decimals else amount)
+    return rate * (float(whole or 0) + (int(decimals.group(1)) / 100 if decimals else 0))
+
+
+# Example usage
+if __name__ == "__main__":
+    chat_path = "./backend/download/downloaded_chats/-MRIkiCRVW8.live_chat.json"
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}")
+                   for index in range(60)]
+
+    chat_analysis_service = ChatAnalysisService(chat_path)
+    candidates = chat_analysis_service.select_candidates(transcripts)
+
+    print(f"Kept {len(candidates)} of {len(transcripts)} chunks for AI scoring:")
+    for candidate in candidates:
+        print(candidate)
@@ -0,0 +1,92 @@
+from backend.core.constants import COARSE_SCORING_BATCH_SIZE, COARSE_SCORING_TOKEN_BUDGET, COARSE_THRESHOLD_SCORE, COARSE_WINDOW_SIZE
+from backend.core.metrics import COARSE_WINDOWS
+from backend.models.segment import Segment
+from backend.services.highlight_detection import HighlightDetectionService
+from backend.services.transcript_parser import TranscriptParser
+
+from typing import List
+
+import numpy as np
+
+
+class CoarseToFineSelector:
+    """
+    Keeps the chunks worth scoring by scoring long windows of them first.
+
+    The chunks are regrouped by a TranscriptParser into windows of
+    window_size seconds, which are scored several at a time. Only the chunks
+    of the windows scoring above threshold are kept, to be scored on their
+    own, so clip boundaries stay as precise as when every chunk is scored.
+    On long streams with few highlights this sends several times fewer AI
+    requests, which bound the scoring time under the request rate limit.
+    """
+
+    def __init__(self, highlight_service: HighlightDetectionService,
+                 window_size: float = COARSE_WINDOW_SIZE,
+                 threshold: float = COARSE_THRESHOLD_SCORE,
+                 batch_size: int = COARSE_SCORING_BATCH_SIZE,
+                 token_budget: int = COARSE_SCORING_TOKEN_BUDGET):
+        """
+        :param highlight_service: Scores the windows
+        :param window_size: Seconds after which a window ends
+        :param threshold: Score a window must exceed for its chunks to be kept
+        :param batch_size: Windows packed into one scoring prompt
+        :param token_budget: Tokens of window text packed into one scoring
+                             prompt at most, windows being much longer than chunks
+        """
+        self.highlight_service = highlight_service
+        self.window_parser = TranscriptParser(chunk_size=window_size)
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.token_budget = token_budget
+
+    def select(self, transcripts: List[Segment]) -> List[Segment]:
+        """
+        :param transcripts: Chunks in transcript order
+        :return: The chunks of the lively windows, in transcript order
+        """
+        windows = self.window_parser.regroup(transcripts)
+        self.highlight_service.score_transcripts(windows, batch_size=self.batch_size, token_budget=self.token_budget)
+        return self._chunks_in_lively_windows(transcripts, windows)
+
+    async def select_async(self, transcripts: List[Segment]) -> List[Segment]:
+        """
+        Same as select, with concurrent AI requests.
+        """
+        windows = self.window_parser.regroup(transcripts)
+        await self.highlight_service.score_transcripts_async(
+            windows, batch_size=self.batch_size, token_budget=self.token_budget)
+        return self._chunks_in_lively_windows(transcripts, windows)
+
+    def _chunks_in_lively_windows(self, transcripts: List[Segment], windows: List[Segment]) -> List[Segment]:
+        lively = [window for window in windows if (window.highlight_score or 0) > self.threshold]
+        COARSE_WINDOWS.inc(len(lively), result="kept")
+        COARSE_WINDOWS.inc(len(windows) - len(lively), result="skipped")
+        if not lively:
+            return []
+
+        # Windows are regrouped from the chunks in order, so their starts and ends never decrease
+        window_starts_ms = np.fromiter((window.start_ms for window in lively), np.int64, len(lively))
+        window_ends_ms = np.fromiter((window.end_ms for window in lively), np.int64, len(lively))
+        starts_ms = np.fromiter((t.start_ms for t in transcripts), np.int64, len(transcripts))
+        ends_ms = np.fromiter((t.end_ms for t in transcripts), np.int64, len(transcripts))
+
+        # First lively window ending after each chunk starts, the chunk is kept when it overlaps it
+        windows_after = np.searchsorted(window_ends_ms, starts_ms, side="right")
+        in_range = windows_after < len(lively)
+        overlaps = in_range & (window_starts_ms[np.minimum(windows_after, len(lively) - 1)] < ends_ms)
+
+        return [transcripts[index] for index in np.flatnonzero(overlaps).tolist()]
+
+
+# Example usage
+if __name__ == "__main__":
+    vtt_path = "./backend/download/downloaded_transcripts/【恋バナ】超絶ノンデリ彼ピと！念願の恋愛相談読んでみる・・・よッ！【にじさんじ_星川サラ_犬山たまき】#星川恋愛研究所.json"
+
+    chunks = TranscriptParser().parse(vtt_path)
+    highlight_service = HighlightDetectionService()
+    candidates = CoarseToFineSelector(highlight_service).select(chunks)
+    print(f"Chunks to score: {len(candidates)} of {len(chunks)}")
+
+    for highlight in highlight_service.execute(candidates):
+        print(f"{highlight}, Highlight Score: {highlight.highlight_score}")
@@ -1,59 +1,485 @@
-from backend.services.youtube_download import TranscriptDownloadService, VideoDownloadService
-from backend.services.transcript_parser import TranscriptParser
+from backend.services.youtube_download import AudioDownloadService, ChatDownloadService, DownloadProgressTracker, TranscriptDownloadService, VideoDownloadService
+from backend.services.audio_extraction import AudioExtractionService
+from backend.services.chat_analysis import ChatAnalysisService
+from backend.services.coarse_to_fine import CoarseToFineSelector
+from backend.services.transcription import TranscriptionService
+from backend.services.prerank import select_candidates
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy
 from backend.services.highlight_detection import HighlightDetectionService
+from backend.services.highlight_ranking import AUDIO_SIGNAL, CHAT_SIGNAL
+from backend.services.score_cache import get_score_cache
+from backend.services.scorers import Scorer, create_scorer
 from backend.services.video_clipping import VideoClippingService
 from backend.services.google_cloud_storage import GoogleCloudStorage
+from backend.services.job_registry import JobRegistry, get_job_registry
+from backend.services.media_store import MediaLease, MediaStore, get_media_store
+from backend.services.url_validator import UrlValidator
+from backend.core.clients import get_client_pool
+from backend.core.constants import MAX_CLIP_WORKERS, MAX_SEGMENT_DOWNLOAD_WORKERS, MAX_UPLOAD_WORKERS, PIPELINE_QUEUE_SIZE, PRERANK_MIN_CHUNKS, PRERANK_SIGNAL_TIMEOUT_SECONDS, SCORING_BATCH_SIZE, TRANSCRIPT_EXT
+from backend.core.event_bus import EventBus
+from backend.core.settings import AUDIO_PREFILTER_ENABLED, CHAT_PREFILTER_ENABLED, COARSE_TO_FINE_ENABLED, HIGHLIGHT_RANKING_ENABLED
+from backend.core.metrics import AUDIO_ANALYSIS, CHAT_ANALYSIS, CLIP, COARSE_SCORE, PARSE, PRERANK_CHUNKS, SCORE, STAGE_BYTES, STAGE_ITEMS, TOTAL, TRANSCRIPT_DOWNLOAD, TRANSCRIPTION, UPLOAD, VIDEO_DOWNLOAD, StageTimings
+from backend.models.generate_highlight_request import DownloadMode, ScoringBackend
 from backend.models.generate_highlight_response import GenerateHighlightResponse
+from backend.models.job import JobStage
+from backend.models.progress_event import ProgressEventType
 
-from typing import List
-from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from youtube_transcript_api import CouldNotRetrieveTranscript
+
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+
+# Overall job progress at the start of each stage
+STAGE_PROGRESS = {
+    JobStage.DOWNLOADING: 0.0,
+    JobStage.PARSING: 0.1,
+    JobStage.SCORING: 0.15,
+    JobStage.CLIPPING: 0.75,
+    JobStage.UPLOADING: 0.9,
+    JobStage.DONE: 1.0,
+}
+
+# Tells a stage worker that no more items will arrive
+_END_OF_STAGE = None
 
 
 class GenerateHighlightCoordinator:
     """This class coordinates the generation of highlights in the backend.
     It manages the interaction between different services
     such as video, audio, and transcript download services.
+
+    The pipeline is streamed: every highlight is clipped as soon as its
+    score is final, and every clip is uploaded as soon as it is cut.
     """
 
-    def run(self, video_url: str) -> GenerateHighlightResponse:
+    def __init__(self, job_registry: JobRegistry | None = None, media_store: MediaStore | None = None):
+        self.job_registry = job_registry or get_job_registry()
+        self.media_store = media_store or get_media_store()
+        self.event_bus = None
+        self.pipeline_events = EventBus()
+        self.scoring_backend = ScoringBackend.GEMINI
+        self.timings = StageTimings()
+
+    def run(self, video_url: str,
+            download_mode: DownloadMode = DownloadMode.FULL,
+            event_bus: EventBus | None = None,
+            scoring_backend: ScoringBackend = ScoringBackend.GEMINI) -> GenerateHighlightResponse:
         """
         This method coordinates all the services in the backend.
+
+        Requests for a video that is already being processed wait for that
+        run, and finished videos are served from the cached GCS objects.
+
+        :param download_mode: FULL downloads the whole video before clipping,
+                              RANGES downloads only the detected highlights
+        :param event_bus: Receives the progress of every stage, including the
+                          signed url of every clip as soon as it is uploaded
+        :param scoring_backend: What scores the transcript chunks
         """
+        self.event_bus = event_bus
+        self.scoring_backend = scoring_backend
+        video_id = UrlValidator.extract_video_id(video_url)
+        job_key = self._job_key(video_id)
+        gcs_service = GoogleCloudStorage()
+
+        blob_names = self._run_once(
+            job_key, lambda: self._run_pipeline(video_url, video_id, gcs_service, download_mode))
+        urls = [gcs_service.generate_signed_url(
+            blob_name) for blob_name in blob_names]
+
+        if not all(urls):
+            # Cached objects were deleted from the bucket, process the video again
+            self.job_registry.invalidate(job_key)
+            blob_names = self._run_once(
+                job_key, lambda: self._run_pipeline(video_url, video_id, gcs_service, download_mode))
+            urls = [gcs_service.generate_signed_url(
+                blob_name) for blob_name in blob_names]
+
+        download_links = GenerateHighlightResponse(
+            download_links=urls, timings=self.timings.as_dict())
+
+        return download_links
+
+    def _run_once(self, job_key: str, pipeline: Callable[[], List[str]]) -> List[str]:
+        """
+        Runs the pipeline through the job registry, publishing its events on
+        a bus of the run. Jobs attaching to the run relay that bus to their
+        own, replaying what they missed, and share its timings.
+        """
+        self.timings = StageTimings()
+        self.pipeline_events = EventBus()
+        if self.event_bus is not None:
+            self.pipeline_events.relay_to(self.event_bus)
+
+        def attach(context: tuple) -> None:
+            pipeline_events, self.timings = context
+            if self.event_bus is not None:
+                pipeline_events.relay_to(self.event_bus)
+
+        try:
+            return self.job_registry.run(job_key, pipeline, context=(self.pipeline_events, self.timings),
+                                         on_attach=attach)
+        finally:
+            # Sends the throttled events still waiting, to this job and the attached ones
+            self.pipeline_events.close()
+
+    def _run_pipeline(self, video_url: str, video_id: str, gcs_service: GoogleCloudStorage,
+                      download_mode: DownloadMode) -> List[str]:
+        """
+        Downloads, scores, clips and uploads the video.
+
+        Downloads go through the media store, which keeps them from being
+        evicted until the pipeline is done and serves them to later runs.
+
+        :return: The names of the uploaded objects in the bucket, in highlight order
+        """
+        with self.media_store.acquire(video_id) as media:
+            return self._run_stages(video_url, video_id, media, gcs_service, download_mode)
+
+    def _run_stages(self, video_url: str, video_id: str, media: MediaLease,
+                    gcs_service: GoogleCloudStorage, download_mode: DownloadMode) -> List[str]:
+        """
+        Scoring, clipping and uploading run concurrently, connected by
+        bounded queues so a fast stage cannot run far ahead of a slow one.
+        """
+        start_time = time.perf_counter()
+        first_link_seconds = None
+        clipped_count = 0
+        clip_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        upload_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        blob_names = {}
+        errors = []
+        lock = threading.Lock()
 
         # Download video and transcript
-        video_service = VideoDownloadService()
+        video_service = VideoDownloadService(
+            progress_callback=self._report_download_progress)
         transcript_service = TranscriptDownloadService()
-        gcs_service = GoogleCloudStorage()
+        range_tracker = DownloadProgressTracker(self._report_download_progress)
+        # Clip workers each download one range, at most MAX_SEGMENT_DOWNLOAD_WORKERS at once per job
+        range_slots = threading.BoundedSemaphore(MAX_SEGMENT_DOWNLOAD_WORKERS)
+        video_future = Future()
+        audio_future = None
+        chat_future = None
+        chat_unneeded = threading.Event()
+        highlight_indices = itertools.count()
 
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            # Download video on a different thread
-            video_future = executor.submit(video_service.download, video_url)
+        # Every download is staged under the video ID, so videos with the same title never collide
+        def download_video() -> str:
+            with self.timings.measure(VIDEO_DOWNLOAD):
+                video_path = video_service.download(video_url, output_dir=media.staging_directory("video"))
+            STAGE_BYTES.inc(self._file_size(video_path), stage=VIDEO_DOWNLOAD)
+            return video_path
 
-            transcript_path = transcript_service.download(video_url)
-            print(f"Transcript downloaded to: {transcript_path}")
+        def download_audio() -> str:
+            return AudioDownloadService().download(video_url, output_dir=media.staging_directory("audio"))
 
-            # Parse the transcript
-            parser = TranscriptParser()
-            parsed_entries = parser.parse(transcript_path)
-            print(f"Parsed Transcript Entries count: {len(parsed_entries)}")
+        def download_chat() -> str:
+            return ChatDownloadService().download(
+                video_url, output_dir=media.staging_directory("chat"), stop=chat_unneeded)
 
-            # Detect highlights from the parsed transcript
-            highlight_service = HighlightDetectionService()
-            highlights = highlight_service.execute(parsed_entries)
-            print(f"Detected Highlights count: {len(highlights)}")
+        def clip(item: tuple) -> tuple:
+            nonlocal clipped_count
+            index, highlight = item
+            if download_mode == DownloadMode.RANGES:
+                # Each downloaded range already is a clip
+                time_range = (highlight.start_seconds, highlight.end_seconds)
+                with range_slots, self.timings.measure(CLIP):
+                    # Kept with the video in the media store, so they count towards its quota
+                    clipped_video = video_service.download_ranges(
+                        video_url, [time_range], max_workers=1, tracker=range_tracker,
+                        output_dir=media.directory("ranges"))[0]
+            else:
+                video_clipping_service = VideoClippingService(
+                    video_future.result())
+                with self.timings.measure(CLIP):
+                    clipped_video = video_clipping_service.clip([highlight])[0]
+            STAGE_ITEMS.inc(stage=CLIP)
+            with lock:
+                clipped_count += 1
+                completed = clipped_count
+            self._publish(ProgressEventType.CLIP,
+                          JobStage.CLIPPING, completed=completed)
+            return index, clipped_video
 
-            # Clip the video based on detected highlights
-            video_path = video_future.result()
-            video_clipping_service = VideoClippingService(video_path)
-            clipped_videos = video_clipping_service.clip(highlights)
-            print(f"Clipped Videos: {clipped_videos}")
+        def upload(item: tuple) -> None:
+            nonlocal first_link_seconds
+            index, clipped_video = item
+            with self.timings.measure(UPLOAD):
+                blob_name = gcs_service.upload_file(
+                    clipped_video, f"{self._job_key(video_id)}/{os.path.basename(clipped_video)}")
+            STAGE_BYTES.inc(self._file_size(clipped_video), stage=UPLOAD)
+            STAGE_ITEMS.inc(stage=UPLOAD)
+            with lock:
+                blob_names[index] = blob_name
+                uploaded_count = len(blob_names)
+                if first_link_seconds is None:
+                    first_link_seconds = time.perf_counter() - start_time
+            self._publish(ProgressEventType.UPLOAD, JobStage.UPLOADING, completed=uploaded_count,
+                          download_link=gcs_service.generate_signed_url(blob_name))
 
-            urls = gcs_service.upload(clipped_videos)
-            print(f"Download links count: {len(urls)}")
+        with ThreadPoolExecutor(max_workers=3 + MAX_CLIP_WORKERS + MAX_UPLOAD_WORKERS) as executor:
+            self._report_stage(JobStage.DOWNLOADING)
+            if download_mode == DownloadMode.FULL:
+                # Download video on a different thread
+                video_future = executor.submit(
+                    media.fetch, "video", download_video)
+            if AUDIO_PREFILTER_ENABLED:
+                # The audio alone is much smaller than the video, it is ready long before scoring
+                audio_future = executor.submit(
+                    media.fetch, "audio", download_audio)
+            if CHAT_PREFILTER_ENABLED:
+                # Only past streams have a chat replay, other videos are ranked by audio alone
+                chat_future = executor.submit(
+                    media.fetch, "chat", download_chat)
 
-        download_links = GenerateHighlightResponse(download_links=urls)
+            clip_workers = [executor.submit(self._run_stage, clip_queue, clip, upload_queue, errors)
+                            for _ in range(MAX_CLIP_WORKERS)]
+            upload_workers = [executor.submit(self._run_stage, upload_queue, upload, None, errors)
+                              for _ in range(MAX_UPLOAD_WORKERS)]
 
-        return download_links
+            try:
+                transcript_path = media.fetch("transcript", lambda: self._download_transcript(
+                    video_url, transcript_service, lambda: media.fetch("audio", download_audio),
+                    media.staging_directory("transcript")))
+                print(f"Transcript downloaded to: {transcript_path}")
+
+                # Parse the transcript
+                self._report_stage(JobStage.PARSING)
+                # Chunks of dense talk are cut shorter, so every one costs about the same to score
+                parser = TranscriptParser(policy=WindowPolicy.TOKENS)
+                with self.timings.measure(PARSE):
+                    parsed_entries = parser.parse(transcript_path)
+                STAGE_ITEMS.inc(len(parsed_entries), stage=PARSE)
+                print(
+                    f"Parsed Transcript Entries count: {len(parsed_entries)}")
+
+                # Only the chunks with the liveliest audio and chat are sent to the AI model
+                signals = self._analyze_signals(parsed_entries, audio_future, chat_future)
+                candidates = self._prefilter(parsed_entries, signals)
+
+                # Detect highlights, each one is clipped as soon as it is final
+                self._report_stage(JobStage.SCORING)
+                scorer = create_scorer(self.scoring_backend)
+                if COARSE_TO_FINE_ENABLED:
+                    candidates = self._select_lively_windows(candidates, scorer)
+                highlight_service = HighlightDetectionService(
+                    score_cache=get_score_cache(), progress_callback=self._report_scoring_progress, scorer=scorer)
+                if HIGHLIGHT_RANKING_ENABLED:
+                    highlights = self._rank_to_queue(
+                        highlight_service, parsed_entries, candidates, signals, clip_queue, highlight_indices)
+                else:
+                    with self.timings.measure(SCORE):
+                        # The loop of this thread, where the async connections of its client live
+                        highlights = get_client_pool().run_async(self._stream_to_queue(
+                            highlight_service, candidates, clip_queue, highlight_indices))
+                STAGE_ITEMS.inc(len(candidates), stage=SCORE)
+                print(f"Detected Highlights count: {len(highlights)}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # A chat replay still downloading is abandoned, so the job does not wait for it
+                chat_unneeded.set()
+                self._report_stage(JobStage.CLIPPING)
+                self._close_stage(clip_queue, clip_workers)
+                self._report_stage(JobStage.UPLOADING)
+                self._close_stage(upload_queue, upload_workers)
+
+        if errors:
+            raise errors[0]
+
+        if download_mode == DownloadMode.RANGES:
+            video_service.report = range_tracker.report([])
+            STAGE_BYTES.inc(video_service.report.bytes_downloaded,
+                            stage=VIDEO_DOWNLOAD)
+        self.timings.add(TOTAL, time.perf_counter() - start_time)
+        print(f"Video download report: {video_service.report}")
+        print(f"Uploaded clips count: {len(blob_names)}, time to first link: "
+              f"{first_link_seconds}s, stage timings: {self.timings.as_dict()}")
+
+        return [blob_names[index] for index in sorted(blob_names)]
+
+    async def _stream_to_queue(self, highlight_service: HighlightDetectionService, transcripts: list,
+                               clip_queue: queue.Queue, highlight_indices: itertools.count) -> list:
+        """
+        Scores the transcripts, putting every highlight on the clip queue as
+        soon as it is final.
+
+        Puts on the bounded queue wait in executor threads, so a lagging clip
+        stage never blocks the event loop and the AI requests in flight on it.
+        """
+        loop = asyncio.get_running_loop()
+        handoffs = []
+        highlights = await highlight_service.stream_highlights_async(
+            transcripts, lambda highlight: handoffs.append(loop.run_in_executor(
+                None, clip_queue.put, (next(highlight_indices), highlight))))
+        await asyncio.gather(*handoffs)
+        return highlights
+
+    def _rank_to_queue(self, highlight_service: HighlightDetectionService, transcripts: list,
+                       candidates: list, signals: dict, clip_queue: queue.Queue,
+                       highlight_indices: itertools.count) -> list:
+        """
+        Scores the candidates, then picks the highlights among all the
+        transcripts from their AI scores and the other signals, see
+        HighlightRanker, and puts them on the clip queue.
+
+        Ranking needs every score, so clipping only starts once scoring ends.
+        """
+        with self.timings.measure(SCORE):
+            get_client_pool().run_async(highlight_service.score_transcripts_async(
+                candidates, batch_size=SCORING_BATCH_SIZE))
+            # Chunks left out by pre-ranking are unscored, they are ranked by their other signals
+            highlights = highlight_service.rank_highlights(transcripts, signals)
+        for highlight in highlights:
+            clip_queue.put((next(highlight_indices), highlight))
+        return highlights
+
+    def _download_transcript(self, video_url: str, transcript_service: TranscriptDownloadService,
+                             fetch_audio: Callable[[], str], output_dir: str) -> str:
+        """
+        Downloads the captions of the video, or transcribes its audio
+        locally when it has none.
+
+        :param fetch_audio: Returns the path of the audio, downloading it if needed
+        :param output_dir: Directory of the video the transcript is written to
+        """
+        try:
+            with self.timings.measure(TRANSCRIPT_DOWNLOAD):
+                return transcript_service.download(video_url, output_dir=output_dir)
+        except CouldNotRetrieveTranscript as e:
+            print(f"No captions ({type(e).__name__}), transcribing the audio")
+
+        audio_path = fetch_audio()
+        transcription_service = TranscriptionService()
+        with self.timings.measure(TRANSCRIPTION):
+            # Stored audio is always named audio.<ext>, so the transcript must not be named after it
+            transcript_path = transcription_service.transcribe(
+                audio_path, output_path=os.path.join(output_dir, f"transcript.{TRANSCRIPT_EXT}"))
+        print(f"Transcription report: {transcription_service.report}")
+
+        return transcript_path
+
+    def _analyze_signals(self, transcripts: list, audio_future: Future | None,
+                         chat_future: Future | None) -> dict:
+        """
+        Scores every chunk by the audio and the live chat of the video, for
+        pre-ranking and highlight ranking. A signal that cannot be downloaded
+        or analyzed in time, see PRERANK_SIGNAL_TIMEOUT_SECONDS, is left out.
+
+        :return: The scores of every chunk by signal name
+        """
+        # Short transcripts are scored in full, only highlight ranking needs their signals
+        if len(transcripts) < PRERANK_MIN_CHUNKS and not HIGHLIGHT_RANKING_ENABLED:
+            return {}
+
+        signals = {}
+        for future, analysis_class, stage, name in (
+                (audio_future, AudioExtractionService, AUDIO_ANALYSIS, AUDIO_SIGNAL),
+                (chat_future, ChatAnalysisService, CHAT_ANALYSIS, CHAT_SIGNAL)):
+            if future is None:
+                continue
+            try:
+                with self.timings.measure(stage):
+                    signals[name] = analysis_class(future.result(
+                        timeout=PRERANK_SIGNAL_TIMEOUT_SECONDS)).score_chunks(transcripts)
+            except TimeoutError:
+                print(f"Pre-ranking by {stage} timed out, ranking without it")
+            except Exception as e:
+                print(f"Pre-ranking by {stage} failed, ranking without it: {e}")
+        return signals
+
+    def _prefilter(self, transcripts: list, signals: dict) -> list:
+        """
+        Keeps the chunks worth scoring according to the signals of the
+        video. Short transcripts are scored in full, and so is every
+        transcript without any signal.
+        """
+        if len(transcripts) < PRERANK_MIN_CHUNKS or not signals:
+            return transcripts
+
+        candidates = select_candidates(transcripts, list(signals.values()))
+        PRERANK_CHUNKS.inc(len(candidates), result="kept")
+        PRERANK_CHUNKS.inc(len(transcripts) - len(candidates), result="skipped")
+        print(f"Pre-ranking kept {len(candidates)} of {len(transcripts)} chunks")
+        return candidates
+
+    def _job_key(self, video_id: str) -> str:
+        """
+        Key of the run in the job registry and prefix of its clips in the
+        bucket, other scoring backends than Gemini picking other clips.
+        """
+        if self.scoring_backend == ScoringBackend.GEMINI:
+            return video_id
+        return f"{video_id}/{self.scoring_backend.value}"
+
+    def _select_lively_windows(self, transcripts: list, scorer: Scorer) -> list:
+        """
+        Keeps the chunks of the windows of the transcript that score as
+        lively, see CoarseToFineSelector.
+        """
+        # Scoring progress is only reported for the chunks themselves
+        selector = CoarseToFineSelector(HighlightDetectionService(score_cache=get_score_cache(), scorer=scorer))
+        with self.timings.measure(COARSE_SCORE):
+            candidates = get_client_pool().run_async(selector.select_async(transcripts))
+        print(f"Coarse scoring kept {len(candidates)} of {len(transcripts)} chunks")
+        return candidates
+
+    def _run_stage(self, input_queue: queue.Queue, handle: Callable,
+                   output_queue: queue.Queue | None, errors: list) -> None:
+        """
+        Handles items from input_queue until the end marker arrives.
+
+        After a failure the remaining items are drained without being handled,
+        so the stages feeding this one never block on a full queue.
+        """
+        while True:
+            item = input_queue.get()
+            if item is _END_OF_STAGE:
+                return
+            if errors:
+                continue
+            try:
+                result = handle(item)
+                if output_queue is not None:
+                    output_queue.put(result)
+            except Exception as e:
+                errors.append(e)
+
+    def _close_stage(self, input_queue: queue.Queue, workers: list) -> None:
+        for _ in workers:
+            input_queue.put(_END_OF_STAGE)
+        for worker in workers:
+            worker.result()
+
+    def _file_size(self, path: str) -> int:
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    def _publish(self, event_type: ProgressEventType, stage: JobStage, **fields) -> None:
+        self.pipeline_events.publish(event_type, stage, **fields)
+
+    def _report_stage(self, stage: JobStage) -> None:
+        self._publish(ProgressEventType.STAGE, stage,
+                      progress=STAGE_PROGRESS[stage])
+
+    def _report_scoring_progress(self, scored_count: int, total_count: int) -> None:
+        scoring_span = STAGE_PROGRESS[JobStage.CLIPPING] - \
+            STAGE_PROGRESS[JobStage.SCORING]
+        self._publish(ProgressEventType.SCORING, JobStage.SCORING,
+                      progress=STAGE_PROGRESS[JobStage.SCORING] +
+                      scoring_span * scored_count / max(total_count, 1),
+                      completed=scored_count, total=total_count)
+
+    def _report_download_progress(self, downloaded_bytes: int, total_bytes: int | None) -> None:
+        # Downloads overlap the other stages, so they do not move the overall progress
+        self._publish(ProgressEventType.DOWNLOAD, JobStage.DOWNLOADING,
+                      completed=downloaded_bytes, total=total_bytes)
 
 
 # Example usage
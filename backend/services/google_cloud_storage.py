@@ -1,20 +1,31 @@
 from backend.core.constants import MAX_UPLOAD_WORKERS, SIGNED_CREDENTIAL_VERSION, URL_EXPIRATION_SECONDS
-from backend.core.settings import GOOGLE_APPLICATION_CREDENTIALS, GOOGLE_BUCKET_NAME
+from backend.core.clients import get_client_pool
+from backend.core.settings import GOOGLE_BUCKET_NAME
+from backend.models.upload_report import UploadReport
+from backend.services.resumable_upload import ResumableUploader
 
 from google.cloud import storage
-from google.oauth2 import service_account
 from concurrent.futures import ThreadPoolExecutor
 
 import os
 
 
 class GoogleCloudStorage:
-    def __init__(self):
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_APPLICATION_CREDENTIALS)
-        client = storage.Client(credentials=credentials,
-                                project=credentials.project_id)
-        self.bucket = client.bucket(GOOGLE_BUCKET_NAME)
+    # Set by every upload, to follow upload throughput
+    report: UploadReport | None = None
+
+    def __init__(self, client: storage.Client | None = None, bucket_name: str = GOOGLE_BUCKET_NAME):
+        """
+        :param client: Defaults to the shared client of the application, whose
+                       pooled connections also carry the upload chunks
+        """
+        session = None
+        if client is None:
+            client_pool = get_client_pool()
+            client = client_pool.storage_client
+            session = client_pool.http_session
+        self.bucket = client.bucket(bucket_name)
+        self.uploader = ResumableUploader(self.bucket, session=session)
 
     def upload(self, video_paths: list[str]) -> list[str]:
         """Uploads a list of videos to GSC
@@ -39,6 +50,27 @@ class GoogleCloudStorage:
 
         return signed_urls
 
+    def upload_files(self, video_paths: list[str], prefix: str = "") -> list[str]:
+        """Uploads a list of videos to GSC without signing them
+
+        Args:
+            video_paths (list[str]): A list of video paths
+            prefix (str): Prepended to the file name of every object
+
+        Returns:
+            list[str]: A list of object names, to be signed with generate_signed_url
+        """
+        with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as executor:
+            futures = []
+            for video_path in video_paths:
+                destination_blob = prefix + os.path.basename(video_path)
+                futures.append(executor.submit(
+                    self.upload_file, video_path, destination_blob))
+
+            blob_names = [future.result() for future in futures]
+
+        return blob_names
+
     def upload_one_file(self, video_path: str, destination_blob: str) -> str:
         """
         Uploads a local file to GCS bucket.
@@ -49,13 +81,29 @@ class GoogleCloudStorage:
         blob = self.bucket.blob(destination_blob)
 
         # Upload file
-        blob.upload_from_filename(video_path)
+        self._upload(video_path, destination_blob)
 
         url = blob.generate_signed_url(
             version=SIGNED_CREDENTIAL_VERSION, expiration=URL_EXPIRATION_SECONDS)  # 1 hour
 
         return url
 
+    def upload_file(self, video_path: str, destination_blob: str) -> str:
+        """
+        Uploads a local file to GCS bucket without signing it.
+
+        :return: The object name, to be signed with generate_signed_url
+        """
+        self._upload(video_path, destination_blob)
+        return destination_blob
+
+    def _upload(self, video_path: str, destination_blob: str) -> None:
+        report = self.uploader.upload(video_path, destination_blob)
+        self.report = report
+        print(f"Uploaded {destination_blob}: {report.bytes_uploaded / 1e6:.1f} MB in "
+              f"{report.elapsed_seconds:.2f}s ({report.throughput / 1e6:.1f} MB/s), "
+              f"{report.part_count} parts, {report.retry_count} retries")
+
     def generate_signed_url(self, blob_name: str, expiration_seconds: int = URL_EXPIRATION_SECONDS) -> str:
         """
         Generate a signed URL for a file in GCS.
@@ -1,38 +1,124 @@
-import random
-from backend.core.constants import AI_REQUEST_BUFFER_SECONDS, AI_REQUEST_PER_MINUTE_LIMIT, AI_RESPONSE_PRECEDING_STRING_FORMAT, AI_RESPONSE_SUCCEDING_STRING_FORMAT, END, HIGHLIGHT_DETECTION_PROMPT, HIGHLIGHT_SCORE, MAX_SCORE, MIN_SCORE, REASON, SLEEP_TIME_BEFORE_RETRY_SECONDS, START, TEXT, THRESHOLD_SCORE
-from backend.core.settings import GOOGLE_AI_API_KEY, GOOGLE_AI_MODEL
-from backend.models.ai_response import AIResponse
+from backend.core.constants import AI_RESPONSE_PARSE_FAILED_REASON, AI_RESPONSE_PRECEDING_STRING_FORMAT, AI_RESPONSE_SUCCEDING_STRING_FORMAT, HIGHLIGHT_ADJACENCY_TOLERANCE_MS, HIGHLIGHT_DETECTION_BATCH_INSTRUCTION, HIGHLIGHT_DETECTION_BATCH_PROMPT, HIGHLIGHT_DETECTION_INSTRUCTION, HIGHLIGHT_DETECTION_PROMPT, HIGHLIGHT_SCORE, INDEX, MAX_CONCURRENT_AI_REQUESTS, REASON, SCORING_BATCH_SIZE, SCORING_TOKEN_BUDGET, TEXT, THRESHOLD_SCORE
+from backend.core.metrics import AI_RATE_LIMIT_WAIT, AI_REQUEST_DURATION, AI_RETRIES
+from backend.core.rate_limiter import RateLimiter, get_ai_rate_limiter
+from backend.core.tokens import TokenCounter, compact_text, get_token_counter
+from backend.models.ai_response import AIBatchResponse, AIResponse
+from backend.models.segment import Segment
+from backend.services.highlight_ranking import HighlightRanker
+from backend.services.score_cache import ScoreCache
+from backend.services.scorers import GeminiScorer, LocalScorer, Scorer
 
 from google import genai
+from pydantic import ValidationError
+from typing import Callable, Iterable
 
+import asyncio
+import dataclasses
+import itertools
 import json
 import re
-import time
-import datetime
 
 
 class HighlightDetectionService:
-    def __init__(self):
-        self.client = genai.Client(api_key=GOOGLE_AI_API_KEY)
+    def __init__(self, rate_limiter: RateLimiter | None = None, score_cache: ScoreCache | None = None,
+                 progress_callback: Callable[[int, int], None] | None = None,
+                 client: genai.Client | None = None, token_counter: TokenCounter | None = None,
+                 token_budget: int = SCORING_TOKEN_BUDGET, scorer: Scorer | None = None):
+        """
+        :param client: Gemini client of the default scorer
+        :param scorer: What scores the chunks, Gemini by default, see Scorer
+        """
+        self.scorer = scorer or GeminiScorer(client)
+        # Scorers without a quota, such as local models, are not rate limited
+        self.rate_limiter = rate_limiter or (get_ai_rate_limiter() if self.scorer.rate_limited else None)
+        self.score_cache = score_cache
+        self.token_counter = token_counter or get_token_counter()
+        # Tokens of chunk text packed into one batched prompt at most
+        self.token_budget = token_budget
+        # Called with (scored chunks, chunks to score) as scoring advances
+        self.progress_callback = progress_callback
 
-    def execute(self, transcripts: list) -> list:
+    def execute(self, transcripts: Iterable[Segment], ranker: HighlightRanker | None = None,
+                signals: dict | None = None) -> list:
         """
         Execute highlight detection on the provided transcripts.
+
+        transcripts may be a generator such as TranscriptParser.iter_parse:
+        it is scored one batch at a time as it is produced, and only the
+        highlights are kept once a batch is scored.
+
+        :param ranker: Picks the highlights from the scores of every chunk
+                       instead of the threshold, see rank_highlights
+        :param signals: Other scores of every chunk by name, for the ranker
         """
-        if not transcripts:
-            return []
+        transcripts = iter(transcripts)
+        highlights = []
 
-        # Score each transcript entry for highlights
-        scored_transcripts = self.score_transcripts(transcripts)
+        while batch := list(itertools.islice(transcripts, SCORING_BATCH_SIZE)):
+            # Score each transcript entry for highlights
+            scored_transcripts = self.score_transcripts(
+                batch, batch_size=SCORING_BATCH_SIZE)
 
-        # Filter out entries with highlight score of 0
-        highlights = self.detect_highlights(scored_transcripts)
+            if ranker is not None:
+                # Ranking looks at every chunk at once
+                highlights.extend(scored_transcripts)
+            else:
+                # Filter out entries with highlight score of 0
+                highlights.extend(self.detect_highlights(scored_transcripts))
+
+        if ranker is not None:
+            return self.rank_highlights(highlights, signals, ranker)
 
         # Aggregate highlights based on their start and end times
         aggregated_highlights = self.aggregate_highlights(highlights)
 
         return aggregated_highlights
 
+    async def execute_async(self, transcripts: list, ranker: HighlightRanker | None = None,
+                            signals: dict | None = None) -> list:
+        """
+        Execute highlight detection with concurrent AI requests.
+
+        :param ranker: See execute
+        :param signals: See execute
+        """
+        if not transcripts:
+            return []
+
+        scored_transcripts = await self.score_transcripts_async(
+            transcripts, batch_size=SCORING_BATCH_SIZE)
+        if ranker is not None:
+            return self.rank_highlights(scored_transcripts, signals, ranker)
+        highlights = self.detect_highlights(scored_transcripts)
+
+        return self.aggregate_highlights(highlights)
+
+    def rank_highlights(self, scored_transcripts: list, signals: dict | None = None,
+                        ranker: HighlightRanker | None = None) -> list:
+        """
+        Picks the highlights by fusing the AI scores with the other signals
+        and picking the peaks, see HighlightRanker. Ranking the same scores
+        again with other parameters needs no AI request.
+        """
+        return (ranker or HighlightRanker()).rank(scored_transcripts, signals)
+
+    async def stream_highlights_async(self, transcripts: list,
+                                      on_highlight: Callable[[Segment], None]) -> list:
+        """
+        Execute highlight detection, handing every aggregated highlight to
+        on_highlight as soon as it is final instead of after the last chunk.
+
+        A highlight is final once the chunk following it has been scored, so
+        later stages can start working while scoring continues.
+        """
+        aggregator = StreamingHighlightAggregator(
+            self, transcripts, on_highlight)
+        await self.score_transcripts_async(
+            transcripts, batch_size=SCORING_BATCH_SIZE, on_batch_scored=aggregator.advance)
+        aggregator.finish()
+
+        return aggregator.highlights
+
     def aggregate_highlights(self, highlights: list) -> list:
         """
         Aggregate highlights based on their start and end times.
@@ -44,16 +130,9 @@ class HighlightDetectionService:
         current_highlight = highlights[0]
 
         for highlight in highlights[1:]:
-            # Ignore milliseconds for comparison
-            if highlight[START][:-4] == current_highlight[END][:-4]:
+            if self._is_contiguous(current_highlight, highlight):
                 # Overlapping or contiguous highlights, extend the current one
-                current_highlight[END] = highlight[END]
-                current_highlight[TEXT] += " " + highlight[TEXT]
-                current_highlight[HIGHLIGHT_SCORE] = max(
-                    current_highlight.get(HIGHLIGHT_SCORE, 0),
-                    highlight.get(HIGHLIGHT_SCORE, 0)
-                )
-                current_highlight[REASON] += " " + highlight.get(REASON, "")
+                self._merge_highlight(current_highlight, highlight)
             else:
                 # No overlap, save the current highlight and start a new one
                 aggregated_highlights.append(current_highlight)
@@ -64,6 +143,19 @@ class HighlightDetectionService:
 
         return aggregated_highlights
 
+    def _is_contiguous(self, current_highlight: Segment, highlight: Segment) -> bool:
+        # Overlapping, touching or separated by rounding noise only
+        return highlight.start_ms - current_highlight.end_ms <= HIGHLIGHT_ADJACENCY_TOLERANCE_MS
+
+    def _merge_highlight(self, current_highlight: Segment, highlight: Segment) -> None:
+        current_highlight.end_ms = max(current_highlight.end_ms, highlight.end_ms)
+        current_highlight.text += " " + highlight.text
+        current_highlight.highlight_score = max(
+            current_highlight.highlight_score or 0,
+            highlight.highlight_score or 0
+        )
+        current_highlight.reason = f"{current_highlight.reason or ''} {highlight.reason or ''}"
+
     def detect_highlights(self, scored_transcripts: list) -> list:
         """
         Detect highlights using the scored transcripts with threshold value 
@@ -73,95 +165,362 @@ class HighlightDetectionService:
             return []
 
         # Filter out entries with highlight score of 0
-        highlights = [t for t in scored_transcripts if t.get(
-            HIGHLIGHT_SCORE, 0) > THRESHOLD_SCORE]
+        highlights = [t for t in scored_transcripts if (
+            t.highlight_score or 0) > THRESHOLD_SCORE]
 
         return highlights
 
-    def score_transcripts(self, transcripts: list) -> list:
+    def score_transcripts(self, transcripts: list, batch_size: int = 1,
+                          token_budget: int | None = None) -> list:
         """
         Detect highlights in the video.
+
+        When batch_size is greater than 1, up to batch_size chunks are packed
+        into a single prompt, which cuts the number of AI requests by roughly
+        that factor. Batches whose response cannot be parsed are split in half
+        and retried, and chunks missing from a response fall back to a
+        per-chunk request.
+
+        Batches are also cut before their chunks exceed token_budget tokens,
+        the budget of the service by default, so dense talk does not make
+        some requests much larger than others. Chunk text is compacted
+        before it is sent, see compact_text.
+
+        Chunks found in the score cache are not sent to the AI model.
+        Local scorers score every chunk at once, without cache or batches.
+        """
+        if isinstance(self.scorer, LocalScorer):
+            return self._score_locally(transcripts)
+
+        pending = self._apply_cached_scores(transcripts)
+
+        if batch_size <= 1:
+            for index, transcript in enumerate(pending):
+                self._score_one(transcript)
+                self._report_progress(index + 1, len(pending))
+        else:
+            scored_count = 0
+            for batch in self._pack_batches(pending, batch_size, token_budget):
+                self._score_batch(batch)
+                scored_count += len(batch)
+                self._report_progress(scored_count, len(pending))
+
+        self._cache_scores(pending)
+
+        return list(transcripts)
+
+    async def score_transcripts_async(self, transcripts: list, batch_size: int = 1,
+                                      max_concurrency: int = MAX_CONCURRENT_AI_REQUESTS,
+                                      on_batch_scored: Callable[[], None] | None = None,
+                                      token_budget: int | None = None) -> list:
+        """
+        Same as score_transcripts, but keeps up to max_concurrency AI requests
+        in flight at once. Throughput is bound by the shared rate limiter
+        instead of by the sum of the request latencies.
+
+        :param on_batch_scored: Called whenever more chunks have been scored
+        """
+        if isinstance(self.scorer, LocalScorer):
+            scored_transcripts = self._score_locally(transcripts)
+            if on_batch_scored is not None:
+                on_batch_scored()
+            return scored_transcripts
+
+        pending = self._apply_cached_scores(transcripts)
+        if on_batch_scored is not None:
+            on_batch_scored()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        batches = self._pack_batches(pending, max(batch_size, 1), token_budget)
+        scored_count = 0
+
+        async def score_batch(batch: list) -> None:
+            nonlocal scored_count
+            await self._score_batch_async(batch, semaphore)
+            scored_count += len(batch)
+            self._report_progress(scored_count, len(pending))
+            if on_batch_scored is not None:
+                on_batch_scored()
+
+        await asyncio.gather(*(score_batch(batch) for batch in batches))
+        self._cache_scores(pending)
+
+        return list(transcripts)
+
+    def _score_locally(self, transcripts: list) -> list:
+        self.scorer.score(transcripts)
+        self._report_progress(len(transcripts), len(transcripts))
+        return list(transcripts)
+
+    def _pack_batches(self, transcripts: list, batch_size: int, token_budget: int | None = None) -> list:
+        """
+        Splits the transcripts, in order, into batches of at most batch_size
+        chunks and token_budget tokens, the budget of the service by default.
+        """
+        token_budget = token_budget or self.token_budget
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for transcript in transcripts:
+            tokens = self.token_counter.count(compact_text(transcript.text))
+            if batch and (len(batch) >= batch_size or batch_tokens + tokens > token_budget):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(transcript)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _report_progress(self, scored_count: int, total_count: int) -> None:
+        print(f"Scoring progress: {scored_count}/{total_count}", end="\r")
+        if self.progress_callback is not None:
+            self.progress_callback(scored_count, total_count)
+
+    def _apply_cached_scores(self, transcripts: list) -> list:
+        """
+        Writes cached scores to the transcripts.
+
+        :return: The transcripts that still need to be scored
+        """
+        if self.score_cache is None:
+            return list(transcripts)
+
+        pending = []
+        for transcript in transcripts:
+            ai_resp = self.score_cache.get(transcript.text, self.scorer.model_name)
+            if ai_resp is None:
+                pending.append(transcript)
+                continue
+            transcript.highlight_score = ai_resp.highlight_score
+            transcript.reason = ai_resp.reason
+
+        return pending
+
+    def _cache_scores(self, transcripts: list) -> None:
+        if self.score_cache is None:
+            return
+
+        # Parse failures are retried on the next run instead of being cached
+        self.score_cache.set_many([
+            (transcript.text, AIResponse(highlight_score=transcript.highlight_score, reason=transcript.reason))
+            for transcript in transcripts if transcript.reason != AI_RESPONSE_PARSE_FAILED_REASON
+        ], self.scorer.model_name)
+
+    def _score_one(self, transcript: Segment) -> None:
+        """
+        Scores a single transcript chunk with its own AI request.
+        """
+        # AI prompt for highlight detection
+        prompt = HIGHLIGHT_DETECTION_PROMPT % compact_text(transcript.text)
+        self._apply_response(transcript, self._generate(prompt, HIGHLIGHT_DETECTION_INSTRUCTION))
+
+    def _score_batch(self, batch: list) -> None:
+        """
+        Scores several transcript chunks with a single AI request.
         """
-        transcsript_score = []
-        start_time = datetime.datetime.now()
-        should_renew_start_time = False
-
-        for index, transcript in enumerate(transcripts):
-            # Adjust request per minute
-            while self._over_ai_rpm(start_time, index):
-                time.sleep(SLEEP_TIME_BEFORE_RETRY_SECONDS)
-                should_renew_start_time = True
-            if should_renew_start_time:
-                start_time = datetime.datetime.now()
-                should_renew_start_time = False
-
-            # AI prompt for highlight detection
-            prompt = HIGHLIGHT_DETECTION_PROMPT % transcript[TEXT]
-            response = self.client.models.generate_content(
-                model=GOOGLE_AI_MODEL,
-                contents=prompt,
+        if len(batch) == 1:
+            self._score_one(batch[0])
+            return
+
+        missing = self._apply_batch_response(
+            batch, self._generate(self._batch_prompt(batch), HIGHLIGHT_DETECTION_BATCH_INSTRUCTION))
+
+        if missing is None:
+            # Malformed or truncated response, retry with smaller batches
+            AI_RETRIES.inc(2, reason="split")
+            middle = len(batch) // 2
+            self._score_batch(batch[:middle])
+            self._score_batch(batch[middle:])
+            return
+
+        # Only the chunks missing from the response are re-requested
+        AI_RETRIES.inc(len(missing), reason="missing")
+        for transcript in missing:
+            self._score_one(transcript)
+
+    async def _score_one_async(self, transcript: Segment, semaphore: asyncio.Semaphore) -> None:
+        prompt = HIGHLIGHT_DETECTION_PROMPT % compact_text(transcript.text)
+        self._apply_response(transcript, await self._generate_async(
+            prompt, HIGHLIGHT_DETECTION_INSTRUCTION, semaphore))
+
+    async def _score_batch_async(self, batch: list, semaphore: asyncio.Semaphore) -> None:
+        if len(batch) == 1:
+            await self._score_one_async(batch[0], semaphore)
+            return
+
+        missing = self._apply_batch_response(
+            batch, await self._generate_async(self._batch_prompt(batch), HIGHLIGHT_DETECTION_BATCH_INSTRUCTION,
+                                              semaphore))
+
+        if missing is None:
+            AI_RETRIES.inc(2, reason="split")
+            middle = len(batch) // 2
+            await asyncio.gather(self._score_batch_async(batch[:middle], semaphore),
+                                 self._score_batch_async(batch[middle:], semaphore))
+            return
+
+        AI_RETRIES.inc(len(missing), reason="missing")
+        await asyncio.gather(*(self._score_one_async(transcript, semaphore)
+                               for transcript in missing))
+
+    def _batch_prompt(self, batch: list) -> str:
+        chunks = [{INDEX: index, TEXT: compact_text(transcript.text)}
+                  for index, transcript in enumerate(batch)]
+        return HIGHLIGHT_DETECTION_BATCH_PROMPT % json.dumps(chunks, ensure_ascii=False)
+
+    def _apply_response(self, transcript: Segment, resp_text: str) -> None:
+        """
+        Writes the score and reason of a single-chunk AI response to the transcript.
+        """
+        try:
+            resp_json = json.loads(self._strip_code_fence(resp_text))
+            ai_resp = AIResponse(
+                highlight_score=float(resp_json.get(HIGHLIGHT_SCORE, 0)),
+                reason=resp_json.get(REASON, "No reason provided")
             )
-            resp_text = response.text
+            transcript.highlight_score = ai_resp.highlight_score
+            transcript.reason = ai_resp.reason
+        except Exception:
+            # fallback in case parsing fails
+            transcript.highlight_score = 0
+            transcript.reason = AI_RESPONSE_PARSE_FAILED_REASON
 
-            # For testing purposes, we will use a dummy response
-            # In production, uncomment the above lines and comment the below lines
-            # dummy_response = {
-            #     HIGHLIGHT_SCORE: random.uniform(MIN_SCORE, MAX_SCORE),
-            #     REASON: "Dummy data"
-            # }
-            # resp_text = "```json\n" + \
-            #     str(dummy_response).replace("'", '"') + "\n```"
+    def _apply_batch_response(self, batch: list, resp_text: str) -> list | None:
+        """
+        Writes the scores of a batched AI response to the transcripts.
 
+        :return: The transcripts missing from the response,
+                 or None when the response is not a JSON array
+        """
+        ai_responses = self._parse_batch_response(resp_text)
+        if ai_responses is None:
+            return None
+
+        missing = []
+        for index, transcript in enumerate(batch):
+            ai_resp = ai_responses.get(index)
+            if ai_resp is None:
+                missing.append(transcript)
+                continue
+            transcript.highlight_score = ai_resp.highlight_score
+            transcript.reason = ai_resp.reason
+
+        return missing
+
+    def _parse_batch_response(self, resp_text: str) -> dict | None:
+        """
+        Parses a batched AI response into a dict of chunk index to AIBatchResponse.
+        Returns None when the response is not a JSON array.
+        """
+        try:
+            resp_json = json.loads(self._strip_code_fence(resp_text))
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(resp_json, list):
+            return None
+
+        ai_responses = {}
+        for item in resp_json:
             try:
-                cleaned = re.sub(
-                    AI_RESPONSE_PRECEDING_STRING_FORMAT, "", resp_text.strip())
-                cleaned = re.sub(
-                    AI_RESPONSE_SUCCEDING_STRING_FORMAT, "", cleaned)
-                resp_json = json.loads(cleaned)
-                ai_resp = AIResponse(
-                    highlight_score=float(resp_json.get(HIGHLIGHT_SCORE, 0)),
-                    reason=resp_json.get(REASON, "No reason provided")
-                )
-                transcript[HIGHLIGHT_SCORE] = ai_resp.highlight_score
-                transcript[REASON] = ai_resp.reason
-            except Exception as e:
-                # fallback in case parsing fails
-                ai_resp = AIResponse(
-                    highlight_score=0,
-                    reason="Failed to parse AI response"
-                )
-                transcript[HIGHLIGHT_SCORE] = 0
-                transcript[REASON] = "Failed to parse AI response"
-
-            transcsript_score.append(transcript)
-
-            print(f"Scoring progress: {index+1}/{len(transcripts)}", end="\r")
-
-        return transcsript_score
-
-    def _over_ai_rpm(self, start_time: datetime.datetime, index: int) -> bool:
-        current_time = datetime.datetime.now()
-        if index == 0:
-            return False
-        if index % AI_REQUEST_PER_MINUTE_LIMIT == 0 and (current_time - start_time) < datetime.timedelta(minutes=1, seconds=AI_REQUEST_BUFFER_SECONDS):
-            return True
-        return False
+                ai_resp = AIBatchResponse.model_validate(item)
+            except ValidationError:
+                continue
+            ai_responses[ai_resp.index] = ai_resp
+
+        return ai_responses
+
+    def _generate(self, prompt: str, instruction: str) -> str:
+        """
+        Sends one prompt to the AI model once the rate limiter allows it.
+        """
+        if self.rate_limiter is not None:
+            AI_RATE_LIMIT_WAIT.observe(
+                self.rate_limiter.acquire(self._estimate_tokens(prompt, instruction)))
+        with AI_REQUEST_DURATION.time():
+            return self.scorer.generate(prompt, instruction)
+
+    async def _generate_async(self, prompt: str, instruction: str, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            if self.rate_limiter is not None:
+                AI_RATE_LIMIT_WAIT.observe(
+                    await self.rate_limiter.acquire_async(self._estimate_tokens(prompt, instruction)))
+            with AI_REQUEST_DURATION.time():
+                return await self.scorer.generate_async(prompt, instruction)
+
+    def _estimate_tokens(self, prompt: str, instruction: str) -> int:
+        # A system instruction counts towards the input tokens of every request
+        return self.token_counter.count(prompt) + self.token_counter.count(instruction)
+
+    def _strip_code_fence(self, resp_text: str) -> str:
+        cleaned = re.sub(
+            AI_RESPONSE_PRECEDING_STRING_FORMAT, "", resp_text.strip())
+        return re.sub(AI_RESPONSE_SUCCEDING_STRING_FORMAT, "", cleaned)
+
+
+class StreamingHighlightAggregator:
+    """
+    Incremental version of detect_highlights followed by aggregate_highlights.
+
+    Chunks may be scored out of order; they are consumed in transcript order
+    and a highlight is emitted once the chunk after it is known not to extend it.
+    """
+
+    def __init__(self, service: HighlightDetectionService, transcripts: list,
+                 on_highlight: Callable[[Segment], None]):
+        self.highlights = []
+        self._service = service
+        self._transcripts = transcripts
+        self._on_highlight = on_highlight
+        self._next_index = 0
+        self._current_highlight = None
+
+    def advance(self) -> None:
+        """
+        Consumes every newly scored chunk at the front of the transcript.
+        """
+        while self._next_index < len(self._transcripts) and \
+                self._transcripts[self._next_index].is_scored:
+            transcript = self._transcripts[self._next_index]
+            self._next_index += 1
+
+            if transcript.highlight_score <= THRESHOLD_SCORE:
+                self._flush()
+            elif self._current_highlight is not None and \
+                    self._service._is_contiguous(self._current_highlight, transcript):
+                self._service._merge_highlight(
+                    self._current_highlight, transcript)
+            else:
+                self._flush()
+                self._current_highlight = dataclasses.replace(transcript)
+
+    def finish(self) -> None:
+        self.advance()
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._current_highlight is None:
+            return
+        self.highlights.append(self._current_highlight)
+        self._on_highlight(self._current_highlight)
+        self._current_highlight = None
 
 
 # Example usage
 if __name__ == "__main__":
     highlight_detection_service = HighlightDetectionService()
-    transcripts = [{START: '00:01:33.720', END: '00:02:37.460',
-                    TEXT: '[音楽] ben ん [音楽] ana 持っています [音楽] [音楽] ん 多分ん ハーイご主人様ワンタワー男の壁一重バーの犬山た秋です ということでねえっとサムネイルと bgm が全く合ってないんですけどもこのまま 異国なと思いますということで皆さんついにこの日がやってまいりましたそれでは栄光 をかけていきましょう サイコパス v 中ば最強受けて1000回へ [拍手] はいということで始まりましたサイコば水中バー最強決定戦へこちらの企画はですね'},
-                   {START: '00:02:37.470', END: '00:03:41.160', TEXT: 'えっとなんでこの企画やることになったかと言いますとあの以前ね夏への祭りさんと あのサンリオピューロランドで遊びに行ったことがあったんですけども その時にまあなんかね色々あの順番待ちで並んでいる時に暇だったんで あの祭にサイコパス診断を少しやってみたんですよ まあ市松伏ねそんじゃないんですねあの第一問からぱっちこり正解はのやつはね当てて きまして 本当にこれって当ててくる奴いるんだって思って サイコパスの新蘭が出るぞ正解をねまぁすれば正解ってばいいんですけどあの祭りです よ だしてきまして僕もねあの昔サイコパス診断自分でちょっとやったことあるんですけど あの一般人の回答しかちょっと出せなくてですね あのそこでまぁツイッターでサイコパスっぽい v 中ば誰ですかあって質問した ところ 特に多かった8人を本日およびさせていただきました ということで呼び込みしていきましょう まず1人目我らが組長いなーバー派手でさーんどうぞ'},
-                   {START: '00:03:41.170', END: '00:04:45.590', TEXT: 'あまあまあシュルしくお願いしません続所 いえなかこんな中そうそうたる サイコパスのメンバーになぁかちょっと私なぁかが混じってしまって大丈夫かなぁと 思ってヘナか本当に申し訳ないで市民ならー過去 他の方ほんとねせぱすといえばー みてーな方ばっかりなのにそんな彼に私なんかが無しってしまって皆ちょっと場違い カラーなんてちょっと思って申し訳ないんだと思ってませんあり今日もしかしね大きい ですか違いますねやっぱり安定さあねおかげとリフェコアのかわいいせんですよねー ですねええええ あれいう宇宙はますし普段増力さん逆ですかな感じで好きで エレアコ山通りの感じです良いもう様子を塗るキャンを申し訳ない バーン罰がいいか王者自分ではリプライ多かった気がするんですけどねそうか彦 ましたあなたも間違えだなぁ 学部者売名とか恐れございます 封印ないして中韓に行ったんだけど誰だかやらだソロ育てなのか'},
-                   {START: '00:04:45.600', END: '00:05:49.720', TEXT: 'いや親父あの花さあのチケット完売おめでとうございますありがとうございまして皆れ 来てくださいのバーナー完璧車来てございませんけどイベントも うん マネージャー本日頑張ってくださいよろしくお願いしますこれ一応確認しておくとイア の中受けねないとかサイコパスのなぁ回答何か狙ったできるとかじゃなくてはい国家 いいなぁか思ったとおりにすごいにくいいう形んよね 妻もいいですが近いと俺じゃない大丈夫っすそうだよねあのじゃあ 本当に取れ高ないと思うんですけどよろしくお願いシャンあるがチクリとなのかなる ほどね うまっっわかりましたはいということでじゃあ続いて2人目を呼びしていきましょう 続いてはこの方 かぐら姐さーん'},
+    transcripts = [Segment.from_timestamps('00:01:33.720', '00:02:37.460',
+                                           '[音楽] ben ん [音楽] ana 持っています [音楽] [音楽] ん 多分ん ハーイご主人様ワンタワー男の壁一重バーの犬山た秋です ということでねえっとサムネイルと bgm が全く合ってないんですけどもこのまま 異国なと思いますということで皆さんついにこの日がやってまいりましたそれでは栄光 をかけていきましょう サイコパス v 中ば最強受けて1000回へ [拍手] はいということで始まりましたサイコば水中バー最強決定戦へこちらの企画はですね'),
+                   Segment.from_timestamps('00:02:37.470', '00:03:41.160', 'えっとなんでこの企画やることになったかと言いますとあの以前ね夏への祭りさんと あのサンリオピューロランドで遊びに行ったことがあったんですけども その時にまあなんかね色々あの順番待ちで並んでいる時に暇だったんで あの祭にサイコパス診断を少しやってみたんですよ まあ市松伏ねそんじゃないんですねあの第一問からぱっちこり正解はのやつはね当てて きまして 本当にこれって当ててくる奴いるんだって思って サイコパスの新蘭が出るぞ正解をねまぁすれば正解ってばいいんですけどあの祭りです よ だしてきまして僕もねあの昔サイコパス診断自分でちょっとやったことあるんですけど あの一般人の回答しかちょっと出せなくてですね あのそこでまぁツイッターでサイコパスっぽい v 中ば誰ですかあって質問した ところ 特に多かった8人を本日およびさせていただきました ということで呼び込みしていきましょう まず1人目我らが組長いなーバー派手でさーんどうぞ'),
+                   Segment.from_timestamps('00:03:41.170', '00:04:45.590', 'あまあまあシュルしくお願いしません続所 いえなかこんな中そうそうたる サイコパスのメンバーになぁかちょっと私なぁかが混じってしまって大丈夫かなぁと 思ってヘナか本当に申し訳ないで市民ならー過去 他の方ほんとねせぱすといえばー みてーな方ばっかりなのにそんな彼に私なんかが無しってしまって皆ちょっと場違い カラーなんてちょっと思って申し訳ないんだと思ってませんあり今日もしかしね大きい ですか違いますねやっぱり安定さあねおかげとリフェコアのかわいいせんですよねー ですねええええ あれいう宇宙はますし普段増力さん逆ですかな感じで好きで エレアコ山通りの感じです良いもう様子を塗るキャンを申し訳ない バーン罰がいいか王者自分ではリプライ多かった気がするんですけどねそうか彦 ましたあなたも間違えだなぁ 学部者売名とか恐れございます 封印ないして中韓に行ったんだけど誰だかやらだソロ育てなのか'),
+                   Segment.from_timestamps('00:04:45.600', '00:05:49.720', 'いや親父あの花さあのチケット完売おめでとうございますありがとうございまして皆れ 来てくださいのバーナー完璧車来てございませんけどイベントも うん マネージャー本日頑張ってくださいよろしくお願いしますこれ一応確認しておくとイア の中受けねないとかサイコパスのなぁ回答何か狙ったできるとかじゃなくてはい国家 いいなぁか思ったとおりにすごいにくいいう形んよね 妻もいいですが近いと俺じゃない大丈夫っすそうだよねあのじゃあ 本当に取れ高ないと思うんですけどよろしくお願いシャンあるがチクリとなのかなる ほどね うまっっわかりましたはいということでじゃあ続いて2人目を呼びしていきましょう 続いてはこの方 かぐら姐さーん'),
                    ]
     highlights = highlight_detection_service.execute(transcripts)
 
     for highlight in highlights:
-        print(f"Start: {highlight[START]}, End: {highlight[END]}, "
-              f"Text: {highlight[TEXT]}, "
-              f"Highlight Score: {highlight.get(HIGHLIGHT_SCORE, 'N/A')}, "
-              f"Reason: {highlight.get(REASON, 'N/A')}")
+        print(f"{highlight}, "
+              f"Text: {highlight.text}, "
+              f"Highlight Score: {highlight.highlight_score}, "
+              f"Reason: {highlight.reason}")
     print("\nHighlight detection completed.\n")
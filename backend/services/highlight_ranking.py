@@ -0,0 +1,213 @@
+from backend.core.constants import HIGHLIGHT_FUSION_WEIGHTS, HIGHLIGHT_MAX_CLIP_SECONDS, HIGHLIGHT_MAX_TOTAL_SECONDS, HIGHLIGHT_MIN_CLIP_SECONDS, HIGHLIGHT_MIN_PEAK_SCORE, HIGHLIGHT_SMOOTHING_CHUNKS, HIGHLIGHT_TOP_K, THRESHOLD_SCORE
+from backend.core.timestamps import seconds_to_ms
+from backend.models.segment import Segment
+from backend.services.prerank import standardize
+
+from typing import List
+
+import numpy as np
+
+# Names of the signals, the weights of HIGHLIGHT_FUSION_WEIGHTS
+LLM_SIGNAL = "llm"
+AUDIO_SIGNAL = "audio"
+CHAT_SIGNAL = "chat"
+
+
+class HighlightRanker:
+    """
+    Picks highlight clips from the scores of every chunk of a video.
+
+    The AI score of every chunk is fused with any other per-chunk signal,
+    such as the audio and chat scores of the pre-ranking, into one score.
+    Its local peaks above min_peak_score become clips spanning the chunks
+    around them that also score above it, widened or cut to the clip length
+    range. Overlapping clips are suppressed in favour of the best peak, and
+    clips are taken best first until the top_k or duration budget is spent.
+
+    Everything but the final suppression is vectorized, so ranking a long
+    stream again with other parameters takes milliseconds and no AI request.
+    With the AI score alone and no smoothing, the clips are the runs of
+    chunks scoring above THRESHOLD_SCORE, like detect_highlights followed by
+    aggregate_highlights.
+    """
+
+    def __init__(self, weights: dict | None = None,
+                 smoothing_chunks: int = HIGHLIGHT_SMOOTHING_CHUNKS,
+                 min_peak_score: float = HIGHLIGHT_MIN_PEAK_SCORE,
+                 min_clip_seconds: float = HIGHLIGHT_MIN_CLIP_SECONDS,
+                 max_clip_seconds: float = HIGHLIGHT_MAX_CLIP_SECONDS,
+                 top_k: int = HIGHLIGHT_TOP_K,
+                 max_total_seconds: float = HIGHLIGHT_MAX_TOTAL_SECONDS):
+        """
+        :param weights: Weight of every signal by name, LLM_SIGNAL for the AI score
+        :param smoothing_chunks: Chunks the fused score is averaged over
+        :param min_peak_score: Fused score a clip's chunks must exceed
+        :param top_k: Maximum number of clips
+        :param max_total_seconds: Maximum total length of the clips
+        """
+        if min_clip_seconds > max_clip_seconds:
+            raise ValueError("min_clip_seconds must not exceed max_clip_seconds")
+        self.weights = HIGHLIGHT_FUSION_WEIGHTS if weights is None else weights
+        self.smoothing_chunks = max(1, smoothing_chunks)
+        self.min_peak_score = min_peak_score
+        self.min_clip_ms = seconds_to_ms(min_clip_seconds)
+        self.max_clip_ms = seconds_to_ms(max_clip_seconds)
+        self.top_k = top_k
+        self.max_total_ms = seconds_to_ms(max_total_seconds)
+
+    def rank(self, transcripts: List[Segment], signals: dict | None = None) -> List[Segment]:
+        """
+        :param transcripts: Chunks in transcript order, unscored ones are
+                            ranked by the other signals alone, see fuse
+        :param signals: Scores of every chunk by signal name, -inf where a
+                        signal has no data
+        :return: The clips, in video order, each with the text of its chunks
+                 and their best AI score
+        """
+        if not transcripts:
+            return []
+
+        starts_ms = np.fromiter((t.start_ms for t in transcripts), np.int64, len(transcripts))
+        ends_ms = np.fromiter((t.end_ms for t in transcripts), np.int64, len(transcripts))
+        llm_scores = np.fromiter((np.nan if t.highlight_score is None else t.highlight_score
+                                  for t in transcripts), np.float64, len(transcripts))
+
+        scores = smooth(self.fuse(llm_scores, signals or {}), self.smoothing_chunks)
+        peaks = find_peaks(scores, self.min_peak_score)
+        clip_starts_ms, clip_ends_ms = self._clip_bounds(scores, peaks, starts_ms, ends_ms)
+        kept = self._select(scores[peaks], clip_starts_ms, clip_ends_ms)
+
+        clips = []
+        for index in kept[np.argsort(clip_starts_ms[kept])]:
+            first, last = np.searchsorted(ends_ms, clip_starts_ms[index], side="right"), \
+                np.searchsorted(starts_ms, clip_ends_ms[index], side="left")
+            chunks = transcripts[first:last]
+            chunk_scores = llm_scores[first:last]
+            clips.append(Segment(
+                int(clip_starts_ms[index]), int(clip_ends_ms[index]),
+                " ".join(chunk.text for chunk in chunks),
+                highlight_score=None if np.isnan(chunk_scores).all() else float(np.nanmax(chunk_scores)),
+                reason=" ".join(chunk.reason for chunk in chunks if chunk.reason)))
+        return clips
+
+    def fuse(self, llm_scores: np.ndarray, signals: dict) -> np.ndarray:
+        """
+        Weighted sum of the AI scores, in points above THRESHOLD_SCORE, and
+        of the standardized signals. A missing AI score counts as
+        THRESHOLD_SCORE, neither for nor against the chunk, any other missing
+        value as the lowest value of its signal.
+        """
+        fused = np.zeros(len(llm_scores))
+        llm_points = np.nan_to_num(llm_scores - THRESHOLD_SCORE, nan=0.0)
+        for name, values in ((LLM_SIGNAL, llm_points), *signals.items()):
+            weight = self.weights.get(name, 0.0)
+            values = np.asarray(values, dtype=np.float64)
+            present = np.isfinite(values)
+            if not weight or not present.any():
+                continue
+            values = np.where(present, values, values[present].min())
+            fused += weight * (values if name == LLM_SIGNAL else standardize(values))
+        return fused
+
+    def _clip_bounds(self, scores: np.ndarray, peaks: np.ndarray,
+                     starts_ms: np.ndarray, ends_ms: np.ndarray) -> tuple:
+        """
+        :return: (start, end) of the clip of every peak, in milliseconds
+        """
+        # Runs of consecutive chunks above the minimum score, every peak lies in one
+        above = np.concatenate(([False], scores > self.min_peak_score, [False]))
+        run_firsts = np.flatnonzero(above[1:-1] & ~above[:-2])
+        run_lasts = np.flatnonzero(above[1:-1] & ~above[2:])
+        runs = np.searchsorted(run_firsts, peaks, side="right") - 1
+        run_starts_ms = starts_ms[run_firsts[runs]]
+        run_ends_ms = ends_ms[run_lasts[runs]]
+
+        # Long runs are cut to max_clip_ms around the peak, staying inside the run
+        centres_ms = (starts_ms[peaks] + ends_ms[peaks]) // 2
+        clip_starts_ms = np.clip(centres_ms - self.max_clip_ms // 2,
+                                 run_starts_ms, np.maximum(run_starts_ms, run_ends_ms - self.max_clip_ms))
+        clip_ends_ms = np.minimum(run_ends_ms, clip_starts_ms + self.max_clip_ms)
+
+        # Short ones are widened to min_clip_ms around their middle, staying inside the video
+        short = clip_ends_ms - clip_starts_ms < self.min_clip_ms
+        video_start_ms, video_end_ms = starts_ms.min(), ends_ms.max()
+        widened_starts_ms = np.clip((clip_starts_ms + clip_ends_ms) // 2 - self.min_clip_ms // 2,
+                                    video_start_ms, max(video_start_ms, video_end_ms - self.min_clip_ms))
+        clip_starts_ms = np.where(short, widened_starts_ms, clip_starts_ms)
+        clip_ends_ms = np.where(short, np.minimum(video_end_ms, widened_starts_ms + self.min_clip_ms),
+                                clip_ends_ms)
+
+        return clip_starts_ms, clip_ends_ms
+
+    def _select(self, peak_scores: np.ndarray, clip_starts_ms: np.ndarray,
+                clip_ends_ms: np.ndarray) -> np.ndarray:
+        """
+        Non-maximum suppression: clips are taken best peak first, skipping
+        the ones overlapping a taken clip or not fitting the duration budget.
+
+        :return: The indices of the taken clips
+        """
+        # Peaks of one run share their clip when the run is short, only the best one is a candidate
+        order = np.lexsort((-peak_scores, clip_ends_ms, clip_starts_ms))
+        distinct = np.ones(len(order), dtype=bool)
+        distinct[1:] = (np.diff(clip_starts_ms[order]) != 0) | (np.diff(clip_ends_ms[order]) != 0)
+        candidates = order[distinct]
+        candidates = candidates[np.argsort(-peak_scores[candidates], kind="stable")]
+
+        kept, kept_starts, kept_ends = [], [], []
+        total_ms = 0
+        for index in candidates.tolist():
+            if len(kept) >= self.top_k:
+                break
+            start_ms, end_ms = clip_starts_ms[index], clip_ends_ms[index]
+            if total_ms + end_ms - start_ms > self.max_total_ms:
+                continue
+            if any(start_ms < kept_end and kept_start < end_ms
+                   for kept_start, kept_end in zip(kept_starts, kept_ends)):
+                continue
+            kept.append(index)
+            kept_starts.append(start_ms)
+            kept_ends.append(end_ms)
+            total_ms += end_ms - start_ms
+
+        return np.asarray(kept, dtype=np.int64)
+
+
+def smooth(scores: np.ndarray, window: int) -> np.ndarray:
+    """
+    Centred moving average over window values, the windows at both ends
+    averaging only the values they cover.
+    """
+    if window <= 1 or len(scores) == 0:
+        return scores
+    kernel = np.ones(window)
+    return np.convolve(scores, kernel, mode="same") / np.convolve(np.ones(len(scores)), kernel, mode="same")
+
+
+def find_peaks(scores: np.ndarray, min_score: float) -> np.ndarray:
+    """
+    :return: The indices of the local maxima above min_score, the first
+             of a plateau standing for all of it
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        return np.zeros(0, dtype=np.int64)
+    # Plateaus are runs of equal scores, a run is a peak when both runs around it are lower
+    run_firsts = np.flatnonzero(np.concatenate(([True], scores[1:] != scores[:-1])))
+    run_scores = np.concatenate(([-np.inf], scores[run_firsts], [-np.inf]))
+    peaks = (run_scores[1:-1] > run_scores[:-2]) & (run_scores[1:-1] > run_scores[2:]) \
+        & (run_scores[1:-1] > min_score)
+    return run_firsts[peaks]
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}",
+                           highlight_score=float(rng.integers(0, 11)))
+                   for index in range(600)]
+    audio_scores = rng.normal(size=len(transcripts))
+
+    ranker = HighlightRanker(top_k=10)
+    for clip in ranker.rank(transcripts, {"audio": audio_scores}):
+        print(f"{clip}, Highlight Score: {clip.highlight_score}")
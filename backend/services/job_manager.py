@@ -0,0 +1,154 @@
+from backend.core.constants import JOB_RETENTION_SECONDS
+from backend.core.event_bus import EventBus
+from backend.core.metrics import JOBS, JOBS_IN_PROGRESS
+from backend.core.exceptions import JobNotFoundError, JobQueueFullError
+from backend.core.settings import JOB_QUEUE_SIZE, MAX_CONCURRENT_JOBS
+from backend.models.generate_highlight_request import GenereateHighlightRequest
+from backend.models.job import JobStage, JobStatusResponse
+from backend.models.progress_event import ProgressEvent, ProgressEventType
+from backend.services.generate_highlight_coordinator import GenerateHighlightCoordinator
+
+from typing import Callable
+
+import queue
+import threading
+import time
+import uuid
+
+
+class Job:
+    """
+    State of one highlight generation request, kept up to date from the
+    progress events of its event bus.
+    """
+
+    def __init__(self, highlight_request: GenereateHighlightRequest):
+        self.job_id = uuid.uuid4().hex
+        self.request = highlight_request
+        self.url = highlight_request.url
+        self.stage = JobStage.QUEUED
+        self.progress = 0.0
+        self.download_links = []
+        self.error = None
+        self.timings = {}
+        self.finished_at = None
+        self.events = EventBus()
+        self.events.add_listener(self._apply_event)
+
+    def _apply_event(self, event: ProgressEvent) -> None:
+        if event.progress is not None:
+            self.stage = event.stage
+            self.progress = event.progress
+        if event.type == ProgressEventType.UPLOAD:
+            self.download_links.append(event.download_link)
+        elif event.type == ProgressEventType.FAILED:
+            self.error = event.error
+            self.stage = JobStage.FAILED
+
+    def to_response(self) -> JobStatusResponse:
+        return JobStatusResponse(
+            job_id=self.job_id,
+            url=self.url,
+            stage=self.stage,
+            progress=self.progress,
+            download_links=self.download_links,
+            error=self.error,
+            timings=self.timings,
+        )
+
+
+class JobManager:
+    """
+    Runs highlight jobs on a fixed pool of worker threads fed by a bounded queue.
+
+    At most max_workers jobs run at once and at most queue_size jobs wait for
+    a worker. Submitting beyond that raises JobQueueFullError, so callers can
+    apply backpressure instead of piling up work.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS, queue_size: int = JOB_QUEUE_SIZE,
+                 coordinator_factory: Callable[[], GenerateHighlightCoordinator] = GenerateHighlightCoordinator,
+                 retention_seconds: int = JOB_RETENTION_SECONDS):
+        self.coordinator_factory = coordinator_factory
+        self.retention_seconds = retention_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True, name=f"job-worker-{index}")
+                         for index in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, highlight_request: GenereateHighlightRequest) -> Job:
+        """
+        Queues a job for the given request.
+
+        :raises JobQueueFullError: When no more jobs can be queued
+        """
+        job = Job(highlight_request)
+        with self._lock:
+            self._remove_expired_jobs()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFullError(
+                    "Too many highlight jobs are queued, retry later") from None
+            self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        :raises JobNotFoundError: When the job is unknown or has expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            JOBS_IN_PROGRESS.inc()
+            try:
+                coordinator = self.coordinator_factory()
+                # Links are published as soon as each clip is uploaded
+                response = coordinator.run(
+                    job.url, download_mode=job.request.download_mode, event_bus=job.events,
+                    scoring_backend=job.request.scoring_backend)
+                job.download_links = response.download_links
+                job.timings = response.timings
+                job.events.publish(ProgressEventType.DONE,
+                                   JobStage.DONE, progress=1.0)
+                JOBS.inc(result=JobStage.DONE.value)
+            except Exception as e:
+                job.events.publish(ProgressEventType.FAILED,
+                                   JobStage.FAILED, error=str(e))
+                JOBS.inc(result=JobStage.FAILED.value)
+            finally:
+                JOBS_IN_PROGRESS.dec()
+                job.finished_at = time.time()
+                job.events.close()
+                self._queue.task_done()
+
+    def _remove_expired_jobs(self) -> None:
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.retention_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    Returns the process-wide job manager, starting its workers on first use.
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+    return _job_manager
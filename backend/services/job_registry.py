@@ -0,0 +1,104 @@
+from backend.core.constants import JOB_RESULT_MAX_ENTRIES, JOB_RESULT_TTL_SECONDS
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+import threading
+import time
+
+
+class JobRegistry:
+    """
+    Coalesces pipeline runs for the same video.
+
+    Concurrent callers with the same key attach to the one in-flight run
+    (single-flight), and finished results are cached for result_ttl_seconds.
+    The owner of a run can share a context, such as its progress events,
+    with the callers that attach to it.
+    Expired results are dropped as new ones are stored, and at most
+    max_results are kept, the oldest being dropped first.
+    """
+
+    def __init__(self, result_ttl_seconds: int = JOB_RESULT_TTL_SECONDS,
+                 max_results: int = JOB_RESULT_MAX_ENTRIES, clock=time.time):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, tuple[Future, Any]] = {}
+        # In the order they were stored, so the oldest results come first
+        self._results: OrderedDict[str, tuple[float, list]] = OrderedDict()
+
+    def run(self, key: str, pipeline: Callable[[], list], context: Any = None,
+            on_attach: Callable[[Any], None] | None = None) -> list:
+        """
+        Returns the cached result for key, waits for the in-flight run of key,
+        or runs the pipeline when neither exists.
+
+        :param context: Shared with the callers attaching to the run, when this caller runs the pipeline
+        :param on_attach: Called with the context of the in-flight run before waiting for it
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if self._clock() - cached[0] <= self.result_ttl_seconds:
+                    return cached[1]
+                del self._results[key]
+
+            in_flight = self._in_flight.get(key)
+            is_owner = in_flight is None
+            if is_owner:
+                in_flight = self._in_flight[key] = (Future(), context)
+            future, owner_context = in_flight
+
+        if not is_owner:
+            if on_attach is not None:
+                on_attach(owner_context)
+            return future.result()
+
+        try:
+            result = pipeline()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, result)
+            del self._in_flight[key]
+        future.set_result(result)
+
+        return result
+
+    def _store(self, key: str, result: list) -> None:
+        """
+        Caches the result of key, dropping expired results and the oldest
+        ones beyond max_results. Must be called with the lock held.
+        """
+        now = self._clock()
+        self._results.pop(key, None)
+        self._results[key] = (now, result)
+        while self._results:
+            oldest_key, (stored_at, _) = next(iter(self._results.items()))
+            if now - stored_at <= self.result_ttl_seconds and len(self._results) <= self.max_results:
+                break
+            del self._results[oldest_key]
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drops the cached result for key, e.g. when its objects no longer exist.
+        """
+        with self._lock:
+            self._results.pop(key, None)
+
+
+_job_registry = JobRegistry()
+
+
+def get_job_registry() -> JobRegistry:
+    """
+    Returns the process-wide job registry.
+    """
+    return _job_registry
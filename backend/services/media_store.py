@@ -0,0 +1,291 @@
+from backend.core.constants import MEDIA_STORE_DIR, MEDIA_STORE_MANIFEST, MEDIA_STORE_STAGING_DIR, MEDIA_STORE_TRASH_DIR
+from backend.core.metrics import MEDIA_STORE_BYTES, MEDIA_STORE_EVICTIONS, MEDIA_STORE_LOOKUPS
+from backend.core.settings import MEDIA_STORE_QUOTA_BYTES
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+@dataclass(slots=True)
+class _Entry:
+    # File name in the video directory of every stored download
+    files: dict = field(default_factory=dict)
+    last_used: float = 0.0
+    size: int = 0
+    # Running jobs using the video, it is never evicted while this is positive
+    leases: int = 0
+
+
+class MediaStore:
+    """
+    Keeps the downloads of every video in its own directory, keyed by video
+    ID and by name, such as video, audio or transcript, so a second job on
+    the same video skips its downloads and videos with the same title never
+    collide.
+
+    Downloads can be written to a staging directory of the video, see
+    MediaLease.staging_directory, so downloads of different videos never
+    share a path before they are stored either.
+
+    Files derived from the downloads, such as clips and binary transcripts,
+    are written next to them or to a directory of the video, see
+    MediaLease.directory. The directory of a video is the unit of
+    eviction: whenever the store is over quota_bytes, the least recently
+    used videos are deleted, except those leased by a running job.
+    """
+
+    def __init__(self, root: str = MEDIA_STORE_DIR, quota_bytes: int = MEDIA_STORE_QUOTA_BYTES,
+                 clock=time.time):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[str, _Entry] = {}
+        self._fetch_locks: dict[tuple, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def acquire(self, video_id: str) -> "MediaLease":
+        """
+        Leases the video until the lease is released, its files are not
+        evicted in between.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(video_id, _Entry())
+            entry.leases += 1
+            entry.last_used = self._clock()
+        return MediaLease(self, video_id)
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    def _fetch(self, video_id: str, name: str, download: Callable[[], str]) -> str:
+        # Concurrent fetches of the same file wait for a single download
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault((video_id, name), threading.Lock())
+
+        with fetch_lock:
+            path = self._stored_path(video_id, name)
+            if path is not None:
+                MEDIA_STORE_LOOKUPS.inc(result="hit")
+                return path
+
+            MEDIA_STORE_LOOKUPS.inc(result="miss")
+            try:
+                downloaded_path = download()
+                directory = self._directory(video_id)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, name + os.path.splitext(downloaded_path)[1])
+                shutil.move(downloaded_path, path)
+            finally:
+                # Whatever else the download left behind, such as partial files
+                shutil.rmtree(self._staging_directory(video_id, name), ignore_errors=True)
+
+            with self._lock:
+                entry = self._entries[video_id]
+                entry.files[name] = os.path.basename(path)
+                self._write_manifest(video_id, entry)
+                entry.size = _directory_size(directory)
+            self._evict()
+
+        return path
+
+    def _release(self, video_id: str) -> None:
+        with self._lock:
+            entry = self._entries[video_id]
+            entry.leases -= 1
+            entry.last_used = self._clock()
+            if entry.files:
+                self._write_manifest(video_id, entry)
+            # Files derived from the downloads count towards the quota too
+            entry.size = _directory_size(self._directory(video_id))
+        self._evict()
+
+    def _stored_path(self, video_id: str, name: str) -> str | None:
+        with self._lock:
+            entry = self._entries[video_id]
+            file_name = entry.files.get(name)
+            if file_name is None:
+                return None
+            path = os.path.join(self._directory(video_id), file_name)
+            if not os.path.isfile(path):
+                # Deleted behind the store's back
+                del entry.files[name]
+                return None
+            return path
+
+    def _evict(self) -> None:
+        trash_paths = []
+        with self._lock:
+            total_size = sum(entry.size for entry in self._entries.values())
+            idle = sorted((entry.last_used, video_id) for video_id, entry in self._entries.items()
+                          if entry.leases == 0)
+
+            for _, video_id in idle:
+                if total_size <= self.quota_bytes:
+                    break
+                total_size -= self._entries.pop(video_id).size
+                for key in [key for key in self._fetch_locks if key[0] == video_id]:
+                    del self._fetch_locks[key]
+                # A rename is instant, deleting gigabytes of video is not
+                trash_paths.append(self._move_to_trash(video_id))
+                MEDIA_STORE_EVICTIONS.inc()
+
+            MEDIA_STORE_BYTES.set(total_size)
+
+        # Other jobs acquire and release videos meanwhile
+        for trash_path in trash_paths:
+            shutil.rmtree(trash_path, ignore_errors=True)
+        if trash_paths:
+            try:
+                os.rmdir(os.path.join(self.root, MEDIA_STORE_TRASH_DIR))
+            except OSError:
+                # Still holding videos evicted by another thread
+                pass
+
+    def _move_to_trash(self, video_id: str) -> str:
+        """
+        :return: The directory holding the video directory, to be deleted
+        """
+        trash_directory = os.path.join(self.root, MEDIA_STORE_TRASH_DIR)
+        os.makedirs(trash_directory, exist_ok=True)
+        trash_path = tempfile.mkdtemp(dir=trash_directory)
+        try:
+            os.rename(self._directory(video_id), os.path.join(trash_path, video_id))
+        except FileNotFoundError:
+            pass
+        return trash_path
+
+    def _load(self) -> None:
+        """
+        Rebuilds the index from the video directories left by earlier runs.
+        """
+        # Evicted videos the end of the process left undeleted
+        shutil.rmtree(os.path.join(self.root, MEDIA_STORE_TRASH_DIR), ignore_errors=True)
+        for video_id in os.listdir(self.root):
+            directory = self._directory(video_id)
+            if not os.path.isdir(directory):
+                continue
+            # Downloads interrupted by the end of the process
+            shutil.rmtree(os.path.join(directory, MEDIA_STORE_STAGING_DIR), ignore_errors=True)
+            try:
+                with open(os.path.join(directory, MEDIA_STORE_MANIFEST), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                # Interrupted before its first download was stored, evicted first
+                manifest = {"files": {}, "last_used": 0.0}
+            self._entries[video_id] = _Entry(files=manifest["files"], last_used=manifest["last_used"],
+                                             size=_directory_size(directory))
+        self._evict()
+
+    def _write_manifest(self, video_id: str, entry: _Entry) -> None:
+        directory = self._directory(video_id)
+        # Written under a temporary name so readers never see half a file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as f:
+            json.dump({"files": entry.files, "last_used": entry.last_used}, f)
+        os.replace(temp_path, os.path.join(directory, MEDIA_STORE_MANIFEST))
+
+    def _directory(self, video_id: str) -> str:
+        return os.path.join(self.root, video_id)
+
+    def _staging_directory(self, video_id: str, name: str) -> str:
+        return os.path.join(self._directory(video_id), MEDIA_STORE_STAGING_DIR, name)
+
+
+class MediaLease:
+    """
+    A running job's hold on the files of one video.
+    """
+
+    def __init__(self, store: MediaStore, video_id: str):
+        self.video_id = video_id
+        self._store = store
+        self._released = False
+
+    def fetch(self, name: str, download: Callable[[], str]) -> str:
+        """
+        Returns the stored file called name, or calls download and stores
+        the file it returns, moving it into the store.
+
+        :param download: Downloads the file and returns its path
+        :return: The path of the file in the store, with the extension of the download
+        """
+        return self._store._fetch(self.video_id, name, download)
+
+    def directory(self, name: str) -> str:
+        """
+        Returns a directory of the video for files derived from its
+        downloads, such as downloaded ranges, which count towards the quota
+        and are evicted with the video.
+        """
+        directory = os.path.join(self._store._directory(self.video_id), name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def staging_directory(self, name: str) -> str:
+        """
+        Returns an empty-at-first directory of the video to download the file
+        called name to, deleted once the file is stored.
+        """
+        directory = self._store._staging_directory(self.video_id, name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._store._release(self.video_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _directory_size(directory: str) -> int:
+    size = 0
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            try:
+                size += os.path.getsize(os.path.join(root, file_name))
+            except FileNotFoundError:
+                pass
+    return size
+
+
+_media_store = None
+_media_store_lock = threading.Lock()
+
+
+def get_media_store() -> MediaStore:
+    """
+    Returns the process-wide media store.
+    """
+    global _media_store
+    with _media_store_lock:
+        if _media_store is None:
+            _media_store = MediaStore()
+    return _media_store
+
+
+# Example usage
+if __name__ == "__main__":
+    media_store = MediaStore()
+
+    with media_store.acquire("UcE0Go6I0XI") as media:
+        # The second fetch is served from the store
+        for _ in range(2):
+            video_path = media.fetch("video", lambda: "./backend/download/downloaded_videos/sample_video.mp4")
+            print(f"Video stored at: {video_path}")
+
+    print(f"Media store size: {media_store.size()} bytes")
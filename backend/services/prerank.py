@@ -0,0 +1,69 @@
+from backend.core.constants import PRERANK_KEEP_RATIO, PRERANK_NEIGHBOURS
+from backend.models.segment import Segment
+
+from typing import List
+
+import math
+import numpy as np
+
+
+def select_candidates(transcripts: List[Segment], signals: List[np.ndarray],
+                      keep_ratio: float = PRERANK_KEEP_RATIO,
+                      neighbours: int = PRERANK_NEIGHBOURS) -> List[Segment]:
+    """
+    Keeps the chunks worth sending to the AI model according to cheap
+    signals such as the audio or the live chat of the video.
+
+    Every signal holds one standardized score per chunk, -inf where it has
+    no data. The signals are summed, a missing value counting as the lowest
+    value of its signal, and the chunks with the best sums are kept.
+
+    :param keep_ratio: Share of the chunks kept before adding neighbours
+    :param neighbours: Chunks kept on each side of every top chunk
+    :return: The kept chunks, in transcript order
+    """
+    if not transcripts:
+        return []
+
+    scores = np.zeros(len(transcripts))
+    for signal in signals:
+        finite = np.isfinite(signal)
+        if finite.any():
+            scores += np.where(finite, signal, signal[finite].min())
+    kept = select_top_windows(scores, math.ceil(keep_ratio * len(transcripts)), neighbours)
+
+    return [transcripts[index] for index in kept]
+
+
+def select_top_windows(scores: np.ndarray, top_k: int, neighbours: int = 0) -> np.ndarray:
+    """
+    :return: The indices of the top_k best scores and of the neighbours
+             on each side of them, in increasing order
+    """
+    top_k = min(max(top_k, 0), len(scores))
+    if not top_k:
+        return np.zeros(0, dtype=np.int64)
+
+    kept = np.zeros(len(scores), dtype=bool)
+    kept[np.argpartition(-scores, top_k - 1)[:top_k]] = True
+    # Widen every kept window by the neighbours on both sides
+    widened = kept.copy()
+    for offset in range(1, neighbours + 1):
+        widened[offset:] |= kept[:-offset]
+        widened[:-offset] |= kept[offset:]
+
+    return np.flatnonzero(widened)
+
+
+def standardize(values: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Scales values to zero mean and unit deviation over the values in mask,
+    or all of them. Constant values all become 0.
+    """
+    masked = values if mask is None else values[mask]
+    if not len(masked):
+        return np.zeros(len(values))
+    deviation = masked.std()
+    if deviation == 0:
+        return np.zeros(len(values))
+    return (values - masked.mean()) / deviation
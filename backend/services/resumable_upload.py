@@ -0,0 +1,204 @@
+from backend.core.constants import UPLOAD_BACKOFF_SECONDS, UPLOAD_CHUNK_SIZE, UPLOAD_COMPOSITE_THRESHOLD, UPLOAD_CONNECT_TIMEOUT_SECONDS, UPLOAD_MAX_PARTS, UPLOAD_MAX_RETRIES, UPLOAD_READ_TIMEOUT_SECONDS
+from backend.core.metrics import UPLOAD_RETRIES
+from backend.models.upload_report import UploadReport
+
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.exceptions import GoogleAPIError
+from google.cloud import storage
+from google.cloud.exceptions import NotFound
+
+import math
+import mimetypes
+import os
+import random
+import requests
+import time
+import uuid
+
+# Statuses after which a chunk is re-sent
+RETRIABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# GCS answers 308 while a resumable upload is incomplete
+RESUME_INCOMPLETE = 308
+# Chunks other than the last must be a multiple of this size
+_CHUNK_ALIGNMENT = 256 * 1024
+
+
+class TransientUploadError(Exception):
+    pass
+
+
+class ResumableUploader:
+    """
+    Uploads files to a bucket with resumable uploads.
+
+    The file is sent in chunks of chunk_size. When a chunk fails, the
+    uploader backs off, asks GCS how many bytes it persisted and resumes
+    from there, so a transient failure costs at most one chunk instead of
+    the whole file.
+
+    Files of composite_threshold bytes or more are split into parts that
+    are uploaded in parallel as temporary objects, then composed into the
+    destination object.
+    """
+
+    def __init__(self, bucket: storage.Bucket, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                 max_retries: int = UPLOAD_MAX_RETRIES, backoff_seconds: float = UPLOAD_BACKOFF_SECONDS,
+                 composite_threshold: int = UPLOAD_COMPOSITE_THRESHOLD, max_parts: int = UPLOAD_MAX_PARTS,
+                 session: requests.Session | None = None,
+                 timeout: tuple = (UPLOAD_CONNECT_TIMEOUT_SECONDS, UPLOAD_READ_TIMEOUT_SECONDS),
+                 sleep=time.sleep):
+        """
+        :param session: Sends the chunks, sharing its pooled connections.
+                        Defaults to a new session per upload
+        :param timeout: (connect, read) seconds of every chunk request, after
+                        which it is retried, so a stalled connection never
+                        holds an upload worker forever
+        """
+        if chunk_size % _CHUNK_ALIGNMENT:
+            raise ValueError(f"chunk_size must be a multiple of {_CHUNK_ALIGNMENT}")
+        self.bucket = bucket
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.composite_threshold = composite_threshold
+        # GCS composes at most 32 objects at once
+        self.max_parts = min(max_parts, 32)
+        self.session = session
+        self.timeout = timeout
+        self._sleep = sleep
+
+    def upload(self, file_path: str, destination_blob: str) -> UploadReport:
+        """
+        Uploads a local file to the destination object.
+
+        :raises TransientUploadError: When a chunk still fails after max_retries
+        :raises requests.HTTPError: On a response that is not worth retrying
+        """
+        start_time = time.perf_counter()
+        size = os.path.getsize(file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+        part_count = self._part_count(size)
+        if part_count == 1:
+            retry_count = self._upload_range(
+                file_path, destination_blob, 0, size, content_type)
+        else:
+            retry_count = self._upload_composite(
+                file_path, destination_blob, size, part_count, content_type)
+
+        return UploadReport(bytes_uploaded=size, elapsed_seconds=time.perf_counter() - start_time,
+                            part_count=part_count, retry_count=retry_count)
+
+    def _part_count(self, size: int) -> int:
+        if size < self.composite_threshold or self.max_parts < 2:
+            return 1
+        # Every part gets at least one full chunk
+        return max(1, min(self.max_parts, size // self.chunk_size))
+
+    def _upload_composite(self, file_path: str, destination_blob: str, size: int,
+                          part_count: int, content_type: str) -> int:
+        # Parts are aligned to chunks, so only the last chunk of every part is short
+        part_size = math.ceil(size / part_count / self.chunk_size) * self.chunk_size
+        offsets = list(range(0, size, part_size))
+        part_names = [f"{destination_blob}.part-{uuid.uuid4().hex}-{index}"
+                      for index in range(len(offsets))]
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(offsets)) as executor:
+                retry_counts = list(executor.map(
+                    lambda part: self._upload_range(
+                        file_path, part[0], part[1], min(part_size, size - part[1]), content_type),
+                    zip(part_names, offsets)))
+
+            destination = self.bucket.blob(destination_blob)
+            destination.content_type = content_type
+            destination.compose([self.bucket.blob(part_name) for part_name in part_names])
+        finally:
+            for part_name in part_names:
+                try:
+                    self.bucket.blob(part_name).delete()
+                except NotFound:
+                    pass
+                except (GoogleAPIError, requests.RequestException) as e:
+                    # The error of the upload or compose, if any, is the one the caller needs
+                    print(f"Part {part_name} not deleted: {e}")
+
+        return sum(retry_counts)
+
+    def _upload_range(self, file_path: str, blob_name: str, offset: int, length: int,
+                      content_type: str) -> int:
+        """
+        Uploads length bytes of the file from offset as its own object.
+
+        :return: The number of retried chunks
+        """
+        session_url = self.bucket.blob(blob_name).create_resumable_upload_session(
+            content_type=content_type, size=length, checksum=None)
+        if self.session is not None:
+            return self._send_range(self.session, session_url, file_path, blob_name, offset, length)
+        with requests.Session() as session:
+            return self._send_range(session, session_url, file_path, blob_name, offset, length)
+
+    def _send_range(self, session: requests.Session, session_url: str, file_path: str,
+                    blob_name: str, offset: int, length: int) -> int:
+        position = 0
+        attempt = 0
+        retry_count = 0
+
+        with open(file_path, "rb") as file:
+            while True:
+                try:
+                    finished = False
+                    if attempt:
+                        # Resume from what GCS actually persisted
+                        finished, position = self._query_status(session, session_url, length)
+                    if not finished:
+                        chunk_end = min(position + self.chunk_size, length)
+                        file.seek(offset + position)
+                        finished, position = self._send_chunk(
+                            session, session_url, file.read(chunk_end - position), position, length)
+                except (requests.ConnectionError, requests.Timeout, TransientUploadError) as e:
+                    attempt += 1
+                    retry_count += 1
+                    UPLOAD_RETRIES.inc()
+                    if attempt > self.max_retries:
+                        raise TransientUploadError(
+                            f"Upload of '{blob_name}' failed after {self.max_retries} retries") from e
+                    # Exponential backoff with jitter, so parallel parts do not retry in lockstep
+                    self._sleep(self.backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                    continue
+
+                if finished:
+                    return retry_count
+                # Only a chunk that went through resets the backoff
+                attempt = 0
+
+    def _send_chunk(self, session: requests.Session, session_url: str, data: bytes,
+                    position: int, length: int) -> tuple:
+        if length == 0:
+            content_range = "bytes */0"
+        else:
+            content_range = f"bytes {position}-{position + len(data) - 1}/{length}"
+        response = session.put(session_url, data=data, headers={"Content-Range": content_range},
+                               timeout=self.timeout)
+        return self._parse_response(response)
+
+    def _query_status(self, session: requests.Session, session_url: str, length: int) -> tuple:
+        response = session.put(session_url, headers={"Content-Range": f"bytes */{length}"},
+                               timeout=self.timeout)
+        return self._parse_response(response)
+
+    def _parse_response(self, response: requests.Response) -> tuple:
+        """
+        :return: (whether the upload is finished, bytes persisted so far)
+        """
+        if response.status_code in (200, 201):
+            return True, None
+        if response.status_code == RESUME_INCOMPLETE:
+            # "bytes=0-N" once anything is persisted, absent before
+            persisted = response.headers.get("Range")
+            return False, int(persisted.rsplit("-", 1)[1]) + 1 if persisted else 0
+        if response.status_code in RETRIABLE_STATUSES:
+            raise TransientUploadError(f"GCS answered {response.status_code}")
+        response.raise_for_status()
+        raise requests.HTTPError(f"Unexpected upload status {response.status_code}", response=response)
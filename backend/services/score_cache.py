@@ -0,0 +1,147 @@
+from backend.core.constants import HIGHLIGHT_DETECTION_BATCH_INSTRUCTION, HIGHLIGHT_DETECTION_BATCH_PROMPT, HIGHLIGHT_DETECTION_INSTRUCTION, HIGHLIGHT_DETECTION_PROMPT, SCORE_CACHE_MAX_ENTRIES, SCORE_CACHE_PATH, SCORE_CACHE_TTL_SECONDS
+from backend.core.metrics import SCORE_CACHE_LOOKUPS
+from backend.core.settings import GOOGLE_AI_MODEL
+from backend.models.ai_response import AIResponse
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class ScoreCache:
+    """
+    Disk-backed cache of AI highlight scores, keyed by a hash of the prompt
+    templates, the model name and the chunk text. Changing the prompt or the
+    model therefore never returns a stale score.
+
+    Entries expire after ttl_seconds and the least recently used entries are
+    evicted once the cache holds more than max_entries.
+    """
+
+    def __init__(self, path: str = SCORE_CACHE_PATH,
+                 max_entries: int = SCORE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = SCORE_CACHE_TTL_SECONDS,
+                 prompt_template: str = HIGHLIGHT_DETECTION_INSTRUCTION + HIGHLIGHT_DETECTION_PROMPT +
+                 HIGHLIGHT_DETECTION_BATCH_INSTRUCTION + HIGHLIGHT_DETECTION_BATCH_PROMPT,
+                 model_name: str | None = GOOGLE_AI_MODEL,
+                 clock=time.time):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self.prompt_template = prompt_template
+        self.model_name = model_name
+        self._key_prefix = self._make_key_prefix(model_name)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key TEXT PRIMARY KEY, highlight_score REAL, reason TEXT, "
+            "created_at REAL, accessed_at REAL)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS scores_accessed_at ON scores (accessed_at)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS scores_created_at ON scores (created_at)")
+        self._connection.commit()
+
+    def make_key(self, text: str, model_name: str | None = None) -> str:
+        """
+        :param model_name: Model that scored the text, the model of the cache when None
+        """
+        key_prefix = self._key_prefix if model_name in (None, self.model_name) else \
+            self._make_key_prefix(model_name)
+        return hashlib.sha256(key_prefix + text.encode()).hexdigest()
+
+    def _make_key_prefix(self, model_name: str | None) -> bytes:
+        return hashlib.sha256(f"{self.prompt_template}\0{model_name}\0".encode()).digest()
+
+    def get(self, text: str, model_name: str | None = None) -> AIResponse | None:
+        """
+        Returns the cached score of a chunk, or None on a miss.
+
+        :param model_name: See make_key
+        """
+        key = self.make_key(text, model_name)
+        now = self._clock()
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT highlight_score, reason, created_at FROM scores WHERE key = ?", (key,)).fetchone()
+
+            if row is None or now - row[2] > self.ttl_seconds:
+                if row is not None:
+                    self._connection.execute(
+                        "DELETE FROM scores WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.misses += 1
+                SCORE_CACHE_LOOKUPS.inc(result="miss")
+                return None
+
+            self._connection.execute(
+                "UPDATE scores SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            SCORE_CACHE_LOOKUPS.inc(result="hit")
+
+        return AIResponse(highlight_score=row[0], reason=row[1])
+
+    def set(self, text: str, ai_resp: AIResponse, model_name: str | None = None) -> None:
+        """
+        Stores the score of a chunk, evicting expired and least recently used entries.
+
+        :param model_name: See make_key
+        """
+        self.set_many([(text, ai_resp)], model_name)
+
+    def set_many(self, scores: list, model_name: str | None = None) -> None:
+        """
+        Stores the scores of several chunks in one transaction, evicting
+        expired and least recently used entries once for the whole batch.
+
+        :param scores: (text, AIResponse) of every chunk
+        :param model_name: See make_key
+        """
+        if not scores:
+            return
+
+        now = self._clock()
+        rows = [(self.make_key(text, model_name), ai_resp.highlight_score, ai_resp.reason, now, now)
+                for text, ai_resp in scores]
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)", rows)
+            self._connection.execute(
+                "DELETE FROM scores WHERE created_at < ?", (now - self.ttl_seconds,))
+            excess = self._connection.execute(
+                "SELECT COUNT(*) FROM scores").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._connection.execute(
+                    "DELETE FROM scores WHERE key IN ("
+                    "SELECT key FROM scores ORDER BY accessed_at LIMIT ?)", (excess,))
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+_score_cache = None
+_score_cache_lock = threading.Lock()
+
+
+def get_score_cache() -> ScoreCache:
+    """
+    Returns the process-wide score cache.
+    """
+    global _score_cache
+    with _score_cache_lock:
+        if _score_cache is None:
+            _score_cache = ScoreCache()
+    return _score_cache
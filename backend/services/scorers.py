@@ -0,0 +1,265 @@
+from backend.core.clients import get_client_pool
+from backend.core.constants import HEURISTIC_KEYWORD_WEIGHTS, HEURISTIC_SCORE_SCALE, MAX_SCORE, OPENAI_COMPATIBLE_TIMEOUT_SECONDS
+from backend.core.settings import AI_SYSTEM_INSTRUCTION_ENABLED, GOOGLE_AI_MODEL, OPENAI_COMPATIBLE_API_KEY, OPENAI_COMPATIBLE_BASE_URL, OPENAI_COMPATIBLE_MODEL
+from backend.models.generate_highlight_request import ScoringBackend
+from backend.models.segment import Segment
+
+from abc import ABC, abstractmethod
+from google import genai
+from google.genai import types
+from typing import List
+
+import asyncio
+import httpx
+import numpy as np
+import weakref
+
+# Shortest chunk length the heuristic divides keyword points by, in minutes
+_MIN_HEURISTIC_MINUTES = 0.25
+
+
+class Scorer(ABC):
+    """
+    What HighlightDetectionService scores transcript chunks with, either a
+    PromptScorer or a LocalScorer.
+    """
+
+    # Name of the model in score cache keys
+    model_name: str | None = None
+    # Whether requests share the quota of the process-wide AI rate limiter
+    rate_limited = True
+
+    def close(self) -> None:
+        """
+        Closes the connections of the scorer. Called at shutdown.
+        """
+
+
+class PromptScorer(Scorer):
+    """
+    A model answering the scoring prompts, which HighlightDetectionService
+    builds, batches, rate limits and caches.
+    """
+
+    @abstractmethod
+    def generate(self, prompt: str, instruction: str) -> str:
+        """
+        :return: The answer of the model to the prompt, given the instruction
+        """
+
+    @abstractmethod
+    async def generate_async(self, prompt: str, instruction: str) -> str:
+        """
+        Same as generate, without blocking the event loop.
+        """
+
+
+class LocalScorer(Scorer):
+    """
+    Scores the chunks itself, all at once, without prompts, batches, rate
+    limit or cache.
+    """
+
+    rate_limited = False
+
+    @abstractmethod
+    def score(self, transcripts: List[Segment]) -> None:
+        """
+        Writes the score and reason of every chunk.
+        """
+
+
+class GeminiScorer(PromptScorer):
+    """
+    Sends the prompts to Gemini through the google-genai client.
+    """
+
+    def __init__(self, client: genai.Client | None = None, model_name: str | None = GOOGLE_AI_MODEL,
+                 system_instruction: bool = AI_SYSTEM_INSTRUCTION_ENABLED):
+        """
+        :param system_instruction: Whether the instruction goes in the system
+                                   instruction instead of every prompt, a fixed
+                                   prefix that the model can cache
+        """
+        self._client = client
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    @property
+    def client(self) -> genai.Client:
+        # Without a given client, the shared client of the calling thread, see ClientPool.genai_client
+        return self._client or get_client_pool().genai_client()
+
+    def generate(self, prompt: str, instruction: str) -> str:
+        contents, config = self._request(prompt, instruction)
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=config,
+        )
+        return response.text
+
+    async def generate_async(self, prompt: str, instruction: str) -> str:
+        contents, config = self._request(prompt, instruction)
+        response = await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=config,
+        )
+        return response.text
+
+    def _request(self, prompt: str, instruction: str) -> tuple:
+        """
+        :return: (contents, config) of the request for the prompt
+        """
+        if self.system_instruction:
+            return prompt, types.GenerateContentConfig(system_instruction=instruction)
+        return instruction + prompt, None
+
+
+class OpenAICompatibleScorer(PromptScorer):
+    """
+    Sends the prompts to the chat completions endpoint of a server speaking
+    the OpenAI API, such as a local llama.cpp or vLLM server.
+
+    Connections are pooled per scorer, and per event loop for async
+    requests, since an async client cannot move between loops.
+    """
+
+    # A local server has no quota to share with Gemini
+    rate_limited = False
+
+    def __init__(self, base_url: str = OPENAI_COMPATIBLE_BASE_URL, model_name: str = OPENAI_COMPATIBLE_MODEL,
+                 api_key: str | None = OPENAI_COMPATIBLE_API_KEY,
+                 timeout_seconds: float = OPENAI_COMPATIBLE_TIMEOUT_SECONDS):
+        """
+        :param base_url: URL the /chat/completions path is appended to, usually ending in /v1
+        """
+        self.model_name = model_name
+        self._client_args = {
+            "base_url": base_url.rstrip("/"),
+            "headers": {"Authorization": f"Bearer {api_key}"} if api_key else {},
+            "timeout": timeout_seconds,
+        }
+        self._client = httpx.Client(**self._client_args)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def generate(self, prompt: str, instruction: str) -> str:
+        response = self._client.post("/chat/completions", json=self._request(prompt, instruction))
+        return self._answer(response)
+
+    async def generate_async(self, prompt: str, instruction: str) -> str:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(**self._client_args)
+        response = await client.post("/chat/completions", json=self._request(prompt, instruction))
+        return self._answer(response)
+
+    def close(self) -> None:
+        self._client.close()
+        for loop, client in list(self._async_clients.items()):
+            try:
+                # Async connections are closed on the loop they were opened on, while it is not running
+                if not loop.is_closed():
+                    loop.run_until_complete(client.aclose())
+            except RuntimeError as e:
+                print(f"Async client of a running event loop not closed: {e}")
+        self._async_clients.clear()
+
+    def _request(self, prompt: str, instruction: str) -> dict:
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0,
+        }
+
+    def _answer(self, response: httpx.Response) -> str:
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class HeuristicScorer(LocalScorer):
+    """
+    Scores chunks on the CPU from the keywords of excitement and laughter
+    they contain per minute, without any model.
+
+    Keyword counts are weighed and summed for all chunks at once with numpy,
+    so a whole stream is scored in milliseconds. The score of a chunk only
+    depends on its own text and length, so chunks can be scored in any
+    batches.
+    """
+
+    model_name = "heuristic"
+
+    def __init__(self, keyword_weights: dict | None = None, score_scale: float = HEURISTIC_SCORE_SCALE):
+        """
+        :param keyword_weights: Points of every keyword found in a chunk
+        :param score_scale: Points per minute at which the score reaches 63% of MAX_SCORE
+        """
+        self.keyword_weights = HEURISTIC_KEYWORD_WEIGHTS if keyword_weights is None else keyword_weights
+        self.score_scale = score_scale
+
+    def score(self, transcripts: List[Segment]) -> None:
+        if not transcripts:
+            return
+
+        scores, keyword_counts = self.score_texts(
+            [t.text for t in transcripts],
+            np.fromiter((t.duration_ms for t in transcripts), np.float64, len(transcripts)) / 60000)
+        for transcript, score, keyword_count in zip(transcripts, scores.tolist(), keyword_counts.tolist()):
+            transcript.highlight_score = score
+            transcript.reason = f"{int(keyword_count)} excitement keywords"
+
+    def score_texts(self, texts: List[str], minutes: np.ndarray) -> tuple:
+        """
+        :param minutes: Length of every text in minutes
+        :return: (score of every text, rounded to a tenth, keywords found in every text)
+        """
+        points = np.zeros(len(texts))
+        keyword_counts = np.zeros(len(texts))
+        counts = {}
+        # Longest first, a keyword inside a longer one, such as ! in ?!, only counts outside of it
+        for keyword in sorted(self.keyword_weights, key=len, reverse=True):
+            counts[keyword] = np.fromiter((text.count(keyword) for text in texts), np.float64, len(texts))
+            for longer_keyword, longer_counts in counts.items():
+                if longer_keyword != keyword and keyword in longer_keyword:
+                    counts[keyword] -= longer_keyword.count(keyword) * longer_counts
+            points += self.keyword_weights[keyword] * counts[keyword]
+            keyword_counts += counts[keyword]
+
+        # Saturates towards MAX_SCORE, so a few extra keywords matter less in a lively chunk
+        points_per_minute = points / np.maximum(minutes, _MIN_HEURISTIC_MINUTES)
+        scores = MAX_SCORE * (1 - np.exp(-points_per_minute / self.score_scale))
+        return np.round(scores, 1), keyword_counts
+
+
+def create_scorer(backend: ScoringBackend) -> Scorer:
+    """
+    Returns the scorer of the given backend, configured from the settings
+    and shared by every job, see ClientPool.scorer.
+    """
+    return get_client_pool().scorer(backend, lambda: _new_scorer(backend))
+
+
+def _new_scorer(backend: ScoringBackend) -> Scorer:
+    if backend == ScoringBackend.OPENAI_COMPATIBLE:
+        return OpenAICompatibleScorer()
+    if backend == ScoringBackend.HEURISTIC:
+        return HeuristicScorer()
+    return GeminiScorer()
+
+
+# Example usage
+if __name__ == "__main__":
+    transcripts = [
+        Segment(0, 60000, "今日は雑談配信です。よろしくお願いします"),
+        Segment(60000, 120000, "やばいやばい！www 草 まじで勝った！！ えぐい"),
+    ]
+
+    HeuristicScorer().score(transcripts)
+    for transcript in transcripts:
+        print(f"{transcript}, Highlight Score: {transcript.highlight_score}, Reason: {transcript.reason}")
@@ -0,0 +1,220 @@
+from backend.core.constants import BINARY_TRANSCRIPT_EXT, DURATION, START, TEXT, TRANSCRIPT_READ_BLOCK_SIZE
+
+from array import array
+from typing import Iterable, Iterator
+
+import json
+import mmap
+import numpy as np
+import os
+import shutil
+import struct
+import tempfile
+
+# Magic, format version, line count, text blob size in bytes
+HEADER = struct.Struct("<4sIQQ")
+MAGIC = b"VHTR"
+VERSION = 1
+
+
+class BinaryTranscript:
+    """
+    Read-only, memory-mapped view of a binary transcript file.
+
+    The file holds a header followed by four columns:
+    - starts: float64[count], start of every line in seconds
+    - durations: float64[count], duration of every line in seconds
+    - offsets: uint64[count + 1], byte range of every line in the text blob
+    - text: UTF-8 blob of the stripped lines, each non-empty line followed by a space
+
+    The columns are NumPy views of the mapping, nothing is copied on open.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, text_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"'{path}' is not a binary transcript")
+
+        offset = HEADER.size
+        self.starts = np.frombuffer(self._mmap, "<f8", count, offset)
+        offset += 8 * count
+        self.durations = np.frombuffer(self._mmap, "<f8", count, offset)
+        offset += 8 * count
+        self.offsets = np.frombuffer(self._mmap, "<u8", count + 1, offset)
+        offset += 8 * (count + 1)
+        self.text_blob = memoryview(self._mmap)[offset:offset + text_size]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        # Drop the separating space of non-empty lines
+        return bytes(self.text_blob[start:max(start, end - 1)]).decode("utf-8")
+
+    def text_range(self, first: int, last: int) -> str:
+        """
+        The non-empty lines first to last, joined by spaces, decoded at once.
+        """
+        start, end = int(self.offsets[first]), int(self.offsets[last + 1])
+        return bytes(self.text_blob[start:max(start, end - 1)]).decode("utf-8")
+
+    def iter_lines(self) -> Iterator[dict]:
+        """
+        Yields every line in the raw transcript format.
+        """
+        for index in range(len(self)):
+            yield {TEXT: self.text(index), START: float(self.starts[index]),
+                   DURATION: float(self.durations[index])}
+
+    def segments(self, close_gaps: bool = True) -> tuple:
+        """
+        Computes the times of every non-empty line, like TranscriptParser does.
+
+        :return: (indices, starts_ms, ends_ms) NumPy arrays
+        """
+        if not len(self):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+
+        ends = self.starts + self.durations
+        next_starts = self.starts[1:]
+        if close_gaps:
+            ends = np.concatenate((next_starts, ends[-1:]))
+        else:
+            ends = np.concatenate((np.minimum(ends[:-1], next_starts), ends[-1:]))
+
+        indices = np.flatnonzero(np.diff(self.offsets) > 0)
+        # Same rounding as seconds_to_ms: round half to even
+        starts_ms = np.rint(self.starts[indices] * 1000).astype(np.int64)
+        ends_ms = np.rint(ends[indices] * 1000).astype(np.int64)
+        return indices, starts_ms, ends_ms
+
+    def close(self) -> None:
+        self.starts = self.durations = self.offsets = None
+        self.text_blob.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TranscriptCache:
+    """
+    Keeps a binary copy next to every transcript JSON file. The copy is
+    written on the first read of the JSON file and reused while it is newer.
+    """
+
+    def open(self, transcript_path: str) -> BinaryTranscript:
+        """
+        Opens the binary copy of a transcript, converting the JSON file first
+        if there is no up-to-date copy. Binary files are opened directly.
+        """
+        if self.is_binary(transcript_path):
+            return BinaryTranscript(transcript_path)
+
+        binary_path = self.binary_path(transcript_path)
+        if not os.path.exists(binary_path) or \
+                os.path.getmtime(binary_path) < os.path.getmtime(transcript_path):
+            self.write(binary_path, iter_json_array(transcript_path))
+
+        return BinaryTranscript(binary_path)
+
+    def binary_path(self, transcript_path: str) -> str:
+        return f"{os.path.splitext(transcript_path)[0]}.{BINARY_TRANSCRIPT_EXT}"
+
+    def is_binary(self, path: str) -> bool:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+
+    def write(self, binary_path: str, lines: Iterable[dict]) -> None:
+        """
+        Writes lines in the raw transcript format to a binary transcript file.
+
+        The text blob is spooled to a temporary file and the columns are kept
+        in compact arrays, so long transcripts are converted in little memory.
+        """
+        starts, durations, offsets = array("d"), array("d"), array("Q", [0])
+        directory = os.path.dirname(binary_path) or "."
+
+        with tempfile.TemporaryFile(dir=directory) as text_file:
+            for line in lines:
+                text = line[TEXT].strip().encode("utf-8")
+                if text:
+                    text_file.write(text + b" ")
+                starts.append(line[START])
+                durations.append(line[DURATION])
+                offsets.append(offsets[-1] + (len(text) + 1 if text else 0))
+
+            # Written under a temporary name so readers never see half a file
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    file.write(HEADER.pack(MAGIC, VERSION, len(starts), offsets[-1]))
+                    file.write(np.asarray(starts, dtype="<f8").tobytes())
+                    file.write(np.asarray(durations, dtype="<f8").tobytes())
+                    file.write(np.asarray(offsets, dtype="<u8").tobytes())
+                    text_file.seek(0)
+                    shutil.copyfileobj(text_file, file)
+                os.replace(temp_path, binary_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+
+def iter_json_array(path: str, block_size: int = TRANSCRIPT_READ_BLOCK_SIZE) -> Iterator:
+    """
+    Yields the items of the top-level JSON array of the file one by one,
+    reading block_size characters at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as file:
+        buffer = ""
+        position = 0
+        end_of_file = False
+        array_opened = False
+
+        while True:
+            if not end_of_file and len(buffer) - position < block_size:
+                block = file.read(block_size)
+                end_of_file = not block
+                buffer = buffer[position:] + block
+                position = 0
+
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                if end_of_file:
+                    raise ValueError(f"Transcript '{path}' ends before its closing bracket")
+                continue
+
+            if not array_opened:
+                if buffer[position] != "[":
+                    raise ValueError(f"Transcript '{path}' is not a JSON array")
+                array_opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+                # The item continues in the next block
+                block = file.read(block_size)
+                end_of_file = not block
+                buffer = buffer[position:] + block
+                position = 0
+                continue
+            yield item
+
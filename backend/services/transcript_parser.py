@@ -1,86 +1,246 @@
-from datetime import datetime, timedelta
-from typing import List
+from collections import deque
+from enum import Enum
+from typing import Iterable, Iterator, List
 
-import json
+import numpy as np
 
-from backend.core.constants import DURATION, END, START, TEXT, TRANSCRIPT_CHUNK_SIZE
+from backend.core.constants import SENTENCE_ENDINGS, TRANSCRIPT_CHUNK_SIZE, TRANSCRIPT_CHUNK_TOKEN_BUDGET, TRANSCRIPT_MIN_CHUNK_SIZE, TRANSCRIPT_SILENCE_GAP_SECONDS, TRANSCRIPT_WINDOW_OVERLAP
+from backend.core.timestamps import seconds_to_ms
+from backend.core.tokens import TokenCounter, compact_text, get_token_counter
+from backend.models.segment import Segment
+from backend.services.transcript_cache import BinaryTranscript, TranscriptCache
+
+
+class WindowPolicy(str, Enum):
+    # Back-to-back chunks of chunk_size seconds
+    FIXED = "fixed"
+    # Chunks of chunk_size seconds, each starting overlap seconds before the previous one ends
+    SLIDING = "sliding"
+    # Chunks that end at a pause or a sentence end, between min_chunk_size and chunk_size seconds
+    BOUNDARY = "boundary"
+    # Chunks that end after chunk_size seconds or once they hold token_budget tokens
+    TOKENS = "tokens"
 
 
 class TranscriptParser:
-    def parse(self, transctipts_path: str):
+    """
+    Turns a transcript JSON file into chunks of transcript lines.
+
+    The JSON file is converted once to a memory-mapped binary copy, see
+    TranscriptCache, and every later parse reads the columns of that copy.
+    Chunks are yielded as soon as they are complete, and only the lines of
+    the current chunk are decoded, so memory stays flat regardless of the
+    length of the stream.
+    """
+
+    def __init__(self, policy: WindowPolicy = WindowPolicy.FIXED,
+                 chunk_size: float = TRANSCRIPT_CHUNK_SIZE,
+                 overlap: float = TRANSCRIPT_WINDOW_OVERLAP,
+                 min_chunk_size: float = TRANSCRIPT_MIN_CHUNK_SIZE,
+                 silence_gap: float = TRANSCRIPT_SILENCE_GAP_SECONDS,
+                 token_budget: int = TRANSCRIPT_CHUNK_TOKEN_BUDGET,
+                 token_counter: TokenCounter | None = None,
+                 transcript_cache: TranscriptCache | None = None):
+        """
+        :param policy: How transcript lines are grouped into chunks, see WindowPolicy
+        :param chunk_size: Seconds after which a chunk ends
+        :param overlap: Seconds shared by consecutive SLIDING chunks
+        :param min_chunk_size: Seconds a BOUNDARY chunk lasts at least
+        :param silence_gap: Seconds without speech that end a BOUNDARY chunk
+        :param token_budget: Tokens of compacted text a TOKENS chunk holds at most,
+                             unless its first line alone holds more
+        :param token_counter: Counts the tokens of TOKENS chunks
+        :param transcript_cache: Where the binary copies of transcripts are kept
         """
-        Parses the WebVTT text and returns a list of transcript entries.
-        Each entry is a dictionary with 'start', 'end', and 'text' keys.
+        if policy == WindowPolicy.SLIDING and not 0 <= overlap < chunk_size:
+            raise ValueError("overlap must be shorter than chunk_size")
+        self.policy = policy
+        self.chunk_size_ms = seconds_to_ms(chunk_size)
+        self.overlap_ms = seconds_to_ms(overlap)
+        self.min_chunk_size_ms = seconds_to_ms(min_chunk_size)
+        self.silence_gap_ms = seconds_to_ms(silence_gap)
+        self.token_budget = token_budget
+        self.token_counter = token_counter
+        if policy == WindowPolicy.TOKENS and token_counter is None:
+            self.token_counter = get_token_counter()
+        self.transcript_cache = transcript_cache or TranscriptCache()
+
+    def parse(self, transctipts_path: str) -> List[Segment]:
         """
-        transcripts = self._extract_json(transctipts_path)
-        transcripts = self._parse_transcripts(transcripts)
-        return self._aggregate_transcripts(transcripts)
+        Parses the transcript JSON and returns a list of segments
+        grouped into chunks according to the window policy.
+        """
+        return list(self.iter_parse(transctipts_path))
 
-    def _extract_json(self, transctipts_path: str) -> List:
-        with open(transctipts_path, 'r') as file:
-            transctipts = json.load(file)
-        return transctipts
+    def iter_parse(self, transctipts_path: str) -> Iterator[Segment]:
+        """
+        Same as parse, but yields every chunk as soon as it is complete.
+        """
+        with self.transcript_cache.open(transctipts_path) as transcript:
+            # Pauses are only visible when every line keeps its own end
+            indices, starts_ms, ends_ms = transcript.segments(
+                close_gaps=self.policy != WindowPolicy.BOUNDARY)
 
-    def _parse_transcripts(self, transcripts_raw: str):
-        transcripts = []
+            if self.policy == WindowPolicy.FIXED and np.all(np.diff(ends_ms) >= 0):
+                yield from self._iter_fixed_columns(transcript, indices, starts_ms, ends_ms)
+            else:
+                yield from self._iter_chunks(
+                    Segment(start_ms, end_ms, transcript.text(index)) for index, start_ms, end_ms
+                    in zip(indices.tolist(), starts_ms.tolist(), ends_ms.tolist()))
 
-        for i, chunk in enumerate(transcripts_raw):
-            text = chunk[TEXT]
-            start_sec = chunk[START]
+    def regroup(self, chunks: Iterable[Segment]) -> List[Segment]:
+        """
+        Groups already parsed chunks, taken as transcript lines, into larger
+        chunks according to the window policy.
+        """
+        return self._aggregate_transcripts(chunks)
+
+    def _aggregate_transcripts(self, transcripts: List[Segment]) -> List[Segment]:
+        return list(self._iter_chunks(transcripts))
+
+    def _iter_chunks(self, transcripts: Iterable[Segment]) -> Iterator[Segment]:
+        if self.policy == WindowPolicy.SLIDING:
+            return self._iter_sliding(transcripts)
+        if self.policy == WindowPolicy.BOUNDARY:
+            return self._iter_at_boundaries(transcripts)
+        if self.policy == WindowPolicy.TOKENS:
+            return self._iter_token_budget(transcripts)
+        return self._iter_fixed(transcripts)
+
+    def _iter_fixed(self, transcripts: Iterable[Segment]) -> Iterator[Segment]:
+        aggregated_texts = []
+        previous_start_ms = None
+        for transcript, next_transcript in _with_next(transcripts):
+            aggregated_texts.append(transcript.text)
+
+            if previous_start_ms is None:
+                previous_start_ms = transcript.start_ms
+
+            if transcript.end_ms - previous_start_ms > self.chunk_size_ms or next_transcript is None:
+                yield Segment(previous_start_ms, transcript.end_ms, " ".join(aggregated_texts))
+                aggregated_texts = []
+                previous_start_ms = None
+
+    def _iter_fixed_columns(self, transcript: BinaryTranscript, indices: np.ndarray,
+                            starts_ms: np.ndarray, ends_ms: np.ndarray) -> Iterator[Segment]:
+        """
+        Same chunks as _iter_fixed, computed on the columns of a binary
+        transcript. The line that ends every chunk is found by a binary search
+        over the line ends, which must not decrease, and the text of the chunk
+        is decoded in one piece.
+        """
+        line_count = len(indices)
+        # First line ending more than chunk_size after each line starts
+        last_lines = np.searchsorted(
+            ends_ms, starts_ms + self.chunk_size_ms, side="right").tolist()
+        indices, starts_ms, ends_ms = indices.tolist(), starts_ms.tolist(), ends_ms.tolist()
+
+        first = 0
+        while first < line_count:
+            last = min(max(first, last_lines[first]), line_count - 1)
+            yield Segment(starts_ms[first], ends_ms[last],
+                          transcript.text_range(indices[first], indices[last]))
+            first = last + 1
+
+    def _iter_sliding(self, transcripts: Iterable[Segment]) -> Iterator[Segment]:
+        """
+        Keeps only the lines of the current window, both window edges only
+        move forward.
+        """
+        step_ms = self.chunk_size_ms - self.overlap_ms
+        source = iter(transcripts)
+        upcoming = next(source, None)
+        window = deque()
+
+        while upcoming is not None or window:
+            if not window:
+                window.append(upcoming)
+                upcoming = next(source, None)
+            window_start_ms = window[0].start_ms
+            # Like FIXED, the line that crosses the window size is included
+            while upcoming is not None and window[-1].end_ms - window_start_ms <= self.chunk_size_ms:
+                window.append(upcoming)
+                upcoming = next(source, None)
+            yield Segment(window_start_ms, window[-1].end_ms,
+                          " ".join(transcript.text for transcript in window))
+            if upcoming is None:
+                return
+
+            window.popleft()
+            while window and window[0].start_ms < window_start_ms + step_ms:
+                window.popleft()
+
+    def _iter_at_boundaries(self, transcripts: Iterable[Segment]) -> Iterator[Segment]:
+        """
+        Each chunk is extended to the start of the next one, so chunks stay
+        contiguous even though they are cut at pauses.
+        """
+        aggregated_texts = []
+        previous_start_ms = None
+        for transcript, next_transcript in _with_next(transcripts):
+            aggregated_texts.append(transcript.text)
 
-            if i < len(transcripts_raw) - 1:
-                end_sec = transcripts_raw[i+1][START]
-            else:
-                end_sec = chunk[DURATION] + start_sec
-
-            start = self._format_seconds(start_sec)
-            end = self._format_seconds(end_sec)
-
-            # Clean text
-            clean_text = text.strip()
-
-            if clean_text:
-                transcripts.append({
-                    START: start,
-                    END: end,
-                    TEXT: clean_text
-                })
-
-        return transcripts
-
-    def _format_seconds(self, seconds: float) -> str:
-        td = timedelta(seconds=seconds)
-        total_seconds = td.total_seconds()
-        hours = int(total_seconds // 3600)
-        minutes = int((total_seconds % 3600) // 60)
-        secs = total_seconds % 60
-        return f"{hours:02}:{minutes:02}:{secs:06.3f}"  # HH:MM:SS.mmm
-
-    def _aggregate_transcripts(self, transcripts):
-        aggregated = []
-        aggregated_text = ""
-        previous_start_time = None
-        for transcript in transcripts:
-            start = transcript[START]
-            end = transcript[END]
-            text = transcript[TEXT]
-            current_start_time = datetime.strptime(start, "%H:%M:%S.%f")
-            current_end_time = datetime.strptime(end, "%H:%M:%S.%f")
-            aggregated_text = aggregated_text + " " + text
+            if previous_start_ms is None:
+                previous_start_ms = transcript.start_ms
+
+            if next_transcript is None:
+                yield Segment(previous_start_ms, transcript.end_ms, " ".join(aggregated_texts))
+                return
 
-            if previous_start_time is None:
-                previous_start_time = current_start_time
+            next_start_ms = next_transcript.start_ms
+            chunk_ms = transcript.end_ms - previous_start_ms
+            at_boundary = next_start_ms - transcript.end_ms >= self.silence_gap_ms or \
+                transcript.text.endswith(SENTENCE_ENDINGS)
 
-            if current_end_time - previous_start_time > timedelta(seconds=TRANSCRIPT_CHUNK_SIZE) or transcript == transcripts[-1]:
-                aggregated.append({
-                    START: datetime.strftime(previous_start_time, "%H:%M:%S.%f")[:-3],
-                    END: end,
-                    TEXT: str.strip(aggregated_text)
-                })
-                aggregated_text = ""
-                previous_start_time = None
+            if chunk_ms > self.chunk_size_ms or (chunk_ms >= self.min_chunk_size_ms and at_boundary):
+                yield Segment(previous_start_ms, next_start_ms, " ".join(aggregated_texts))
+                aggregated_texts = []
+                previous_start_ms = None
 
-        return aggregated
+    def _iter_token_budget(self, transcripts: Iterable[Segment]) -> Iterator[Segment]:
+        """
+        Like FIXED, but a chunk also ends before the line that would take it
+        over the token budget, so every chunk costs about the same to score
+        however dense the talk is.
+        """
+        aggregated_texts = []
+        previous_start_ms = None
+        previous_end_ms = None
+        chunk_tokens = 0
+        for transcript in transcripts:
+            line_tokens = self.token_counter.count(compact_text(transcript.text))
+            if aggregated_texts and chunk_tokens + line_tokens > self.token_budget:
+                yield Segment(previous_start_ms, previous_end_ms, " ".join(aggregated_texts))
+                aggregated_texts = []
+                previous_start_ms = None
+                chunk_tokens = 0
+
+            aggregated_texts.append(transcript.text)
+            chunk_tokens += line_tokens
+            previous_end_ms = transcript.end_ms
+            if previous_start_ms is None:
+                previous_start_ms = transcript.start_ms
+
+            if transcript.end_ms - previous_start_ms > self.chunk_size_ms:
+                yield Segment(previous_start_ms, transcript.end_ms, " ".join(aggregated_texts))
+                aggregated_texts = []
+                previous_start_ms = None
+                chunk_tokens = 0
+
+        if aggregated_texts:
+            yield Segment(previous_start_ms, previous_end_ms, " ".join(aggregated_texts))
+
+
+def _with_next(items: Iterable) -> Iterator[tuple]:
+    """
+    Yields every item with the one after it, or None for the last item.
+    """
+    iterator = iter(items)
+    current = next(iterator, None)
+    while current is not None:
+        upcoming = next(iterator, None)
+        yield current, upcoming
+        current = upcoming
 
 
 # Example usage
@@ -91,5 +251,4 @@ if __name__ == "__main__":
     parsed_entries = parser.parse(vtt_path)
 
     for entry in parsed_entries:
-        print(
-            f"Start: {entry[START]}, End: {entry[END]}, Text: {entry[TEXT]}")
+        print(f"{entry}, Text: {entry.text}")
@@ -0,0 +1,157 @@
+from backend.core.constants import DOWNLOADED_TRANSCRIPT_PATH, DURATION, START, TEXT, TRANSCRIPT_EXT, TRANSCRIPTION_CHUNK_SECONDS, TRANSCRIPTION_SPLIT_SEARCH_SECONDS, WHISPER_SAMPLE_RATE
+from backend.core.settings import TRANSCRIPTION_WORKERS, WHISPER_MODEL_SIZE
+from backend.models.audio_features import AudioFeatures
+from backend.models.transcription_report import TranscriptionReport
+from backend.services.audio_extraction import AudioExtractionService
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import ffmpeg
+import json
+import numpy as np
+import os
+import time
+
+# Whisper model of the current worker process, loaded once by _load_model
+_model = None
+
+
+class TranscriptionService:
+    """
+    Transcribes audio locally with Whisper on the CPU, for videos without
+    captions.
+
+    The audio is split at silences into chunks of about chunk_seconds and
+    the chunks are transcribed by a pool of worker processes, each holding
+    its own copy of the model.
+    """
+
+    # Set by every transcription, to compare worker counts
+    report: TranscriptionReport | None = None
+
+    def __init__(self, model_size: str = WHISPER_MODEL_SIZE, max_workers: int = TRANSCRIPTION_WORKERS,
+                 language: str | None = None, chunk_seconds: float = TRANSCRIPTION_CHUNK_SECONDS):
+        """
+        :param model_size: Whisper model name, such as tiny, base, small or medium
+        :param max_workers: Number of worker processes, 1 transcribes in this process
+        :param language: Language code of the speech, detected per chunk when None
+        """
+        self.model_size = model_size
+        self.max_workers = max(1, max_workers)
+        self.language = language
+        self.chunk_seconds = chunk_seconds
+
+    def transcribe(self, audio_path: str, output_path: str | None = None) -> str:
+        """
+        Transcribes the audio to a transcript JSON file in the raw format
+        written by TranscriptDownloadService, so TranscriptParser reads it as is.
+
+        :param audio_path: Any file ffmpeg can decode an audio stream from
+        :param output_path: Defaults to the transcript download directory,
+                            named after the audio file
+        :return: The file path where the transcript is saved
+        """
+        start_time = time.perf_counter()
+        features = AudioExtractionService(
+            audio_path, sample_rate=WHISPER_SAMPLE_RATE).extract_features()
+        time_ranges = split_on_silence(features, self.chunk_seconds)
+        tasks = [(audio_path, start, end, self.language) for start, end in time_ranges]
+        # Torch threads are shared out between the workers
+        threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+
+        if self.max_workers == 1 or len(tasks) <= 1:
+            _load_model(self.model_size, threads)
+            chunks = [_transcribe_chunk(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)), initializer=_load_model,
+                                     initargs=(self.model_size, threads)) as executor:
+                chunks = list(executor.map(_transcribe_chunk, *zip(*tasks)))
+
+        output_path = output_path or DOWNLOADED_TRANSCRIPT_PATH % {
+            "title": os.path.splitext(os.path.basename(audio_path))[0], "ext": TRANSCRIPT_EXT}
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump([line for chunk in chunks for line in chunk], f,
+                      ensure_ascii=False, indent=2)
+
+        self.report = TranscriptionReport(
+            audio_seconds=features.duration_ms / 1000,
+            elapsed_seconds=time.perf_counter() - start_time,
+            worker_count=self.max_workers,
+            chunk_count=len(tasks),
+        )
+
+        return output_path
+
+
+def split_on_silence(features: AudioFeatures, chunk_seconds: float,
+                     search_seconds: float = TRANSCRIPTION_SPLIT_SEARCH_SECONDS) -> List[tuple]:
+    """
+    Splits the audio into chunks of at most chunk_seconds, each ending at
+    the quietest frame of its last search_seconds, or of its second half
+    for short chunks.
+
+    :return: (start, end) pairs in seconds, covering the whole audio
+    """
+    frames_per_chunk = max(1, int(chunk_seconds * 1000 / features.frame_ms))
+    search_frames = min(int(search_seconds * 1000 / features.frame_ms), frames_per_chunk // 2)
+    boundaries = [0]
+
+    while features.frame_count - boundaries[-1] > frames_per_chunk:
+        latest_end = boundaries[-1] + frames_per_chunk
+        earliest_end = latest_end - search_frames
+        boundaries.append(
+            earliest_end + int(np.argmin(features.energy[earliest_end:latest_end + 1])))
+    if features.frame_count > boundaries[-1]:
+        boundaries.append(features.frame_count)
+
+    return [(start * features.frame_ms / 1000, end * features.frame_ms / 1000)
+            for start, end in zip(boundaries, boundaries[1:])]
+
+
+def _load_model(model_size: str, threads: int) -> None:
+    global _model
+    # Imported here so only the workers pay for loading torch
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_size, device="cpu")
+
+
+def _transcribe_chunk(audio_path: str, start: float, end: float, language: str | None) -> List[dict]:
+    """
+    Transcribes end - start seconds of the audio from start.
+
+    :return: Transcript lines in the raw format, timed from the start of the audio
+    """
+    samples, _ = (
+        ffmpeg
+        .input(audio_path, ss=start, t=end - start)
+        .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=WHISPER_SAMPLE_RATE)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    result = _model.transcribe(np.frombuffer(samples, np.float32), language=language,
+                               fp16=False, condition_on_previous_text=False)
+
+    lines = []
+    for segment in result["segments"]:
+        # Whisper may time the last words past the end of the chunk
+        segment_end = min(segment["end"], end - start)
+        lines.append({TEXT: segment["text"].strip(),
+                      START: round(start + segment["start"], 3),
+                      DURATION: round(max(segment_end - segment["start"], 0), 3)})
+
+    return lines
+
+
+# Example usage
+if __name__ == "__main__":
+    audio_path = "./backend/download/downloaded_audios/sample_audio.mp3"
+
+    transcription_service = TranscriptionService(language="ja")
+    transcript_path = transcription_service.transcribe(audio_path)
+
+    print(f"Transcript saved to: {transcript_path}")
+    print(f"Transcription report: {transcription_service.report}, "
+          f"{transcription_service.report.throughput:.1f} audio seconds per second")
@@ -1,4 +1,4 @@
-from backend.core.constants import YOUTUBE_REGEX
+from backend.core.constants import YOUTUBE_REGEX, YOUTUBE_VIDEO_ID_REGEX
 
 
 class UrlValidator:
@@ -10,6 +10,17 @@ class UrlValidator:
         is_validate_url = bool(YOUTUBE_REGEX.match(url))
         return is_validate_url
 
+    @staticmethod
+    def extract_video_id(url: str) -> str:
+        """
+        Returns the 11 character video ID, so different URL forms of the same
+        video (youtu.be, extra query parameters) map to the same key.
+        """
+        match = YOUTUBE_VIDEO_ID_REGEX.search(url)
+        if match is None:
+            raise ValueError(f"No video ID found in url '{url}'")
+        return match.group(1)
+
 
 # Example usage
 if __name__ == "__main__":
@@ -20,3 +31,5 @@ if __name__ == "__main__":
     print(f"Url1 validity: {UrlValidator.is_validate_url(url1)}")
     # Url2 validity: True
     print(f"Url2 validity: {UrlValidator.is_validate_url(url2)}")
+    # Url2 video ID: UcE0Go6I0XI
+    print(f"Url2 video ID: {UrlValidator.extract_video_id(url2)}")
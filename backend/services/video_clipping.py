@@ -1,39 +1,94 @@
 from typing import List
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 import ffmpeg
 
-from backend.core.constants import END, START
+from backend.core.constants import MAX_CLIP_WORKERS
+from backend.core.timestamps import format_timestamp
+from backend.models.segment import Segment
+
+
+class ClipMode(str, Enum):
+    # One ffmpeg process per highlight, one after another
+    SERIAL = "serial"
+    # One ffmpeg process per highlight, up to max_workers at once
+    POOL = "pool"
+    # A single ffmpeg process that writes every highlight as its own output
+    SINGLE_PASS = "single_pass"
 
 
 class VideoClippingService:
     def __init__(self, video_path: str):
         self.video_path = video_path
         self.video_path_wo_ext = video_path.rsplit('.', 1)[0]
-        
 
-    def clip(self, highlights: List) -> List:
+    def clip(self, highlights: List[Segment], mode: ClipMode = ClipMode.SERIAL,
+             max_workers: int = MAX_CLIP_WORKERS) -> List:
         """
-        Clips all highlights from start_time to end_time and saves it.
+        Clips all highlights from their start to their end and saves them.
 
-        :param highlights: List of dictionaries with 'start_time' and 'end_time'
+        :param highlights: Segments to clip
+        :param mode: How the ffmpeg processes are run, see ClipMode
+        :param max_workers: Maximum number of ffmpeg processes in POOL mode
         :return: Path to the clipped video
         """
+        if not highlights:
+            return []
+        if mode == ClipMode.SINGLE_PASS:
+            return self._clip_single_pass(highlights)
+
         output_videos = []
+        streams = []
         for highlight in highlights:
-            start_time = highlight.get(START, "00:00:00.000")
-            end_time = highlight.get(END, "00:00:10.000")
-            clipped_video_path = f"{self.video_path_wo_ext}_clipped_{start_time}_{end_time}.mp4"
+            clipped_video_path = self._clipped_video_path(highlight)
 
-            (
+            streams.append(
                 ffmpeg
-                .input(self.video_path, ss=start_time, to=end_time)
+                .input(self.video_path, ss=highlight.start_seconds, to=highlight.end_seconds)
                 .output(clipped_video_path, c='copy')
-                .run()
+                .overwrite_output()
             )
+            output_videos.append(clipped_video_path)
+
+        if mode == ClipMode.POOL:
+            # The work happens in the ffmpeg subprocesses, threads only wait on them
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(lambda stream: stream.run(quiet=True), streams))
+        else:
+            for stream in streams:
+                stream.run(quiet=True)
+
+        return output_videos
 
+    def _clip_single_pass(self, highlights: List[Segment]) -> List:
+        """
+        Writes every highlight with one ffmpeg process, so the source file is
+        opened and probed once. The input seeks to the first highlight and
+        each output cuts its own range relative to that point.
+        """
+        first_start_ms = min(highlight.start_ms for highlight in highlights)
+        source = ffmpeg.input(self.video_path, ss=first_start_ms / 1000)
+
+        output_videos = []
+        outputs = []
+        for highlight in highlights:
+            clipped_video_path = self._clipped_video_path(highlight)
+            outputs.append(source.output(
+                clipped_video_path,
+                ss=(highlight.start_ms - first_start_ms) / 1000,
+                to=(highlight.end_ms - first_start_ms) / 1000,
+                c='copy',
+            ))
             output_videos.append(clipped_video_path)
 
+        ffmpeg.merge_outputs(*outputs).overwrite_output().run(quiet=True)
+
         return output_videos
 
+    def _clipped_video_path(self, highlight: Segment) -> str:
+        return (f"{self.video_path_wo_ext}_clipped_"
+                f"{format_timestamp(highlight.start_ms)}_{format_timestamp(highlight.end_ms)}.mp4")
+
 
 # Example usage
 if __name__ == "__main__":
@@ -41,9 +96,9 @@ if __name__ == "__main__":
         "./backend/download/downloaded_videos/＂Soda Pop＂ Official Lyric Video ｜ KPop Demon Hunters ｜ Sony Animation.webm")
 
     highlights = [
-        {START: "00:00:04.880", END: "00:00:07.950"},
-        {START: "00:00:07.960", END: "00:00:12.749"},
-        {START: "00:00:12.759", END: "00:00:16.230"}
+        Segment.from_timestamps("00:00:04.880", "00:00:07.950"),
+        Segment.from_timestamps("00:00:07.960", "00:00:12.749"),
+        Segment.from_timestamps("00:00:12.759", "00:00:16.230")
     ]
 
     clipped_video_path = video_clipping_service.clip(highlights)
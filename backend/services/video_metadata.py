@@ -0,0 +1,129 @@
+from backend.core.constants import VIDEO_METADATA_CACHE_DIR, VIDEO_METADATA_MAX_ENTRIES, VIDEO_METADATA_TTL_SECONDS
+from backend.models.video_metadata import VideoMetadata
+from backend.services.job_registry import JobRegistry
+from backend.services.url_validator import UrlValidator
+
+from yt_dlp import YoutubeDL
+
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class VideoMetadataService:
+    """
+    Fetches the yt-dlp info of every video once and shares it between the
+    downloaders, which download from it with process_ie_result instead of
+    extracting it again.
+
+    Info is kept in memory and on disk for ttl_seconds. Concurrent lookups
+    of the same video wait for a single extraction.
+    """
+
+    def __init__(self, cache_dir: str = VIDEO_METADATA_CACHE_DIR,
+                 ttl_seconds: int = VIDEO_METADATA_TTL_SECONDS,
+                 max_entries: int = VIDEO_METADATA_MAX_ENTRIES, clock=time.time):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # Single-flight extraction with an in-memory TTL cache
+        self._registry = JobRegistry(result_ttl_seconds=ttl_seconds, max_results=max_entries, clock=clock)
+
+    def get(self, video_url: str) -> VideoMetadata:
+        info = self.get_info(video_url)
+        return VideoMetadata(
+            video_id=info.get("id") or self._cache_key(video_url),
+            title=info.get("title") or "",
+            duration=info.get("duration"),
+            formats=info.get("formats") or [],
+            chapters=info.get("chapters") or [],
+        )
+
+    def get_info(self, video_url: str) -> dict:
+        """
+        Returns the sanitized yt-dlp info of the video.
+
+        The result is a copy, so callers may hand it to process_ie_result,
+        which modifies it.
+        """
+        key = self._cache_key(video_url)
+        info = self._registry.run(key, lambda: self._load(video_url, key))
+        return copy.deepcopy(info)
+
+    def invalidate(self, video_url: str) -> None:
+        """
+        Drops the cached info, e.g. when its stream URLs were rejected.
+        """
+        key = self._cache_key(video_url)
+        self._registry.invalidate(key)
+        try:
+            os.remove(self._cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _load(self, video_url: str, key: str) -> dict:
+        info = self._read_disk(key)
+        if info is not None:
+            return info
+
+        with YoutubeDL({}) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(video_url, download=False))
+        self._write_disk(key, info)
+
+        return info
+
+    def _read_disk(self, key: str) -> dict | None:
+        try:
+            with open(self._cache_path(key), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if self._clock() - cached["fetched_at"] > self.ttl_seconds:
+            return None
+        return cached["info"]
+
+    def _write_disk(self, key: str, info: dict) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written under a temporary name so readers never see half a file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self._clock(), "info": info}, f, ensure_ascii=False)
+        os.replace(temp_path, self._cache_path(key))
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _cache_key(self, video_url: str) -> str:
+        try:
+            return UrlValidator.extract_video_id(video_url)
+        except ValueError:
+            return hashlib.sha256(video_url.encode("utf-8")).hexdigest()
+
+
+_video_metadata_service = None
+_video_metadata_service_lock = threading.Lock()
+
+
+def get_video_metadata_service() -> VideoMetadataService:
+    """
+    Returns the process-wide video metadata service.
+    """
+    global _video_metadata_service
+    with _video_metadata_service_lock:
+        if _video_metadata_service is None:
+            _video_metadata_service = VideoMetadataService()
+    return _video_metadata_service
+
+
+# Example usage
+if __name__ == "__main__":
+    video_metadata_service = VideoMetadataService()
+    metadata = video_metadata_service.get(
+        "https://www.youtube.com/watch?v=UcE0Go6I0XI")
+
+    print(f"Title: {metadata.title}, duration: {metadata.duration}s, "
+          f"formats: {len(metadata.formats)}, chapters: {len(metadata.chapters)}")
@@ -1,23 +1,95 @@
 from yt_dlp import YoutubeDL
-from backend.core.constants import AUDIO_OPTION, DOWNLOADED_TRANSCRIPT_PATH, LANGUAGE, TRANSCRIPT_EXT, VIDEO_OPTION
+from yt_dlp.utils import download_range_func
+from backend.core.constants import AUDIO_OPTION, CHAT_OPTION, DOWNLOADED_TRANSCRIPT_PATH, LANGUAGE, LIVE_CHAT, MAX_SEGMENT_DOWNLOAD_WORKERS, SEGMENT_KEYFRAME_PAD_SECONDS, SEGMENT_OPTION, TRANSCRIPT_EXT, VIDEO_OPTION
+from backend.models.download_report import DownloadReport
+from backend.services.video_metadata import VideoMetadataService, get_video_metadata_service
 from youtube_transcript_api import YouTubeTranscriptApi
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
 import os
 import json
 import re
+import threading
+import time
 from pathlib import Path
 
 
+class DownloadProgressTracker:
+    """
+    Follows yt-dlp progress hooks to measure the bytes downloaded and the
+    peak disk usage of one or more concurrent downloads.
+
+    :param progress_callback: Called on every hook with the bytes downloaded
+                              so far and the expected total, if known
+    """
+
+    def __init__(self, progress_callback: Callable[[int, int | None], None] | None = None):
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        self._file_bytes = {}
+        self._file_total_bytes = {}
+        self._peak_disk_bytes = 0
+        self._start_time = time.perf_counter()
+
+    def hook(self, progress: dict) -> None:
+        total_bytes = progress.get(
+            "total_bytes") or progress.get("total_bytes_estimate")
+        downloaded_bytes = progress.get("downloaded_bytes") or total_bytes or 0
+        with self._lock:
+            self._file_bytes[progress.get("filename")] = downloaded_bytes
+            self._file_total_bytes[progress.get("filename")] = total_bytes
+            all_downloaded_bytes = sum(self._file_bytes.values())
+            self._peak_disk_bytes = max(
+                self._peak_disk_bytes, all_downloaded_bytes)
+            all_total_bytes = None if None in self._file_total_bytes.values() \
+                else sum(self._file_total_bytes.values())
+
+        if self.progress_callback is not None:
+            self.progress_callback(all_downloaded_bytes, all_total_bytes)
+
+    def report(self, output_paths: list) -> DownloadReport:
+        # Section downloads go through ffmpeg, which may not report progress
+        output_bytes = sum(os.path.getsize(path)
+                           for path in output_paths if os.path.isfile(path))
+        with self._lock:
+            hooked_bytes = sum(self._file_bytes.values())
+            peak_disk_bytes = self._peak_disk_bytes
+
+        return DownloadReport(
+            bytes_downloaded=max(hooked_bytes, output_bytes),
+            peak_disk_bytes=max(peak_disk_bytes, output_bytes),
+            file_count=len(output_paths),
+            elapsed_seconds=time.perf_counter() - self._start_time,
+        )
+
+
 class BaseDownloadService:
-    def _download(self, video_url: str, ydl_opts: dict) -> Path:
+    # Set by every download, to compare full and range downloads
+    report: DownloadReport | None = None
+
+    def __init__(self, progress_callback: Callable[[int, int | None], None] | None = None,
+                 metadata_service: VideoMetadataService | None = None):
+        """
+        :param progress_callback: See DownloadProgressTracker
+        :param metadata_service: Shares the video info between downloaders,
+                                 so YouTube is queried once per video
+        """
+        self.progress_callback = progress_callback
+        self.metadata_service = metadata_service or get_video_metadata_service()
+
+    def _download(self, video_url: str, ydl_opts: dict, output_dir: str | None = None) -> Path:
         """
         Base method to download content from a URL.
 
         :param video_url: The URL of the content to download.
+        :param output_dir: See _in_directory
         :return: The file path where the content is saved.
         """
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
+        tracker = DownloadProgressTracker(self.progress_callback)
+        with YoutubeDL({**self._in_directory(ydl_opts, output_dir), 'progress_hooks': [tracker.hook]}) as ydl:
+            info = ydl.process_ie_result(
+                self.metadata_service.get_info(video_url), download=True)
             output_path = info["requested_downloads"][0]["filename"]
 
         # Extract real title + ext
@@ -36,42 +108,99 @@ class BaseDownloadService:
         if not os.path.exists(safe_path):
             raise FileNotFoundError(f"File '{output_path}' does not exist.")
 
+        self.report = tracker.report([safe_path])
+
         return safe_path
 
+    def _in_directory(self, ydl_opts: dict, output_dir: str | None) -> dict:
+        """
+        :param output_dir: Directory the file is saved to instead of the
+                           download directory, such as a staging directory
+                           of the media store, so videos with the same title
+                           never share a path
+        """
+        if output_dir is None:
+            return ydl_opts
+        return {**ydl_opts, 'outtmpl': os.path.join(output_dir, os.path.basename(ydl_opts['outtmpl']))}
+
     def _sanitize_filename(self, name: str) -> str:
         # Remove or replace invalid characters
         return re.sub(r'[\\/*?:"<>|]', "_", name)
 
 
 class VideoDownloadService(BaseDownloadService):
-    def download(self, video_url: str) -> Path:
+    def download(self, video_url: str, output_dir: str | None = None) -> Path:
         """
         Downloads a video from the given URL and returns the file path.
 
         :param video_url: The URL of the video to download.
+        :param output_dir: See BaseDownloadService._in_directory
         :return: The file path where the video is saved.
         """
 
-        return self._download(video_url, VIDEO_OPTION)
+        return self._download(video_url, VIDEO_OPTION, output_dir)
+
+    def download_ranges(self, video_url: str, time_ranges: list,
+                        pad_seconds: float = SEGMENT_KEYFRAME_PAD_SECONDS,
+                        max_workers: int = MAX_SEGMENT_DOWNLOAD_WORKERS,
+                        tracker: DownloadProgressTracker | None = None,
+                        output_dir: str | None = None) -> list:
+        """
+        Downloads only the given time ranges of a video, each to its own file.
+
+        :param video_url: The URL of the video to download.
+        :param time_ranges: (start, end) pairs in seconds.
+        :param pad_seconds: Seconds added before and after every range.
+        :param max_workers: Maximum number of ranges downloaded at once.
+        :param tracker: Shared tracker when ranges are requested over several calls.
+        :param output_dir: See BaseDownloadService._in_directory
+        :return: The file paths of the downloaded ranges, in the given order.
+        """
+        tracker = tracker or DownloadProgressTracker(self.progress_callback)
+        padded_ranges = [(max(0.0, start - pad_seconds), end + pad_seconds)
+                         for start, end in time_ranges]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            output_paths = list(executor.map(
+                lambda time_range: self._download_range(video_url, time_range, tracker, output_dir),
+                padded_ranges))
+
+        self.report = tracker.report(output_paths)
+
+        return output_paths
+
+    def _download_range(self, video_url: str, time_range: tuple, tracker: DownloadProgressTracker,
+                        output_dir: str | None = None) -> str:
+        ydl_opts = {
+            **self._in_directory(SEGMENT_OPTION, output_dir),
+            'download_ranges': download_range_func(None, [time_range]),
+            'progress_hooks': [tracker.hook],
+        }
+        with YoutubeDL(ydl_opts) as ydl:
+            info = ydl.process_ie_result(
+                self.metadata_service.get_info(video_url), download=True)
+            return info["requested_downloads"][0]["filename"]
 
 
 class AudioDownloadService(BaseDownloadService):
-    def download(self, video_url: str) -> Path:
+    def download(self, video_url: str, output_dir: str | None = None) -> Path:
         """
         Downloads the audio from the given video URL and returns the file path.
 
         :param video_url: The URL of the video to extract audio from.
+        :param output_dir: See BaseDownloadService._in_directory
         :return: The file path where the audio is saved.
         """
-        return self._download(video_url, AUDIO_OPTION)
+        return self._download(video_url, AUDIO_OPTION, output_dir)
 
 
 class TranscriptDownloadService(BaseDownloadService):
-    def download(self, video_url: str) -> Path:
+    def download(self, video_url: str, output_dir: str | None = None) -> Path:
         """
         Downloads the transcript of the video from the given URL.
 
         :param video_url: The URL of the video to download the transcript from.
+        :param output_dir: See BaseDownloadService._in_directory
         :return: The file path where the transcript is saved.
         """
         video_id = video_url.rsplit('v=', 1)[-1]
@@ -83,13 +212,13 @@ class TranscriptDownloadService(BaseDownloadService):
         transcript = ytt_api.fetch(
             video_id, languages=LANGUAGE, preserve_formatting=False)
 
-        with YoutubeDL({}) as ydl:
-            info = ydl.extract_info(video_url, download=False)
-            title = info["title"]
-            title = self._sanitize_filename(title)
+        title = self._sanitize_filename(
+            self.metadata_service.get(video_url).title)
 
         output_path = DOWNLOADED_TRANSCRIPT_PATH % {
             "title": title, "ext": TRANSCRIPT_EXT}
+        if output_dir is not None:
+            output_path = os.path.join(output_dir, os.path.basename(output_path))
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(transcript.to_raw_data(), f,
                       ensure_ascii=False, indent=2)
@@ -97,6 +226,41 @@ class TranscriptDownloadService(BaseDownloadService):
         return output_path
 
 
+class ChatDownloadService(BaseDownloadService):
+    def download(self, video_url: str, output_dir: str | None = None,
+                 stop: threading.Event | None = None) -> Path:
+        """
+        Downloads the live chat replay of a past stream, one JSON object per line.
+
+        :param video_url: The URL of the stream to download the chat of.
+        :param output_dir: See BaseDownloadService._in_directory
+        :param stop: Set when the chat is no longer needed, the download is
+                     then abandoned
+        :return: The file path where the chat replay is saved.
+        :raises FileNotFoundError: When the video has no chat replay, or the
+                                   download was abandoned
+        """
+        ydl_opts = self._in_directory(CHAT_OPTION, output_dir)
+        if stop is not None:
+            def stop_when_set(progress: dict) -> None:
+                # The replay is fetched piece by piece, yt-dlp abandons it on an error in a hook
+                if stop.is_set():
+                    raise InterruptedError("Live chat replay no longer needed")
+
+            ydl_opts = {**ydl_opts, 'progress_hooks': [*ydl_opts.get('progress_hooks', []), stop_when_set]}
+
+        with YoutubeDL(ydl_opts) as ydl:
+            info = ydl.process_ie_result(
+                self.metadata_service.get_info(video_url), download=True)
+
+        chat = (info.get("requested_subtitles") or {}).get(LIVE_CHAT) or {}
+        chat_path = chat.get("filepath")
+        if not chat_path or not os.path.exists(chat_path):
+            raise FileNotFoundError(f"'{video_url}' has no live chat replay")
+
+        return chat_path
+
+
 # Example usage
 if __name__ == "__main__":
     video_service = VideoDownloadService()
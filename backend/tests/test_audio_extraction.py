@@ -0,0 +1,99 @@
+from backend.models.segment import Segment
+from backend.services.audio_extraction import AudioExtractionService, detect_onsets
+
+import numpy as np
+import pytest
+import shutil
+import wave
+
+SAMPLE_RATE = 16000
+ZONE_SECONDS = 10
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def write_wav(path, samples: np.ndarray) -> None:
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        file.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+@pytest.fixture
+def stream_audio(tmp_path):
+    """
+    30 seconds of audio: near silence, then steady music, then bursts of
+    noise standing in for laughter.
+    """
+    rng = np.random.default_rng(0)
+    zone_length = SAMPLE_RATE * ZONE_SECONDS
+    times = np.arange(zone_length) / SAMPLE_RATE
+    silence = rng.normal(0, 0.001, zone_length)
+    music = 0.2 * np.sin(2 * np.pi * 440 * times)
+    # 0.1 second bursts four times a second
+    bursts = rng.normal(0, 0.4, zone_length) * ((times % 0.25) < 0.1)
+
+    audio_path = tmp_path / "stream.wav"
+    write_wav(audio_path, np.concatenate([silence, music, bursts]))
+    return str(audio_path)
+
+
+@requires_ffmpeg
+def test_extract_features(stream_audio):
+    features = AudioExtractionService(stream_audio).extract_features()
+
+    assert features.frame_ms == 50
+    assert features.frame_count == 3 * ZONE_SECONDS * 20
+    zones = np.split(np.arange(features.frame_count), 3)
+    energy = [features.energy[zone].mean() for zone in zones]
+    onsets = [features.onsets[zone].sum() for zone in zones]
+    assert energy[0] < energy[1] < energy[2]
+    # Steady music has no onsets, every burst has one
+    assert onsets[1] == 0
+    assert onsets[2] >= 0.75 * 4 * ZONE_SECONDS
+
+
+@requires_ffmpeg
+def test_scores_rank_bursts_over_music_over_silence(stream_audio):
+    service = AudioExtractionService(stream_audio)
+    transcripts = [Segment(index * 5000, (index + 1) * 5000, f"chunk {index}")
+                   for index in range(6)] + [Segment(40000, 45000, "after the audio")]
+
+    scores = service.score_windows(service.extract_features(), transcripts)
+
+    assert scores[6] == -np.inf
+    assert max(scores[0:2]) < min(scores[2:4])
+    assert max(scores[2:4]) < min(scores[4:6])
+
+
+@requires_ffmpeg
+def test_select_candidates_keeps_top_chunks_and_neighbours(stream_audio):
+    service = AudioExtractionService(stream_audio)
+    transcripts = [Segment(index * 2000, (index + 1) * 2000, f"chunk {index}")
+                   for index in range(15)]
+
+    candidates = service.select_candidates(transcripts, keep_ratio=0.2, neighbours=1)
+
+    # The top 3 chunks are in the bursts, from 20 seconds on, and so are their
+    # neighbours except the one before the first burst chunk
+    assert all(candidate in transcripts[9:] for candidate in candidates)
+    assert 4 <= len(candidates) <= 6
+
+
+@requires_ffmpeg
+def test_undecodable_audio_raises(tmp_path):
+    audio_path = tmp_path / "broken.wav"
+    audio_path.write_bytes(b"not audio")
+
+    with pytest.raises(RuntimeError):
+        AudioExtractionService(str(audio_path)).extract_features()
+
+
+def test_detect_onsets_marks_outstanding_peaks_only():
+    flux = np.full(20, 1.0)
+    flux[5] = 10.0
+    flux[12] = 1.1
+
+    assert np.flatnonzero(detect_onsets(flux)).tolist() == [5]
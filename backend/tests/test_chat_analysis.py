@@ -0,0 +1,123 @@
+from backend.models.segment import Segment
+from backend.services.chat_analysis import ChatAnalysisService, parse_superchat_value
+
+import json
+import numpy as np
+import pytest
+
+CHUNK_MS = 60000
+
+
+def text_message(text: str) -> dict:
+    return {"liveChatTextMessageRenderer": {"message": {"runs": [{"text": text}]}, "authorName": {"simpleText": "viewer"}}}
+
+
+def emoji_message(emoji_id: str, shortcut: str, custom: bool = False) -> dict:
+    return {"liveChatTextMessageRenderer": {"message": {"runs": [
+        {"emoji": {"emojiId": emoji_id, "shortcuts": [shortcut], "isCustomEmoji": custom}}]}}}
+
+
+def superchat(amount: str, text: str = "") -> dict:
+    return {"liveChatPaidMessageRenderer": {"message": {"runs": [{"text": text}]},
+                                            "purchaseAmountText": {"simpleText": amount}}}
+
+
+def replay_line(offset_ms: int, *items: dict) -> str:
+    return json.dumps({"replayChatItemAction": {
+        "actions": [{"addChatItemAction": {"item": item, "clientId": "x"}} for item in items],
+        "videoOffsetTimeMsec": str(offset_ms)}}, ensure_ascii=False)
+
+
+def ticker_line(offset_ms: int) -> str:
+    return json.dumps({"replayChatItemAction": {"actions": [{"addLiveChatTickerItemAction": {
+        "item": superchat("¥10,000")}}], "videoOffsetTimeMsec": str(offset_ms)}})
+
+
+@pytest.fixture
+def chat_replay(tmp_path):
+    """
+    10 minutes of chat: a steady trickle of greetings, a burst of laughter
+    in minute 3 and a superchat in minute 7.
+    """
+    lines = []
+    for second in range(0, 600, 10):
+        lines.append(replay_line(second * 1000, text_message("こんにちは")))
+    for index in range(40):
+        lines.append(replay_line(180000 + index * 500, text_message("草草草 www")))
+    lines.append(replay_line(420000, superchat("¥10,000", "おめでとう")))
+    lines.append(ticker_line(420500))
+    # A membership milestone is not a message
+    lines.append(replay_line(430000, {"liveChatMembershipItemRenderer": {"headerSubtext": {}}}))
+
+    chat_path = tmp_path / "stream.live_chat.json"
+    chat_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(chat_path)
+
+
+def make_transcripts(count: int) -> list:
+    return [Segment(index * CHUNK_MS, (index + 1) * CHUNK_MS, f"chunk {index}") for index in range(count)]
+
+
+def test_extract_features(chat_replay):
+    features = ChatAnalysisService(chat_replay).extract_features()
+
+    # Greetings, laughter and the superchat, but not the ticker or the membership item
+    assert features.message_count == 60 + 40 + 1
+    assert np.all(np.diff(features.offsets_ms) >= 0)
+    assert features.superchat_values.sum() == 10000
+    assert features.laughter_counts.sum() == 40 * 2
+
+
+def test_score_windows_ranks_reactions_first(chat_replay):
+    service = ChatAnalysisService(chat_replay)
+
+    scores = service.score_windows(service.extract_features(), make_transcripts(10))
+
+    assert int(np.argmax(scores)) == 3
+    assert scores[7] > np.median(scores)
+
+
+def test_select_candidates(chat_replay):
+    transcripts = make_transcripts(10)
+
+    candidates = ChatAnalysisService(chat_replay).select_candidates(
+        transcripts, keep_ratio=0.2, neighbours=0)
+
+    assert candidates == [transcripts[3], transcripts[7]]
+
+
+def test_messages_are_sorted_by_offset(tmp_path):
+    chat_path = tmp_path / "unordered.live_chat.json"
+    chat_path.write_text("\n".join([replay_line(5000, text_message("b")),
+                                    replay_line(1000, text_message("a"), emoji_message("😂", ":face_with_tears_of_joy:")),
+                                    replay_line(3000, emoji_message("UCxyz/kusa", ":_kusa:", custom=True))]),
+                         encoding="utf-8")
+
+    features = ChatAnalysisService(str(chat_path)).extract_features()
+
+    assert features.offsets_ms.tolist() == [1000, 1000, 3000, 5000]
+    assert features.laughter_counts.tolist() == [0, 1, 1, 0]
+
+
+def test_empty_replay(tmp_path):
+    chat_path = tmp_path / "empty.live_chat.json"
+    chat_path.write_text("", encoding="utf-8")
+    service = ChatAnalysisService(str(chat_path))
+
+    features = service.extract_features()
+
+    assert features.message_count == 0
+    assert service.score_windows(features, make_transcripts(3)).tolist() == [0, 0, 0]
+
+
+@pytest.mark.parametrize("amount_text,expected", [
+    ("¥1,000", 1000),
+    ("￥500", 500),
+    ("$5.00", 750),
+    ("CA$10.00", 1100),
+    ("€2,50", 400),
+    ("₩10,000", 1100),
+    ("ZZZ 5.00", 500),
+])
+def test_parse_superchat_value(amount_text, expected):
+    assert parse_superchat_value(amount_text) == pytest.approx(expected)
@@ -0,0 +1,68 @@
+from backend.benchmarks.fake_gcs_server import FakeGcsServer
+from backend.core.clients import ClientPool
+
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncio
+import httpx
+import pytest
+
+
+def make_pool() -> ClientPool:
+    return ClientPool(credentials_path=None, api_key="fake-key")
+
+
+def test_genai_client_is_reused_within_a_thread():
+    pool = make_pool()
+
+    client = pool.genai_client()
+
+    assert pool.genai_client() is client
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(pool.genai_client).result() is not client
+
+
+def test_run_async_keeps_connections_across_calls():
+    pool = make_pool()
+    async_client = None
+
+    async def get(url: str) -> int:
+        nonlocal async_client
+        # Created on the first call, like the async client of genai_client
+        async_client = async_client or httpx.AsyncClient()
+        return (await async_client.get(url)).status_code
+
+    with FakeGcsServer() as server:
+        url = f"{server.base_url}/storage/v1/b/{server.bucket_name}/o/missing"
+        # With asyncio.run the second call fails on a connection of the closed first loop
+        assert [pool.run_async(get(url)) for _ in range(3)] == [404] * 3
+
+
+def test_storage_client_needs_credentials():
+    with pytest.raises(RuntimeError):
+        make_pool().storage_client
+
+
+def test_close_closes_the_clients_and_loops_of_every_thread():
+    pool = make_pool()
+
+    async def get_loop():
+        return asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        clients = [pool.genai_client(), executor.submit(pool.genai_client).result()]
+        loops = [pool.run_async(get_loop()), executor.submit(pool.run_async, get_loop()).result()]
+
+    async def shutdown():
+        # Like at app shutdown, closed from a thread already running a loop
+        pool.close()
+
+    asyncio.run(shutdown())
+
+    for client in clients:
+        assert client._api_client._httpx_client.is_closed
+        assert client._api_client._async_httpx_client.is_closed
+    assert all(loop.is_closed() for loop in loops)
+    # Used after closing, the thread gets new ones
+    assert pool.genai_client() is not clients[0]
+    assert pool.run_async(get_loop()) is not loops[0]
@@ -0,0 +1,68 @@
+from backend.core.metrics import COARSE_WINDOWS
+from backend.models.segment import Segment
+from backend.services.coarse_to_fine import CoarseToFineSelector
+
+from unittest.mock import MagicMock
+
+import asyncio
+import re
+
+
+def make_transcripts(count: int) -> list:
+    return [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}") for index in range(count)]
+
+
+def make_highlight_service(lively_index: int, score: float = 9) -> MagicMock:
+    """
+    Scores the windows containing chunk lively_index with score, and the others with 1.
+    """
+    def score_transcripts(windows, batch_size, token_budget):
+        for window in windows:
+            lively = re.search(rf"\bchunk {lively_index}\b", window.text)
+            window.highlight_score = score if lively else 1
+        return windows
+
+    async def score_transcripts_async(windows, batch_size, token_budget):
+        return score_transcripts(windows, batch_size, token_budget)
+
+    highlight_service = MagicMock()
+    highlight_service.score_transcripts.side_effect = score_transcripts
+    highlight_service.score_transcripts_async = score_transcripts_async
+    return highlight_service
+
+
+def test_keeps_the_chunks_of_lively_windows():
+    transcripts = make_transcripts(20)
+    highlight_service = make_highlight_service(8)
+    kept_before = COARSE_WINDOWS.value(result="kept")
+    skipped_before = COARSE_WINDOWS.value(result="skipped")
+
+    # Like any chunk, a window includes the chunk that crosses its size
+    candidates = CoarseToFineSelector(
+        highlight_service, window_size=300, batch_size=3, token_budget=5000).select(transcripts)
+
+    assert candidates == transcripts[6:12]
+    windows = highlight_service.score_transcripts.call_args.args[0]
+    assert [(window.start_ms, window.end_ms) for window in windows] == [
+        (0, 360000), (360000, 720000), (720000, 1080000), (1080000, 1200000)]
+    assert highlight_service.score_transcripts.call_args.kwargs == {"batch_size": 3, "token_budget": 5000}
+    assert COARSE_WINDOWS.value(result="kept") - kept_before == 1
+    assert COARSE_WINDOWS.value(result="skipped") - skipped_before == 3
+
+
+def test_select_async_matches_select():
+    transcripts = make_transcripts(20)
+    selector = CoarseToFineSelector(make_highlight_service(19), window_size=300)
+
+    assert asyncio.run(selector.select_async(transcripts)) == transcripts[18:]
+    assert selector.select(transcripts) == transcripts[18:]
+    # The chunks themselves are left unscored
+    assert all(transcript.highlight_score is None for transcript in transcripts)
+
+
+def test_windows_must_score_above_the_threshold():
+    transcripts = make_transcripts(20)
+
+    assert CoarseToFineSelector(make_highlight_service(8, score=5), threshold=5).select(transcripts) == []
+    assert CoarseToFineSelector(make_highlight_service(8, score=5.5), threshold=5).select(transcripts) == \
+        transcripts[6:12]
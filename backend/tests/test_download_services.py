@@ -1,8 +1,10 @@
 from pathlib import Path
 import pytest
-from unittest.mock import patch, MagicMock
-from backend.services.youtube_download import VideoDownloadService, AudioDownloadService, TranscriptDownloadService
-from backend.core.constants import AUDIO_FORMAT, DOWNLOADED_AUDIO_PATH, DOWNLOADED_TRANSCRIPT_PATH, DOWNLOADED_VIDEO_PATH, TRANSCRIPT_EXT, VIDEO_FORMAT
+import os
+import threading
+from unittest.mock import ANY, patch, MagicMock
+from backend.services.youtube_download import VideoDownloadService, AudioDownloadService, ChatDownloadService, TranscriptDownloadService
+from backend.core.constants import AUDIO_FORMAT, CHAT_OPTION, DOWNLOADED_AUDIO_PATH, DOWNLOADED_TRANSCRIPT_PATH, DOWNLOADED_VIDEO_PATH, SEGMENT_OPTION, TRANSCRIPT_EXT, VIDEO_FORMAT
 
 URL = "https://www.youtube.com/watch?v=test123"
 TITLE = "Fake / title"
@@ -19,7 +21,8 @@ TITLE = "Fake / title"
 @patch("backend.services.youtube_download.os.path.exists", return_value=True)
 @patch("backend.services.youtube_download.YoutubeDL")
 def test_download_service(mock_youtubedl, _, mock_rename, service_class, expected_format, expected_outtmpl, expected_ext):
-    service = service_class()
+    metadata_service = MagicMock()
+    service = service_class(metadata_service=metadata_service)
 
     mock_instance = MagicMock()
     mock_youtubedl.return_value.__enter__.return_value = mock_instance
@@ -33,7 +36,7 @@ def test_download_service(mock_youtubedl, _, mock_rename, service_class, expecte
             {"filename": f"{expected_outtmpl.replace('%(title)s', sanitized_title).replace('%(ext)s', expected_ext)}"}
         ]
     }
-    mock_instance.extract_info.return_value = dummy_info
+    mock_instance.process_ie_result.return_value = dummy_info
 
     result = service.download(URL)
 
@@ -42,20 +45,24 @@ def test_download_service(mock_youtubedl, _, mock_rename, service_class, expecte
     mock_youtubedl.assert_called_once_with({
         'format': expected_format,
         'outtmpl': expected_outtmpl,
+        'progress_hooks': ANY,
     })
-    mock_instance.extract_info.assert_called_once_with(URL, download=True)
+    # The shared video info is downloaded from instead of being extracted again
+    metadata_service.get_info.assert_called_once_with(URL)
+    mock_instance.process_ie_result.assert_called_once_with(
+        metadata_service.get_info.return_value, download=True)
+    mock_instance.extract_info.assert_not_called()
 
 
 @patch("backend.services.youtube_download.YouTubeTranscriptApi")
-@patch("backend.services.youtube_download.YoutubeDL")
-def test_transcript_download_service(mock_youtubedl, mock_youtube_transcript_api):
-    service = TranscriptDownloadService()
+def test_transcript_download_service(mock_youtube_transcript_api):
+    metadata_service = MagicMock()
+    service = TranscriptDownloadService(metadata_service=metadata_service)
 
     sanitized_title = "Fake _ title"
     fake_transcript_data = {"text": "hello world"}
 
-    mock_youtubedl.return_value.__enter__.return_value.extract_info.return_value = {
-        "title": sanitized_title}
+    metadata_service.get.return_value.title = sanitized_title
     mock_youtube_transcript_api.return_value.fetch.return_value.to_raw_data.return_value = fake_transcript_data
 
     result = service.download(URL)
@@ -65,3 +72,119 @@ def test_transcript_download_service(mock_youtubedl, mock_youtube_transcript_api
         "title": sanitized_title, "ext": TRANSCRIPT_EXT}
 
     assert result == expected_path
+
+
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_chat_download_service(mock_youtubedl, tmp_path):
+    metadata_service = MagicMock()
+    chat_path = tmp_path / "test123.live_chat.json"
+    chat_path.write_text("{}\n")
+    ydl = mock_youtubedl.return_value.__enter__.return_value
+    ydl.process_ie_result.return_value = {
+        "requested_subtitles": {"live_chat": {"ext": "json", "filepath": str(chat_path)}}}
+
+    result = ChatDownloadService(metadata_service=metadata_service).download(URL)
+
+    assert result == str(chat_path)
+    mock_youtubedl.assert_called_once_with(CHAT_OPTION)
+    ydl.process_ie_result.assert_called_once_with(
+        metadata_service.get_info.return_value, download=True)
+
+
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_chat_download_is_abandoned_when_stopped(mock_youtubedl):
+    stop = threading.Event()
+
+    def download(info, download):
+        ydl_opts = mock_youtubedl.call_args.args[0]
+        hook = ydl_opts["progress_hooks"][-1]
+        hook({"status": "downloading"})
+        stop.set()
+        hook({"status": "downloading"})
+
+    mock_youtubedl.return_value.__enter__.return_value.process_ie_result.side_effect = download
+
+    with pytest.raises(InterruptedError):
+        ChatDownloadService(metadata_service=MagicMock()).download(URL, stop=stop)
+
+
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_chat_download_service_without_replay(mock_youtubedl):
+    mock_youtubedl.return_value.__enter__.return_value.process_ie_result.return_value = {
+        "requested_subtitles": None}
+
+    with pytest.raises(FileNotFoundError):
+        ChatDownloadService(metadata_service=MagicMock()).download(URL)
+
+
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_video_download_ranges(mock_youtubedl, tmp_path):
+    requested_ranges = []
+
+    def make_ydl(ydl_opts):
+        # download_range_func yields the sections to download for an info dict
+        section = next(iter(ydl_opts["download_ranges"]({}, None)))
+        requested_ranges.append((section["start_time"], section["end_time"]))
+        output_path = tmp_path / \
+            f"test123_{section['start_time']}-{section['end_time']}.mp4"
+
+        def process_ie_result(info, download):
+            ydl_opts["progress_hooks"][0](
+                {"status": "downloading", "filename": str(output_path), "downloaded_bytes": 50})
+            output_path.write_bytes(b"0" * 100)
+            return {"requested_downloads": [{"filename": str(output_path)}]}
+
+        ydl = MagicMock()
+        ydl.__enter__.return_value.process_ie_result.side_effect = process_ie_result
+        return ydl
+
+    mock_youtubedl.side_effect = make_ydl
+    metadata_service = MagicMock()
+    service = VideoDownloadService(metadata_service=metadata_service)
+
+    result = service.download_ranges(
+        URL, [(1.0, 10.0), (60.0, 90.0)], pad_seconds=2, max_workers=2)
+
+    assert sorted(requested_ranges) == [(0.0, 12.0), (58.0, 92.0)]
+    assert result == [str(tmp_path / "test123_0.0-12.0.mp4"),
+                      str(tmp_path / "test123_58.0-92.0.mp4")]
+    assert service.report.file_count == 2
+    assert service.report.bytes_downloaded == 200
+    assert service.report.peak_disk_bytes == 200
+    assert metadata_service.get_info.call_count == 2
+
+
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_video_download_ranges_to_output_dir(mock_youtubedl, tmp_path):
+    mock_youtubedl.return_value.__enter__.return_value.process_ie_result.return_value = {
+        "requested_downloads": [{"filename": str(tmp_path / "range.mp4")}]}
+
+    VideoDownloadService(metadata_service=MagicMock()).download_ranges(URL, [(1.0, 10.0)], output_dir=str(tmp_path))
+
+    assert mock_youtubedl.call_args.args[0]["outtmpl"] == os.path.join(
+        str(tmp_path), os.path.basename(SEGMENT_OPTION["outtmpl"]))
+
+
+@patch("backend.services.youtube_download.YouTubeTranscriptApi")
+def test_transcript_download_to_output_dir(mock_youtube_transcript_api, tmp_path):
+    metadata_service = MagicMock()
+    metadata_service.get.return_value.title = TITLE
+    mock_youtube_transcript_api.return_value.fetch.return_value.to_raw_data.return_value = [{"text": "hello"}]
+
+    result = TranscriptDownloadService(metadata_service=metadata_service).download(URL, output_dir=str(tmp_path))
+
+    assert result == str(tmp_path / f"Fake _ title.{TRANSCRIPT_EXT}")
+    assert Path(result).exists()
+
+
+@patch("backend.services.youtube_download.os.path.exists", return_value=True)
+@patch("backend.services.youtube_download.YoutubeDL")
+def test_download_to_output_dir(mock_youtubedl, _, tmp_path):
+    ydl = mock_youtubedl.return_value.__enter__.return_value
+    ydl.process_ie_result.return_value = {
+        "title": "title", "ext": "mp3", "requested_downloads": [{"filename": str(tmp_path / "title.mp3")}]}
+
+    result = AudioDownloadService(metadata_service=MagicMock()).download(URL, output_dir=str(tmp_path))
+
+    assert result == str(tmp_path / "title.mp3")
+    assert mock_youtubedl.call_args.args[0]["outtmpl"] == str(tmp_path / "%(title)s.%(ext)s")
@@ -0,0 +1,104 @@
+from backend.core.event_bus import EventBus
+from backend.models.job import JobStage
+from backend.models.progress_event import ProgressEventType
+
+import asyncio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_bus():
+    clock = FakeClock()
+    bus = EventBus(min_interval_seconds=1.0, clock=clock)
+    events = []
+    bus.add_listener(events.append)
+    return bus, clock, events
+
+
+def test_fast_events_are_coalesced():
+    bus, clock, events = _make_bus()
+
+    for downloaded_bytes in range(1000):
+        bus.publish(ProgressEventType.DOWNLOAD, JobStage.DOWNLOADING,
+                    completed=downloaded_bytes, total=999)
+    clock.now = 1.0
+    bus.publish(ProgressEventType.DOWNLOAD, JobStage.DOWNLOADING,
+                completed=1000, total=1000)
+
+    assert [event.completed for event in events] == [0, 1000]
+
+
+def test_pending_events_are_sent_before_the_next_event():
+    bus, clock, events = _make_bus()
+
+    bus.publish(ProgressEventType.SCORING, JobStage.SCORING,
+                progress=0.2, completed=1, total=3)
+    bus.publish(ProgressEventType.SCORING, JobStage.SCORING,
+                progress=0.4, completed=3, total=3)
+    bus.publish(ProgressEventType.STAGE, JobStage.CLIPPING, progress=0.75)
+
+    assert [(event.type, event.completed) for event in events] == [
+        (ProgressEventType.SCORING, 1),
+        (ProgressEventType.SCORING, 3),
+        (ProgressEventType.STAGE, None),
+    ]
+
+
+def test_close_flushes_and_ignores_later_events():
+    bus, clock, events = _make_bus()
+
+    bus.publish(ProgressEventType.DOWNLOAD, JobStage.DOWNLOADING, completed=1)
+    bus.publish(ProgressEventType.DOWNLOAD, JobStage.DOWNLOADING, completed=2)
+    bus.close()
+    bus.publish(ProgressEventType.DONE, JobStage.DONE, progress=1.0)
+
+    assert [event.completed for event in events] == [1, 2]
+
+
+def test_late_subscriber_receives_current_state():
+    bus, clock, _ = _make_bus()
+    bus.publish(ProgressEventType.STAGE, JobStage.DOWNLOADING, progress=0.0)
+    bus.publish(ProgressEventType.STAGE, JobStage.UPLOADING, progress=0.9)
+    for completed in (1, 2):
+        bus.publish(ProgressEventType.UPLOAD, JobStage.UPLOADING,
+                    completed=completed, download_link=f"https://signed/{completed}")
+
+    async def receive():
+        subscription = bus.subscribe()
+        bus.publish(ProgressEventType.DONE, JobStage.DONE, progress=1.0)
+        bus.close()
+        return [event async for event in subscription]
+
+    events = asyncio.run(receive())
+
+    assert [(event.type, event.stage) for event in events] == [
+        (ProgressEventType.STAGE, JobStage.UPLOADING),
+        (ProgressEventType.UPLOAD, JobStage.UPLOADING),
+        (ProgressEventType.UPLOAD, JobStage.UPLOADING),
+        (ProgressEventType.DONE, JobStage.DONE),
+    ]
+
+
+def test_relay_replays_the_current_state_then_forwards():
+    bus, clock, _ = _make_bus()
+    target, _, relayed = _make_bus()
+    bus.publish(ProgressEventType.STAGE, JobStage.UPLOADING, progress=0.9)
+    bus.publish(ProgressEventType.UPLOAD, JobStage.UPLOADING,
+                completed=1, download_link="https://signed/1")
+
+    bus.relay_to(target)
+    bus.publish(ProgressEventType.UPLOAD, JobStage.UPLOADING,
+                completed=2, download_link="https://signed/2")
+
+    assert [(event.type, event.download_link) for event in relayed] == [
+        (ProgressEventType.STAGE, None),
+        (ProgressEventType.UPLOAD, "https://signed/1"),
+        (ProgressEventType.UPLOAD, "https://signed/2"),
+    ]
+    assert relayed[0].progress == 0.9
@@ -0,0 +1,495 @@
+from backend.core.constants import PRERANK_MIN_CHUNKS
+from backend.core.event_bus import EventBus
+from backend.models.generate_highlight_request import DownloadMode, ScoringBackend
+from backend.models.segment import Segment
+from backend.models.progress_event import ProgressEventType
+from backend.services.generate_highlight_coordinator import GenerateHighlightCoordinator
+from backend.services.highlight_ranking import HighlightRanker
+from backend.services.job_registry import JobRegistry
+from backend.services.media_store import MediaStore
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Barrier, Event, Lock
+from unittest.mock import ANY, patch
+from youtube_transcript_api import TranscriptsDisabled
+
+import asyncio
+import os
+import time
+import numpy as np
+import pytest
+
+URL = "https://www.youtube.com/watch?v=UcE0Go6I0XI"
+HIGHLIGHTS = [
+    Segment.from_timestamps("00:01:00.000", "00:02:00.500"),
+    Segment.from_timestamps("01:00:00.000", "01:00:30.000"),
+]
+CLIPS = ["./clip_a.mp4", "./clip_b.mp4"]
+
+
+def _stream_highlights(highlights):
+    """
+    Returns a stand-in for stream_highlights_async that emits the given highlights.
+    """
+    async def stream_highlights_async(transcripts, on_highlight):
+        for highlight in highlights:
+            on_highlight(highlight)
+        return highlights
+    return stream_highlights_async
+
+
+def _clip_path(highlight):
+    return CLIPS[HIGHLIGHTS.index(highlight)]
+
+
+@pytest.fixture
+def services():
+    """
+    Stubs every service used by the pipeline and counts pipeline executions.
+    """
+    module = "backend.services.generate_highlight_coordinator"
+    with patch(f"{module}.VideoDownloadService") as video_service, \
+            patch(f"{module}.AudioDownloadService"), \
+            patch(f"{module}.ChatDownloadService") as chat_service, \
+            patch(f"{module}.get_media_store") as media_store, \
+            patch(f"{module}.TranscriptDownloadService") as transcript_service, \
+            patch(f"{module}.TranscriptParser"), \
+            patch(f"{module}.HighlightDetectionService") as highlight_service, \
+            patch(f"{module}.get_score_cache"), \
+            patch(f"{module}.VideoClippingService") as clipping_service, \
+            patch(f"{module}.GoogleCloudStorage") as gcs_service:
+        executions = []
+        lock = Lock()
+
+        def slow_download(video_url, output_dir=None):
+            with lock:
+                executions.append(video_url)
+            time.sleep(0.2)
+            return "./transcript.json"
+
+        transcript_service.return_value.download.side_effect = slow_download
+        # Every download goes through, as if the store were empty
+        media = media_store.return_value.acquire.return_value.__enter__.return_value
+        media.fetch.side_effect = lambda name, download: download()
+        media.staging_directory.side_effect = lambda name: f"./staging/{name}"
+        media.directory.side_effect = lambda name: f"./media/{name}"
+        chat_service.return_value.download.side_effect = FileNotFoundError("No live chat replay")
+        video_service.return_value.download.return_value = "./video.mp4"
+        highlight_service.return_value.stream_highlights_async = _stream_highlights(
+            HIGHLIGHTS)
+        clipping_service.return_value.clip.side_effect = lambda highlights: [
+            _clip_path(highlights[0])]
+        gcs = gcs_service.return_value
+        gcs.upload_file.side_effect = lambda path, blob_name: blob_name
+        gcs.generate_signed_url.side_effect = lambda blob_name: f"https://signed/{blob_name}"
+
+        yield executions, gcs, video_service.return_value, clipping_service, highlight_service
+
+
+def test_concurrent_requests_share_one_pipeline(services):
+    executions, gcs, *_ = services
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+    callers = 8
+    barrier = Barrier(callers)
+
+    def request(_):
+        barrier.wait()
+        return coordinator.run(URL)
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        responses = list(executor.map(request, range(callers)))
+
+    assert len(executions) == 1
+    assert gcs.upload_file.call_count == 2
+    assert {"transcript_download", "parse", "score", "clip", "upload", "total"} <= \
+        max(responses, key=lambda response: len(response.timings)).timings.keys()
+    for response in responses:
+        assert response.download_links == [
+            "https://signed/UcE0Go6I0XI/clip_a.mp4", "https://signed/UcE0Go6I0XI/clip_b.mp4"]
+
+
+def test_finished_job_is_served_from_cache(services):
+    executions, gcs, *_ = services
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+
+    coordinator.run(URL)
+    response = coordinator.run("https://youtu.be/UcE0Go6I0XI?t=42")
+
+    assert len(executions) == 1
+    assert gcs.upload_file.call_count == 2
+    # Once per uploaded clip for its event, then once per clip for each response
+    assert gcs.generate_signed_url.call_count == 6
+    assert response.download_links[0] == "https://signed/UcE0Go6I0XI/clip_a.mp4"
+
+
+def test_missing_objects_rerun_the_pipeline(services):
+    executions, gcs, *_ = services
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+    coordinator.run(URL)
+
+    # The first object disappeared from the bucket
+    signed_urls = iter(["", "https://signed/b"])
+    gcs.generate_signed_url.side_effect = lambda blob_name: next(
+        signed_urls, f"https://signed/{blob_name}")
+    coordinator.run(URL)
+
+    assert len(executions) == 2
+
+
+def test_failed_pipeline_is_not_cached(services):
+    executions, gcs, *_ = services
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+    gcs.upload_file.side_effect = RuntimeError("upload failed")
+
+    with pytest.raises(RuntimeError):
+        coordinator.run(URL)
+    gcs.upload_file.side_effect = lambda path, blob_name: blob_name
+    coordinator.run(URL)
+
+    assert len(executions) == 2
+
+
+def test_coalesced_jobs_receive_the_events_of_the_run(services):
+    executions, gcs, *_ = services
+    registry = JobRegistry()
+    owner_events, follower_events = EventBus(), EventBus()
+    owner_received, follower_received = [], []
+    owner_events.add_listener(owner_received.append)
+    follower_events.add_listener(follower_received.append)
+    follower = GenerateHighlightCoordinator(job_registry=registry)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner_response = executor.submit(GenerateHighlightCoordinator(job_registry=registry).run,
+                                         URL, event_bus=owner_events)
+        # Joins while the owner is still downloading the transcript
+        time.sleep(0.05)
+        follower_response = follower.run(URL, event_bus=follower_events)
+        owner_response = owner_response.result()
+
+    assert len(executions) == 1
+    links = ["https://signed/UcE0Go6I0XI/clip_a.mp4", "https://signed/UcE0Go6I0XI/clip_b.mp4"]
+    for received in (owner_received, follower_received):
+        assert sorted(event.download_link for event in received
+                      if event.type == ProgressEventType.UPLOAD) == links
+    assert follower_response.timings == owner_response.timings
+    assert "score" in follower_response.timings
+
+
+def test_range_download_mode_skips_full_download(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    video_service.download_ranges.side_effect = lambda url, time_ranges, **kwargs: [
+        CLIPS[0] if time_ranges[0][0] == 60.0 else CLIPS[1]]
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+
+    response = coordinator.run(URL, download_mode=DownloadMode.RANGES)
+
+    video_service.download.assert_not_called()
+    clipping_service.assert_not_called()
+    video_service.download_ranges.assert_any_call(
+        URL, [(60.0, 120.5)], max_workers=1, tracker=ANY, output_dir="./media/ranges")
+    video_service.download_ranges.assert_any_call(
+        URL, [(3600.0, 3630.0)], max_workers=1, tracker=ANY, output_dir="./media/ranges")
+    assert response.download_links == [
+        "https://signed/UcE0Go6I0XI/clip_a.mp4", "https://signed/UcE0Go6I0XI/clip_b.mp4"]
+
+
+def test_range_downloads_are_capped_per_job(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    module = "backend.services.generate_highlight_coordinator"
+    highlights = [Segment(index * 60000, index * 60000 + 30000, "") for index in range(8)]
+    highlight_service.return_value.stream_highlights_async = _stream_highlights(highlights)
+    in_flight = 0
+    max_in_flight = 0
+    lock = Lock()
+
+    def download_ranges(url, time_ranges, **kwargs):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return [f"./clip_{time_ranges[0][0]:.0f}.mp4"]
+
+    video_service.download_ranges.side_effect = download_ranges
+    with patch(f"{module}.MAX_CLIP_WORKERS", 4), patch(f"{module}.MAX_SEGMENT_DOWNLOAD_WORKERS", 2):
+        response = GenerateHighlightCoordinator(job_registry=JobRegistry()).run(
+            URL, download_mode=DownloadMode.RANGES)
+
+    assert len(response.download_links) == 8
+    assert max_in_flight == 2
+
+
+def test_first_link_is_published_before_scoring_finishes(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    first_link = Event()
+
+    async def stream_highlights_async(transcripts, on_highlight):
+        on_highlight(HIGHLIGHTS[0])
+        # The second highlight is only emitted once the first one is online
+        assert first_link.wait(timeout=5)
+        on_highlight(HIGHLIGHTS[1])
+        return HIGHLIGHTS
+
+    highlight_service.return_value.stream_highlights_async = stream_highlights_async
+    links = []
+
+    def on_event(event):
+        if event.type == ProgressEventType.UPLOAD:
+            links.append(event.download_link)
+            first_link.set()
+
+    event_bus = EventBus()
+    event_bus.add_listener(on_event)
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+    response = coordinator.run(URL, event_bus=event_bus)
+
+    assert links[0] == "https://signed/UcE0Go6I0XI/clip_a.mp4"
+    assert sorted(links) == response.download_links
+
+
+def test_lagging_clips_do_not_block_scoring(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    module = "backend.services.generate_highlight_coordinator"
+    highlights = [Segment(index * 60000, index * 60000 + 30000, "") for index in range(6)]
+    scoring_done = Event()
+    clipped_after_scoring = []
+
+    async def stream_highlights_async(transcripts, on_highlight):
+        for highlight in highlights:
+            on_highlight(highlight)
+            # Other requests on the loop keep going while the clip stage is full
+            await asyncio.sleep(0)
+        scoring_done.set()
+        return highlights
+
+    def clip(highlights_to_clip):
+        clipped_after_scoring.append(scoring_done.wait(timeout=5))
+        return [f"./clip_{highlights_to_clip[0].start_ms}.mp4"]
+
+    highlight_service.return_value.stream_highlights_async = stream_highlights_async
+    clipping_service.return_value.clip.side_effect = clip
+    with patch(f"{module}.PIPELINE_QUEUE_SIZE", 1), patch(f"{module}.MAX_CLIP_WORKERS", 1):
+        response = GenerateHighlightCoordinator(job_registry=JobRegistry()).run(URL)
+
+    assert len(response.download_links) == 6
+    assert all(clipped_after_scoring)
+
+
+def _run_prefiltered(audio_scores, chat_scores, download_chat=None) -> tuple:
+    """
+    Runs the pipeline on PRERANK_MIN_CHUNKS chunks with the given audio and
+    chat scores, an exception standing for a failed analysis, and the chat
+    downloaded by download_chat if given.
+
+    :return: (the chunks sent to scoring, the coordinator)
+    """
+    module = "backend.services.generate_highlight_coordinator"
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}")
+                   for index in range(PRERANK_MIN_CHUNKS)]
+    scored = []
+
+    async def stream_highlights_async(transcripts, on_highlight):
+        scored.extend(transcripts)
+        return []
+
+    with patch(f"{module}.HighlightDetectionService") as highlight_service, \
+            patch(f"{module}.TranscriptParser") as parser, \
+            patch(f"{module}.ChatDownloadService") as chat_download_service, \
+            patch(f"{module}.AudioExtractionService") as audio_service, \
+            patch(f"{module}.ChatAnalysisService") as chat_service:
+        highlight_service.return_value.stream_highlights_async = stream_highlights_async
+        parser.return_value.parse.return_value = transcripts
+        if download_chat is not None:
+            chat_download_service.return_value.download.side_effect = download_chat
+        for service, scores in ((audio_service, audio_scores), (chat_service, chat_scores)):
+            if isinstance(scores, Exception):
+                service.return_value.score_chunks.side_effect = scores
+            else:
+                service.return_value.score_chunks.return_value = np.asarray(scores, dtype=float)
+        coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+        coordinator.run(URL)
+
+    return [transcripts.index(chunk) for chunk in scored], coordinator
+
+
+def test_long_transcripts_are_prefiltered_by_audio(services):
+    # The 6 loudest chunks and their neighbours
+    scored, coordinator = _run_prefiltered(np.arange(PRERANK_MIN_CHUNKS), RuntimeError("no chat"))
+
+    assert scored == list(range(PRERANK_MIN_CHUNKS - 7, PRERANK_MIN_CHUNKS))
+    assert "audio_analysis" in coordinator.timings.as_dict()
+
+
+def test_long_transcripts_are_prefiltered_by_chat(services):
+    scored, coordinator = _run_prefiltered(RuntimeError("no audio"), -np.arange(PRERANK_MIN_CHUNKS))
+
+    assert scored == list(range(7))
+    assert "chat_analysis" in coordinator.timings.as_dict()
+
+
+def test_audio_and_chat_scores_are_combined(services):
+    audio_scores = np.zeros(PRERANK_MIN_CHUNKS)
+    chat_scores = np.zeros(PRERANK_MIN_CHUNKS)
+    # Loud but quiet chat, lively chat but quiet, and both
+    audio_scores[[5, 20]] = 3
+    chat_scores[[12, 20]] = 3
+    audio_scores[[25, 26, 27, 28]] = 1
+
+    scored, _ = _run_prefiltered(audio_scores, chat_scores)
+
+    assert 20 in scored and 5 in scored and 12 in scored
+    assert {19, 21} <= set(scored)
+
+
+def test_late_chat_is_abandoned(services):
+    stops = []
+
+    def download_chat(video_url, output_dir=None, stop=None):
+        stops.append(stop)
+        stop.wait(5)
+        raise FileNotFoundError("Live chat replay no longer needed")
+
+    started = time.perf_counter()
+    with patch("backend.services.generate_highlight_coordinator.PRERANK_SIGNAL_TIMEOUT_SECONDS", 0.1):
+        scored, coordinator = _run_prefiltered(
+            np.arange(PRERANK_MIN_CHUNKS), np.zeros(PRERANK_MIN_CHUNKS), download_chat)
+
+    # Ranked by audio alone, without waiting for the chat download to end
+    assert scored == list(range(PRERANK_MIN_CHUNKS - 7, PRERANK_MIN_CHUNKS))
+    assert stops[0].is_set()
+    assert time.perf_counter() - started < 5
+
+
+def test_failed_prefilter_scores_every_chunk(services):
+    scored, _ = _run_prefiltered(RuntimeError("no audio"), FileNotFoundError("no chat"))
+
+    assert scored == list(range(PRERANK_MIN_CHUNKS))
+
+
+def test_coarse_to_fine_scores_only_the_chunks_of_lively_windows(services):
+    module = "backend.services.generate_highlight_coordinator"
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}") for index in range(4)]
+    scored = []
+
+    async def stream_highlights_async(transcripts, on_highlight):
+        scored.extend(transcripts)
+        return []
+
+    async def select_async(transcripts):
+        return transcripts[1:3]
+
+    with patch(f"{module}.COARSE_TO_FINE_ENABLED", True), \
+            patch(f"{module}.HighlightDetectionService") as highlight_service, \
+            patch(f"{module}.TranscriptParser") as parser, \
+            patch(f"{module}.CoarseToFineSelector") as selector:
+        highlight_service.return_value.stream_highlights_async = stream_highlights_async
+        parser.return_value.parse.return_value = transcripts
+        selector.return_value.select_async = select_async
+        coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+        coordinator.run(URL)
+
+    assert scored == transcripts[1:3]
+    assert "coarse_score" in coordinator.timings.as_dict()
+
+
+def test_highlight_ranking_fuses_the_signals_of_every_chunk(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    module = "backend.services.generate_highlight_coordinator"
+    transcripts = [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}")
+                   for index in range(PRERANK_MIN_CHUNKS)]
+    clipped = []
+
+    async def score_transcripts_async(candidates, batch_size):
+        for chunk in candidates:
+            chunk.highlight_score = 9 if chunk is transcripts[-3] else 0
+        return candidates
+
+    with patch(f"{module}.HIGHLIGHT_RANKING_ENABLED", True), \
+            patch(f"{module}.TranscriptParser") as parser, \
+            patch(f"{module}.ChatDownloadService"), \
+            patch(f"{module}.AudioExtractionService") as audio_service, \
+            patch(f"{module}.ChatAnalysisService") as chat_service:
+        parser.return_value.parse.return_value = transcripts
+        audio_service.return_value.score_chunks.return_value = np.arange(PRERANK_MIN_CHUNKS, dtype=float)
+        chat_service.return_value.score_chunks.return_value = np.zeros(PRERANK_MIN_CHUNKS)
+        highlight_service.return_value.score_transcripts_async = score_transcripts_async
+        highlight_service.return_value.rank_highlights.side_effect = HighlightRanker().rank
+        clipping_service.return_value.clip.side_effect = lambda highlights: clipped.extend(highlights) or [CLIPS[0]]
+        GenerateHighlightCoordinator(job_registry=JobRegistry()).run(URL)
+
+    ranked, signals = highlight_service.return_value.rank_highlights.call_args.args
+    # Every chunk is ranked, the ones left out by pre-ranking by their audio and chat alone
+    assert ranked == transcripts
+    assert set(signals) == {"audio", "chat"}
+    def is_clipped(chunk):
+        return any(clip.start_ms <= chunk.start_ms < clip.end_ms for clip in clipped)
+
+    # The AI highlight, and a loud chunk left out by pre-ranking but not a quiet one
+    assert is_clipped(transcripts[-3])
+    assert is_clipped(transcripts[-8]) and transcripts[-8].highlight_score is None
+    assert not is_clipped(transcripts[5])
+
+
+def test_scoring_backend_selects_the_scorer_and_its_own_clips(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+
+    with patch("backend.services.generate_highlight_coordinator.create_scorer") as create_scorer:
+        gemini = coordinator.run(URL)
+        heuristic = coordinator.run(URL, scoring_backend=ScoringBackend.HEURISTIC)
+        coordinator.run(URL, scoring_backend=ScoringBackend.HEURISTIC)
+
+    assert [c.args for c in create_scorer.call_args_list] == [(ScoringBackend.GEMINI,), (ScoringBackend.HEURISTIC,)]
+    highlight_service.assert_called_with(score_cache=ANY, progress_callback=ANY, scorer=create_scorer.return_value)
+    assert len(executions) == 2
+    assert gemini.download_links[0] == "https://signed/UcE0Go6I0XI/clip_a.mp4"
+    assert heuristic.download_links[0] == "https://signed/UcE0Go6I0XI/heuristic/clip_a.mp4"
+
+
+def test_videos_without_captions_are_transcribed(services):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    module = "backend.services.generate_highlight_coordinator"
+
+    with patch(f"{module}.TranscriptDownloadService") as transcript_service, \
+            patch(f"{module}.AudioDownloadService") as audio_service, \
+            patch(f"{module}.TranscriptionService") as transcription_service, \
+            patch(f"{module}.TranscriptParser") as parser:
+        transcript_service.return_value.download.side_effect = TranscriptsDisabled("UcE0Go6I0XI")
+        audio_service.return_value.download.return_value = "./audio.mp3"
+        transcription_service.return_value.transcribe.return_value = "./audio.json"
+        coordinator = GenerateHighlightCoordinator(job_registry=JobRegistry())
+        response = coordinator.run(URL)
+
+    transcription_service.return_value.transcribe.assert_called_once_with(
+        "./audio.mp3", output_path="./staging/transcript/transcript.json")
+    parser.return_value.parse.assert_called_once_with("./audio.json")
+    assert len(response.download_links) == 2
+    assert "transcription" in coordinator.timings.as_dict()
+
+
+def test_second_job_on_a_video_skips_the_downloads(services, tmp_path):
+    executions, gcs, video_service, clipping_service, highlight_service = services
+    media_store = MediaStore(root=str(tmp_path / "store"), quota_bytes=10 ** 6)
+
+    def download(name):
+        def write_file(video_url, output_dir):
+            path = Path(output_dir) / name
+            path.write_bytes(b"0" * 100)
+            return str(path)
+        return write_file
+
+    video_service.download.side_effect = download("video.mp4")
+    module = "backend.services.generate_highlight_coordinator"
+    with patch(f"{module}.TranscriptDownloadService") as transcript_service, \
+            patch(f"{module}.AudioDownloadService") as audio_service:
+        transcript_service.return_value.download.side_effect = download("transcript.json")
+        audio_service.return_value.download.side_effect = download("audio.mp3")
+        for _ in range(2):
+            GenerateHighlightCoordinator(job_registry=JobRegistry(), media_store=media_store).run(URL)
+
+    assert video_service.download.call_count == 1
+    assert transcript_service.return_value.download.call_count == 1
+    clipping_service.assert_called_with(str(tmp_path / "store" / "UcE0Go6I0XI" / "video.mp4"))
+    assert sorted(os.listdir(tmp_path / "store" / "UcE0Go6I0XI" / ".staging")) == []
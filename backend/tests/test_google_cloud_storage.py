@@ -0,0 +1,155 @@
+from backend.benchmarks.fake_gcs_server import FakeGcsServer
+from backend.services.google_cloud_storage import GoogleCloudStorage
+from backend.services.resumable_upload import ResumableUploader, TransientUploadError
+
+from google.api_core.client_options import ClientOptions
+from google.api_core.exceptions import ServiceUnavailable
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+from unittest.mock import patch
+
+import os
+import pytest
+import requests
+
+CHUNK_SIZE = 256 * 1024
+
+
+@pytest.fixture
+def fake_gcs():
+    with FakeGcsServer() as server:
+        yield server
+
+
+def make_bucket(server: FakeGcsServer) -> storage.Bucket:
+    client = storage.Client(project="test", credentials=AnonymousCredentials(),
+                            client_options=ClientOptions(api_endpoint=server.base_url))
+    return client.bucket(server.bucket_name)
+
+
+def make_file(tmp_path, size: int) -> tuple:
+    content = os.urandom(size)
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(content)
+    return str(path), content
+
+
+def make_uploader(server: FakeGcsServer, **kwargs) -> ResumableUploader:
+    return ResumableUploader(make_bucket(server), chunk_size=CHUNK_SIZE,
+                             sleep=lambda seconds: None, **kwargs)
+
+
+@pytest.mark.parametrize("size", [0, 1000, CHUNK_SIZE, 3 * CHUNK_SIZE + 17])
+def test_upload_in_chunks(fake_gcs, tmp_path, size):
+    file_path, content = make_file(tmp_path, size)
+
+    report = make_uploader(fake_gcs).upload(file_path, "video/clip.mp4")
+
+    assert fake_gcs.objects["video/clip.mp4"] == content
+    assert fake_gcs.chunk_request_count == -(-size // CHUNK_SIZE)
+    assert report.bytes_uploaded == size
+    assert report.part_count == 1
+    assert report.retry_count == 0
+
+
+def test_failed_chunks_resume_from_persisted_bytes(fake_gcs, tmp_path):
+    file_path, content = make_file(tmp_path, 4 * CHUNK_SIZE)
+    fake_gcs.fail_chunk_requests = {2, 3, 5}
+    sleeps = []
+
+    uploader = ResumableUploader(make_bucket(fake_gcs), chunk_size=CHUNK_SIZE,
+                                 backoff_seconds=1, sleep=sleeps.append)
+    report = uploader.upload(file_path, "clip.mp4")
+
+    assert fake_gcs.objects["clip.mp4"] == content
+    assert report.retry_count == 3
+    # The second failure in a row waits about twice as long
+    assert 0.5 <= sleeps[0] <= 1.5 and 1 <= sleeps[1] <= 3
+    # Half of every failed chunk was persisted, so every retry resumes from there
+    # and two failures in a row cost one extra request only
+    assert fake_gcs.chunk_request_count == 4 + 2
+
+
+def test_stalled_chunks_time_out_and_resume(fake_gcs, tmp_path):
+    file_path, content = make_file(tmp_path, 3 * CHUNK_SIZE)
+    fake_gcs.stall_chunk_requests = {2}
+    fake_gcs.stall_seconds = 2
+
+    report = make_uploader(fake_gcs, timeout=(1, 0.5)).upload(file_path, "clip.mp4")
+
+    assert fake_gcs.objects["clip.mp4"] == content
+    assert report.retry_count == 1
+    assert fake_gcs.chunk_request_count == 3 + 1
+
+
+def test_upload_gives_up_after_max_retries(fake_gcs, tmp_path):
+    file_path, _ = make_file(tmp_path, 2 * CHUNK_SIZE)
+    fake_gcs.fail_chunk_requests = set(range(1, 100))
+
+    with pytest.raises(TransientUploadError):
+        make_uploader(fake_gcs, max_retries=3).upload(file_path, "clip.mp4")
+    assert "clip.mp4" not in fake_gcs.objects
+
+
+def test_large_files_are_composed_from_parallel_parts(fake_gcs, tmp_path):
+    file_path, content = make_file(tmp_path, 10 * CHUNK_SIZE + 5)
+    fake_gcs.fail_chunk_requests = {4}
+
+    report = make_uploader(fake_gcs, composite_threshold=4 * CHUNK_SIZE, max_parts=4).upload(
+        file_path, "video/clip.mp4")
+
+    assert fake_gcs.objects["video/clip.mp4"] == content
+    assert fake_gcs.compose_count == 1
+    # Temporary parts are deleted
+    assert list(fake_gcs.objects) == ["video/clip.mp4"]
+    assert report.part_count == 4
+    assert report.retry_count == 1
+    assert report.throughput > 0
+
+
+def test_parts_are_deleted_when_an_upload_fails(fake_gcs, tmp_path):
+    file_path, _ = make_file(tmp_path, 8 * CHUNK_SIZE)
+    fake_gcs.fail_chunk_requests = set(range(3, 100))
+
+    with pytest.raises(TransientUploadError):
+        make_uploader(fake_gcs, composite_threshold=CHUNK_SIZE, max_parts=4,
+                      max_retries=1).upload(file_path, "clip.mp4")
+    assert fake_gcs.objects == {}
+
+
+def test_failed_part_deletion_does_not_hide_the_upload_error(fake_gcs, tmp_path):
+    file_path, _ = make_file(tmp_path, 8 * CHUNK_SIZE)
+    fake_gcs.fail_chunk_requests = set(range(3, 100))
+
+    with patch.object(storage.Blob, "delete", side_effect=ServiceUnavailable("down")) as delete, \
+            pytest.raises(TransientUploadError):
+        make_uploader(fake_gcs, composite_threshold=CHUNK_SIZE, max_parts=4,
+                      max_retries=1).upload(file_path, "clip.mp4")
+    assert delete.call_count == 4
+
+
+def test_chunks_go_through_the_shared_session(fake_gcs, tmp_path):
+    file_path, content = make_file(tmp_path, 2 * CHUNK_SIZE)
+    session = requests.Session()
+
+    with patch.object(session, "put", wraps=session.put) as put:
+        make_uploader(fake_gcs, session=session).upload(file_path, "clip.mp4")
+
+    assert fake_gcs.objects["clip.mp4"] == content
+    assert put.call_count == 2
+
+
+def test_chunk_size_must_be_aligned(fake_gcs):
+    with pytest.raises(ValueError):
+        ResumableUploader(make_bucket(fake_gcs), chunk_size=1000)
+
+
+def test_google_cloud_storage_upload_file(fake_gcs, tmp_path):
+    file_path, content = make_file(tmp_path, 1000)
+    gcs = GoogleCloudStorage(client=make_bucket(fake_gcs).client,
+                             bucket_name=fake_gcs.bucket_name)
+
+    assert gcs.upload_file(file_path, "video/clip.mp4") == "video/clip.mp4"
+    assert fake_gcs.objects["video/clip.mp4"] == content
+    assert gcs.report.bytes_uploaded == 1000
@@ -1,128 +1,385 @@
-from backend.core.constants import END, HIGHLIGHT_SCORE, REASON, START, TEXT
+from backend.core.constants import HIGHLIGHT_DETECTION_BATCH_INSTRUCTION, HIGHLIGHT_SCORE, INDEX, REASON, SCORING_BATCH_SIZE, TEXT, THRESHOLD_SCORE
+from backend.models.segment import Segment
 from backend.services.highlight_detection import HighlightDetectionService
-from unittest.mock import patch, MagicMock
+from backend.services.score_cache import ScoreCache
+from backend.services.scorers import GeminiScorer, HeuristicScorer
+from backend.core.rate_limiter import RateLimiter
+from backend.core.tokens import TokenCounter
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
+import asyncio
+import json
+import math
+import pytest
 
-@patch("backend.services.highlight_detection.genai.Client")
-def test_score_transcripts(client_mock):
-    service = HighlightDetectionService()
+
+def test_score_transcripts():
+    client_mock = MagicMock()
+    service = HighlightDetectionService(client=client_mock)
 
     ai_response_mock = MagicMock()
     ai_response_mock.text = '```json\n{"highlight_score": 0.8, "reason": "mock reason"}\n```'
 
-    client_mock_instance = client_mock.return_value
-    client_mock_instance.models.generate_content.return_value = ai_response_mock
+    client_mock.models.generate_content.return_value = ai_response_mock
 
     transcripts = [
-        {
-            START: "00:00:01.000",
-            END: "00:00:05.000",
-            TEXT: "This is a test highlight."
-        },
-        {
-            START: "00:00:06.000",
-            END: "00:00:10.000",
-            TEXT: "This is another highlight."
-        }
+        Segment(1000, 5000, "This is a test highlight."),
+        Segment(6000, 10000, "This is another highlight."),
     ]
 
     scored_transcripts = service.score_transcripts(transcripts)
 
     assert len(scored_transcripts) == 2
-    assert scored_transcripts[0][HIGHLIGHT_SCORE] == 0.8
-    assert scored_transcripts[0][REASON] == "mock reason"
-    assert scored_transcripts[0][START] == "00:00:01.000"
-    assert scored_transcripts[0][END] == "00:00:05.000"
-    assert scored_transcripts[0][TEXT] == "This is a test highlight."
-    assert scored_transcripts[1][START] == "00:00:06.000"
-    assert scored_transcripts[1][END] == "00:00:10.000"
-    assert scored_transcripts[1][TEXT] == "This is another highlight."
-    assert scored_transcripts[1][HIGHLIGHT_SCORE] == 0.8
-    assert scored_transcripts[1][REASON] == "mock reason"
-
-
-@patch("backend.services.highlight_detection.genai.Client")
-def test_detect_highlights(_):
-    service = HighlightDetectionService()
+    assert scored_transcripts[0].highlight_score == 0.8
+    assert scored_transcripts[0].reason == "mock reason"
+    assert scored_transcripts[0].start_ms == 1000
+    assert scored_transcripts[0].end_ms == 5000
+    assert scored_transcripts[0].text == "This is a test highlight."
+    assert scored_transcripts[1].start_ms == 6000
+    assert scored_transcripts[1].end_ms == 10000
+    assert scored_transcripts[1].text == "This is another highlight."
+    assert scored_transcripts[1].highlight_score == 0.8
+    assert scored_transcripts[1].reason == "mock reason"
+
+
+def test_detect_highlights():
+    service = HighlightDetectionService(client=MagicMock())
 
     transcripts = [
-        {
-            START: "00:00:01.000",
-            END: "00:00:05.000",
-            TEXT: "This is a test highlight.",
-            HIGHLIGHT_SCORE: 8,
-            REASON: "Interesting moment"
-        },
-        {
-            START: "00:00:06.000",
-            END: "00:00:10.000",
-            TEXT: "This is another highlight.",
-            HIGHLIGHT_SCORE: 0,
-            REASON: "Not interesting"
-        },
-        {
-            START: "00:00:11.000",
-            END: "00:00:15.000",
-            TEXT: "This is a third highlight.",
-            HIGHLIGHT_SCORE: 9,
-            REASON: "Very interesting"
-        }
+        Segment(1000, 5000, "This is a test highlight.",
+                highlight_score=8, reason="Interesting moment"),
+        Segment(6000, 10000, "This is another highlight.",
+                highlight_score=0, reason="Not interesting"),
+        Segment(11000, 15000, "This is a third highlight.",
+                highlight_score=9, reason="Very interesting"),
     ]
 
     highlights = service.detect_highlights(transcripts)
 
-    assert len(highlights) == 2
-    assert highlights[0][START] == "00:00:01.000"
-    assert highlights[0][END] == "00:00:05.000"
-    assert highlights[0][TEXT] == "This is a test highlight."
-    assert highlights[0][HIGHLIGHT_SCORE] == 8
-    assert highlights[0][REASON] == "Interesting moment"
-    assert highlights[1][START] == "00:00:11.000"
-    assert highlights[1][END] == "00:00:15.000"
-    assert highlights[1][TEXT] == "This is a third highlight."
-    assert highlights[1][HIGHLIGHT_SCORE] == 9
-    assert highlights[1][REASON] == "Very interesting"
+    assert highlights == [transcripts[0], transcripts[2]]
+
+
+def test_aggregate_highlights():
+    service = HighlightDetectionService(client=MagicMock())
+
+    highlights = [
+        Segment(1000, 5000, "This is a test highlight.",
+                highlight_score=8, reason="Interesting moment"),
+        Segment(5000, 10000, "This is another highlight.",
+                highlight_score=9, reason="Very interesting"),
+        Segment(11000, 15000, "This is a third highlight.",
+                highlight_score=7, reason="Somewhat interesting"),
+    ]
+
+    aggregated_highlights = service.aggregate_highlights(highlights)
+
+    assert aggregated_highlights == [
+        Segment(1000, 10000, "This is a test highlight. This is another highlight.",
+                highlight_score=9, reason="Interesting moment Very interesting"),
+        Segment(11000, 15000, "This is a third highlight.",
+                highlight_score=7, reason="Somewhat interesting"),
+    ]
 
 
-@patch("backend.services.highlight_detection.genai.Client")
-def test_aggregate_highlights(_):
-    service = HighlightDetectionService()
+def test_aggregate_highlights_merges_across_second_boundaries():
+    service = HighlightDetectionService(client=MagicMock())
 
+    # Rounding noise across a second boundary, and a real gap
     highlights = [
-        {
-            START: "00:00:01.000",
-            END: "00:00:05.000",
-            TEXT: "This is a test highlight.",
-            HIGHLIGHT_SCORE: 8,
-            REASON: "Interesting moment"
-        },
-        {
-            START: "00:00:05.000",
-            END: "00:00:10.000",
-            TEXT: "This is another highlight.",
-            HIGHLIGHT_SCORE: 9,
-            REASON: "Very interesting"
-        },
-        {
-            START: "00:00:11.000",
-            END: "00:00:15.000",
-            TEXT: "This is a third highlight.",
-            HIGHLIGHT_SCORE: 7,
-            REASON: "Somewhat interesting"
-        }
+        Segment.from_timestamps("00:00:50.000", "00:00:59.990", "a"),
+        Segment.from_timestamps("00:01:00.000", "00:01:10.000", "b"),
+        Segment.from_timestamps("00:01:12.000", "00:01:20.000", "c"),
     ]
 
     aggregated_highlights = service.aggregate_highlights(highlights)
 
-    assert len(aggregated_highlights) == 2
-    assert aggregated_highlights[0][START] == "00:00:01.000"
-    assert aggregated_highlights[0][END] == "00:00:10.000"
-    assert aggregated_highlights[0][TEXT] == "This is a test highlight. This is another highlight."
-    assert aggregated_highlights[0][HIGHLIGHT_SCORE] == 9
-    assert aggregated_highlights[0][REASON] == "Interesting moment Very interesting"
-
-    assert aggregated_highlights[1][START] == "00:00:11.000"
-    assert aggregated_highlights[1][END] == "00:00:15.000"
-    assert aggregated_highlights[1][TEXT] == "This is a third highlight."
-    assert aggregated_highlights[1][HIGHLIGHT_SCORE] == 7
-    assert aggregated_highlights[1][REASON] == "Somewhat interesting"
+    assert [(h.start_ms, h.end_ms) for h in aggregated_highlights] == [
+        (50000, 70000), (72000, 80000)]
+
+
+class FakeGenaiClient:
+    """
+    Stand-in for genai.Client that scores chunks deterministically from their
+    text and counts the generate_content requests it receives.
+    """
+
+    def __init__(self, max_batch_size: int | None = None, drop_indices: tuple = ()):
+        self.models = self
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self.generate_content_async))
+        self.request_count = 0
+        self.max_batch_size = max_batch_size
+        self.drop_indices = drop_indices
+
+    @staticmethod
+    def score(text: str) -> float:
+        return float(len(text) % 11)
+
+    def generate_content(self, model, contents, config=None):
+        self.request_count += 1
+        payload = contents.split('"""')[1]
+        response = MagicMock()
+
+        if INDEX not in contents:
+            response.text = json.dumps(
+                {HIGHLIGHT_SCORE: self.score(payload), REASON: payload})
+            return response
+
+        chunks = json.loads(payload)
+        if self.max_batch_size is not None and len(chunks) > self.max_batch_size:
+            # Simulate a response cut off by the output token limit
+            response.text = '```json\n[{"index": 0, "highlight_score": 3'
+            return response
+
+        response.text = "```json\n" + json.dumps([
+            {INDEX: chunk[INDEX], HIGHLIGHT_SCORE: self.score(
+                chunk[TEXT]), REASON: chunk[TEXT]}
+            for chunk in chunks if chunk[INDEX] not in self.drop_indices
+        ]) + "\n```"
+        return response
+
+    async def generate_content_async(self, model, contents, config=None):
+        await asyncio.sleep(0)
+        return self.generate_content(model, contents, config)
+
+
+def _make_service(client: FakeGenaiClient, score_cache: ScoreCache | None = None,
+                  **kwargs) -> HighlightDetectionService:
+    return HighlightDetectionService(rate_limiter=RateLimiter(10**6, 10**9), score_cache=score_cache,
+                                     client=client, **kwargs)
+
+
+def _make_transcripts(count: int) -> list:
+    return [Segment(index * 60000, index * 60000 + 59000, "w" * index)
+            for index in range(count)]
+
+
+@pytest.mark.parametrize("batch_size", [3, 5, 12])
+def test_score_transcripts_batched_reduces_requests(batch_size):
+    per_chunk_client = FakeGenaiClient()
+    batched_client = FakeGenaiClient()
+
+    per_chunk = _make_service(per_chunk_client).score_transcripts(
+            _make_transcripts(12))
+    batched = _make_service(batched_client).score_transcripts(
+            _make_transcripts(12), batch_size=batch_size)
+
+    assert per_chunk_client.request_count == 12
+    assert batched_client.request_count == math.ceil(12 / batch_size)
+    assert [t.highlight_score for t in batched] == [
+        t.highlight_score for t in per_chunk]
+    assert [t.reason for t in batched] == [t.reason for t in per_chunk]
+
+
+def test_score_transcripts_batched_splits_truncated_responses():
+    client = FakeGenaiClient(max_batch_size=2)
+
+    scored = _make_service(client).score_transcripts(
+            _make_transcripts(8), batch_size=8)
+
+    # 8 -> 4 + 4 -> 2 + 2 + 2 + 2: one failed request per split level
+    assert client.request_count == 1 + 2 + 4
+    assert [t.highlight_score for t in scored] == [
+        FakeGenaiClient.score("w" * index) for index in range(8)]
+
+
+def test_score_transcripts_batched_falls_back_for_missing_entries():
+    client = FakeGenaiClient(drop_indices=(1, 3))
+
+    scored = _make_service(client).score_transcripts(
+            _make_transcripts(5), batch_size=5)
+
+    # One batched request plus one per-chunk request for each dropped entry
+    assert client.request_count == 1 + 2
+    assert [t.highlight_score for t in scored] == [
+        FakeGenaiClient.score("w" * index) for index in range(5)]
+
+
+def test_score_transcripts_batches_stay_within_the_token_budget():
+    client = FakeGenaiClient()
+
+    scored = _make_service(client, token_counter=TokenCounter(None), token_budget=10).score_transcripts(
+        _make_transcripts(8), batch_size=8)
+
+    # Chunks of 0 to 4 characters fill the first batch, the longer ones are sent alone
+    assert client.request_count == 4
+    assert [t.highlight_score for t in scored] == [
+        FakeGenaiClient.score("w" * index) for index in range(8)]
+
+
+def test_score_transcripts_token_budget_overrides_the_service_budget():
+    client = FakeGenaiClient()
+
+    _make_service(client, token_counter=TokenCounter(None), token_budget=10).score_transcripts(
+        _make_transcripts(8), batch_size=8, token_budget=100)
+
+    assert client.request_count == 1
+
+
+@pytest.mark.parametrize("system_instruction", [True, False])
+def test_instructions_are_sent_once_per_request(system_instruction):
+    client = FakeGenaiClient()
+    requests = []
+    generate_content = client.generate_content
+
+    def record_generate_content(model, contents, config=None):
+        requests.append((contents, config))
+        return generate_content(model, contents, config)
+
+    client.generate_content = record_generate_content
+    _make_service(client, scorer=GeminiScorer(client, system_instruction=system_instruction)).score_transcripts(
+        _make_transcripts(3), batch_size=3)
+
+    (contents, config), = requests
+    if system_instruction:
+        assert config.system_instruction == HIGHLIGHT_DETECTION_BATCH_INSTRUCTION
+        assert HIGHLIGHT_DETECTION_BATCH_INSTRUCTION not in contents
+    else:
+        assert config is None
+        assert contents.startswith(HIGHLIGHT_DETECTION_BATCH_INSTRUCTION)
+
+
+def test_prompts_send_compacted_text():
+    transcript = Segment(0, 60000, "[音楽] [音楽]  えーあのー配信 [音楽]")
+
+    _make_service(FakeGenaiClient()).score_transcripts([transcript])
+
+    # The fake model echoes the text it was sent as the reason
+    assert transcript.reason == "[音楽] えー配信 [音楽]"
+    assert transcript.text == "[音楽] [音楽]  えーあのー配信 [音楽]"
+
+
+def test_score_transcripts_async_matches_serial_scores():
+    serial_client = FakeGenaiClient()
+    async_client = FakeGenaiClient(drop_indices=(2,))
+
+    serial = _make_service(serial_client).score_transcripts(
+        _make_transcripts(12))
+    concurrent = asyncio.run(_make_service(async_client).score_transcripts_async(
+        _make_transcripts(12), batch_size=4, max_concurrency=3))
+
+    # Three batches plus one fallback request for each dropped entry
+    assert async_client.request_count == 3 + 3
+    assert [t.highlight_score for t in concurrent] == [
+        t.highlight_score for t in serial]
+
+
+def test_score_transcripts_async_bounds_concurrency():
+    client = FakeGenaiClient()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_generate_content(model, contents, config=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return client.generate_content(model, contents, config)
+
+    client.aio.models.generate_content = slow_generate_content
+    asyncio.run(_make_service(client).score_transcripts_async(
+        _make_transcripts(10), max_concurrency=4))
+
+    assert client.request_count == 10
+    assert max_in_flight == 4
+
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_score_transcripts_skips_cached_chunks(batch_size):
+    score_cache = ScoreCache(path=":memory:")
+    first_client = FakeGenaiClient()
+    second_client = FakeGenaiClient()
+
+    first = _make_service(first_client, score_cache).score_transcripts(
+        _make_transcripts(8), batch_size=batch_size)
+    second = _make_service(second_client, score_cache).score_transcripts(
+        _make_transcripts(10), batch_size=batch_size)
+
+    # Only the two chunks that were not part of the first run are requested
+    assert second_client.request_count == (2 if batch_size == 1 else 1)
+    assert score_cache.hits == 8
+    assert [t.highlight_score for t in second[:8]] == [
+        t.highlight_score for t in first]
+
+
+def test_score_transcripts_does_not_cache_parse_failures():
+    score_cache = ScoreCache(path=":memory:")
+    client = FakeGenaiClient()
+    client.generate_content = MagicMock(
+        return_value=MagicMock(text="not json"))
+
+    _make_service(client, score_cache).score_transcripts(_make_transcripts(3))
+
+    assert len(score_cache) == 0
+
+
+def test_local_scorer_skips_the_cache_and_rate_limiter():
+    score_cache = MagicMock()
+    service = HighlightDetectionService(score_cache=score_cache, scorer=HeuristicScorer())
+    transcripts = [Segment(0, 60000, "今日は雑談です"), Segment(60000, 120000, "やばい！www 草")]
+
+    scored = asyncio.run(service.score_transcripts_async(transcripts, batch_size=SCORING_BATCH_SIZE))
+
+    assert service.rate_limiter is None
+    score_cache.get.assert_not_called()
+    score_cache.set.assert_not_called()
+    assert scored[0].highlight_score == 0
+    assert scored[1].highlight_score > 0
+    assert service.score_transcripts(transcripts) == scored
+
+
+def test_scores_are_cached_per_scorer_model():
+    score_cache = ScoreCache(path=":memory:")
+    gemini_client = FakeGenaiClient()
+    other_client = FakeGenaiClient()
+
+    _make_service(gemini_client, score_cache).score_transcripts(_make_transcripts(3))
+    _make_service(other_client, score_cache, scorer=GeminiScorer(
+        other_client, model_name="other-model")).score_transcripts(_make_transcripts(3))
+
+    assert other_client.request_count == 3
+    assert score_cache.hits == 0
+
+
+def test_stream_highlights_async_matches_execute_async():
+    def contiguous_transcripts():
+        # Every chunk ends where the next one starts, so highlights merge
+        return [Segment(index * 60000, (index + 1) * 60000, "w" * index)
+                for index in range(22)]
+    emitted = []
+
+    expected = asyncio.run(_make_service(
+        FakeGenaiClient()).execute_async(contiguous_transcripts()))
+    streamed = asyncio.run(_make_service(FakeGenaiClient(drop_indices=(9,))).stream_highlights_async(
+        contiguous_transcripts(), emitted.append))
+
+    assert len(expected) == 2
+    assert streamed == expected
+    assert emitted == expected
+
+
+def test_execute_scores_generators_batch_by_batch():
+    client = FakeGenaiClient()
+    produced = 0
+    produced_at_first_request = []
+    generate_content = client.generate_content
+
+    def record_generate_content(model, contents, config=None):
+        produced_at_first_request.append(produced)
+        return generate_content(model, contents, config)
+
+    def transcripts():
+        nonlocal produced
+        for transcript in _make_transcripts(25):
+            produced += 1
+            yield transcript
+
+    client.generate_content = record_generate_content
+    highlights = _make_service(client).execute(transcripts())
+
+    # Scoring started after the first batch, not after the whole transcript
+    assert produced_at_first_request[0] == SCORING_BATCH_SIZE
+    assert [h.text for h in highlights] == [
+        "w" * index for index in range(25) if FakeGenaiClient.score("w" * index) > THRESHOLD_SCORE]
@@ -0,0 +1,149 @@
+from backend.models.segment import Segment
+from backend.services.highlight_detection import HighlightDetectionService
+from backend.services.highlight_ranking import HighlightRanker, find_peaks, smooth
+
+from unittest.mock import MagicMock
+
+import dataclasses
+import numpy as np
+import pytest
+
+CHUNK_MS = 60000
+
+
+def make_transcripts(scores: list) -> list:
+    return [Segment(index * CHUNK_MS, (index + 1) * CHUNK_MS, f"chunk {index}",
+                    highlight_score=score, reason=None if score is None else f"reason {index}")
+            for index, score in enumerate(scores)]
+
+
+def unbounded_ranker(**kwargs) -> HighlightRanker:
+    options = dict(weights={"llm": 1.0}, min_clip_seconds=0, max_clip_seconds=10**6,
+                   top_k=10**6, max_total_seconds=10**9)
+    return HighlightRanker(**{**options, **kwargs})
+
+
+def spans(clips: list) -> list:
+    return [(clip.start_ms // CHUNK_MS, clip.end_ms // CHUNK_MS) for clip in clips]
+
+
+def test_llm_scores_alone_match_threshold_and_aggregation():
+    rng = np.random.default_rng(0)
+    transcripts = make_transcripts(rng.integers(0, 11, 200).astype(float).tolist())
+    service = HighlightDetectionService(client=MagicMock())
+
+    expected = service.aggregate_highlights(service.detect_highlights(
+        [dataclasses.replace(transcript) for transcript in transcripts]))
+    ranked = unbounded_ranker().rank(transcripts)
+
+    assert [(clip.start_ms, clip.end_ms, clip.text, clip.highlight_score) for clip in ranked] == \
+        [(clip.start_ms, clip.end_ms, clip.text, clip.highlight_score) for clip in expected]
+
+
+def test_signals_break_ties_between_equal_ai_scores():
+    transcripts = make_transcripts([5, 8, 5, 5, 8, 5])
+    audio = np.array([0.0, 0.0, 0.0, 0.0, 2.0, 0.0])
+
+    clips = unbounded_ranker(weights={"llm": 1.0, "audio": 0.5}, top_k=1).rank(
+        transcripts, {"audio": audio})
+
+    assert spans(clips) == [(4, 5)]
+
+
+def test_strong_signals_promote_chunks_the_ai_scored_low():
+    transcripts = make_transcripts([5, 5, 6, 5, 5])
+    chat = np.array([0.0, 0.0, 50.0, 0.0, 0.0])
+
+    assert unbounded_ranker().rank(transcripts, {"chat": chat}) == []
+    clips = unbounded_ranker(weights={"llm": 1.0, "chat": 1.0}).rank(transcripts, {"chat": chat})
+    assert spans(clips) == [(2, 3)]
+
+
+def test_unscored_chunks_are_not_clipped_by_the_ai_score_alone():
+    transcripts = make_transcripts([None, 9, None, 8])
+
+    clips = unbounded_ranker().rank(transcripts)
+
+    assert spans(clips) == [(1, 2), (3, 4)]
+    assert [clip.reason for clip in clips] == ["reason 1", "reason 3"]
+
+
+def test_unscored_chunks_are_ranked_by_the_other_signals():
+    # Chunks left out by pre-ranking, one of them loud
+    transcripts = make_transcripts([None, None, None, 3, None, None])
+    audio = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 5.0])
+
+    clips = unbounded_ranker(weights={"llm": 1.0, "audio": 0.5}).rank(transcripts, {"audio": audio})
+
+    assert spans(clips) == [(5, 6)]
+    assert clips[0].highlight_score is None
+
+
+def test_long_runs_are_cut_around_their_peaks():
+    # One 10 minute run with a peak near each end
+    transcripts = make_transcripts([0, 9, 10, 8, 8, 8, 8, 8, 8, 10, 9, 0])
+
+    clips = unbounded_ranker(max_clip_seconds=180).rank(transcripts)
+
+    # Both peaks get their own clip, inside the run
+    assert spans(clips) == [(1, 4), (8, 11)]
+    assert all(clip.duration_ms == 180000 for clip in clips)
+
+
+def test_short_runs_are_widened():
+    transcripts = make_transcripts([0, 0, 9, 0, 0])
+
+    clips = unbounded_ranker(min_clip_seconds=180).rank(transcripts)
+
+    assert spans(clips) == [(1, 4)]
+    assert clips[0].text == "chunk 1 chunk 2 chunk 3"
+
+
+def test_overlapping_clips_keep_the_best_peak():
+    transcripts = make_transcripts([0, 8, 0, 10, 0])
+
+    clips = unbounded_ranker(min_clip_seconds=180).rank(transcripts)
+
+    # The clip of chunk 1 overlaps the better clip of chunk 3
+    assert spans(clips) == [(2, 5)]
+
+
+def test_top_k_and_duration_budgets():
+    transcripts = make_transcripts([9, 0, 10, 10, 0, 8, 0, 9.5])
+
+    assert spans(unbounded_ranker(top_k=2).rank(transcripts)) == [(2, 4), (7, 8)]
+    assert spans(unbounded_ranker(max_total_seconds=180).rank(transcripts)) == [(2, 4), (7, 8)]
+    # The best clip is too long for the budget, shorter ones are still taken
+    assert spans(unbounded_ranker(max_total_seconds=60).rank(transcripts)) == [(7, 8)]
+
+
+def test_min_clip_length_must_not_exceed_max():
+    with pytest.raises(ValueError):
+        HighlightRanker(min_clip_seconds=60, max_clip_seconds=30)
+
+
+def test_smooth_and_find_peaks():
+    scores = np.array([0.0, 3.0, 0.0, 1.0, 1.0, 0.0, 2.0])
+
+    assert smooth(scores, 3).tolist() == pytest.approx([1.5, 1, 4 / 3, 2 / 3, 2 / 3, 1, 1])
+    assert find_peaks(scores, 0.5).tolist() == [1, 3, 6]
+    assert find_peaks(scores, 2.5).tolist() == [1]
+
+
+def test_find_peaks_skips_the_shoulders_of_plateaus():
+    assert find_peaks(np.array([1.0, 5.0, 5.0, 6.0, 1.0]), 0).tolist() == [3]
+    assert find_peaks(np.array([8.0, 8.0, 9.0, 8.0]), 0).tolist() == [2]
+    assert find_peaks(np.array([1.0, 6.0, 6.0, 6.0, 1.0]), 0).tolist() == [1]
+    assert find_peaks(np.array([]), 0).tolist() == []
+
+
+def test_execute_ranks_when_given_a_ranker():
+    transcripts = make_transcripts([None] * 4)
+    service = HighlightDetectionService(client=MagicMock())
+    service.score_transcripts = lambda batch, batch_size: [
+        dataclasses.replace(transcript, highlight_score=9.0 if transcript.start_ms == CHUNK_MS else 1.0)
+        for transcript in batch]
+
+    clips = service.execute(iter(transcripts), ranker=unbounded_ranker(min_clip_seconds=120))
+
+    assert [(clip.start_ms, clip.end_ms, clip.highlight_score) for clip in clips] == [(30000, 150000, 9.0)]
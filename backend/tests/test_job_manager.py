@@ -0,0 +1,123 @@
+from backend.core.exceptions import JobNotFoundError, JobQueueFullError
+from backend.main import app
+from backend.models.generate_highlight_request import GenereateHighlightRequest
+from backend.models.generate_highlight_response import GenerateHighlightResponse
+from backend.models.job import JobStage
+from backend.models.progress_event import ProgressEventType
+from backend.services.job_manager import JobManager
+from fastapi.testclient import TestClient
+from threading import Event
+from unittest.mock import patch
+
+import time
+import pytest
+
+URL = "https://www.youtube.com/watch?v=UcE0Go6I0XI"
+
+
+class BlockingCoordinator:
+    """Coordinator stub that reports progress and waits until released."""
+
+    release = Event()
+
+    def run(self, video_url, download_mode=None, event_bus=None, scoring_backend=None):
+        event_bus.publish(ProgressEventType.STAGE,
+                          JobStage.SCORING, progress=0.5)
+        event_bus.publish(ProgressEventType.UPLOAD, JobStage.UPLOADING,
+                          completed=1, download_link="https://signed/partial")
+        self.release.wait(timeout=5)
+        if video_url.endswith("fail"):
+            raise RuntimeError("pipeline failed")
+        return GenerateHighlightResponse(download_links=["https://signed/clip"])
+
+
+@pytest.fixture
+def manager():
+    BlockingCoordinator.release = Event()
+    yield JobManager(max_workers=1, queue_size=1, coordinator_factory=BlockingCoordinator)
+    BlockingCoordinator.release.set()
+
+
+def _wait_for(job, stage):
+    deadline = time.time() + 5
+    while job.stage != stage and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.stage == stage
+
+
+def test_job_reports_progress_and_result(manager):
+    job = manager.submit(GenereateHighlightRequest(url=URL))
+
+    _wait_for(job, JobStage.SCORING)
+    assert manager.get(job.job_id).progress == 0.5
+    assert job.to_response().download_links == ["https://signed/partial"]
+
+    BlockingCoordinator.release.set()
+    _wait_for(job, JobStage.DONE)
+    assert job.to_response().download_links == ["https://signed/clip"]
+
+
+def test_job_failure_is_reported(manager):
+    job = manager.submit(GenereateHighlightRequest(url=URL + "&fail"))
+    BlockingCoordinator.release.set()
+
+    _wait_for(job, JobStage.FAILED)
+    assert job.error == "pipeline failed"
+
+
+def test_submit_rejects_jobs_when_queue_is_full(manager):
+    running = manager.submit(GenereateHighlightRequest(url=URL))
+    _wait_for(running, JobStage.SCORING)
+    queued = manager.submit(GenereateHighlightRequest(url=URL))
+
+    with pytest.raises(JobQueueFullError):
+        manager.submit(GenereateHighlightRequest(url=URL))
+    assert queued.stage == JobStage.QUEUED
+
+
+def test_get_unknown_job_raises(manager):
+    with pytest.raises(JobNotFoundError):
+        manager.get("unknown")
+
+
+def test_jobs_api(manager):
+    client = TestClient(app)
+
+    with patch("backend.routers.router.get_job_manager", return_value=manager):
+        created = client.post("/api/v1/jobs", json={"url": URL})
+        job_id = created.json()["job_id"]
+        _wait_for(manager.get(job_id), JobStage.SCORING)
+        client.post("/api/v1/jobs", json={"url": URL})
+        rejected = client.post("/api/v1/jobs", json={"url": URL})
+        status = client.get(f"/api/v1/jobs/{job_id}")
+        missing = client.get("/api/v1/jobs/unknown")
+        invalid = client.post("/api/v1/jobs", json={"url": "not a url"})
+
+    assert created.status_code == 202
+    assert rejected.status_code == 429
+    assert "Retry-After" in rejected.headers
+    assert status.status_code == 200
+    assert status.json()["stage"] == "scoring"
+    assert status.json()["progress"] == 0.5
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
+
+
+def test_job_events_stream(manager):
+    client = TestClient(app)
+
+    with patch("backend.routers.router.get_job_manager", return_value=manager):
+        job = manager.submit(GenereateHighlightRequest(url=URL))
+        _wait_for(job, JobStage.SCORING)
+        BlockingCoordinator.release.set()
+        # The stream replays the events so far and ends when the job is done
+        events = client.get(f"/api/v1/jobs/{job.job_id}/events")
+        missing = client.get("/api/v1/jobs/unknown/events")
+
+    assert events.status_code == 200
+    assert events.headers["content-type"].startswith("text/event-stream")
+    names = [line.split(": ", 1)[1] for line in events.text.splitlines()
+             if line.startswith("event: ")]
+    assert names == ["stage", "upload", "done"]
+    assert '"download_link":"https://signed/partial"' in events.text
+    assert missing.status_code == 404
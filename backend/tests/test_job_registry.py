@@ -0,0 +1,34 @@
+from backend.services.job_registry import JobRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_expired_results_are_dropped():
+    clock = FakeClock()
+    registry = JobRegistry(result_ttl_seconds=60, clock=clock)
+    registry.run("a", lambda: ["a"])
+
+    clock.now += 61
+    registry.run("b", lambda: ["b"])
+
+    assert list(registry._results) == ["b"]
+
+
+def test_oldest_results_are_dropped_beyond_max_results():
+    clock = FakeClock()
+    registry = JobRegistry(max_results=2, clock=clock)
+    runs = []
+
+    for key in ["a", "b", "c", "a"]:
+        clock.now += 1
+        registry.run(key, lambda: runs.append(key) or [key])
+
+    # "a" was dropped when "c" was stored, so it ran again and dropped "b"
+    assert runs == ["a", "b", "c", "a"]
+    assert list(registry._results) == ["c", "a"]
@@ -0,0 +1,199 @@
+from backend.services.media_store import MediaStore
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import os
+import shutil
+import time
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def downloader(tmp_path, size: int, ext: str = ".mp4"):
+    """
+    Returns a download function writing a file of the given size, and the
+    list of its calls.
+    """
+    calls = []
+
+    def download() -> str:
+        calls.append(size)
+        path = tmp_path / f"download_{len(calls)}_{size}{ext}"
+        path.write_bytes(b"0" * size)
+        return str(path)
+    return download, calls
+
+
+def test_second_fetch_is_a_hit(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1000)
+    download, calls = downloader(tmp_path, 100)
+
+    with store.acquire("video_a") as media:
+        first_path = media.fetch("video", download)
+    with store.acquire("video_a") as media:
+        second_path = media.fetch("video", download)
+
+    assert first_path == second_path == str(tmp_path / "store" / "video_a" / "video.mp4")
+    assert calls == [100]
+    assert store.size() == 100 + os.path.getsize(tmp_path / "store" / "video_a" / "manifest.json")
+
+
+def test_same_title_different_videos_do_not_collide(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1000)
+
+    with store.acquire("video_a") as media_a, store.acquire("video_b") as media_b:
+        path_a = media_a.fetch("video", downloader(tmp_path, 10)[0])
+        path_b = media_b.fetch("video", downloader(tmp_path, 20)[0])
+
+    assert path_a != path_b
+    assert os.path.getsize(path_a) == 10
+    assert os.path.getsize(path_b) == 20
+
+
+def test_staged_downloads_of_same_title_videos_do_not_collide(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1000)
+
+    def download_to(media, size):
+        def download() -> str:
+            path = os.path.join(media.staging_directory("audio"), "Same title.mp3")
+            with open(path, "wb") as f:
+                f.write(b"0" * size)
+            return path
+        return download
+
+    with store.acquire("video_a") as media_a, store.acquire("video_b") as media_b:
+        path_a = media_a.fetch("audio", download_to(media_a, 10))
+        path_b = media_b.fetch("audio", download_to(media_b, 20))
+
+    assert os.path.getsize(path_a) == 10
+    assert os.path.getsize(path_b) == 20
+    # The staging directory is deleted once its file is stored
+    assert not os.path.exists(tmp_path / "store" / "video_a" / ".staging" / "audio")
+
+
+def test_concurrent_fetches_download_once(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1000)
+    download, calls = downloader(tmp_path, 100)
+
+    def slow_download():
+        time.sleep(0.2)
+        return download()
+
+    def run_job(_):
+        with store.acquire("video_a") as media:
+            return media.fetch("video", slow_download)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        paths = set(executor.map(run_job, range(3)))
+
+    assert len(paths) == 1
+    assert calls == [100]
+
+
+def test_least_recently_used_videos_are_evicted(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=2500, clock=FakeClock())
+    for video_id in ["video_a", "video_b"]:
+        with store.acquire(video_id) as media:
+            media.fetch("video", downloader(tmp_path, 1000)[0])
+    # video_a is used again, so video_b is now the least recently used
+    store.acquire("video_a").release()
+
+    with store.acquire("video_c") as media:
+        media.fetch("video", downloader(tmp_path, 1000)[0])
+
+    assert sorted(os.listdir(tmp_path / "store")) == ["video_a", "video_c"]
+    assert store.size() <= 2500
+
+
+def test_evicted_videos_are_deleted_outside_the_lock(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1500, clock=FakeClock())
+    with store.acquire("video_a") as media:
+        media.fetch("video", downloader(tmp_path, 1000)[0])
+    locked_while_deleting = []
+    rmtree = shutil.rmtree
+
+    def record_rmtree(path, *args, **kwargs):
+        locked_while_deleting.append(store._lock.locked())
+        rmtree(path, *args, **kwargs)
+
+    with patch("backend.services.media_store.shutil.rmtree", side_effect=record_rmtree), \
+            store.acquire("video_b") as media:
+        media.fetch("video", downloader(tmp_path, 1000)[0])
+
+    assert locked_while_deleting and not any(locked_while_deleting)
+    assert os.listdir(tmp_path / "store") == ["video_b"]
+
+
+def test_leased_videos_are_never_evicted(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1500, clock=FakeClock())
+    running = store.acquire("video_a")
+    running.fetch("video", downloader(tmp_path, 1000)[0])
+
+    with store.acquire("video_b") as media:
+        path_b = media.fetch("video", downloader(tmp_path, 1000)[0])
+        # Over quota, but both videos are in use
+        assert sorted(os.listdir(tmp_path / "store")) == ["video_a", "video_b"]
+
+    # Released video_b is the only one that may go
+    assert not os.path.exists(path_b)
+    assert os.listdir(tmp_path / "store") == ["video_a"]
+    running.release()
+
+
+def test_derived_files_count_towards_the_quota(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1500, clock=FakeClock())
+    with store.acquire("video_a") as media:
+        video_path = media.fetch("video", downloader(tmp_path, 500)[0])
+        # A clip written next to the download
+        with open(video_path.replace(".mp4", "_clipped.mp4"), "wb") as f:
+            f.write(b"0" * 500)
+    assert store.size() > 1000
+
+    with store.acquire("video_b") as media:
+        media.fetch("video", downloader(tmp_path, 600)[0])
+
+    assert os.listdir(tmp_path / "store") == ["video_b"]
+
+
+def test_files_of_a_lease_directory_count_towards_the_quota(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1500, clock=FakeClock())
+    with store.acquire("video_a") as media:
+        # Downloaded ranges, without any fetched download
+        with open(os.path.join(media.directory("ranges"), "range.mp4"), "wb") as f:
+            f.write(b"0" * 1000)
+    assert store.size() == 1000
+
+    with store.acquire("video_b") as media:
+        media.fetch("video", downloader(tmp_path, 600)[0])
+
+    assert os.listdir(tmp_path / "store") == ["video_b"]
+
+
+def test_store_is_reloaded_from_disk(tmp_path):
+    root = str(tmp_path / "store")
+    with MediaStore(root=root, quota_bytes=1000).acquire("video_a") as media:
+        media.fetch("transcript", downloader(tmp_path, 100, ".json")[0])
+    download, calls = downloader(tmp_path, 100, ".json")
+
+    with MediaStore(root=root, quota_bytes=1000).acquire("video_a") as media:
+        path = media.fetch("transcript", download)
+
+    assert path.endswith(os.path.join("video_a", "transcript.json"))
+    assert calls == []
+
+
+def test_deleted_files_are_downloaded_again(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), quota_bytes=1000)
+    download, calls = downloader(tmp_path, 100)
+    with store.acquire("video_a") as media:
+        os.remove(media.fetch("video", download))
+        media.fetch("video", download)
+
+    assert calls == [100, 100]
@@ -0,0 +1,60 @@
+from backend.core.metrics import Counter, Histogram, MetricsRegistry, StageTimings, STAGE_DURATION
+from backend.main import app
+from fastapi.testclient import TestClient
+
+
+def test_counter_renders_labels():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter(
+        "test_items_total", "Items", labels=("stage",)))
+
+    counter.inc(stage="clip")
+    counter.inc(2, stage="clip")
+    counter.inc(stage='up"load')
+
+    assert registry.render().splitlines() == [
+        "# HELP test_items_total Items",
+        "# TYPE test_items_total counter",
+        'test_items_total{stage="clip"} 3.0',
+        'test_items_total{stage="up\\"load"} 1.0',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram(
+        "test_seconds", "Seconds", buckets=(1, 5)))
+
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="5"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 14.5",
+        "test_seconds_count 4",
+    ]
+
+
+def test_stage_timings_add_up_every_run():
+    timings = StageTimings()
+    runs_before = STAGE_DURATION.count(stage="test_stage")
+
+    timings.add("test_stage", 1.25)
+    timings.add("test_stage", 0.5)
+    with timings.measure("other_stage"):
+        pass
+
+    assert timings.as_dict()["test_stage"] == 1.75
+    assert "other_stage" in timings.as_dict()
+    assert STAGE_DURATION.count(stage="test_stage") == runs_before + 2
+
+
+def test_metrics_endpoint():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE highlight_stage_duration_seconds histogram" in response.text
+    assert "# TYPE highlight_ai_rate_limit_wait_seconds histogram" in response.text
@@ -0,0 +1,47 @@
+from backend.models.segment import Segment
+from backend.services.prerank import select_candidates, select_top_windows, standardize
+
+import numpy as np
+
+
+def make_transcripts(count: int) -> list:
+    return [Segment(index * 60000, (index + 1) * 60000, f"chunk {index}") for index in range(count)]
+
+
+def test_select_top_windows():
+    scores = np.array([0.0, 5.0, 1.0, -np.inf, 0.5, 4.0, 0.2, 0.1])
+
+    assert select_top_windows(scores, 2).tolist() == [1, 5]
+    assert select_top_windows(scores, 2, neighbours=1).tolist() == [0, 1, 2, 4, 5, 6]
+    assert select_top_windows(scores, 0, neighbours=1).tolist() == []
+    assert select_top_windows(scores, 100).tolist() == list(range(8))
+
+
+def test_select_candidates_sums_signals():
+    transcripts = make_transcripts(10)
+    audio = np.array([0, 0, 2, 0, 0, 0, 0, 1, 0, 0], dtype=float)
+    chat = np.array([0, 0, 0, 0, 0, 0, 0, 2, 0, 0], dtype=float)
+
+    candidates = select_candidates(transcripts, [audio, chat], keep_ratio=0.1, neighbours=0)
+
+    assert candidates == [transcripts[7]]
+
+
+def test_select_candidates_ranks_missing_values_lowest():
+    transcripts = make_transcripts(4)
+    # No audio past the second chunk, the chat alone ranks the rest
+    audio = np.array([1.0, -1.0, -np.inf, -np.inf])
+    chat = np.array([0.0, 0.0, 0.5, 3.0])
+
+    candidates = select_candidates(transcripts, [audio, chat], keep_ratio=0.5, neighbours=0)
+
+    assert candidates == [transcripts[0], transcripts[3]]
+
+
+def test_standardize():
+    values = np.array([1.0, 2.0, 3.0, 100.0])
+
+    assert np.allclose(standardize(values[:3]), [-1.224745, 0, 1.224745])
+    assert np.allclose(standardize(values, np.array([True, True, True, False]))[:3],
+                       [-1.224745, 0, 1.224745])
+    assert standardize(np.ones(3)).tolist() == [0, 0, 0]
@@ -0,0 +1,66 @@
+from backend.core.rate_limiter import RateLimiter, get_ai_rate_limiter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_allows_burst_then_spaces_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=15,
+                          tokens_per_minute=10**9, clock=clock)
+
+    waits = [limiter.reserve() for _ in range(17)]
+
+    assert waits[:15] == [0.0] * 15
+    # Each request over the burst waits for one more refill interval (60 / 15)
+    assert waits[15] == pytest.approx(4.0)
+    assert waits[16] == pytest.approx(8.0)
+
+
+def test_rate_limiter_refills_over_time():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60,
+                          tokens_per_minute=10**9, clock=clock)
+
+    for _ in range(60):
+        limiter.reserve()
+    clock.now = 10.0
+
+    waits = [limiter.reserve() for _ in range(11)]
+
+    assert waits[:10] == [0.0] * 10
+    assert waits[10] == pytest.approx(1.0)
+
+
+def test_rate_limiter_limits_tokens_per_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1000,
+                          tokens_per_minute=6000, clock=clock)
+
+    assert limiter.reserve(tokens=5000) == 0.0
+    # 4000 tokens short at 100 tokens per second
+    assert limiter.reserve(tokens=5000) == pytest.approx(40.0)
+
+
+def test_rate_limiter_is_shared_between_threads():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=30,
+                          tokens_per_minute=10**9, clock=clock)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        waits = sorted(executor.map(lambda _: limiter.reserve(), range(40)))
+
+    assert waits[:30] == [0.0] * 30
+    assert waits[30:] == pytest.approx([2.0 * i for i in range(1, 11)])
+
+
+def test_get_ai_rate_limiter_returns_process_wide_instance():
+    assert get_ai_rate_limiter() is get_ai_rate_limiter()
@@ -0,0 +1,103 @@
+from backend.models.ai_response import AIResponse
+from backend.services.score_cache import ScoreCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _score(value: float) -> AIResponse:
+    return AIResponse(highlight_score=value, reason=f"reason {value}")
+
+
+def test_score_cache_hit_and_miss_counters():
+    cache = ScoreCache(path=":memory:")
+
+    assert cache.get("chunk") is None
+    cache.set("chunk", _score(8))
+
+    assert cache.get("chunk") == _score(8)
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_score_cache_persists_on_disk(tmp_path):
+    path = str(tmp_path / "cache" / "scores.sqlite3")
+    ScoreCache(path=path).set("chunk", _score(5))
+
+    assert ScoreCache(path=path).get("chunk") == _score(5)
+
+
+def test_score_cache_key_includes_prompt_and_model(tmp_path):
+    path = str(tmp_path / "scores.sqlite3")
+    ScoreCache(path=path, prompt_template="prompt v1",
+               model_name="model-a").set("chunk", _score(5))
+
+    assert ScoreCache(path=path, prompt_template="prompt v1",
+                      model_name="model-a").get("chunk") == _score(5)
+    assert ScoreCache(path=path, prompt_template="prompt v2",
+                      model_name="model-a").get("chunk") is None
+    assert ScoreCache(path=path, prompt_template="prompt v1",
+                      model_name="model-b").get("chunk") is None
+
+
+def test_score_cache_keeps_the_scores_of_every_model_apart():
+    cache = ScoreCache(path=":memory:", model_name="model-a")
+    cache.set("chunk", _score(5))
+    cache.set("chunk", _score(2), model_name="local")
+
+    assert cache.get("chunk") == _score(5)
+    assert cache.get("chunk", model_name="model-a") == _score(5)
+    assert cache.get("chunk", model_name="local") == _score(2)
+    assert cache.get("chunk", model_name="model-b") is None
+
+
+def test_score_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = ScoreCache(path=":memory:", ttl_seconds=60, clock=clock)
+    cache.set("chunk", _score(5))
+
+    clock.now += 59
+    assert cache.get("chunk") == _score(5)
+    clock.now += 2
+    assert cache.get("chunk") is None
+    assert len(cache) == 0
+
+
+def test_score_cache_evicts_least_recently_used():
+    clock = FakeClock()
+    cache = ScoreCache(path=":memory:", max_entries=2, clock=clock)
+
+    cache.set("a", _score(1))
+    clock.now += 1
+    cache.set("b", _score(2))
+    clock.now += 1
+    # Touch "a" so "b" becomes the least recently used entry
+    cache.get("a")
+    clock.now += 1
+    cache.set("c", _score(3))
+
+    assert len(cache) == 2
+    assert cache.get("a") == _score(1)
+    assert cache.get("b") is None
+    assert cache.get("c") == _score(3)
+
+
+def test_score_cache_set_many_evicts_once_per_batch():
+    clock = FakeClock()
+    cache = ScoreCache(path=":memory:", max_entries=3, ttl_seconds=60, clock=clock)
+    cache.set("expired", _score(1))
+    clock.now += 61
+    cache.set("old", _score(2))
+    clock.now += 1
+
+    cache.set_many([("a", _score(3)), ("b", _score(4)), ("c", _score(5))])
+
+    assert len(cache) == 3
+    assert cache.get("expired") is None
+    assert cache.get("old") is None
+    assert [cache.get(text) for text in "abc"] == [_score(3), _score(4), _score(5)]
@@ -0,0 +1,144 @@
+from backend.core.clients import ClientPool
+from backend.core.constants import MAX_SCORE
+from backend.models.generate_highlight_request import ScoringBackend
+from backend.models.segment import Segment
+from backend.services.scorers import GeminiScorer, HeuristicScorer, LocalScorer, OpenAICompatibleScorer, PromptScorer, create_scorer
+from unittest.mock import MagicMock, patch
+
+import asyncio
+import httpx
+import json
+import numpy as np
+import pytest
+
+
+def test_heuristic_scores_lively_chunks_higher():
+    transcripts = [
+        Segment(0, 60000, "今日は雑談配信です"),
+        Segment(60000, 120000, "やばい"),
+        Segment(120000, 180000, "やばいやばい！www 草 まじで勝った！！ えぐい"),
+    ]
+
+    HeuristicScorer().score(transcripts)
+
+    assert transcripts[0].highlight_score == 0
+    assert 0 < transcripts[1].highlight_score < transcripts[2].highlight_score <= MAX_SCORE
+    assert transcripts[0].reason == "0 excitement keywords"
+    assert transcripts[1].reason == "1 excitement keywords"
+
+
+def test_heuristic_scores_keywords_per_minute():
+    scorer = HeuristicScorer(keyword_weights={"草": 1.0}, score_scale=2.0)
+
+    scores, keyword_counts = scorer.score_texts(["草草", "草草", "草"], np.array([1.0, 2.0, 0.1]))
+
+    assert keyword_counts.tolist() == [2, 2, 1]
+    # Chunks shorter than a quarter minute count as a quarter minute
+    assert scores.tolist() == [
+        round(MAX_SCORE * (1 - np.exp(-1.0)), 1),
+        round(MAX_SCORE * (1 - np.exp(-0.5)), 1),
+        round(MAX_SCORE * (1 - np.exp(-2.0)), 1),
+    ]
+
+
+def test_heuristic_counts_combined_marks_once():
+    scorer = HeuristicScorer(keyword_weights={"!": 0.5, "！": 0.5, "?!": 1.0, "？！": 1.0})
+
+    scores, keyword_counts = scorer.score_texts(["まじ?!", "えっ！", "うそ？！！", "?!?!!"], np.ones(4))
+
+    assert keyword_counts.tolist() == [1, 1, 2, 3]
+    assert scores.tolist() == [round(MAX_SCORE * (1 - np.exp(-points / scorer.score_scale)), 1)
+                               for points in [1.0, 0.5, 1.5, 2.5]]
+
+
+def test_openai_compatible_scorer_sends_chat_completions():
+    requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": '{"highlight_score": 7}'}}]})
+
+    scorer = OpenAICompatibleScorer(base_url="http://local/v1/", model_name="local-model", api_key="key")
+    scorer._client_args["transport"] = httpx.MockTransport(handle)
+    scorer._client = httpx.Client(**scorer._client_args)
+
+    assert scorer.generate("prompt", "instruction") == '{"highlight_score": 7}'
+    assert asyncio.run(scorer.generate_async("prompt", "instruction")) == '{"highlight_score": 7}'
+
+    for request in requests:
+        assert str(request.url) == "http://local/v1/chat/completions"
+        assert request.headers["Authorization"] == "Bearer key"
+        assert json.loads(request.content) == {
+            "model": "local-model",
+            "messages": [
+                {"role": "system", "content": "instruction"},
+                {"role": "user", "content": "prompt"},
+            ],
+            "temperature": 0,
+        }
+
+
+def test_openai_compatible_scorer_raises_on_server_errors():
+    scorer = OpenAICompatibleScorer(base_url="http://local/v1")
+    scorer._client = httpx.Client(base_url="http://local/v1", transport=httpx.MockTransport(
+        lambda request: httpx.Response(503)))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        scorer.generate("prompt", "instruction")
+
+
+@pytest.mark.parametrize("system_instruction", [False, True])
+def test_gemini_scorer_sends_the_instruction(system_instruction):
+    client = MagicMock()
+    client.models.generate_content.return_value.text = "answer"
+
+    answer = GeminiScorer(client, model_name="model", system_instruction=system_instruction).generate(
+        "prompt", "instruction")
+
+    assert answer == "answer"
+    request = client.models.generate_content.call_args.kwargs
+    assert request["model"] == "model"
+    if system_instruction:
+        assert request["contents"] == "prompt"
+        assert request["config"].system_instruction == "instruction"
+    else:
+        assert request["contents"] == "instructionprompt"
+        assert request["config"] is None
+
+
+def test_create_scorer_returns_the_shared_backend_scorer():
+    pool = ClientPool(credentials_path=None, api_key="fake-key")
+
+    with patch("backend.services.scorers.get_client_pool", return_value=pool):
+        assert isinstance(create_scorer(ScoringBackend.GEMINI), GeminiScorer)
+        assert isinstance(create_scorer(ScoringBackend.OPENAI_COMPATIBLE), OpenAICompatibleScorer)
+        assert isinstance(create_scorer(ScoringBackend.HEURISTIC), HeuristicScorer)
+        scorer = create_scorer(ScoringBackend.OPENAI_COMPATIBLE)
+
+    assert create_scorer(ScoringBackend.OPENAI_COMPATIBLE) is not scorer
+    with patch("backend.services.scorers.get_client_pool", return_value=pool):
+        assert create_scorer(ScoringBackend.OPENAI_COMPATIBLE) is scorer
+
+
+def test_client_pool_closes_the_scorers_and_their_async_clients():
+    pool = ClientPool(credentials_path=None, api_key="fake-key")
+    scorer = pool.scorer(ScoringBackend.OPENAI_COMPATIBLE, lambda: OpenAICompatibleScorer(base_url="http://local/v1"))
+    scorer._client_args["transport"] = httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"choices": [{"message": {"content": "answer"}}]}))
+
+    pool.run_async(scorer.generate_async("prompt", "instruction"))
+    async_client = next(iter(scorer._async_clients.values()))
+    pool.close()
+
+    assert scorer._client.is_closed
+    assert async_client.is_closed
+    assert pool.scorer(ScoringBackend.OPENAI_COMPATIBLE, OpenAICompatibleScorer) is not scorer
+
+
+def test_scorers_implement_their_own_interface():
+    with pytest.raises(TypeError):
+        PromptScorer()
+    with pytest.raises(TypeError):
+        LocalScorer()
+    assert isinstance(HeuristicScorer(), LocalScorer) and not hasattr(HeuristicScorer(), "generate")
+    assert isinstance(GeminiScorer(MagicMock()), PromptScorer) and not hasattr(GeminiScorer(MagicMock()), "score")
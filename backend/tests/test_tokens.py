@@ -0,0 +1,47 @@
+from backend.core.tokens import TokenCounter, compact_text
+
+from unittest.mock import MagicMock, patch
+
+
+def test_compact_text_keeps_one_of_every_repeated_annotation():
+    assert compact_text("[音楽] [音楽][音楽] はい [拍手] [拍手]") == "[音楽] はい [拍手]"
+    assert compact_text("[音楽] [拍手] [音楽]") == "[音楽] [拍手] [音楽]"
+
+
+def test_compact_text_keeps_the_first_filler_of_a_run():
+    assert compact_text("えーあのー、えっと今日は") == "えー今日は"
+    assert compact_text("um uh so, the album uh") == "um so, the album uh"
+    # Laughter is content, not filler
+    assert compact_text("wwwwww 草草草") == "wwwwww 草草草"
+
+
+def test_compact_text_collapses_whitespace():
+    assert compact_text("  a \n\t b  ") == "a b"
+
+
+def test_token_counter_counts_characters_without_an_encoding():
+    counter = TokenCounter(None)
+
+    assert counter.count("配信") == 2
+    assert counter.count_many(["a", "abc"]) == [1, 3]
+
+
+def test_token_counter_uses_the_encoding():
+    encoding = MagicMock()
+    encoding.encode_ordinary.return_value = [1, 2]
+    encoding.encode_ordinary_batch.return_value = [[1], [1, 2, 3]]
+
+    with patch("backend.core.tokens.tiktoken.get_encoding", return_value=encoding) as get_encoding:
+        counter = TokenCounter("cl100k_base")
+
+    get_encoding.assert_called_once_with("cl100k_base")
+    assert counter.count("hello world") == 2
+    assert counter.count_many(["a", "abc"]) == [1, 3]
+
+
+def test_token_counter_counts_characters_when_the_encoding_cannot_be_loaded():
+    with patch("backend.core.tokens.tiktoken.get_encoding", side_effect=OSError("offline")):
+        counter = TokenCounter("cl100k_base")
+
+    assert counter.encoding is None
+    assert counter.count("abc") == 3
@@ -0,0 +1,85 @@
+from backend.benchmarks.bench_transcript_cache import json_segments
+from backend.services.transcript_cache import BinaryTranscript, TranscriptCache
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy
+
+import json
+import os
+import pytest
+
+LINES = [{"text": f" 配信 {index}{'。' if index % 5 == 0 else ''} " if index % 9 else "  ",
+          "start": index * 1.5,
+          # Every 7th line is followed by a pause
+          "duration": 0.5 if index % 7 == 0 else 1.5}
+         for index in range(200)]
+
+
+def write_transcript(tmp_path, lines=LINES) -> str:
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(lines, ensure_ascii=False), encoding="utf-8")
+    return str(transcript_path)
+
+
+def test_binary_transcript_round_trip(tmp_path):
+    transcript_path = write_transcript(tmp_path)
+
+    with TranscriptCache().open(transcript_path) as transcript:
+        assert transcript.path == str(tmp_path / "transcript.bin")
+        assert list(transcript.iter_lines()) == [
+            {"text": line["text"].strip(), "start": line["start"], "duration": line["duration"]}
+            for line in LINES]
+
+
+def test_cache_converts_only_when_json_is_newer(tmp_path):
+    transcript_path = write_transcript(tmp_path)
+    cache = TranscriptCache()
+    cache.open(transcript_path).close()
+    binary_path = cache.binary_path(transcript_path)
+    converted_at = os.path.getmtime(binary_path)
+
+    cache.open(transcript_path).close()
+    assert os.path.getmtime(binary_path) == converted_at
+
+    write_transcript(tmp_path, LINES[:10])
+    os.utime(transcript_path, (converted_at + 10, converted_at + 10))
+    with cache.open(transcript_path) as transcript:
+        assert len(transcript) == 10
+
+
+def test_binary_files_are_opened_directly(tmp_path):
+    cache = TranscriptCache()
+    binary_path = str(tmp_path / "transcript.bin")
+    cache.write(binary_path, LINES)
+
+    with cache.open(binary_path) as transcript:
+        assert len(transcript) == len(LINES)
+
+
+def test_rejects_other_files(tmp_path):
+    other_path = tmp_path / "other.bin"
+    other_path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(ValueError):
+        BinaryTranscript(str(other_path))
+
+
+@pytest.mark.parametrize("policy", list(WindowPolicy))
+@pytest.mark.parametrize("chunk_size", [1, 10, 60, 1000])
+def test_cached_parse_matches_json_parse(tmp_path, policy, chunk_size):
+    transcript_path = write_transcript(tmp_path)
+    parser_service = TranscriptParser(policy=policy, chunk_size=chunk_size, overlap=0.5,
+                                      min_chunk_size=min(chunk_size, 5))
+
+    assert parser_service.parse(transcript_path) == parser_service.regroup(
+        json_segments(LINES, close_gaps=policy != WindowPolicy.BOUNDARY))
+
+
+def test_cached_parse_of_unsorted_lines_matches_json_parse(tmp_path):
+    lines = LINES[:20] + LINES[5:10]
+    transcript_path = write_transcript(tmp_path, lines)
+    parser_service = TranscriptParser(chunk_size=10)
+
+    assert parser_service.parse(transcript_path) == parser_service.regroup(json_segments(lines))
+
+
+def test_empty_transcript(tmp_path):
+    assert TranscriptParser().parse(write_transcript(tmp_path, [])) == []
@@ -1,9 +1,24 @@
-from backend.core.constants import END, START, TEXT
-from backend.services.transcript_parser import TranscriptParser
-from textwrap import dedent
+from backend.core.tokens import TokenCounter
+from backend.models.segment import Segment
+from backend.services.transcript_cache import TranscriptCache, iter_json_array
+from backend.services.transcript_parser import TranscriptParser, WindowPolicy
 
+import json
+import pytest
 
-def test_parse_transcripts():
+
+def _parse_lines(tmp_path, lines: list, close_gaps: bool = True) -> list:
+    """
+    The lines of a transcript JSON as segments, as parse reads them before grouping them into chunks.
+    """
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(lines, ensure_ascii=False), encoding="utf-8")
+    with TranscriptCache().open(str(transcript_path)) as transcript:
+        return [Segment(start_ms, end_ms, transcript.text(index)) for index, start_ms, end_ms
+                in zip(*(column.tolist() for column in transcript.segments(close_gaps)))]
+
+
+def test_parse_transcripts(tmp_path):
     # Sample VTT content
     json_content = [
         {
@@ -25,19 +40,13 @@ def test_parse_transcripts():
 
     # Expected parsed entries
     expected_entries = [
-        {START: "00:00:00.000", END: "00:00:05.000",
-            TEXT: "A"},
-        {START: "00:00:05.000", END: "00:01:30.000",
-            TEXT: "B"},
-        {START: "00:01:30.000", END: "00:01:33.000",
-            TEXT: "C"}
+        Segment(0, 5000, "A"),
+        Segment(5000, 90000, "B"),
+        Segment(90000, 93000, "C"),
     ]
 
-    # Create an instance of the TranscriptParserService
-    parser_service = TranscriptParser()
-
     # Parse the VTT content
-    parsed_entries = parser_service._parse_transcripts(json_content)
+    parsed_entries = _parse_lines(tmp_path, json_content)
 
     # Assert that the parsed entries match the expected entries
     assert parsed_entries == expected_entries
@@ -46,22 +55,22 @@ def test_parse_transcripts():
 def test_aggregate_transcripts():
     # Sample parsed entries
     parsed_entries = [
-        {START: "00:00:04.880", END: "00:00:59.950",
-            TEXT: "いやあ、まあ昨日はね、大変な1日だった"},
-        {START: "00:00:59.960", END: "00:01:12.749",
-            TEXT: "。もうそれ以外のことが何も考えられな"},
-        {START: "00:01:12.759", END: "00:02:16.230",
-            TEXT: "すぎて1日なんかぼーっとして過ごしてた"},
-        {START: "00:02:16.230", END: "00:02:19.230", TEXT: "AAA"}
+        Segment.from_timestamps("00:00:04.880", "00:00:59.950",
+                                "いやあ、まあ昨日はね、大変な1日だった"),
+        Segment.from_timestamps("00:00:59.960", "00:01:12.749",
+                                "。もうそれ以外のことが何も考えられな"),
+        Segment.from_timestamps("00:01:12.759", "00:02:16.230",
+                                "すぎて1日なんかぼーっとして過ごしてた"),
+        Segment.from_timestamps("00:02:16.230", "00:02:19.230", "AAA")
     ]
 
     # Expected aggregated entries
     expected_aggregated = [
-        {START: "00:00:04.880", END: "00:01:12.749",
-            TEXT: "いやあ、まあ昨日はね、大変な1日だった 。もうそれ以外のことが何も考えられな"},
-        {START: "00:01:12.759", END: "00:02:16.230",
-            TEXT: "すぎて1日なんかぼーっとして過ごしてた"},
-        {START: "00:02:16.230", END: "00:02:19.230", TEXT: "AAA"}
+        Segment.from_timestamps("00:00:04.880", "00:01:12.749",
+                                "いやあ、まあ昨日はね、大変な1日だった 。もうそれ以外のことが何も考えられな"),
+        Segment.from_timestamps("00:01:12.759", "00:02:16.230",
+                                "すぎて1日なんかぼーっとして過ごしてた"),
+        Segment.from_timestamps("00:02:16.230", "00:02:19.230", "AAA")
     ]
 
     # Create an instance of the TranscriptParserService
@@ -72,3 +81,124 @@ def test_aggregate_transcripts():
 
     # Assert that the aggregated entries match the expected entries
     assert aggregated_entries == expected_aggregated
+
+
+def test_parse_transcripts_longer_than_a_day(tmp_path):
+    json_content = [
+        {"text": "A", "start": 86399.5, "duration": 1.0},
+        {"text": "B", "start": 86400.25, "duration": 2.0},
+    ]
+
+    parsed_entries = _parse_lines(tmp_path, json_content)
+
+    assert parsed_entries == [
+        Segment(86399500, 86400250, "A"), Segment(86400250, 86402250, "B")]
+    assert str(parsed_entries[1]) == "24:00:00.250 - 24:00:02.250"
+
+
+def _ten_second_lines(count: int) -> list:
+    return [Segment(index * 10000, (index + 1) * 10000, str(index)) for index in range(count)]
+
+
+def test_sliding_windows_overlap():
+    parser_service = TranscriptParser(
+        policy=WindowPolicy.SLIDING, chunk_size=30, overlap=10)
+
+    windows = parser_service._aggregate_transcripts(_ten_second_lines(7))
+
+    # Windows start every 20 seconds and the last one reaches the end
+    assert [(w.start_ms, w.end_ms, w.text) for w in windows] == [
+        (0, 40000, "0 1 2 3"),
+        (20000, 60000, "2 3 4 5"),
+        (40000, 70000, "4 5 6"),
+    ]
+
+
+def test_sliding_window_overlap_must_be_shorter_than_chunks():
+    with pytest.raises(ValueError):
+        TranscriptParser(policy=WindowPolicy.SLIDING,
+                         chunk_size=30, overlap=30)
+
+
+def test_boundary_chunks_end_at_pauses_and_sentences(tmp_path):
+    json_content = [
+        {"text": "a", "start": 0.0, "duration": 10.0},
+        # Too short to end a chunk even though a pause follows
+        {"text": "b", "start": 10.0, "duration": 5.0},
+        {"text": "c", "start": 18.0, "duration": 5.0},
+        # Long enough, and a sentence ends
+        {"text": "d。", "start": 23.0, "duration": 3.0},
+        {"text": "e", "start": 26.0, "duration": 10.0},
+        {"text": "f", "start": 36.0, "duration": 10.0},
+    ]
+    parser_service = TranscriptParser(
+        policy=WindowPolicy.BOUNDARY, chunk_size=60, min_chunk_size=20, silence_gap=2)
+
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(json_content))
+
+    assert parser_service.parse(str(transcript_path)) == [
+        Segment(0, 26000, "a b c d。"), Segment(26000, 46000, "e f")]
+
+
+def test_token_chunks_end_at_the_token_budget_or_the_chunk_size():
+    lines = [Segment(index * 10000, (index + 1) * 10000, text) for index, text in enumerate(
+        ["quiet", "dense talk", "more dense talk", "a", "b", "c", "d", "e", "f", "g"])]
+    # One token per character
+    parser_service = TranscriptParser(
+        policy=WindowPolicy.TOKENS, chunk_size=30, token_budget=15, token_counter=TokenCounter(None))
+
+    chunks = parser_service.regroup(lines)
+
+    assert [(c.start_ms, c.end_ms, c.text) for c in chunks] == [
+        # The third line would take the chunk over the budget
+        (0, 20000, "quiet dense talk"),
+        (20000, 30000, "more dense talk"),
+        # Short lines fill the chunk up to its size, like FIXED
+        (30000, 70000, "a b c d"),
+        (70000, 100000, "e f g"),
+    ]
+
+
+def test_token_chunks_count_compacted_text():
+    lines = [Segment(0, 10000, "[音楽] [音楽] [音楽]"), Segment(10000, 20000, "[音楽]"),
+             Segment(20000, 30000, "hi")]
+    parser_service = TranscriptParser(
+        policy=WindowPolicy.TOKENS, chunk_size=60, token_budget=12, token_counter=TokenCounter(None))
+
+    assert parser_service.regroup(lines) == [Segment(0, 30000, "[音楽] [音楽] [音楽] [音楽] hi")]
+
+
+@pytest.mark.parametrize("block_size", [7, 64, 1 << 16])
+def test_iter_json_array_reads_items_across_blocks(tmp_path, block_size):
+    lines = [{"text": f"配信 {index} \"quoted\", [brackets]", "start": index * 1.5, "duration": 1.5}
+             for index in range(50)]
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(
+        lines, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    items = list(iter_json_array(
+        str(transcript_path), block_size=block_size))
+
+    assert items == lines
+
+
+def test_iter_json_array_rejects_truncated_files(tmp_path):
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text('[{"text": "a", "start": 0, "duration": 1}, {"text"')
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(transcript_path), block_size=8))
+
+
+def test_iter_parse_matches_parse(tmp_path):
+    lines = [{"text": f"line {index}", "start": index * 7.0, "duration": 7.0}
+             for index in range(100)]
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(lines))
+    parser_service = TranscriptParser()
+
+    chunks = parser_service.iter_parse(str(transcript_path))
+    first_chunk = next(chunks)
+
+    assert [first_chunk, *chunks] == parser_service.parse(str(transcript_path))
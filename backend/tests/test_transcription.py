@@ -0,0 +1,82 @@
+from backend.models.audio_features import AudioFeatures
+from backend.services.transcript_parser import TranscriptParser
+from backend.services.transcription import TranscriptionService, split_on_silence
+from unittest.mock import MagicMock, patch
+
+import json
+import numpy as np
+import pytest
+import shutil
+import wave
+
+SAMPLE_RATE = 16000
+
+
+def make_features(energy) -> AudioFeatures:
+    energy = np.asarray(energy, dtype=np.float32)
+    return AudioFeatures(frame_ms=1000, energy=energy, flux=np.zeros_like(energy),
+                         onsets=np.zeros(len(energy), dtype=bool))
+
+
+def test_split_on_silence_cuts_at_quietest_frame():
+    energy = np.ones(25)
+    energy[8] = 0.1
+    energy[17] = 0.2
+
+    time_ranges = split_on_silence(make_features(energy), chunk_seconds=10, search_seconds=4)
+
+    assert time_ranges == [(0, 8), (8, 17), (17, 25)]
+
+
+def test_split_on_silence_without_silence_cuts_at_chunk_size():
+    time_ranges = split_on_silence(make_features(np.ones(25)), chunk_seconds=10, search_seconds=0)
+
+    assert time_ranges == [(0, 10), (10, 20), (20, 25)]
+
+
+def test_split_on_silence_of_short_audio():
+    assert split_on_silence(make_features(np.ones(5)), chunk_seconds=10) == [(0, 5)]
+    assert split_on_silence(make_features([]), chunk_seconds=10) == []
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_transcribe_writes_raw_transcript(tmp_path):
+    audio_path = tmp_path / "stream.wav"
+    times = np.arange(SAMPLE_RATE * 25) / SAMPLE_RATE
+    # Speech-like tone with a pause at 9 seconds
+    samples = 0.3 * np.sin(2 * np.pi * 300 * times) * (np.abs(times - 9) > 0.5)
+    with wave.open(str(audio_path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        file.writeframes((samples * 32767).astype("<i2").tobytes())
+
+    model = MagicMock()
+    chunk_lengths = []
+
+    def transcribe(samples, **kwargs):
+        chunk_lengths.append(len(samples) / SAMPLE_RATE)
+        return {"segments": [{"start": 0.5, "end": 2.0, "text": " こんにちは "},
+                             {"start": 3.0, "end": 99.0, "text": "さようなら"}]}
+
+    model.transcribe.side_effect = transcribe
+    module = "backend.services.transcription"
+    with patch(f"{module}._load_model"), patch(f"{module}._model", model), \
+            patch(f"{module}.DOWNLOADED_TRANSCRIPT_PATH", str(tmp_path / "%(title)s.%(ext)s")):
+        service = TranscriptionService(max_workers=1, chunk_seconds=10)
+        transcript_path = service.transcribe(str(audio_path))
+
+    assert transcript_path == str(tmp_path / "stream.json")
+    with open(transcript_path, encoding="utf-8") as file:
+        lines = json.load(file)
+    # The first chunk ends in the pause, the others after half a chunk of steady tone
+    assert chunk_lengths == pytest.approx([8.5, 5, 5, 6.5], abs=0.06)
+    # Every line is timed from the start of the audio and ends within its chunk
+    assert [line["start"] for line in lines] == pytest.approx(
+        [0.5, 3.0, 9.0, 11.5, 14.0, 16.5, 19.0, 21.5], abs=0.06)
+    assert lines[0] == {"text": "こんにちは", "start": 0.5, "duration": 1.5}
+    assert lines[1]["duration"] == pytest.approx(5.5, abs=0.06)
+    assert service.report.chunk_count == 4
+    assert service.report.audio_seconds == pytest.approx(25)
+    assert service.report.throughput > 0
+    assert TranscriptParser().parse(transcript_path)
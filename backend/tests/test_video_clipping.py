@@ -1,6 +1,6 @@
 from unittest.mock import call
-from backend.services.video_clipping import VideoClippingService
-from backend.core.constants import START, END
+from backend.services.video_clipping import ClipMode, VideoClippingService
+from backend.models.segment import Segment
 from unittest.mock import patch
 
 
@@ -14,9 +14,9 @@ def test_video_clipping_service(mock_ffmpeg):
     sample_video_path = "./backend/download/downloaded_videos/sample_video.mp4"
     video_clipping_service = VideoClippingService(sample_video_path)
     highlights = [
-        {START: "00:00:04.880", END: "00:00:07.950"},
-        {START: "00:00:07.960", END: "00:00:12.749"},
-        {START: "00:00:12.759", END: "00:00:16.230"}
+        Segment.from_timestamps("00:00:04.880", "00:00:07.950"),
+        Segment.from_timestamps("00:00:07.960", "00:00:12.749"),
+        Segment.from_timestamps("00:00:12.759", "00:00:16.230")
     ]
 
     expected_output_paths = [
@@ -29,9 +29,51 @@ def test_video_clipping_service(mock_ffmpeg):
 
     assert len(clipped_video_path) == 3
     mock_ffmpeg.input.assert_any_call(
-        sample_video_path, ss="00:00:04.880", to="00:00:07.950")
+        sample_video_path, ss=4.88, to=7.95)
     mock_ffmpeg.input.assert_any_call(
-        sample_video_path, ss="00:00:07.960", to="00:00:12.749")
+        sample_video_path, ss=7.96, to=12.749)
     mock_ffmpeg.input.assert_any_call(
-        sample_video_path, ss="00:00:12.759", to="00:00:16.230")
+        sample_video_path, ss=12.759, to=16.23)
     assert clipped_video_path == expected_output_paths
+
+
+@patch("backend.services.video_clipping.ffmpeg")
+def test_video_clipping_pool_mode(mock_ffmpeg):
+    sample_video_path = "./backend/download/downloaded_videos/sample_video.mp4"
+    video_clipping_service = VideoClippingService(sample_video_path)
+    highlights = [Segment(index * 1000, (index + 1) * 1000, "")
+                  for index in range(6)]
+    stream = mock_ffmpeg.input.return_value.output.return_value.overwrite_output.return_value
+
+    clipped_video_path = video_clipping_service.clip(
+        highlights, mode=ClipMode.POOL, max_workers=3)
+
+    assert mock_ffmpeg.input.call_count == 6
+    assert stream.run.call_count == 6
+    stream.run.assert_called_with(quiet=True)
+    assert clipped_video_path == [
+        f"{sample_video_path.rsplit('.', 1)[0]}_clipped_00:00:{index:02}.000_00:00:{index + 1:02}.000.mp4"
+        for index in range(6)]
+
+
+@patch("backend.services.video_clipping.ffmpeg")
+def test_video_clipping_single_pass_mode(mock_ffmpeg):
+    sample_video_path = "./backend/download/downloaded_videos/sample_video.mp4"
+    video_clipping_service = VideoClippingService(sample_video_path)
+    highlights = [
+        Segment.from_timestamps("00:01:00.000", "00:01:30.000"),
+        Segment.from_timestamps("00:10:00.000", "00:10:15.500"),
+    ]
+    source = mock_ffmpeg.input.return_value
+
+    clipped_video_path = video_clipping_service.clip(
+        highlights, mode=ClipMode.SINGLE_PASS)
+
+    # The source is opened once and seeks to the first highlight
+    mock_ffmpeg.input.assert_called_once_with(sample_video_path, ss=60.0)
+    assert source.output.call_args_list == [
+        call(clipped_video_path[0], ss=0.0, to=30.0, c='copy'),
+        call(clipped_video_path[1], ss=540.0, to=555.5, c='copy'),
+    ]
+    mock_ffmpeg.merge_outputs.return_value.overwrite_output.return_value.run.assert_called_once_with(
+        quiet=True)
@@ -0,0 +1,127 @@
+from backend.services.video_metadata import VideoMetadataService
+from backend.services.youtube_download import AudioDownloadService, TranscriptDownloadService, VideoDownloadService
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import time
+
+URL = "https://www.youtube.com/watch?v=UcE0Go6I0XI"
+INFO = {
+    "id": "UcE0Go6I0XI",
+    "title": "Fake / title",
+    "duration": 3600.0,
+    "formats": [{"format_id": "18", "ext": "mp4"}, {"format_id": "140", "ext": "m4a"}],
+    "chapters": [{"start_time": 0.0, "end_time": 600.0, "title": "Opening"}],
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def stub_youtubedl(mock_youtubedl, extract_seconds: float = 0) -> MagicMock:
+    ydl = mock_youtubedl.return_value.__enter__.return_value
+
+    def extract_info(video_url, download):
+        time.sleep(extract_seconds)
+        return dict(INFO)
+
+    ydl.extract_info.side_effect = extract_info
+    ydl.sanitize_info.side_effect = lambda info: info
+    return ydl
+
+
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_metadata_fields(mock_youtubedl, tmp_path):
+    stub_youtubedl(mock_youtubedl)
+
+    metadata = VideoMetadataService(cache_dir=str(tmp_path)).get(URL)
+
+    assert metadata.video_id == "UcE0Go6I0XI"
+    assert metadata.title == "Fake / title"
+    assert metadata.duration == 3600.0
+    assert [video_format["format_id"] for video_format in metadata.formats] == ["18", "140"]
+    assert metadata.chapters[0]["title"] == "Opening"
+
+
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_concurrent_lookups_share_one_extraction(mock_youtubedl, tmp_path):
+    ydl = stub_youtubedl(mock_youtubedl, extract_seconds=0.2)
+    service = VideoMetadataService(cache_dir=str(tmp_path))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        infos = list(executor.map(lambda _: service.get_info(URL), range(4)))
+
+    assert ydl.extract_info.call_count == 1
+    assert all(info == INFO for info in infos)
+    # Every caller gets its own copy
+    infos[0]["title"] = "changed"
+    assert service.get_info(URL)["title"] == INFO["title"]
+
+
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_info_expires_from_memory_and_disk(mock_youtubedl, tmp_path):
+    ydl = stub_youtubedl(mock_youtubedl)
+    clock = FakeClock()
+    service = VideoMetadataService(cache_dir=str(tmp_path), ttl_seconds=60, clock=clock)
+
+    service.get_info(URL)
+    clock.now += 30
+    service.get_info(URL)
+    assert ydl.extract_info.call_count == 1
+
+    clock.now += 31
+    service.get_info(URL)
+    assert ydl.extract_info.call_count == 2
+
+
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_info_is_shared_through_disk(mock_youtubedl, tmp_path):
+    ydl = stub_youtubedl(mock_youtubedl)
+    VideoMetadataService(cache_dir=str(tmp_path)).get_info(URL)
+
+    # A new process starts with an empty memory cache
+    assert VideoMetadataService(cache_dir=str(tmp_path)).get_info(URL) == INFO
+    assert ydl.extract_info.call_count == 1
+
+
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_invalidate_refetches(mock_youtubedl, tmp_path):
+    ydl = stub_youtubedl(mock_youtubedl)
+    service = VideoMetadataService(cache_dir=str(tmp_path))
+    service.get_info(URL)
+
+    service.invalidate(URL)
+    service.get_info(URL)
+
+    assert ydl.extract_info.call_count == 2
+
+
+@patch("backend.services.youtube_download.YouTubeTranscriptApi")
+@patch("backend.services.youtube_download.os.path.exists", return_value=True)
+@patch("backend.services.youtube_download.YoutubeDL")
+@patch("backend.services.video_metadata.YoutubeDL")
+def test_one_extraction_per_job(mock_metadata_youtubedl, mock_download_youtubedl, _,
+                                mock_youtube_transcript_api, tmp_path):
+    ydl = stub_youtubedl(mock_metadata_youtubedl)
+    downloader = mock_download_youtubedl.return_value.__enter__.return_value
+    downloader.process_ie_result.side_effect = lambda info, download: {
+        **info, "ext": "mp4", "requested_downloads": [{"filename": str(tmp_path / "Fake _ title.mp4")}]}
+    mock_youtube_transcript_api.return_value.fetch.return_value.to_raw_data.return_value = []
+    service = VideoMetadataService(cache_dir=str(tmp_path))
+
+    with patch("backend.services.youtube_download.DOWNLOADED_TRANSCRIPT_PATH",
+               str(tmp_path / "%(title)s.%(ext)s")):
+        transcript_path = TranscriptDownloadService(metadata_service=service).download(URL)
+    VideoDownloadService(metadata_service=service).download(URL)
+    AudioDownloadService(metadata_service=service).download(URL)
+    VideoDownloadService(metadata_service=service).download_ranges(URL, [(0, 10), (20, 30)])
+
+    assert transcript_path == str(tmp_path / "Fake _ title.json")
+    assert ydl.extract_info.call_count == 1
+    downloader.extract_info.assert_not_called()
+    assert downloader.process_ie_result.call_count == 4
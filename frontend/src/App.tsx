@@ -3,9 +3,10 @@ import "./App.css";
 
 function App() {
 	const [youtubeUrl, setYoutubeUrl] = useState("");
-	const [clips, setClips] = useState([]);
+	const [clips, setClips] = useState<string[]>([]);
 	const [loading, setLoading] = useState(false);
 	const [error, setError] = useState("");
+	const [progress, setProgress] = useState("");
 
 	const fetchHighlights = async () => {
 		if (!youtubeUrl) return;
@@ -13,21 +14,53 @@ function App() {
 		setLoading(true);
 		setError("");
 		setClips([]);
+		setProgress("");
 
 		try {
-			const res = await fetch(
-				"http://localhost:8000/api/v1/generate-highlight",
-				{
-					method: "POST",
-					headers: { "Content-Type": "application/json" },
-					body: JSON.stringify({ url: youtubeUrl }),
-				}
-			);
+			const res = await fetch("http://localhost:8000/api/v1/jobs", {
+				method: "POST",
+				headers: { "Content-Type": "application/json" },
+				body: JSON.stringify({ url: youtubeUrl }),
+			});
 
+			if (res.status === 429) throw new Error("Server is busy");
 			if (!res.ok) throw new Error("Failed to fetch highlights");
 
-			const data = await res.json();
-			setClips(data.download_links || []);
+			const { job_id } = await res.json();
+
+			// Follow the job's progress events until it finishes
+			await new Promise<void>((resolve, reject) => {
+				const events = new EventSource(
+					`http://localhost:8000/api/v1/jobs/${job_id}/events`
+				);
+				const showProgress = (message: MessageEvent) => {
+					const event = JSON.parse(message.data);
+					if (event.progress !== undefined) {
+						setProgress(
+							`${event.stage} (${Math.round(event.progress * 100)}%)`
+						);
+					}
+				};
+
+				events.addEventListener("stage", showProgress);
+				events.addEventListener("scoring", showProgress);
+				events.addEventListener("upload", (message) => {
+					const event = JSON.parse(message.data);
+					setClips((clips) => [...clips, event.download_link]);
+				});
+				events.addEventListener("done", () => {
+					events.close();
+					resolve();
+				});
+				events.addEventListener("failed", (message) => {
+					events.close();
+					reject(new Error(JSON.parse(message.data).error));
+				});
+				events.onerror = () => {
+					events.close();
+					reject(new Error("Lost the job's progress stream"));
+				};
+			});
 		} catch (err) {
 			console.error(err);
 			setError("Error fetching highlights");
@@ -51,7 +84,7 @@ function App() {
 				Search
 			</button>
 
-			{loading && <p>Loading...</p>}
+			{loading && <p>Loading... {progress}</p>}
 			{error && <p style={{ color: "red" }}>{error}</p>}
 
 			<div style={{ marginTop: "20px" }}>